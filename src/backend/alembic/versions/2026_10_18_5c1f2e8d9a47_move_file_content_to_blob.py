@@ -0,0 +1,28 @@
+"""move file content to blob storage
+
+Revision ID: 5c1f2e8d9a47
+Revises: 74ba7e1b4810
+Create Date: 2026-10-18 15:02:11.408216
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f2e8d9a47'
+down_revision: Union[str, None] = '74ba7e1b4810'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows keep their text in file_content, which readers fall back to
+    op.add_column('files', sa.Column('content_path', sa.String(), nullable=True))
+    op.add_column('files', sa.Column('content_length', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'content_length')
+    op.drop_column('files', 'content_path')
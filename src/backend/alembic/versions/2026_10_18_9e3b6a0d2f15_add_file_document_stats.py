@@ -0,0 +1,34 @@
+"""add file document stats
+
+Revision ID: 9e3b6a0d2f15
+Revises: 5c1f2e8d9a47
+Create Date: 2026-10-18 15:20:43.117902
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3b6a0d2f15'
+down_revision: Union[str, None] = '5c1f2e8d9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows have no statistics, they are computed from their text when read
+    op.add_column('files', sa.Column('word_count', sa.Integer(), nullable=True))
+    op.add_column('files', sa.Column('token_count', sa.Integer(), nullable=True))
+    op.add_column('files', sa.Column('page_count', sa.Integer(), nullable=True))
+    op.add_column('files', sa.Column('language', sa.String(), nullable=True))
+    op.add_column('files', sa.Column('preview', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('files', 'preview')
+    op.drop_column('files', 'language')
+    op.drop_column('files', 'page_count')
+    op.drop_column('files', 'token_count')
+    op.drop_column('files', 'word_count')
@@ -16,7 +16,7 @@ from backend.schemas.cohere_chat import CohereChatRequest
 from backend.schemas.context import Context
 from backend.schemas.tool import Tool, ToolCategory
 from backend.services.chat import check_death_loop, generate_tools_preamble
-from backend.services.file import get_file_service
+from backend.services.file import get_file_service, get_file_stats
 from backend.tools.utils.tools_checkers import tool_has_category
 
 MAX_STEPS = 15
@@ -186,7 +186,7 @@ class CustomChat(BaseChat):
         # Add files to chat history if there are any
         # Otherwise, remove the Read_File and Search_File tools and all other FileReader tools
         if all_files:
-            chat_request.chat_history = self.add_files_to_chat_history(
+            chat_request.chat_history = await self.add_files_to_chat_history(
                 chat_request.chat_history,
                 session,
                 files + agent_files,
@@ -267,7 +267,7 @@ class CustomChat(BaseChat):
             if available_tools.get(tool.name)
         ]
 
-    def add_files_to_chat_history(
+    async def add_files_to_chat_history(
         self,
         chat_history: List[Dict[str, str]],
         session: Any,
@@ -279,13 +279,10 @@ class CustomChat(BaseChat):
         files_message = "The user uploaded the following attachments:\n"
 
         for file in files:
-            word_count = len(file.file_content.split())
+            # Word count and preview are computed at ingest, not from the text on every turn
+            stats = await get_file_stats(file)
 
-            # Use the first 25 words as the document preview in the preamble
-            num_words = min(25, word_count)
-            preview = " ".join(file.file_content.split()[:num_words])
-
-            files_message += f"Filename: {file.file_name}\nFile ID: {file.id}\nWord Count: {word_count} Preview: {preview}\n\n"
+            files_message += f"Filename: {file.file_name}\nFile ID: {file.id}\nWord Count: {stats['word_count']} Preview: {stats['preview']}\n\n"
 
         chat_history.append(ChatMessage(message=files_message, role=ChatRole.SYSTEM))
         return chat_history
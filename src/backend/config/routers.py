@@ -9,6 +9,7 @@ from backend.services.auth.request_validators import (
 )
 from backend.services.request_validators import (
     validate_chat_request,
+    validate_extraction_callback_token,
     validate_organization_header,
     validate_user_header,
 )
@@ -29,6 +30,9 @@ class RouterName(StrEnum):
     SNAPSHOT = "snapshot"
     MODEL = "model"
     SCIM = "scim"
+    EXTRACTION = "extraction"
+    EXTRACTION_CALLBACK = "extraction_callback"
+    COMPARE = "compare"
 
 
 class DependencyType(StrEnum):
@@ -171,4 +175,37 @@ ROUTER_DEPENDENCIES = {
             Depends(ScimAuthValidation()),
         ],
     },
+    RouterName.EXTRACTION: {
+        DependencyType.DEFAULT: [
+            Depends(get_session),
+            Depends(validate_user_header),
+            Depends(validate_organization_header),
+        ],
+        DependencyType.AUTH: [
+            Depends(get_session),
+            Depends(validate_authorization),
+            Depends(validate_organization_header),
+        ],
+    },
+    RouterName.COMPARE: {
+        DependencyType.DEFAULT: [
+            Depends(get_session),
+            Depends(validate_user_header),
+            Depends(validate_organization_header),
+        ],
+        DependencyType.AUTH: [
+            Depends(get_session),
+            Depends(validate_authorization),
+            Depends(validate_organization_header),
+        ],
+    },
+    # Called by the extraction service, not by users
+    RouterName.EXTRACTION_CALLBACK: {
+        DependencyType.DEFAULT: [
+            Depends(validate_extraction_callback_token),
+        ],
+        DependencyType.AUTH: [
+            Depends(validate_extraction_callback_token),
+        ],
+    },
 }
@@ -344,6 +344,19 @@ class RedisSettings(BaseSettings, BaseModel):
     )
 
 
+class MongoSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Status and progress updates are grouped into one bulk write per interval
+    status_flush_interval_ms: Optional[int] = Field(
+        default=20,
+        validation_alias=AliasChoices("MONGO_STATUS_FLUSH_INTERVAL_MS", "status_flush_interval_ms"),
+    )
+    status_batch_size: Optional[int] = Field(
+        default=500,
+        validation_alias=AliasChoices("MONGO_STATUS_BATCH_SIZE", "status_batch_size"),
+    )
+
+
 class GoogleCloudSettings(BaseSettings, BaseModel):
     model_config = SETTINGS_CONFIG
     api_key: Optional[str] = Field(
@@ -457,6 +470,219 @@ class MetricsSettings(BaseSettings, BaseModel):
     )
 
 
+class BlobSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    endpoint_url: Optional[str] = Field(
+        default="http://minio:9000",
+        validation_alias=AliasChoices("BLOB_ENDPOINT_URL", "endpoint_url"),
+    )
+    access_key: Optional[str] = Field(
+        default="minioadmin",
+        validation_alias=AliasChoices("BLOB_ACCESS_KEY", "access_key"),
+    )
+    secret_key: Optional[str] = Field(
+        default="minioadmin",
+        validation_alias=AliasChoices("BLOB_SECRET_KEY", "secret_key"),
+    )
+    bucket_name: Optional[str] = Field(
+        default="docu-compare-assets",
+        validation_alias=AliasChoices("BLOB_BUCKET_NAME", "bucket_name"),
+    )
+    # Size of each part of a multipart upload, S3 requires at least 5MB
+    multipart_part_size: Optional[int] = Field(
+        default=8 * 1024 * 1024,
+        validation_alias=AliasChoices("BLOB_MULTIPART_PART_SIZE", "multipart_part_size"),
+    )
+    # Number of parts of a single upload sent to storage in parallel
+    multipart_concurrency: Optional[int] = Field(
+        default=4,
+        validation_alias=AliasChoices("BLOB_MULTIPART_CONCURRENCY", "multipart_concurrency"),
+    )
+    # Endpoint clients use to reach storage directly, defaults to endpoint_url
+    public_endpoint_url: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("BLOB_PUBLIC_ENDPOINT_URL", "public_endpoint_url"),
+    )
+    # Lifetime of presigned URLs, in seconds
+    presigned_url_expiration: Optional[int] = Field(
+        default=3600,
+        validation_alias=AliasChoices("BLOB_PRESIGNED_URL_EXPIRATION", "presigned_url_expiration"),
+    )
+    # Redirect file downloads to presigned URLs instead of streaming them through the API
+    download_redirect: Optional[bool] = Field(
+        default=False,
+        validation_alias=AliasChoices("BLOB_DOWNLOAD_REDIRECT", "download_redirect"),
+    )
+
+
+class UploadSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Number of files of a batch upload processed (stored, registered, queued for extraction) in parallel
+    max_concurrent_files: Optional[int] = Field(
+        default=8,
+        validation_alias=AliasChoices("UPLOAD_MAX_CONCURRENT_FILES", "max_concurrent_files"),
+    )
+    # Number of files parsed in the process pool at once, defaults to the number of workers
+    max_concurrent_parses: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices("UPLOAD_MAX_CONCURRENT_PARSES", "max_concurrent_parses"),
+    )
+    # Time allowed to parse a single file, in seconds
+    parse_timeout_seconds: Optional[float] = Field(
+        default=120,
+        validation_alias=AliasChoices("UPLOAD_PARSE_TIMEOUT_SECONDS", "parse_timeout_seconds"),
+    )
+
+
+class ProcessPoolSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Number of worker processes for CPU-bound work, defaults to the number of CPUs
+    max_workers: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices("PROCESS_POOL_MAX_WORKERS", "max_workers"),
+    )
+
+
+class ExtractionSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # "local" extracts text in the backend process pool, "external" calls the extraction service
+    mode: Optional[str] = Field(
+        default="local",
+        validation_alias=AliasChoices("EXTRACTION_MODE", "mode"),
+    )
+    max_concurrent_documents: Optional[int] = Field(
+        default=2,
+        validation_alias=AliasChoices(
+            "EXTRACTION_MAX_CONCURRENT_DOCUMENTS", "max_concurrent_documents"
+        ),
+    )
+    # Pages of a PDF extracted by a single process pool task
+    pages_per_task: Optional[int] = Field(
+        default=16,
+        validation_alias=AliasChoices("EXTRACTION_PAGES_PER_TASK", "pages_per_task"),
+    )
+    # Documents of a single user extracted at the same time, unlimited if not set
+    max_concurrent_documents_per_tenant: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "EXTRACTION_MAX_CONCURRENT_DOCUMENTS_PER_TENANT",
+            "max_concurrent_documents_per_tenant",
+        ),
+    )
+    max_attempts: Optional[int] = Field(
+        default=5,
+        validation_alias=AliasChoices("EXTRACTION_MAX_ATTEMPTS", "max_attempts"),
+    )
+    # Delay before the first retry, doubled on every following attempt up to the maximum
+    retry_backoff_seconds: Optional[float] = Field(
+        default=2,
+        validation_alias=AliasChoices("EXTRACTION_RETRY_BACKOFF_SECONDS", "retry_backoff_seconds"),
+    )
+    retry_backoff_max_seconds: Optional[float] = Field(
+        default=300,
+        validation_alias=AliasChoices(
+            "EXTRACTION_RETRY_BACKOFF_MAX_SECONDS", "retry_backoff_max_seconds"
+        ),
+    )
+    # A running job whose lease is not renewed in time is considered orphaned and queued again
+    job_lease_seconds: Optional[float] = Field(
+        default=600,
+        validation_alias=AliasChoices("EXTRACTION_JOB_LEASE_SECONDS", "job_lease_seconds"),
+    )
+    poll_interval_seconds: Optional[float] = Field(
+        default=1,
+        validation_alias=AliasChoices("EXTRACTION_POLL_INTERVAL_SECONDS", "poll_interval_seconds"),
+    )
+    # Shared secret the extraction service sends in the Extraction-Token header of callbacks,
+    # callbacks are rejected while it is unset
+    callback_token: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("EXTRACTION_CALLBACK_TOKEN", "callback_token"),
+    )
+
+
+class TabularSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Rows of a sheet rendered per page of its text view
+    rows_per_page: Optional[int] = Field(
+        default=200,
+        validation_alias=AliasChoices("TABULAR_ROWS_PER_PAGE", "rows_per_page"),
+    )
+    # Rows per Parquet row group, the unit read from storage and pruned by statistics
+    row_group_size: Optional[int] = Field(
+        default=10000,
+        validation_alias=AliasChoices("TABULAR_ROW_GROUP_SIZE", "row_group_size"),
+    )
+
+
+class CompareSettings(BaseSettings, BaseModel):
+    model_config = SETTINGS_CONFIG
+    # Resolution of the grayscale page rasters of visual compares
+    raster_dpi: Optional[int] = Field(
+        default=36,
+        validation_alias=AliasChoices("COMPARE_RASTER_DPI", "raster_dpi"),
+    )
+    # Side in pixels of the tiles of the page difference maps
+    raster_tile_size: Optional[int] = Field(
+        default=12,
+        validation_alias=AliasChoices("COMPARE_RASTER_TILE_SIZE", "raster_tile_size"),
+    )
+    # Pages rendered or diffed by a single process pool task
+    raster_pages_per_task: Optional[int] = Field(
+        default=16,
+        validation_alias=AliasChoices("COMPARE_RASTER_PAGES_PER_TASK", "raster_pages_per_task"),
+    )
+    # Changed pages of a streamed compare diffed by a single process pool task
+    stream_batch_pages: Optional[int] = Field(
+        default=25,
+        validation_alias=AliasChoices("COMPARE_STREAM_BATCH_PAGES", "stream_batch_pages"),
+    )
+    # Compare jobs run at the same time by each backend instance
+    max_concurrent_jobs: Optional[int] = Field(
+        default=2,
+        validation_alias=AliasChoices("COMPARE_MAX_CONCURRENT_JOBS", "max_concurrent_jobs"),
+    )
+    # Compare jobs of a single user running at the same time, unlimited if not set
+    max_concurrent_jobs_per_tenant: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices(
+            "COMPARE_MAX_CONCURRENT_JOBS_PER_TENANT", "max_concurrent_jobs_per_tenant"
+        ),
+    )
+    job_max_attempts: Optional[int] = Field(
+        default=3,
+        validation_alias=AliasChoices("COMPARE_JOB_MAX_ATTEMPTS", "job_max_attempts"),
+    )
+    # A running job whose lease is not renewed in time is considered orphaned and queued again
+    job_lease_seconds: Optional[float] = Field(
+        default=600,
+        validation_alias=AliasChoices("COMPARE_JOB_LEASE_SECONDS", "job_lease_seconds"),
+    )
+    job_poll_interval_seconds: Optional[float] = Field(
+        default=1,
+        validation_alias=AliasChoices(
+            "COMPARE_JOB_POLL_INTERVAL_SECONDS", "job_poll_interval_seconds"
+        ),
+    )
+    # Bytes of compressed results kept in Redis, least recently used evicted first
+    cache_hot_max_bytes: Optional[int] = Field(
+        default=268435456,
+        validation_alias=AliasChoices("COMPARE_CACHE_HOT_MAX_BYTES", "cache_hot_max_bytes"),
+    )
+    # Compressed results larger than this are only kept in blob storage
+    cache_hot_max_entry_bytes: Optional[int] = Field(
+        default=16777216,
+        validation_alias=AliasChoices(
+            "COMPARE_CACHE_HOT_MAX_ENTRY_BYTES", "cache_hot_max_entry_bytes"
+        ),
+    )
+    # Bytes of compressed results kept in blob storage, least recently used evicted first
+    cache_cold_max_bytes: Optional[int] = Field(
+        default=10737418240,
+        validation_alias=AliasChoices("COMPARE_CACHE_COLD_MAX_BYTES", "cache_cold_max_bytes"),
+    )
+
+
 class Settings(BaseSettings):
     """
     Settings class used to grab environment variables from configuration.yaml
@@ -471,10 +697,17 @@ class Settings(BaseSettings):
     tools: Optional[ToolSettings] = Field(default=ToolSettings())
     database: Optional[DatabaseSettings] = Field(default=DatabaseSettings())
     redis: Optional[RedisSettings] = Field(default=RedisSettings())
+    mongo: Optional[MongoSettings] = Field(default=MongoSettings())
     google_cloud: Optional[GoogleCloudSettings] = Field(default=GoogleCloudSettings())
     deployments: Optional[DeploymentSettings] = Field(default=DeploymentSettings())
     logger: Optional[LoggerSettings] = Field(default=LoggerSettings())
     metrics: Optional[MetricsSettings] = Field(default=MetricsSettings())
+    blob: Optional[BlobSettings] = Field(default=BlobSettings())
+    upload: Optional[UploadSettings] = Field(default=UploadSettings())
+    process_pool: Optional[ProcessPoolSettings] = Field(default=ProcessPoolSettings())
+    extraction: Optional[ExtractionSettings] = Field(default=ExtractionSettings())
+    tabular: Optional[TabularSettings] = Field(default=TabularSettings())
+    compare: Optional[CompareSettings] = Field(default=CompareSettings())
 
     def get(self, path: str) -> Any:
         keys = path.split('.')
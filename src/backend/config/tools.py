@@ -12,6 +12,7 @@ from backend.tools import (
     HybridWebSearch,
     LangChainWikiRetriever,
     PythonInterpreter,
+    QueryTableTool,
     ReadFileTool,
     SearchFileTool,
     SharepointTool,
@@ -30,6 +31,7 @@ class Tool(Enum):
     Wiki_Retriever_LangChain = LangChainWikiRetriever
     Read_File = ReadFileTool
     Search_File = SearchFileTool
+    Query_Table = QueryTableTool
     Python_Interpreter = PythonInterpreter
     Calculator = Calculator
     Google_Drive = GoogleDrive
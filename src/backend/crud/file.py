@@ -89,6 +89,30 @@ def get_files_by_ids(db: Session, file_ids: list[str], user_id: str) -> list[Fil
     return db.query(File).filter(File.id.in_(file_ids), File.user_id == user_id).all()
 
 
+def get_file_content_paths(db: Session, file_ids: list[str], user_id: str) -> list[str]:
+    """
+    Get the Blob Storage paths of the contents of files, without loading the files.
+
+    Args:
+        db (Session): Database session.
+        file_ids (list[str]): File IDs.
+        user_id (str): User ID.
+
+    Returns:
+        list[str]: Content paths of the files stored in Blob Storage.
+    """
+    rows = (
+        db.query(File.content_path)
+        .filter(
+            File.id.in_(file_ids),
+            File.user_id == user_id,
+            File.content_path.is_not(None),
+        )
+        .all()
+    )
+    return [content_path for (content_path,) in rows]
+
+
 @validate_transaction
 def get_files_by_file_names(
     db: Session, file_names: list[str], user_id: str
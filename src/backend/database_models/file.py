@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy import String
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -10,6 +12,17 @@ class File(Base):
     user_id: Mapped[str] = mapped_column(String, nullable=True)
     file_name: Mapped[str]
     file_size: Mapped[int] = mapped_column(default=0)
-    file_content: Mapped[str] = mapped_column(default="")
+    # Only files created before contents moved to Blob Storage keep their text here, it is
+    # loaded on access so that listing files never reads it
+    file_content: Mapped[str] = mapped_column(default="", deferred=True)
+    # Blob Storage object holding the extracted text as UTF-8, and its size in bytes
+    content_path: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    content_length: Mapped[int] = mapped_column(default=0)
+    # Statistics computed once at ingest, see services/document_stats.py
+    word_count: Mapped[Optional[int]] = mapped_column(nullable=True)
+    token_count: Mapped[Optional[int]] = mapped_column(nullable=True)
+    page_count: Mapped[Optional[int]] = mapped_column(nullable=True)
+    language: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    preview: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
     __table_args__ = ()
@@ -22,9 +22,13 @@ from backend.metrics import RequestMetricsMiddleware
 from backend.routers.agent import router as agent_router
 from backend.routers.auth import router as auth_router
 from backend.routers.chat import router as chat_router
+from backend.routers.compare import router as compare_router
+from backend.routers.conversation import NEXT_CURSOR_HEADER
 from backend.routers.conversation import router as conversation_router
 from backend.routers.deployment import router as deployment_router
 from backend.routers.experimental_features import router as experimental_feature_router
+from backend.routers.extraction import callback_router as extraction_callback_router
+from backend.routers.extraction import router as extraction_router
 from backend.routers.model import router as model_router
 from backend.routers.organization import router as organization_router
 from backend.routers.scim import SCIMException, scim_exception_handler
@@ -32,9 +36,13 @@ from backend.routers.scim import router as scim_router
 from backend.routers.snapshot import router as snapshot_router
 from backend.routers.tool import router as tool_router
 from backend.routers.user import router as user_router
+from backend.services.compare_jobs import get_compare_job_service
 from backend.services.context import ContextMiddleware, get_context
+from backend.services.extraction import get_extraction_service
 from backend.services.logger.middleware import LoggingMiddleware
 from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import get_mongo_service
+from backend.services.process_pool import shutdown_process_pool
 
 # Only show errors for Pydantic
 logging.getLogger('pydantic').setLevel(logging.ERROR)
@@ -55,8 +63,19 @@ async def lifespan(app: FastAPI):
     # Retrieves all the Auth provider endpoints if authentication is enabled.
     if is_authentication_enabled():
         await get_auth_strategy_endpoints()
+    try:
+        await get_mongo_service().ensure_indexes()
+    except Exception as e:
+        LoggerFactory().get_logger().error(event="Error while creating Mongo indexes", error=str(e))
+    extraction_service = get_extraction_service()
+    await extraction_service.start()
+    compare_job_service = get_compare_job_service()
+    await compare_job_service.start()
     yield
     # Shutdown logic
+    await compare_job_service.stop()
+    await extraction_service.stop()
+    shutdown_process_pool()
 
 
 def create_app() -> FastAPI:
@@ -80,6 +99,9 @@ def create_app() -> FastAPI:
         organization_router,
         model_router,
         scim_router,
+        extraction_router,
+        extraction_callback_router,
+        compare_router,
     ]
 
     # Dynamically set router dependencies
@@ -106,6 +128,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
     app.add_middleware(LoggingMiddleware)
     if settings.get("metrics.enabled"):
@@ -57,6 +57,7 @@ from backend.services.agent import (
 from backend.services.context import get_context
 from backend.services.file import (
     get_file_service,
+    get_file_text,
     validate_file,
 )
 from backend.services.request_validators import (
@@ -587,7 +588,7 @@ async def get_agent_file(
     return FileMetadata(
         id=file.id,
         file_name=file.file_name,
-        file_content=file.file_content,
+        file_content=await get_file_text(file),
         file_size=file.file_size,
         created_at=file.created_at,
         updated_at=file.updated_at,
@@ -612,6 +613,6 @@ async def delete_agent_file(
     validate_file(session, file_id, user_id)
 
     # Delete the File DB object
-    get_file_service().delete_agent_file_by_id(session, agent_id, file_id, user_id, ctx)
+    await get_file_service().delete_agent_file_by_id(session, agent_id, file_id, user_id, ctx)
 
     return DeleteAgentFileResponse()
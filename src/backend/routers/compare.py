@@ -0,0 +1,164 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sse_starlette.sse import EventSourceResponse
+
+from backend.config.routers import RouterName
+from backend.routers.conversation import NEXT_CURSOR_HEADER
+from backend.schemas.compare import (
+    CompareJob,
+    CompareJobRequest,
+    CompareRequest,
+    CompareResult,
+)
+from backend.schemas.context import Context
+from backend.schemas.params.shared import CursorPaginationQueryParams
+from backend.services.compare import get_user_file
+from backend.services.compare_cache import get_compare_cache
+from backend.services.compare_jobs import get_compare_job_service
+from backend.services.compare_stream import check_compared_files, stream_compare
+from backend.services.context import get_context
+
+router = APIRouter(
+    prefix="/v1/compare",
+    tags=[RouterName.COMPARE],
+)
+router.name = RouterName.COMPARE
+
+
+@router.post("", response_model=CompareResult)
+async def compare(
+    compare_request: CompareRequest,
+    ctx: Context = Depends(get_context),
+) -> CompareResult:
+    """
+    Compare two versions of a document: paragraphs inserted, deleted, modified and moved
+    between them, located by page, and the changed cells of their tables.
+
+    Both files must be extracted, their stored pages are compared without parsing the
+    files again. Results are cached by the contents of the files and the options, so
+    comparing the same versions again is a read.
+
+    Raises:
+        HTTPException: If a file is not found or not extracted yet.
+    """
+    user_id = ctx.get_user_id()
+    file_a = await get_user_file(compare_request.file_id_a, user_id)
+    file_b = await get_user_file(compare_request.file_id_b, user_id)
+
+    result = await get_compare_cache().get_or_compare(file_a, file_b, compare_request.options)
+    return CompareResult(
+        file_id_a=compare_request.file_id_a,
+        file_id_b=compare_request.file_id_b,
+        **result,
+    )
+
+
+@router.post("/stream")
+async def compare_stream(
+    compare_request: CompareRequest,
+    ctx: Context = Depends(get_context),
+) -> EventSourceResponse:
+    """
+    Stream the comparison of two versions of a document: `progress` events, a `pages`
+    event with the changes of every batch of changed pages as soon as it is diffed, then
+    a `summary` event. Disconnecting cancels the batches not diffed yet.
+
+    Raises:
+        HTTPException: If a file is not found or cannot be compared.
+    """
+    user_id = ctx.get_user_id()
+    file_a = await get_user_file(compare_request.file_id_a, user_id)
+    file_b = await get_user_file(compare_request.file_id_b, user_id)
+    check_compared_files(file_a, file_b, compare_request.options)
+
+    return EventSourceResponse(
+        stream_compare(file_a, file_b, compare_request.options),
+        media_type="text/event-stream",
+        headers={"Connection": "keep-alive"},
+        send_timeout=300,
+        ping=5,
+    )
+
+
+def to_compare_job(job: dict) -> CompareJob:
+    return CompareJob(id=job["_id"], **{key: value for key, value in job.items() if key != "_id"})
+
+
+@router.post("/jobs", response_model=CompareJob)
+async def submit_compare_job(
+    compare_request: CompareJobRequest,
+    ctx: Context = Depends(get_context),
+) -> CompareJob:
+    """
+    Submit a compare to run in the background, recorded in the job history of the user.
+
+    A compare of the same contents and options that is already queued or running is not
+    queued again, and one whose result is stored is done at once.
+
+    Raises:
+        HTTPException: If a file is not found or cannot be compared.
+    """
+    user_id = ctx.get_user_id()
+    file_a = await get_user_file(compare_request.file_id_a, user_id)
+    file_b = await get_user_file(compare_request.file_id_b, user_id)
+    check_compared_files(file_a, file_b, compare_request.options)
+
+    job = await get_compare_job_service().submit(
+        file_a, file_b, compare_request.options, user_id, compare_request.priority
+    )
+    return to_compare_job(job)
+
+
+@router.get("/jobs", response_model=list[CompareJob])
+async def list_compare_jobs(
+    response: Response,
+    pagination: CursorPaginationQueryParams,
+    ctx: Context = Depends(get_context),
+) -> list[CompareJob]:
+    """
+    List the compare jobs of the user, newest first. When there are more jobs than
+    `limit`, the cursor of the next page is returned in the `X-Next-Cursor` header.
+
+    Raises:
+        HTTPException: If the cursor is not valid.
+    """
+    try:
+        jobs, next_cursor = await get_compare_job_service().list_jobs(
+            ctx.get_user_id(), limit=pagination.limit, cursor=pagination.cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [to_compare_job(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=CompareJob)
+async def get_compare_job(
+    job_id: str,
+    ctx: Context = Depends(get_context),
+) -> CompareJob:
+    """
+    Get a compare job of the user and its state.
+
+    Raises:
+        HTTPException: If the job is not found.
+    """
+    return to_compare_job(await get_compare_job_service().get_job(job_id, ctx.get_user_id()))
+
+
+@router.get("/jobs/{job_id}/result", response_model=CompareResult)
+async def get_compare_job_result(
+    job_id: str,
+    ctx: Context = Depends(get_context),
+) -> CompareResult:
+    """
+    Get the result of a done compare job, read from storage without comparing again.
+
+    Raises:
+        HTTPException: If the job is not found or not done.
+    """
+    compare_job_service = get_compare_job_service()
+    job = await compare_job_service.get_job(job_id, ctx.get_user_id())
+    result = await compare_job_service.get_result(job)
+    return CompareResult(file_id_a=job["file_id_a"], file_id_b=job["file_id_b"], **result)
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, Form, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Form, Header, HTTPException
 from fastapi import File as RequestFile
 from fastapi import UploadFile as FastAPIUploadFile
+from sse_starlette.sse import EventSourceResponse
 from starlette.responses import Response
 
 from backend.chat.custom.utils import get_deployment
@@ -8,7 +11,6 @@ from backend.config.routers import RouterName
 from backend.crud import agent as agent_crud
 from backend.crud import conversation as conversation_crud
 from backend.crud import message as message_crud
-from backend.database_models import Conversation as ConversationModel
 from backend.database_models.database import DBSessionDep
 from backend.schemas.agent import Agent
 from backend.schemas.context import Context
@@ -20,7 +22,12 @@ from backend.schemas.conversation import (
     ToggleConversationPinRequest,
     UpdateConversationRequest,
 )
+from backend.schemas.extraction import ExtractedPage
 from backend.schemas.file import (
+    CompleteDirectUploadRequest,
+    ConversationFilePages,
+    CreateDirectUploadsRequest,
+    CreateDirectUploadsResponse,
     DeleteConversationFileResponse,
     FileMetadata,
     ListConversationFile,
@@ -28,10 +35,23 @@ from backend.schemas.file import (
 )
 from backend.schemas.params.agent import AgentIdQueryParam
 from backend.schemas.params.conversation import ConversationIdPathParam, QueryQueryParam
-from backend.schemas.params.file import FileIdPathParam
+from backend.schemas.params.file import (
+    ColumnsQueryParam,
+    FileIdPathParam,
+    PageLimitQueryParam,
+    RowLimitQueryParam,
+    RowOffsetQueryParam,
+    SheetIndexPathParam,
+    StartPageQueryParam,
+)
 from backend.schemas.params.message import MessageIdPathParam
 from backend.schemas.params.model import ModelQueryParam
-from backend.schemas.params.shared import OrderByQueryParam, PaginationQueryParams
+from backend.schemas.params.shared import (
+    CursorPaginationQueryParams,
+    OrderByQueryParam,
+    PaginationQueryParams,
+)
+from backend.schemas.tabular import FileTables, TableRows
 from backend.services.agent import validate_agent_exists
 from backend.services.context import get_context
 from backend.services.conversation import (
@@ -39,14 +59,28 @@ from backend.services.conversation import (
     generate_conversation_title,
     get_documents_to_rerank,
     get_messages_with_files,
+    get_or_create_conversation,
     validate_conversation,
 )
+from backend.services.download import download_stored_file
 from backend.services.file import (
     attach_conversation_id_to_files,
     get_file_service,
     validate_file,
 )
+from backend.services.file_events import stream_conversation_file_events
 from backend.services.synthesizer import synthesize
+from backend.services.tabular import (
+    get_file_text_pages,
+    get_table_manifest,
+    get_table_rows,
+)
+from backend.services.upload import (
+    abort_direct_upload,
+    complete_direct_upload,
+    create_direct_uploads,
+    upload_conversation_files,
+)
 
 router = APIRouter(
     prefix="/v1/conversations",
@@ -54,6 +88,9 @@ router = APIRouter(
 )
 router.name = RouterName.CONVERSATION
 
+# Response header with the cursor of the next page of a cursor paginated listing
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 # CONVERSATIONS
 @router.get("/{conversation_id}", response_model=ConversationPublic)
@@ -242,7 +279,7 @@ async def delete_conversation(
     user_id = ctx.get_user_id()
     conversation = validate_conversation(session, conversation_id, user_id)
 
-    get_file_service().delete_all_conversation_files(
+    await get_file_service().delete_all_conversation_files(
         session, conversation.id, conversation.file_ids, user_id, ctx
     )
     conversation_crud.delete_conversation(session, conversation_id, user_id)
@@ -330,134 +367,138 @@ async def batch_upload_file(
     Uploads and creates a batch of File object.
     If no conversation_id is provided, a new Conversation is created as well.
 
+    Files are processed concurrently, a file that fails to upload is returned
+    with the FAILED_UPLOAD status and its error instead of failing the batch.
+
     Raises:
         HTTPException: If the conversation with the given ID is not found. Status code 404.
-        HTTPException: If the file wasn't uploaded correctly. Status code 500.
+        HTTPException: If none of the files were uploaded correctly. Status code 500.
     """
 
     user_id = ctx.get_user_id()
+    conversation = get_or_create_conversation(session, conversation_id, user_id)
 
-    # Create new conversation
-    if not conversation_id:
-        conversation = conversation_crud.create_conversation(
-            session,
-            ConversationModel(user_id=user_id),
-        )
-    # Check for existing conversation
-    else:
-        conversation = conversation_crud.get_conversation(
-            session, conversation_id, user_id
+    # Files whose content was already uploaded reuse the stored blob and its extraction
+    uploaded_files = await upload_conversation_files(
+        files, user_id, conversation.id, ctx
+    )
+
+    # Only fail the request when nothing could be uploaded, partial failures are reported per file
+    if uploaded_files and all(file.error for file in uploaded_files):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error while uploading file(s): {uploaded_files[0].error}.",
         )
 
-        # Fail if user_id is not provided when conversation DNE
-        if not conversation:
-            if not user_id:
-                raise HTTPException(
-                    status_code=400,
-                    detail="user_id is required if no valid conversation is provided.",
-                )
-
-            # Create new conversation
-            conversation = conversation_crud.create_conversation(
-                session,
-                ConversationModel(user_id=user_id),
-            )
+    return uploaded_files
 
-    # TODO: check if file already exists in DB once we have files per agents
-
-    # OLD LOGIC REPLACED BY NEW ARCHITECTURE
-    # try:
-    #     uploaded_files = await get_file_service().create_conversation_files(
-    #         session,
-    #         files,
-    #         user_id,
-    #         conversation.id,
-    #         ctx,
-    #     )
-    # except Exception as e:
-    #     raise HTTPException(
-    #         status_code=500, detail=f"Error while uploading file(s): {e}."
-    #     )
-    
-    # NEW ARCHITECTURE FLOW
-    from backend.services.blob import get_blob_service
-    from backend.services.mongo import get_mongo_service
-    from backend.services.extraction import get_extraction_service
-    from backend.database_models.file import File as PostgresFileModel 
-    import uuid
-    import datetime
 
-    blob_service = get_blob_service()
-    mongo_service = get_mongo_service()
-    extraction_service = get_extraction_service()
-    
-    uploaded_files = []
-    
-    try:
-        for file in files:
-            # 1. Upload to Blob
-            file_id = str(uuid.uuid4())
-            blob_path = f"raw/{file_id}/{file.filename}"
-            await blob_service.upload_file(file, blob_path)
-            
-            # 2. Save Metadata to Mongo
-            now = datetime.datetime.utcnow()
-            file_meta = {
-                "_id": file_id,
-                "user_id": user_id,
-                "conversation_id": conversation.id,
-                "file_name": file.filename,
-                "file_size": file.size,
-                "status": "UPLOADED",
-                "blob_path": blob_path,
-                "created_at": now,
-                "updated_at": now
-            }
-            await mongo_service.create_file_metadata(file_meta)
-            
-            # 3. Trigger Extraction
-            await extraction_service.trigger_extraction(file_id, blob_path)
-            
-            # 4. Construct valid response object directly
-            uploaded_files.append(
-                UploadConversationFileResponse(
-                    id=file_id,
-                    conversation_id=conversation.id,
-                    user_id=user_id,
-                    file_name=file.filename,
-                    file_size=file.size,
-                    created_at=now,
-                    updated_at=now
-                )
-            )
+@router.post("/batch_upload_file/presigned", response_model=CreateDirectUploadsResponse)
+async def create_presigned_uploads(
+    *,
+    request: CreateDirectUploadsRequest,
+    session: DBSessionDep,
+    ctx: Context = Depends(get_context),
+) -> CreateDirectUploadsResponse:
+    """
+    Starts uploads sent directly to Blob Storage, for files too large to go through the API.
+    If no conversation_id is provided, a new Conversation is created as well.
 
-    except Exception as e:
-        print(f"Upload failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    Each file is split in parts of `part_size` bytes, PUT to the presigned URL of the part.
+    The ETag header of each response is then sent to the completion endpoint, which
+    verifies the file and queues it for extraction.
 
-    return uploaded_files
+    Raises:
+        HTTPException: If the conversation is not found and no user ID is provided. Status code 400.
+    """
+    user_id = ctx.get_user_id()
+    conversation = get_or_create_conversation(session, request.conversation_id, user_id)
+
+    uploads = await create_direct_uploads(request.files, user_id, conversation.id)
+    return CreateDirectUploadsResponse(conversation_id=conversation.id, uploads=uploads)
+
+
+@router.post(
+    "/{conversation_id}/files/{file_id}/complete",
+    response_model=UploadConversationFileResponse,
+)
+async def complete_presigned_upload(
+    *,
+    conversation_id: ConversationIdPathParam,
+    file_id: FileIdPathParam,
+    request: CompleteDirectUploadRequest,
+    ctx: Context = Depends(get_context),
+) -> UploadConversationFileResponse:
+    """
+    Completes an upload sent directly to Blob Storage: checks the size and SHA-256 of
+    the stored file, registers it and queues it for extraction.
+
+    Raises:
+        HTTPException: If the upload is not pending. Status code 404.
+        HTTPException: If the stored file does not match the declared one. Status code 400.
+        HTTPException: If the file could not be registered. Status code 500.
+    """
+    user_id = ctx.get_user_id()
+    uploaded_file = await complete_direct_upload(
+        file_id, request.parts, user_id, conversation_id, ctx
+    )
+    if uploaded_file.error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error while uploading file: {uploaded_file.error}.",
+        )
+    return uploaded_file
+
+
+@router.delete("/{conversation_id}/files/{file_id}/upload")
+async def abort_presigned_upload(
+    *,
+    conversation_id: ConversationIdPathParam,
+    file_id: FileIdPathParam,
+    ctx: Context = Depends(get_context),
+) -> DeleteConversationFileResponse:
+    """
+    Aborts an upload sent directly to Blob Storage and discards the parts already sent.
+
+    Raises:
+        HTTPException: If the upload is not pending. Status code 404.
+    """
+    user_id = ctx.get_user_id()
+    await abort_direct_upload(file_id, user_id, conversation_id)
+    return DeleteConversationFileResponse()
 
 
 @router.get("/{conversation_id}/files", response_model=list[ListConversationFile])
 async def list_files(
     conversation_id: ConversationIdPathParam,
-    session: DBSessionDep, ctx:
-    Context = Depends(get_context),
+    session: DBSessionDep,
+    response: Response,
+    pagination: CursorPaginationQueryParams,
+    ctx: Context = Depends(get_context),
 ) -> list[ListConversationFile]:
     """
-    List all files from a conversation. Important - no pagination support yet.
+    List the files of a conversation, oldest first. When there are more files than
+    `limit`, the cursor of the next page is returned in the `X-Next-Cursor` header.
 
     Raises:
-        HTTPException: If the conversation with the given ID is not found.
+        HTTPException: If the cursor is not valid.
     """
     user_id = ctx.get_user_id()
     # conversation = validate_conversation(session, conversation_id, user_id) # Skip this for now as we want to see uploaded files even if conversation is empty/new
 
     from backend.services.mongo import get_mongo_service
     mongo_service = get_mongo_service()
-    
-    files = await mongo_service.get_files_by_conversation_id(conversation_id)
-    
+
+    try:
+        files, next_cursor = await mongo_service.get_files_by_conversation_id(
+            conversation_id, limit=pagination.limit, cursor=pagination.cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
     # Map Mongo files to schema
     results = []
     for f in files:
@@ -470,11 +511,37 @@ async def list_files(
             status=f.get("status", "UPLOADED"),
             created_at=f["created_at"],
             updated_at=f["updated_at"],
+            word_count=f.get("word_count"),
+            token_count=f.get("token_count"),
+            page_count=f.get("page_count"),
+            language=f.get("language"),
+            preview=f.get("preview"),
         ))
-        
+
     return results
 
 
+# Declared before the file routes so "events" is not taken for a file ID
+@router.get("/{conversation_id}/files/events")
+async def stream_file_events(
+    conversation_id: ConversationIdPathParam,
+    ctx: Context = Depends(get_context),
+) -> EventSourceResponse:
+    """
+    Stream the status and extraction progress of the files of a conversation.
+
+    Sends a `file_status` event with the current state of every file, then one every
+    time a file changes or is uploaded, until the client disconnects.
+    """
+    return EventSourceResponse(
+        stream_conversation_file_events(conversation_id),
+        media_type="text/event-stream",
+        headers={"Connection": "keep-alive"},
+        send_timeout=300,
+        ping=5,
+    )
+
+
 @router.get("/{conversation_id}/files/{file_id}", response_model=FileMetadata)
 async def get_file(
     conversation_id: ConversationIdPathParam,
@@ -505,20 +572,169 @@ async def get_file(
             detail=f"File with ID: {file_id} does not belong to the conversation with ID: {conversation_id}."
         )
 
-    # Note: Mongo currently stores blob path, not content. 
-    # If content text is needed, we need to read from blob or extracted text service.
-    # For now, return empty content as frontend likely only needs metadata here
-    
+    # Text of the pages extracted so far, the whole content once the file is EXTRACTED
+    pages = await get_file_text_pages(file_data)
+
     return FileMetadata(
         id=file_data["_id"],
         file_name=file_data["file_name"],
-        file_content="", # Content not stored in Mongo metadata
+        file_content="".join(page["text"] for page in pages),
         file_size=file_data["file_size"],
+        status=file_data.get("status", "UPLOADED"),
         created_at=file_data["created_at"],
         updated_at=file_data["updated_at"],
     )
 
 
+@router.get("/{conversation_id}/files/{file_id}/pages", response_model=ConversationFilePages)
+async def get_file_pages(
+    conversation_id: ConversationIdPathParam,
+    file_id: FileIdPathParam,
+    session: DBSessionDep,
+    start_page: StartPageQueryParam = 1,
+    limit: PageLimitQueryParam = None,
+    ctx: Context = Depends(get_context),
+) -> ConversationFilePages:
+    """
+    Get the extracted pages of a conversation file, from `start_page`.
+
+    Pages are available while the file is still being extracted, so readers can start
+    on the first pages and poll for the following ones until the file is EXTRACTED.
+
+    Raises:
+        HTTPException: If the conversation or file with the given ID is not found, or if the file does not belong to the conversation.
+    """
+    from backend.services.mongo import get_mongo_service
+    mongo_service = get_mongo_service()
+
+    file_data = await mongo_service.get_file_metadata(file_id)
+
+    if not file_data or file_data["conversation_id"] != conversation_id:
+        raise HTTPException(
+            status_code=404,
+            detail=f"File with ID: {file_id} not found in the conversation with ID: {conversation_id}."
+        )
+
+    pages = await get_file_text_pages(file_data, start_page, limit)
+
+    return ConversationFilePages(
+        id=file_data["_id"],
+        status=file_data.get("status", "UPLOADED"),
+        page_count=file_data.get("page_count"),
+        pages_extracted=file_data.get("pages_extracted", 0),
+        pages=[ExtractedPage(**page) for page in pages],
+    )
+
+
+@router.get("/{conversation_id}/files/{file_id}/tables", response_model=FileTables)
+async def get_file_tables(
+    conversation_id: ConversationIdPathParam,
+    file_id: FileIdPathParam,
+    ctx: Context = Depends(get_context),
+) -> FileTables:
+    """
+    Get the sheets of a tabular conversation file: columns, row counts and the statistics
+    of each row group.
+
+    Raises:
+        HTTPException: If the file is not found in the conversation, or is not an extracted table.
+    """
+    file_data, manifest = await _get_file_tables(conversation_id, file_id)
+    return FileTables(id=file_data["_id"], sheets=manifest["sheets"])
+
+
+@router.get(
+    "/{conversation_id}/files/{file_id}/tables/{sheet_index}/rows",
+    response_model=TableRows,
+)
+async def get_file_table_rows(
+    conversation_id: ConversationIdPathParam,
+    file_id: FileIdPathParam,
+    sheet_index: SheetIndexPathParam,
+    offset: RowOffsetQueryParam = 0,
+    limit: RowLimitQueryParam = 100,
+    columns: ColumnsQueryParam = None,
+    ctx: Context = Depends(get_context),
+) -> TableRows:
+    """
+    Get a window of rows of a sheet of a tabular conversation file, only reading the row
+    groups and columns it needs from storage.
+
+    Raises:
+        HTTPException: If the file, the sheet or a column is not found.
+    """
+    _, manifest = await _get_file_tables(conversation_id, file_id)
+    if sheet_index >= len(manifest["sheets"]):
+        raise HTTPException(status_code=404, detail=f"Sheet {sheet_index} not found.")
+    sheet = manifest["sheets"][sheet_index]
+
+    unknown_columns = set(columns or []) - {column["name"] for column in sheet["columns"]}
+    if unknown_columns:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Columns not found: {', '.join(sorted(unknown_columns))}.",
+        )
+
+    table = await get_table_rows(sheet, offset, limit, columns)
+    return TableRows(
+        sheet=sheet["name"],
+        offset=offset,
+        total_rows=sheet["num_rows"],
+        columns=table.column_names,
+        rows=[list(row.values()) for row in table.to_pylist()],
+    )
+
+
+async def _get_file_tables(conversation_id: str, file_id: str) -> tuple[dict, dict]:
+    from backend.services.mongo import get_mongo_service
+
+    file_data = await get_mongo_service().get_file_metadata(file_id)
+    if not file_data or file_data["conversation_id"] != conversation_id:
+        raise HTTPException(
+            status_code=404,
+            detail=f"File with ID: {file_id} not found in the conversation with ID: {conversation_id}."
+        )
+
+    manifest = await get_table_manifest(file_data)
+    if manifest is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"File with ID: {file_id} has no extracted tables.",
+        )
+    return file_data, manifest
+
+
+@router.get("/{conversation_id}/files/{file_id}/download")
+async def download_file(
+    conversation_id: ConversationIdPathParam,
+    file_id: FileIdPathParam,
+    range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    ctx: Context = Depends(get_context),
+) -> Response:
+    """
+    Download the original bytes of a conversation file.
+
+    Supports single byte ranges (206) and conditional requests on the ETag (304), and
+    streams the file from storage without buffering it. Redirects to a presigned storage
+    URL instead when `blob.download_redirect` is set.
+
+    Raises:
+        HTTPException: If the conversation or file with the given ID is not found, or if the file does not belong to the conversation.
+    """
+    from backend.services.mongo import get_mongo_service
+
+    file_data = await get_mongo_service().get_file_metadata(file_id)
+
+    if not file_data or file_data["conversation_id"] != conversation_id:
+        raise HTTPException(
+            status_code=404,
+            detail=f"File with ID: {file_id} not found in the conversation with ID: {conversation_id}."
+        )
+
+    return await download_stored_file(file_data, range, if_none_match)
+
+
 @router.delete("/{conversation_id}/files/{file_id}")
 async def delete_file(
     conversation_id: ConversationIdPathParam,
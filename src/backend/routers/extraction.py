@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from backend.config.routers import RouterName
+from backend.schemas.context import Context
+from backend.schemas.extraction import (
+    ExtractionCallback,
+    ExtractionCallbackResponse,
+    ExtractionQueueDepth,
+)
+from backend.services.context import get_context
+from backend.services.extraction import get_extraction_service
+
+router = APIRouter(
+    prefix="/v1/extraction",
+    tags=[RouterName.EXTRACTION],
+)
+router.name = RouterName.EXTRACTION
+
+# Routes called by the extraction service, authenticated with its token instead of a user
+callback_router = APIRouter(
+    prefix="/v1/extraction",
+    tags=[RouterName.EXTRACTION],
+)
+callback_router.name = RouterName.EXTRACTION_CALLBACK
+
+
+@router.get("/queue", response_model=ExtractionQueueDepth)
+async def get_extraction_queue_depth(
+    ctx: Context = Depends(get_context),
+) -> ExtractionQueueDepth:
+    """
+    Get the number of queued and running extraction jobs, overall and of the user.
+
+    The jobs of other users are only counted in the totals.
+    """
+    user_id = ctx.get_user_id()
+    depth = await get_extraction_service().get_queue_depth()
+    tenants = depth.pop("tenants")
+    return ExtractionQueueDepth(
+        **depth, tenants={user_id: tenants[user_id]} if user_id in tenants else {}
+    )
+
+
+@callback_router.post("/callback", response_model=ExtractionCallbackResponse)
+async def extraction_callback(
+    callback: ExtractionCallback,
+    ctx: Context = Depends(get_context),
+) -> ExtractionCallbackResponse:
+    """
+    Receive extraction results, page by page or in chunks.
+
+    Pages are stored as they arrive and readable right away, the status and progress of
+    every file with the extracted content are updated on each call.
+
+    Raises:
+        HTTPException: If the extraction job is not found.
+    """
+    result = await get_extraction_service().ingest_results(
+        callback.job_id,
+        [page.model_dump(exclude_none=True) for page in callback.pages],
+        status=callback.status,
+        page_count=callback.page_count,
+        error=callback.error,
+    )
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Extraction job with ID: {callback.job_id} not found.",
+        )
+
+    return ExtractionCallbackResponse(**result)
@@ -0,0 +1,387 @@
+import datetime
+from enum import StrEnum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class CompareOperationType(StrEnum):
+    INSERT = "insert"
+    DELETE = "delete"
+    MODIFY = "modify"
+    MOVE = "move"
+
+
+class CompareMode(StrEnum):
+    TEXT = "text"
+    VISUAL = "visual"
+
+
+class CompareOptions(BaseModel):
+    mode: CompareMode = Field(
+        CompareMode.TEXT,
+        title="Mode",
+        description="text compares the extracted paragraphs, visual compares rasters of the pages of PDFs, e.g. scans",
+    )
+    modify_threshold: float = Field(
+        0.5,
+        title="Modify Threshold",
+        description="Similarity from which a changed paragraph is reported as modified rather than deleted and inserted",
+        ge=0,
+        le=1,
+    )
+    detect_moves: bool = Field(
+        True,
+        title="Detect Moves",
+        description="Whether deleted paragraphs inserted elsewhere are reported as moved",
+    )
+    detect_table_changes: bool = Field(
+        True,
+        title="Detect Table Changes",
+        description="Whether the numeric changes of the tables of changed pages are reported",
+    )
+    numeric_tolerance: float = Field(
+        0.0,
+        title="Numeric Tolerance",
+        description="Absolute change of a table value up to which it is reported as unchanged",
+        ge=0,
+    )
+    numeric_change_threshold: float = Field(
+        0.0,
+        title="Numeric Change Threshold",
+        description="Change of a table value relative to the original value, e.g. 0.01 for 1%, from which it is reported",
+        ge=0,
+    )
+    detect_image_changes: bool = Field(
+        True,
+        title="Detect Image Changes",
+        description="Whether images inserted, deleted and modified are reported, for PDFs",
+    )
+    image_match_distance: int = Field(
+        12,
+        title="Image Match Distance",
+        description="Hamming distance of the 64-bit perceptual hashes up to which two images are versions of the same image",
+        ge=0,
+        le=64,
+    )
+
+
+class CompareRequest(BaseModel):
+    """
+    Request to compare two versions of a document
+    """
+    file_id_a: str = Field(
+        ...,
+        title="File ID A",
+        description="File ID of the original version",
+    )
+    file_id_b: str = Field(
+        ...,
+        title="File ID B",
+        description="File ID of the revised version",
+    )
+    options: CompareOptions = Field(
+        default_factory=CompareOptions,
+        title="Options",
+        description="Thresholds of the comparison",
+    )
+
+
+class CompareJobRequest(CompareRequest):
+    """
+    Request to run a compare as a background job
+    """
+    priority: int = Field(
+        0,
+        title="Priority",
+        description="Queued jobs of higher priority run first",
+        ge=0,
+        le=10,
+    )
+
+
+class CompareJobState(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class CompareJob(BaseModel):
+    id: str = Field(..., title="ID", description="Unique identifier of the job")
+    file_id_a: str = Field(..., title="File ID A", description="File ID of the original version")
+    file_id_b: str = Field(..., title="File ID B", description="File ID of the revised version")
+    file_name_a: str = Field(
+        ..., title="File Name A", description="Name of the original version"
+    )
+    file_name_b: str = Field(
+        ..., title="File Name B", description="Name of the revised version"
+    )
+    options: CompareOptions = Field(
+        ..., title="Options", description="Thresholds of the comparison"
+    )
+    priority: int = Field(..., title="Priority", description="Priority the job was submitted with")
+    state: CompareJobState = Field(
+        ...,
+        title="State",
+        description="State of the compare, shared by every job of the same files and options",
+    )
+    error: Optional[str] = Field(
+        None, title="Error", description="Error of the last failed attempt"
+    )
+    created_at: datetime.datetime = Field(
+        ..., title="Created At", description="When the job was submitted"
+    )
+
+
+class ParagraphLocation(BaseModel):
+    page_number: int = Field(
+        ...,
+        title="Page Number",
+        description="Number of the page of the paragraph, starting at 1",
+    )
+    paragraph_index: int = Field(
+        ...,
+        title="Paragraph Index",
+        description="Position of the paragraph in its page, starting at 0",
+    )
+    start: int = Field(
+        ...,
+        title="Start",
+        description="Offset of the first character of the paragraph in the text of its page",
+    )
+    end: int = Field(
+        ...,
+        title="End",
+        description="Offset after the last character of the paragraph in the text of its page",
+    )
+    text: str = Field(
+        ...,
+        title="Text",
+        description="Text of the paragraph",
+    )
+    hash: str = Field(
+        ...,
+        title="Hash",
+        description="Hash of the paragraph text, with whitespace collapsed",
+    )
+
+
+class WordChange(BaseModel):
+    type: str = Field(
+        ...,
+        title="Type",
+        description="replace, delete or insert",
+    )
+    a_text: str = Field(
+        ...,
+        title="Text A",
+        description="Words of the original version",
+    )
+    b_text: str = Field(
+        ...,
+        title="Text B",
+        description="Words of the revised version",
+    )
+
+
+class CompareOperation(BaseModel):
+    type: CompareOperationType = Field(
+        ...,
+        title="Type",
+        description="Kind of change",
+    )
+    a: Optional[ParagraphLocation] = Field(
+        None,
+        title="A",
+        description="Paragraph of the original version, None for insertions",
+    )
+    b: Optional[ParagraphLocation] = Field(
+        None,
+        title="B",
+        description="Paragraph of the revised version, None for deletions",
+    )
+    similarity: Optional[float] = Field(
+        None,
+        title="Similarity",
+        description="Word similarity of the two paragraphs of a modification",
+    )
+    changes: list[WordChange] = Field(
+        default_factory=list,
+        title="Changes",
+        description="Word-level changes of a modification",
+    )
+
+
+class TableLocation(BaseModel):
+    page_number: int = Field(
+        ...,
+        title="Page Number",
+        description="Number of the page of the table, starting at 1",
+    )
+    table_index: int = Field(
+        ...,
+        title="Table Index",
+        description="Position of the table in its page, starting at 0",
+    )
+
+
+class TableCellChange(BaseModel):
+    row: str = Field(..., title="Row", description="Label of the row, in the revised version")
+    column: str = Field(
+        ..., title="Column", description="Header of the column, in the revised version"
+    )
+    a_value: Optional[float] = Field(
+        None, title="Value A", description="Value of the original version, None if empty"
+    )
+    b_value: Optional[float] = Field(
+        None, title="Value B", description="Value of the revised version, None if empty"
+    )
+    delta: Optional[float] = Field(
+        None, title="Delta", description="Revised value minus original value"
+    )
+    relative_change: Optional[float] = Field(
+        None,
+        title="Relative Change",
+        description="Delta relative to the original value, None if it is empty or zero",
+    )
+
+
+class TableChange(BaseModel):
+    a: TableLocation = Field(..., title="A", description="Table of the original version")
+    b: TableLocation = Field(..., title="B", description="Table of the revised version")
+    cells: list[TableCellChange] = Field(
+        default_factory=list,
+        title="Cells",
+        description="Changed cells, rows aligned by label and columns by header",
+    )
+
+
+class ImageLocation(BaseModel):
+    page_number: int = Field(
+        ...,
+        title="Page Number",
+        description="Number of the page of the image, starting at 1",
+    )
+    image_index: int = Field(
+        ...,
+        title="Image Index",
+        description="Position of the image in its page, starting at 0",
+    )
+    name: str = Field(..., title="Name", description="Name of the image in the PDF")
+    width: int = Field(..., title="Width", description="Width of the image, in pixels")
+    height: int = Field(..., title="Height", description="Height of the image, in pixels")
+
+
+class ImageChange(BaseModel):
+    type: CompareOperationType = Field(
+        ...,
+        title="Type",
+        description="insert, delete or modify",
+    )
+    a: Optional[ImageLocation] = Field(
+        None,
+        title="A",
+        description="Image of the original version, None for insertions",
+    )
+    b: Optional[ImageLocation] = Field(
+        None,
+        title="B",
+        description="Image of the revised version, None for deletions",
+    )
+    distance: Optional[int] = Field(
+        None,
+        title="Distance",
+        description="Hamming distance of the perceptual and difference hashes of a modified image",
+    )
+
+
+class Region(BaseModel):
+    left: float = Field(..., title="Left", description="Left edge, as a fraction of the page width")
+    top: float = Field(..., title="Top", description="Top edge, as a fraction of the page height")
+    right: float = Field(
+        ..., title="Right", description="Right edge, as a fraction of the page width"
+    )
+    bottom: float = Field(
+        ..., title="Bottom", description="Bottom edge, as a fraction of the page height"
+    )
+
+
+class VisualPageChange(BaseModel):
+    type: CompareOperationType = Field(
+        ...,
+        title="Type",
+        description="insert, delete or modify",
+    )
+    a_page_number: Optional[int] = Field(
+        None,
+        title="Page Number A",
+        description="Page of the original version, None for insertions",
+    )
+    b_page_number: Optional[int] = Field(
+        None,
+        title="Page Number B",
+        description="Page of the revised version, None for deletions",
+    )
+    regions: list[Region] = Field(
+        default_factory=list,
+        title="Regions",
+        description="Bounding boxes of the changed regions of a modified page",
+    )
+    changed_ratio: float = Field(
+        ...,
+        title="Changed Ratio",
+        description="Share of the tiles of the page that changed",
+    )
+
+
+class CompareSummary(BaseModel):
+    pages_a: int = Field(..., title="Pages A", description="Number of pages of the original version")
+    pages_b: int = Field(..., title="Pages B", description="Number of pages of the revised version")
+    identical_pages: int = Field(
+        ..., title="Identical Pages", description="Number of pages identical in both versions"
+    )
+    inserted: int = Field(..., title="Inserted", description="Number of inserted paragraphs")
+    deleted: int = Field(..., title="Deleted", description="Number of deleted paragraphs")
+    modified: int = Field(..., title="Modified", description="Number of modified paragraphs")
+    moved: int = Field(..., title="Moved", description="Number of moved paragraphs")
+    changed_cells: int = Field(
+        0, title="Changed Cells", description="Number of changed table cells"
+    )
+    changed_images: int = Field(
+        0, title="Changed Images", description="Number of inserted, deleted and modified images"
+    )
+    changed_regions: int = Field(
+        0, title="Changed Regions", description="Number of changed regions of a visual compare"
+    )
+
+
+class CompareResult(BaseModel):
+    file_id_a: str = Field(..., title="File ID A", description="File ID of the original version")
+    file_id_b: str = Field(..., title="File ID B", description="File ID of the revised version")
+    engine_version: int = Field(
+        ...,
+        title="Engine Version",
+        description="Version of the compare engine that produced the result",
+    )
+    summary: CompareSummary = Field(..., title="Summary", description="Counts of the changes")
+    operations: list[CompareOperation] = Field(
+        default_factory=list,
+        title="Operations",
+        description="Changes turning the original version into the revised one, in document order",
+    )
+    table_changes: list[TableChange] = Field(
+        default_factory=list,
+        title="Table Changes",
+        description="Numeric changes of the tables of changed pages, in document order",
+    )
+    image_changes: list[ImageChange] = Field(
+        default_factory=list,
+        title="Image Changes",
+        description="Images inserted, deleted and modified, in document order",
+    )
+    visual_changes: list[VisualPageChange] = Field(
+        default_factory=list,
+        title="Visual Changes",
+        description="Pages inserted, deleted and modified of a visual compare, in document order",
+    )
@@ -0,0 +1,96 @@
+from enum import StrEnum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ExtractionCallbackStatus(StrEnum):
+    PROCESSING = "PROCESSING"
+    EXTRACTED = "EXTRACTED"
+    FAILED = "FAILED"
+
+
+class TenantQueueDepth(BaseModel):
+    queued: int = Field(
+        ...,
+        title="Queued",
+        description="Extraction jobs waiting to run",
+    )
+    running: int = Field(
+        ...,
+        title="Running",
+        description="Extraction jobs running",
+    )
+
+
+class ExtractionQueueDepth(TenantQueueDepth):
+    tenants: dict[str, TenantQueueDepth] = Field(
+        default_factory=dict,
+        title="Tenants",
+        description="Queued and running extraction jobs of the requesting tenant",
+    )
+
+
+class ExtractedPage(BaseModel):
+    page_number: int = Field(
+        ...,
+        title="Page Number",
+        description="Number of the page in the document, starting at 1",
+        ge=1,
+    )
+    text: str = Field(
+        ...,
+        title="Text",
+        description="Text extracted from the page",
+    )
+    char_offset: Optional[int] = Field(
+        None,
+        title="Character Offset",
+        description="Offset of the page in the text of the whole document",
+        ge=0,
+    )
+
+
+class ExtractionCallback(BaseModel):
+    """
+    Extraction results sent by the extraction service, in as many calls as it wants
+    """
+    job_id: str = Field(
+        ...,
+        title="Job ID",
+        description="ID of the extraction job, as sent when the extraction was requested",
+    )
+    pages: list[ExtractedPage] = Field(
+        default_factory=list,
+        title="Pages",
+        description="Pages extracted since the previous call",
+    )
+    page_count: Optional[int] = Field(
+        None,
+        title="Page Count",
+        description="Number of pages of the document, once known",
+        ge=0,
+    )
+    status: ExtractionCallbackStatus = Field(
+        ExtractionCallbackStatus.PROCESSING,
+        title="Status",
+        description="PROCESSING while pages are coming, then EXTRACTED or FAILED",
+    )
+    error: Optional[str] = Field(
+        None,
+        title="Error",
+        description="Why the extraction failed",
+    )
+
+
+class ExtractionCallbackResponse(BaseModel):
+    job_state: str = Field(
+        ...,
+        title="Job State",
+        description="State of the extraction job after the results were stored",
+    )
+    pages_stored: int = Field(
+        ...,
+        title="Pages Stored",
+        description="Pages of this call that were not stored before",
+    )
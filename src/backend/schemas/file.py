@@ -1,9 +1,25 @@
 import datetime
 from abc import ABC
+from enum import StrEnum
 from typing import Optional
 
 from pydantic import BaseModel, Field
 
+from backend.schemas.extraction import ExtractedPage
+
+
+class FileStatus(StrEnum):
+    """
+    Lifecycle of an uploaded file, from storage to extraction
+    """
+    UPLOADED = "UPLOADED"
+    QUEUED = "QUEUED"
+    PROCESSING = "PROCESSING"
+    EXTRACTED = "EXTRACTED"
+    FAILED = "FAILED"
+    FAILED_TRIGGER = "FAILED_TRIGGER"
+    FAILED_UPLOAD = "FAILED_UPLOAD"
+
 
 class FileBase(ABC, BaseModel):
     """
@@ -40,6 +56,31 @@ class FileBase(ABC, BaseModel):
         title="File Status",
         description="Status of the file (e.g., UPLOADED, PARSED)",
     )
+    word_count: Optional[int] = Field(
+        None,
+        title="Word Count",
+        description="Number of words of the extracted text",
+    )
+    token_count: Optional[int] = Field(
+        None,
+        title="Token Count",
+        description="Estimated number of tokens of the extracted text",
+    )
+    page_count: Optional[int] = Field(
+        None,
+        title="Page Count",
+        description="Number of pages, for paginated documents",
+    )
+    language: Optional[str] = Field(
+        None,
+        title="Language",
+        description="ISO 639-1 code of the detected language of the text",
+    )
+    preview: Optional[str] = Field(
+        None,
+        title="Preview",
+        description="First words of the extracted text",
+    )
 
 
 
@@ -112,7 +153,11 @@ class UploadConversationFileResponse(ConversationFilePublic):
     """
     Response for uploading a conversation file
     """
-    pass
+    error: Optional[str] = Field(
+        None,
+        title="Error",
+        description="Why the file could not be uploaded, if it failed",
+    )
 
 
 class UploadAgentFileResponse(AgentFilePublic):
@@ -134,3 +179,172 @@ class DeleteAgentFileResponse(BaseModel):
     Response for deleting an agent file
     """
     pass
+
+
+class ConversationFilePages(BaseModel):
+    """
+    Pages of a conversation file extracted so far
+    """
+    id: str = Field(
+        ...,
+        title="ID",
+        description="Unique identifier of the file",
+    )
+    status: str = Field(
+        ...,
+        title="File Status",
+        description="Extraction status of the file",
+    )
+    page_count: Optional[int] = Field(
+        None,
+        title="Page Count",
+        description="Number of pages of the file, once known",
+    )
+    pages_extracted: int = Field(
+        0,
+        title="Pages Extracted",
+        description="Number of pages extracted so far",
+    )
+    pages: list[ExtractedPage] = Field(
+        default_factory=list,
+        title="Pages",
+        description="Extracted pages, in page order",
+    )
+
+
+class CreateDirectUploadFile(BaseModel):
+    """
+    A file the client will send directly to Blob Storage
+    """
+    file_name: str = Field(
+        ...,
+        title="File Name",
+        description="Name of the file",
+    )
+    file_size: int = Field(
+        ...,
+        title="File Size",
+        description="Size of the file in bytes",
+        ge=0,
+    )
+    content_type: Optional[str] = Field(
+        None,
+        title="Content Type",
+        description="MIME type of the file",
+    )
+    sha256: Optional[str] = Field(
+        None,
+        title="SHA-256",
+        description="Hex SHA-256 of the file, checked when the upload completes",
+        pattern="^[0-9a-fA-F]{64}$",
+    )
+
+
+class CreateDirectUploadsRequest(BaseModel):
+    """
+    Request to upload files directly to Blob Storage
+    """
+    conversation_id: Optional[str] = Field(
+        None,
+        title="Conversation ID",
+        description="Conversation to add the files to, a new one is created if not set",
+    )
+    files: list[CreateDirectUploadFile] = Field(
+        ...,
+        title="Files",
+        description="Files to upload",
+        min_length=1,
+    )
+
+
+class DirectUploadPart(BaseModel):
+    """
+    A part of a direct upload and the presigned URL to PUT it to
+    """
+    part_number: int = Field(
+        ...,
+        title="Part Number",
+        description="Number of the part, starting at 1",
+    )
+    url: str = Field(
+        ...,
+        title="URL",
+        description="Presigned URL to PUT the bytes of the part to",
+    )
+
+
+class DirectUpload(BaseModel):
+    """
+    A direct upload: the file is split in parts of `part_size` bytes, the last one may be
+    smaller, and each part is sent to its URL
+    """
+    file_id: str = Field(
+        ...,
+        title="File ID",
+        description="Unique identifier of the file",
+    )
+    file_name: str = Field(
+        ...,
+        title="File Name",
+        description="Name of the file",
+    )
+    part_size: int = Field(
+        ...,
+        title="Part Size",
+        description="Size of each part in bytes",
+    )
+    parts: list[DirectUploadPart] = Field(
+        ...,
+        title="Parts",
+        description="Parts to upload",
+    )
+    expires_at: datetime.datetime = Field(
+        ...,
+        title="Expires At",
+        description="When the presigned URLs expire",
+    )
+
+
+class CreateDirectUploadsResponse(BaseModel):
+    """
+    Response for starting direct uploads
+    """
+    conversation_id: str = Field(
+        ...,
+        title="Conversation ID",
+        description="Conversation the files are added to",
+    )
+    uploads: list[DirectUpload] = Field(
+        ...,
+        title="Uploads",
+        description="One upload per requested file, in the order of the request",
+    )
+
+
+class CompletedUploadPart(BaseModel):
+    """
+    A part sent to Blob Storage
+    """
+    part_number: int = Field(
+        ...,
+        title="Part Number",
+        description="Number of the part",
+        ge=1,
+    )
+    etag: str = Field(
+        ...,
+        title="ETag",
+        description="ETag header returned by Blob Storage for the part",
+    )
+
+
+class CompleteDirectUploadRequest(BaseModel):
+    """
+    Request to complete a direct upload once every part is sent
+    """
+    parts: list[CompletedUploadPart] = Field(
+        ...,
+        title="Parts",
+        description="Parts sent to Blob Storage",
+        min_length=1,
+    )
@@ -1,11 +1,47 @@
 """
 Query and Path Parameters for Files
 """
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import Path
+from fastapi import Path, Query
 
 FileIdPathParam = Annotated[str, Path(
     title="File ID",
     description="File ID for file in question",
 )]
+
+StartPageQueryParam = Annotated[int, Query(
+    title="Start Page",
+    description="Number of the first page to return",
+    ge=1,
+)]
+
+PageLimitQueryParam = Annotated[Optional[int], Query(
+    title="Page Limit",
+    description="Maximum number of pages to return, all the pages extracted so far if not set",
+    ge=1,
+)]
+
+SheetIndexPathParam = Annotated[int, Path(
+    title="Sheet Index",
+    description="Position of the sheet in the file, starting at 0",
+    ge=0,
+)]
+
+RowOffsetQueryParam = Annotated[int, Query(
+    title="Row Offset",
+    description="Index of the first row to return",
+    ge=0,
+)]
+
+RowLimitQueryParam = Annotated[int, Query(
+    title="Row Limit",
+    description="Maximum number of rows to return",
+    ge=1,
+    le=1000,
+)]
+
+ColumnsQueryParam = Annotated[Optional[list[str]], Query(
+    title="Columns",
+    description="Columns to return, all the columns if not set",
+)]
@@ -27,6 +27,30 @@ class _PaginationParams:
 PaginationQueryParams = Annotated[_PaginationParams, Depends()]
 
 
+class _CursorPaginationParams:
+    """
+    Cursor pagination query parameters, the cursor of the next page is returned
+    in the `X-Next-Cursor` response header
+    """
+    def __init__(
+        self,
+        cursor: Annotated[Optional[str], Query(
+            title="Pagination Cursor",
+            description="Cursor of the page to return, from the X-Next-Cursor header of the previous page",
+        )] = None,
+        limit: Annotated[int, Query(
+            title="Pagination Limit",
+            description="Maximum number of records to return per request",
+            ge=1,
+            le=1000,
+        )] = 100,
+    ) -> None:
+        self.cursor = cursor
+        self.limit = limit
+
+CursorPaginationQueryParams = Annotated[_CursorPaginationParams, Depends()]
+
+
 OrderByQueryParam = Annotated[Optional[str], Query(
     title="Orber By",
     description="Field to sorts results by",
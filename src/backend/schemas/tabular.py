@@ -0,0 +1,132 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+
+class TableColumn(BaseModel):
+    name: str = Field(
+        ...,
+        title="Name",
+        description="Name of the column",
+    )
+    type: str = Field(
+        ...,
+        title="Type",
+        description="Arrow type of the column",
+    )
+
+
+class ColumnStatistics(BaseModel):
+    column: str = Field(
+        ...,
+        title="Column",
+        description="Name of the column",
+    )
+    min: Optional[Any] = Field(
+        None,
+        title="Minimum",
+        description="Smallest value of the column in the row group",
+    )
+    max: Optional[Any] = Field(
+        None,
+        title="Maximum",
+        description="Largest value of the column in the row group",
+    )
+    null_count: Optional[int] = Field(
+        None,
+        title="Null Count",
+        description="Number of empty cells of the column in the row group",
+    )
+
+
+class TableRowGroup(BaseModel):
+    first_row: int = Field(
+        ...,
+        title="First Row",
+        description="Index of the first row of the row group in the sheet",
+    )
+    num_rows: int = Field(
+        ...,
+        title="Number of Rows",
+        description="Number of rows of the row group",
+    )
+    statistics: list[ColumnStatistics] = Field(
+        default_factory=list,
+        title="Statistics",
+        description="Statistics of each column in the row group",
+    )
+
+
+class TableSheet(BaseModel):
+    index: int = Field(
+        ...,
+        title="Index",
+        description="Position of the sheet in the file, starting at 0",
+    )
+    name: str = Field(
+        ...,
+        title="Name",
+        description="Name of the sheet",
+    )
+    num_rows: int = Field(
+        ...,
+        title="Number of Rows",
+        description="Number of rows of the sheet, header excluded",
+    )
+    columns: list[TableColumn] = Field(
+        default_factory=list,
+        title="Columns",
+        description="Columns of the sheet",
+    )
+    row_groups: list[TableRowGroup] = Field(
+        default_factory=list,
+        title="Row Groups",
+        description="Row groups of the sheet and their statistics",
+    )
+
+
+class FileTables(BaseModel):
+    """
+    Sheets of a tabular file
+    """
+    id: str = Field(
+        ...,
+        title="ID",
+        description="Unique identifier of the file",
+    )
+    sheets: list[TableSheet] = Field(
+        default_factory=list,
+        title="Sheets",
+        description="Sheets of the file, in order",
+    )
+
+
+class TableRows(BaseModel):
+    """
+    A window of rows of a sheet
+    """
+    sheet: str = Field(
+        ...,
+        title="Sheet",
+        description="Name of the sheet",
+    )
+    offset: int = Field(
+        ...,
+        title="Offset",
+        description="Index of the first returned row",
+    )
+    total_rows: int = Field(
+        ...,
+        title="Total Rows",
+        description="Number of rows of the sheet",
+    )
+    columns: list[str] = Field(
+        default_factory=list,
+        title="Columns",
+        description="Names of the returned columns",
+    )
+    rows: list[list[Any]] = Field(
+        default_factory=list,
+        title="Rows",
+        description="Returned rows, values in the order of the columns",
+    )
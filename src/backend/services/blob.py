@@ -1,29 +1,85 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from backend.config.settings import Settings
 from fastapi import UploadFile
-import io
+
+from backend.config.settings import Settings
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+# S3 rejects multipart uploads whose parts (except the last one) are smaller than 5MB
+MIN_MULTIPART_PART_SIZE = 5 * 1024 * 1024
+MAX_MULTIPART_PARTS = 10000
+# Bytes read from storage at a time when streaming a download
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class PresignedUpload:
+    """
+    A multipart upload clients send directly to Blob Storage, one presigned URL per part
+    """
+    key: str
+    upload_id: str
+    part_size: int
+    part_urls: list[str]
+
+
+@dataclass
+class UploadedBlob:
+    """
+    Result of a streamed upload to Blob Storage
+    """
+    key: str
+    size: int
+    sha256: str
+
 
 class BlobService:
     _instance = None
 
     def __init__(self):
         settings = Settings()
-        # Default to environment variables or Settings defaults
-        import os
-        self.endpoint_url = os.environ.get("BLOB_ENDPOINT_URL") or getattr(settings, 'blob_endpoint_url', 'http://minio:9000')
-        self.access_key = os.environ.get("BLOB_ACCESS_KEY") or getattr(settings, 'blob_access_key', 'minioadmin')
-        self.secret_key = os.environ.get("BLOB_SECRET_KEY") or getattr(settings, 'blob_secret_key', 'minioadmin')
-        self.bucket_name = os.environ.get("BLOB_BUCKET_NAME") or getattr(settings, 'blob_bucket_name', 'docu-compare-assets')
+        self.endpoint_url = settings.get('blob.endpoint_url')
+        self.access_key = settings.get('blob.access_key')
+        self.secret_key = settings.get('blob.secret_key')
+        self.bucket_name = settings.get('blob.bucket_name')
+        self.part_size = max(
+            settings.get('blob.multipart_part_size') or MIN_MULTIPART_PART_SIZE,
+            MIN_MULTIPART_PART_SIZE,
+        )
+        self.max_concurrency = max(settings.get('blob.multipart_concurrency') or 1, 1)
 
         self.s3_client = boto3.client(
             's3',
             endpoint_url=self.endpoint_url,
             aws_access_key_id=self.access_key,
             aws_secret_access_key=self.secret_key,
-            region_name='us-east-1' # MinIO ignores this but boto3 requires it
+            region_name='us-east-1', # MinIO ignores this but boto3 requires it
+            # Concurrent part uploads each hold a connection, keep some headroom for other calls
+            config=Config(max_pool_connections=self.max_concurrency + 10),
         )
-        
+
+        # Presigned URLs are signed for the host clients use, which may differ from ours
+        public_endpoint_url = settings.get('blob.public_endpoint_url')
+        self.presign_client = self.s3_client
+        if public_endpoint_url and public_endpoint_url != self.endpoint_url:
+            self.presign_client = boto3.client(
+                's3',
+                endpoint_url=public_endpoint_url,
+                aws_access_key_id=self.access_key,
+                aws_secret_access_key=self.secret_key,
+                region_name='us-east-1',
+            )
+        self.presigned_url_expiration = settings.get('blob.presigned_url_expiration') or 3600
+
         self.ensure_bucket_exists()
 
     @classmethod
@@ -47,36 +103,294 @@ class BlobService:
         Uploads a FastAPI UploadFile to Blob Storage.
         Returns the object key.
         """
+        uploaded = await self.stream_upload(file, object_name)
+        return uploaded.key
+
+    async def stream_upload(
+        self, file: UploadFile, object_name: Optional[str] = None
+    ) -> UploadedBlob:
+        """
+        Streams a FastAPI UploadFile to Blob Storage without buffering it whole.
+
+        Files smaller than a single part are sent with one PUT, larger files are read
+        part by part from the upload spool and sent as an S3 multipart upload, with up to
+        `max_concurrency` part PUTs in flight. Peak memory per upload is bounded by
+        (max_concurrency + 1) * part_size regardless of the file size.
+
+        The SHA-256 digest of the content is computed on the fly, so callers can
+        fingerprint the file without reading it a second time.
+
+        Args:
+            file (UploadFile): The file to upload
+            object_name (str): The object key, defaults to the file name
+
+        Returns:
+            UploadedBlob: The object key, the number of bytes uploaded and their SHA-256
+        """
         if object_name is None:
             object_name = file.filename
 
-        file_content = await file.read()
-        
-        # Reset file cursor for further processing if needed, though we consumed it here
-        # await file.seek(0) 
+        digest = hashlib.sha256()
+        chunk = await file.read(self.part_size)
+        # hashlib releases the GIL on large buffers, keep hashing off the event loop
+        await asyncio.to_thread(digest.update, chunk)
+        if len(chunk) < self.part_size:
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=object_name,
+                Body=chunk,
+                ContentType=file.content_type or "application/octet-stream",
+            )
+            return UploadedBlob(key=object_name, size=len(chunk), sha256=digest.hexdigest())
+
+        multipart_upload = await asyncio.to_thread(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_name,
+            ContentType=file.content_type or "application/octet-stream",
+        )
+        upload_id = multipart_upload["UploadId"]
+
+        in_flight = asyncio.Semaphore(self.max_concurrency)
+        tasks = []
+        size = 0
+        try:
+            part_number = 1
+            while chunk:
+                # Wait for a free slot before reading further, so reads never outrun the PUTs
+                await in_flight.acquire()
+                failed = next((t for t in tasks if t.done() and t.exception()), None)
+                if failed:
+                    in_flight.release()
+                    raise failed.exception()
+                tasks.append(
+                    asyncio.create_task(
+                        self._upload_part(object_name, upload_id, part_number, chunk, in_flight)
+                    )
+                )
+                size += len(chunk)
+                part_number += 1
+                chunk = await file.read(self.part_size)
+                await asyncio.to_thread(digest.update, chunk)
+
+            parts = await asyncio.gather(*tasks)
+            await asyncio.to_thread(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=object_name,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": list(parts)},
+            )
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.error(
+                event="[Blob] Multipart upload failed, aborting",
+                object_name=object_name,
+                error=str(e),
+            )
+            await asyncio.to_thread(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=object_name,
+                UploadId=upload_id,
+            )
+            raise
+
+        return UploadedBlob(key=object_name, size=size, sha256=digest.hexdigest())
+
+    async def _upload_part(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        body: bytes,
+        in_flight: asyncio.Semaphore,
+    ) -> dict:
+        try:
+            response = await asyncio.to_thread(
+                self.s3_client.upload_part,
+                Bucket=self.bucket_name,
+                Key=object_name,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            in_flight.release()
+
+    async def create_presigned_upload(
+        self, object_name: str, size: int, content_type: Optional[str] = None
+    ) -> PresignedUpload:
+        """
+        Starts a multipart upload and presigns the PUT of each of its parts, so the client
+        sends the bytes straight to Blob Storage. The part size grows past `part_size` when
+        needed to stay within the S3 limit on the number of parts.
+
+        Args:
+            object_name (str): The object key
+            size (int): The size of the file to upload, in bytes
+            content_type (str): The content type of the object
+
+        Returns:
+            PresignedUpload: The upload ID, the part size and the URL of each part
+        """
+        part_size = max(self.part_size, -(-size // MAX_MULTIPART_PARTS))
+        part_count = max(-(-size // part_size), 1)
+
+        multipart_upload = await asyncio.to_thread(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_name,
+            ContentType=content_type or "application/octet-stream",
+        )
+        upload_id = multipart_upload["UploadId"]
+        part_urls = [
+            self.presign_client.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": self.bucket_name,
+                    "Key": object_name,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number,
+                },
+                ExpiresIn=self.presigned_url_expiration,
+            )
+            for part_number in range(1, part_count + 1)
+        ]
+        return PresignedUpload(object_name, upload_id, part_size, part_urls)
+
+    async def complete_presigned_upload(
+        self, object_name: str, upload_id: str, parts: list[dict]
+    ) -> None:
+        """
+        Assembles the parts sent by the client, given as `{"PartNumber", "ETag"}` dicts.
+        """
+        await asyncio.to_thread(
+            self.s3_client.complete_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_name,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+        )
+
+    async def abort_presigned_upload(self, object_name: str, upload_id: str) -> None:
+        """
+        Aborts a multipart upload and discards the parts already sent.
+        """
+        await asyncio.to_thread(
+            self.s3_client.abort_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=object_name,
+            UploadId=upload_id,
+        )
+
+    async def get_file_info(self, object_name: str) -> dict:
+        """
+        Returns the metadata of an object: ContentLength, ETag, ContentType, LastModified
+        """
+        return await asyncio.to_thread(
+            self.s3_client.head_object, Bucket=self.bucket_name, Key=object_name
+        )
 
-        self.s3_client.put_object(
+    async def hash_file(self, object_name: str) -> str:
+        """
+        Computes the SHA-256 of an object, streaming it part by part.
+        """
+        def hash_object() -> str:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=object_name)
+            digest = hashlib.sha256()
+            for chunk in response["Body"].iter_chunks(self.part_size):
+                digest.update(chunk)
+            return digest.hexdigest()
+
+        return await asyncio.to_thread(hash_object)
+
+    async def delete_file(self, object_name: str) -> None:
+        """
+        Deletes an object from Blob Storage
+        """
+        await asyncio.to_thread(
+            self.s3_client.delete_object, Bucket=self.bucket_name, Key=object_name
+        )
+
+    async def download_to_file(self, object_name: str, file_path: str) -> None:
+        """
+        Downloads an object to a local file, streaming it to disk in ranged parts
+        """
+        await asyncio.to_thread(
+            self.s3_client.download_file, self.bucket_name, object_name, file_path
+        )
+
+    async def upload_local_file(self, file_path: str, object_name: str) -> None:
+        """
+        Uploads a local file, in parallel multipart parts when it is large
+        """
+        await asyncio.to_thread(
+            self.s3_client.upload_file, file_path, self.bucket_name, object_name
+        )
+
+    async def upload_bytes(self, data: bytes, object_name: str) -> None:
+        """
+        Uploads an in-memory object
+        """
+        await asyncio.to_thread(
+            self.s3_client.put_object, Bucket=self.bucket_name, Key=object_name, Body=data
+        )
+
+    async def download_bytes(self, object_name: str) -> bytes:
+        """
+        Downloads an object into memory, for small objects
+        """
+        response = await asyncio.to_thread(
+            self.s3_client.get_object, Bucket=self.bucket_name, Key=object_name
+        )
+        return await asyncio.to_thread(response["Body"].read)
+
+    def delete_files(self, object_names: list[str]) -> None:
+        """
+        Deletes objects from Blob Storage in batches, blocking
+        """
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(object_names), 1000):
+            self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [{"Key": name} for name in object_names[start:start + 1000]],
+                    "Quiet": True,
+                },
+            )
+
+    def read_file_range(self, object_name: str, start: int, length: int) -> bytes:
+        """
+        Reads `length` bytes of an object from `start`, blocking
+        """
+        response = self.s3_client.get_object(
             Bucket=self.bucket_name,
             Key=object_name,
-            Body=file_content,
-            ContentType=file.content_type
+            Range=f"bytes={start}-{start + length - 1}",
         )
-        return object_name
+        return response["Body"].read()
 
-    def get_file_url(self, object_name: str) -> str:
+    def get_file_url(self, object_name: str, file_name: Optional[str] = None) -> str:
         """
-        Generate a presigned URL for the file (optional, or just return path)
+        Generate a presigned URL to download the file, served as `file_name` if given
         """
+        params = {'Bucket': self.bucket_name, 'Key': object_name}
+        if file_name:
+            params['ResponseContentDisposition'] = get_content_disposition(file_name)
         try:
-            response = self.s3_client.generate_presigned_url('get_object',
-                                                            Params={'Bucket': self.bucket_name,
-                                                                    'Key': object_name},
-                                                            ExpiresIn=3600)
+            response = self.presign_client.generate_presigned_url(
+                'get_object', Params=params, ExpiresIn=self.presigned_url_expiration
+            )
             return response
         except ClientError as e:
             print(f"Error generating presigned URL: {e}")
             return ""
-            
+
     def get_file_stream(self, object_name: str):
         """
         Get a file stream from blob storage
@@ -88,5 +402,48 @@ class BlobService:
             print(f"Error getting file stream: {e}")
             return None
 
+    async def open_file_stream(
+        self,
+        object_name: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+    ) -> dict:
+        """
+        Opens an object, or the byte range given as a `Range` header value, without reading
+        it. The response holds the unread Body, ContentLength, ContentRange and ETag.
+
+        Raises:
+            ClientError: If the object does not exist, the range is not satisfiable (InvalidRange)
+                or the object matches `if_none_match` (304)
+        """
+        params = {'Bucket': self.bucket_name, 'Key': object_name}
+        if byte_range:
+            params['Range'] = byte_range
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+        return await asyncio.to_thread(self.s3_client.get_object, **params)
+
+    async def iter_file_stream(
+        self, body, chunk_size: int = DOWNLOAD_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Reads an opened object chunk by chunk, so it is never held in memory at once.
+        """
+        chunks = body.iter_chunks(chunk_size)
+        try:
+            while chunk := await asyncio.to_thread(next, chunks, None):
+                yield chunk
+        finally:
+            body.close()
+
+
+def get_content_disposition(file_name: str, disposition: str = "inline") -> str:
+    """
+    Content-Disposition header value serving a file under its name, non-ASCII names included
+    """
+    fallback = file_name.encode("ascii", "replace").decode().replace('"', "'")
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(file_name)}"
+
+
 def get_blob_service():
     return BlobService.get_instance()
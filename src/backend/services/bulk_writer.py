@@ -0,0 +1,152 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+SUPPORTED_OPERATORS = {"$set", "$inc", "$push"}
+
+
+class _PendingUpdate:
+    """
+    Updates of the same documents merged into a single operation
+    """
+
+    def __init__(self, filter: Dict[str, Any], many: bool, position: int):
+        self.filter = filter
+        self.many = many
+        # Index of the operation in its batch
+        self.position = position
+        self.set: Dict[str, Any] = {}
+        self.inc: Dict[str, int] = {}
+        self.push: Dict[str, List[Any]] = {}
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def get_fields(self) -> set:
+        return {*self.set, *self.inc, *self.push}
+
+    def merge(self, update: Dict[str, Any]) -> None:
+        for field, value in update.get("$set", {}).items():
+            # A value set after an increment replaces it
+            self.inc.pop(field, None)
+            self.set[field] = value
+        for field, value in update.get("$inc", {}).items():
+            # An increment after a value was set applies to that value
+            if field in self.set:
+                self.set[field] = (self.set[field] or 0) + value
+            else:
+                self.inc[field] = self.inc.get(field, 0) + value
+        for field, value in update.get("$push", {}).items():
+            values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+            self.push.setdefault(field, []).extend(values)
+
+    def to_operation(self) -> UpdateOne | UpdateMany:
+        update: Dict[str, Any] = {}
+        if self.set:
+            update["$set"] = self.set
+        if self.inc:
+            update["$inc"] = self.inc
+        if self.push:
+            update["$push"] = {field: {"$each": values} for field, values in self.push.items()}
+        operation = UpdateMany if self.many else UpdateOne
+        return operation(self.filter, update)
+
+
+class CoalescingWriter:
+    """
+    Groups the updates of a collection into bulk writes.
+
+    Updates received within `flush_interval` seconds of the first one are sent in a single
+    `bulk_write`, sooner if `max_batch_size` operations are pending, and updates of the same
+    documents are merged into one operation unless an update queued in between changes
+    the same fields. `update` returns once its batch is written, so callers still read
+    their own writes, but a burst of status and progress changes costs one round trip per
+    batch instead of one per change. Updates are written in the order they were queued,
+    also when their filters match the same documents, so the last status set wins.
+
+    Only `$set`, `$inc` and `$push` updates are supported.
+    """
+
+    def __init__(self, collection, flush_interval: float = 0.02, max_batch_size: int = 500):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_batch_size = max(max_batch_size, 1)
+        self.pending: List[_PendingUpdate] = []
+        # Last pending operation of each filter, the one later updates are merged into
+        self.pending_by_filter: Dict[tuple, _PendingUpdate] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        self.background_flushes: set[asyncio.Task] = set()
+        self.write_lock = asyncio.Lock()
+
+    async def update(self, filter: Dict[str, Any], update: Dict[str, Any], many: bool = False):
+        """
+        Queue an update of the documents matching `filter` and wait until it is written.
+        """
+        unsupported = set(update) - SUPPORTED_OPERATORS
+        if unsupported:
+            raise ValueError(f"Unsupported update operators: {', '.join(sorted(unsupported))}")
+
+        key = (many, repr(sorted(filter.items())))
+        pending = self.pending_by_filter.get(key)
+        if pending is None or self._is_overridden(pending, update):
+            pending = _PendingUpdate(filter, many, len(self.pending))
+            self.pending.append(pending)
+            self.pending_by_filter[key] = pending
+        pending.merge(update)
+
+        if len(self.pending) >= self.max_batch_size:
+            if self.flush_task is not None:
+                self.flush_task.cancel()
+            self.flush_task = None
+            flush = asyncio.create_task(self.flush())
+            self.background_flushes.add(flush)
+            flush.add_done_callback(self.background_flushes.discard)
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_later())
+
+        # Several callers may wait on a merged update, don't let one cancel it for the others
+        await asyncio.shield(pending.future)
+
+    async def flush(self) -> None:
+        """
+        Write the pending updates.
+        """
+        batch, self.pending, self.pending_by_filter = self.pending, [], {}
+        if not batch:
+            return
+
+        async with self.write_lock:
+            try:
+                await self.collection.bulk_write(
+                    [pending.to_operation() for pending in batch], ordered=True
+                )
+            except BulkWriteError as e:
+                # The write stops at the first failed operation, the ones before it are written
+                errors = e.details.get("writeErrors", [])
+                failed = min((error["index"] for error in errors), default=0)
+                for index, pending in enumerate(batch):
+                    if index >= failed:
+                        pending.future.set_exception(e)
+                    else:
+                        pending.future.set_result(None)
+            except Exception as e:
+                for pending in batch:
+                    pending.future.set_exception(e)
+            else:
+                for pending in batch:
+                    pending.future.set_result(None)
+
+    def _is_overridden(self, pending: _PendingUpdate, update: Dict[str, Any]) -> bool:
+        """
+        Whether an operation queued after `pending` changes fields of `update`, which may
+        then not be merged into `pending` without being applied before it.
+        """
+        fields = {field for values in update.values() for field in values}
+        return any(
+            fields & later.get_fields() for later in self.pending[pending.position + 1 :]
+        )
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self.flush_task = None
+        await self.flush()
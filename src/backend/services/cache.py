@@ -1,6 +1,7 @@
 from typing import Any
 
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 
 from backend.config.settings import Settings
 from backend.services.logger.utils import LoggerFactory
@@ -21,6 +22,20 @@ def get_client() -> Redis:
     return client
 
 
+def get_async_client(decode_responses: bool = True) -> AsyncRedis:
+    redis_url = Settings().get('redis.url')
+
+    if not redis_url:
+        error = "Tried retrieving Redis client but redis.url in configuration.yaml is not set."
+        logger.error(event=error)
+        raise ValueError(error)
+
+    # Binary values, e.g. compressed payloads, need a client that does not decode responses
+    client = AsyncRedis.from_url(redis_url, decode_responses=decode_responses)
+
+    return client
+
+
 def cache_put(key: str, value: Any) -> None:
     client = get_client()
 
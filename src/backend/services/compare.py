@@ -0,0 +1,555 @@
+import asyncio
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import groupby
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from backend.schemas.compare import CompareMode, CompareOptions
+from backend.schemas.file import FileStatus
+from backend.services.fingerprint import (
+    SKETCH_SIZE,
+    Paragraph,
+    estimate_similarity,
+    fingerprint_pages,
+    get_page_fingerprints,
+    get_paragraphs,
+)
+from backend.services.image_diff import get_image_hashes, match_images
+from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import get_mongo_service
+from backend.services.process_pool import get_process_pool
+from backend.services.table_diff import diff_page_tables
+from backend.services.tabular import get_file_text_pages
+
+logger = LoggerFactory().get_logger()
+
+# Bumped whenever a change to the engine changes its results
+COMPARE_ENGINE_VERSION = 5
+
+# Inserted paragraphs looked at to pair each deleted paragraph of a changed region
+MODIFY_LOOKAHEAD = 3
+# Regions without any unique paragraph are diffed quadratically, up to this many pairs
+MAX_QUADRATIC_CELLS = 250_000
+# Paragraphs with more words than this get no word-level changes
+MAX_WORD_DIFF_WORDS = 2_000
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+def diff_sequences(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Opcode]:
+    """
+    Patience diff of two sequences, as difflib opcodes: ("equal" | "replace" | "delete" |
+    "insert", a_start, a_end, b_start, b_end).
+
+    Common prefixes and suffixes are matched first, then the elements unique to both sides
+    of a region anchor it, in their longest increasing order, and the regions between
+    anchors are diffed the same way. Only regions without any unique element, usually a few
+    repeated lines, fall back to a quadratic diff, so the whole runs in near-linear time.
+    """
+    matches = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        a_start, a_end, b_start, b_end = regions.pop()
+        while a_start < a_end and b_start < b_end and a[a_start] == b[b_start]:
+            matches.append((a_start, b_start))
+            a_start += 1
+            b_start += 1
+        while a_start < a_end and b_start < b_end and a[a_end - 1] == b[b_end - 1]:
+            a_end -= 1
+            b_end -= 1
+            matches.append((a_end, b_end))
+        if a_start == a_end or b_start == b_end:
+            continue
+
+        anchors = _get_unique_anchors(a, b, a_start, a_end, b_start, b_end)
+        if anchors:
+            previous_a, previous_b = a_start, b_start
+            for anchor_a, anchor_b in anchors:
+                matches.append((anchor_a, anchor_b))
+                regions.append((previous_a, anchor_a, previous_b, anchor_b))
+                previous_a, previous_b = anchor_a + 1, anchor_b + 1
+            regions.append((previous_a, a_end, previous_b, b_end))
+        elif (a_end - a_start) * (b_end - b_start) <= MAX_QUADRATIC_CELLS:
+            matcher = SequenceMatcher(None, a[a_start:a_end], b[b_start:b_end], autojunk=False)
+            for block in matcher.get_matching_blocks():
+                matches.extend(
+                    (a_start + block.a + offset, b_start + block.b + offset)
+                    for offset in range(block.size)
+                )
+
+    return _get_opcodes(sorted(matches), len(a), len(b))
+
+
+def _get_unique_anchors(
+    a: Sequence[Hashable], b: Sequence[Hashable], a_start: int, a_end: int, b_start: int, b_end: int
+) -> List[Tuple[int, int]]:
+    a_counts = Counter(a[a_start:a_end])
+    b_counts = Counter(b[b_start:b_end])
+    b_positions = {
+        b[index]: index
+        for index in range(b_start, b_end)
+        if b_counts[b[index]] == 1 and a_counts[b[index]] == 1
+    }
+    pairs = [(index, b_positions[a[index]]) for index in range(a_start, a_end) if a[index] in b_positions]
+    return _longest_increasing_pairs(pairs)
+
+
+def _longest_increasing_pairs(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Longest subsequence of pairs, sorted by their first item, increasing in their second
+    """
+    tails: List[int] = []
+    tail_indexes: List[int] = []
+    previous: List[Optional[int]] = []
+    for index, (_, b_index) in enumerate(pairs):
+        position = bisect_left(tails, b_index)
+        previous.append(tail_indexes[position - 1] if position else None)
+        if position == len(tails):
+            tails.append(b_index)
+            tail_indexes.append(index)
+        else:
+            tails[position] = b_index
+            tail_indexes[position] = index
+
+    result = []
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        result.append(pairs[index])
+        index = previous[index]
+    return result[::-1]
+
+
+def _get_opcodes(matches: List[Tuple[int, int]], a_length: int, b_length: int) -> List[Opcode]:
+    opcodes = []
+    a_index = b_index = 0
+    for match_a, match_b in matches + [(a_length, b_length)]:
+        if a_index < match_a and b_index < match_b:
+            opcodes.append(("replace", a_index, match_a, b_index, match_b))
+        elif a_index < match_a:
+            opcodes.append(("delete", a_index, match_a, b_index, b_index))
+        elif b_index < match_b:
+            opcodes.append(("insert", a_index, a_index, b_index, match_b))
+        if match_a < a_length:
+            if opcodes and opcodes[-1][0] == "equal":
+                tag, start_a, _, start_b, _ = opcodes.pop()
+                opcodes.append((tag, start_a, match_a + 1, start_b, match_b + 1))
+            else:
+                opcodes.append(("equal", match_a, match_a + 1, match_b, match_b + 1))
+        a_index, b_index = match_a + 1, match_b + 1
+    return opcodes
+
+
+def compare_documents(
+    fingerprints_a: List[Dict[str, Any]],
+    fingerprints_b: List[Dict[str, Any]],
+    texts_a: Dict[int, str],
+    texts_b: Dict[int, str],
+    options: Optional[CompareOptions] = None,
+    images_a: Optional[List[Dict[str, Any]]] = None,
+    images_b: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Compares two versions of a document from their page fingerprints, CPU-bound.
+
+    Pages are aligned first by the hash of their text, and identical pages are skipped.
+    The paragraphs of the remaining regions are then aligned by hash, and the changed
+    paragraphs of each region are paired up as modified when similar enough. Deleted
+    paragraphs inserted again elsewhere are reported as moved, and the numbers of the
+    tables of the remaining regions are compared cell by cell. Only the text of the pages
+    outside identical regions is read, see `get_changed_pages`. Images, when their hashes
+    are given, are matched across the whole documents, since a chart can change on a page
+    whose text did not.
+
+    Args:
+        fingerprints_a (List[Dict[str, Any]]): Page fingerprints of the first version, in page order
+        fingerprints_b (List[Dict[str, Any]]): Page fingerprints of the second version
+        texts_a (Dict[int, str]): Text of the changed pages of the first version, by page number
+        texts_b (Dict[int, str]): Text of the changed pages of the second version
+        options (Optional[CompareOptions]): Thresholds of the comparison
+        images_a (Optional[List[Dict[str, Any]]]): Image hashes of the first version
+        images_b (Optional[List[Dict[str, Any]]]): Image hashes of the second version
+
+    Returns:
+        Dict[str, Any]: The operations turning the first version into the second, the
+            changed table cells and images, and a summary
+    """
+    options = options or CompareOptions()
+
+    regions, identical_pages = get_changed_regions(fingerprints_a, fingerprints_b)
+    operations, table_changes = diff_regions(
+        [
+            (
+                [(fingerprint, texts_a[fingerprint["page_number"]]) for fingerprint in pages_a],
+                [(fingerprint, texts_b[fingerprint["page_number"]]) for fingerprint in pages_b],
+            )
+            for pages_a, pages_b in regions
+        ],
+        options,
+    )
+
+    if options.detect_moves:
+        operations = detect_moves(operations)
+
+    image_changes = []
+    if images_a is not None and images_b is not None:
+        image_changes = match_images(images_a, images_b, options.image_match_distance)
+
+    return {
+        "engine_version": COMPARE_ENGINE_VERSION,
+        "summary": get_summary(
+            len(fingerprints_a),
+            len(fingerprints_b),
+            identical_pages,
+            operations,
+            table_changes,
+            image_changes,
+        ),
+        "operations": operations,
+        "table_changes": table_changes,
+        "image_changes": image_changes,
+    }
+
+
+def get_changed_regions(
+    fingerprints_a: List[Dict[str, Any]], fingerprints_b: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]], int]:
+    """
+    Aligns the pages of two versions by the hash of their text.
+
+    Returns:
+        Tuple[List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]], int]: The page
+            fingerprints of each version of every region that is not identical, in document
+            order, and the number of identical pages
+    """
+    regions = []
+    identical_pages = 0
+    for tag, a_start, a_end, b_start, b_end in _diff_pages(fingerprints_a, fingerprints_b):
+        if tag == "equal":
+            identical_pages += a_end - a_start
+        else:
+            regions.append((fingerprints_a[a_start:a_end], fingerprints_b[b_start:b_end]))
+    return regions, identical_pages
+
+
+def diff_regions(
+    regions: List[Tuple[List[Tuple[Dict[str, Any], str]], List[Tuple[Dict[str, Any], str]]]],
+    options: CompareOptions,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Diffs the paragraphs and tables of changed regions, CPU-bound. Regions are independent,
+    so they can be diffed in separate batches. Moves are not detected, as a paragraph can
+    move across regions.
+
+    Args:
+        regions: The fingerprint and text of the pages of each version of every region
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]: The operations and the table
+            changes of the regions, in document order
+    """
+    operations: List[Dict[str, Any]] = []
+    table_changes: List[Dict[str, Any]] = []
+    for pages_a, pages_b in regions:
+        operations.extend(
+            _diff_paragraphs(
+                [paragraph for page in pages_a for paragraph in get_paragraphs(*page)],
+                [paragraph for page in pages_b for paragraph in get_paragraphs(*page)],
+                options,
+            )
+        )
+        if options.detect_table_changes:
+            table_changes.extend(
+                diff_page_tables(
+                    [(fingerprint["page_number"], text) for fingerprint, text in pages_a],
+                    [(fingerprint["page_number"], text) for fingerprint, text in pages_b],
+                    options,
+                )
+            )
+    return operations, table_changes
+
+
+def get_summary(
+    pages_a: int,
+    pages_b: int,
+    identical_pages: int,
+    operations: List[Dict[str, Any]],
+    table_changes: List[Dict[str, Any]],
+    image_changes: List[Dict[str, Any]],
+) -> Dict[str, int]:
+    counts = Counter(operation["type"] for operation in operations)
+    return {
+        "pages_a": pages_a,
+        "pages_b": pages_b,
+        "identical_pages": identical_pages,
+        "inserted": counts["insert"],
+        "deleted": counts["delete"],
+        "modified": counts["modify"],
+        "moved": counts["move"],
+        "changed_cells": sum(len(change["cells"]) for change in table_changes),
+        "changed_images": len(image_changes),
+    }
+
+
+def compare_pages(
+    pages_a: List[Dict[str, Any]],
+    pages_b: List[Dict[str, Any]],
+    options: Optional[CompareOptions] = None,
+) -> Dict[str, Any]:
+    """
+    Compares two versions of a document from their pages, with `page_number` and `text`,
+    fingerprinting them first.
+    """
+    return compare_documents(
+        fingerprint_pages(pages_a),
+        fingerprint_pages(pages_b),
+        {page["page_number"]: page["text"] for page in pages_a},
+        {page["page_number"]: page["text"] for page in pages_b},
+        options,
+    )
+
+
+def get_changed_pages(
+    fingerprints_a: List[Dict[str, Any]], fingerprints_b: List[Dict[str, Any]]
+) -> Tuple[List[int], List[int]]:
+    """
+    Numbers of the pages of each version outside the regions identical in both, the only
+    pages whose text the comparison reads.
+    """
+    regions, _ = get_changed_regions(fingerprints_a, fingerprints_b)
+    return (
+        [fingerprint["page_number"] for pages_a, _ in regions for fingerprint in pages_a],
+        [fingerprint["page_number"] for _, pages_b in regions for fingerprint in pages_b],
+    )
+
+
+def _diff_pages(
+    fingerprints_a: List[Dict[str, Any]], fingerprints_b: List[Dict[str, Any]]
+) -> List[Opcode]:
+    return diff_sequences(
+        [fingerprint["hash"] for fingerprint in fingerprints_a],
+        [fingerprint["hash"] for fingerprint in fingerprints_b],
+    )
+
+
+def _diff_paragraphs(
+    paragraphs_a: List[Paragraph], paragraphs_b: List[Paragraph], options: CompareOptions
+) -> List[Dict[str, Any]]:
+    operations = []
+    opcodes = diff_sequences(
+        [paragraph.hash for paragraph in paragraphs_a],
+        [paragraph.hash for paragraph in paragraphs_b],
+    )
+    for tag, a_start, a_end, b_start, b_end in opcodes:
+        if tag == "equal":
+            continue
+        deleted = paragraphs_a[a_start:a_end]
+        inserted = paragraphs_b[b_start:b_end]
+
+        # Pairs deleted and inserted paragraphs in order, looking a few paragraphs ahead
+        next_inserted = 0
+        for paragraph_a in deleted:
+            best, best_ratio = None, options.modify_threshold
+            for index in range(next_inserted, min(next_inserted + MODIFY_LOOKAHEAD, len(inserted))):
+                if _share_no_shingle(paragraph_a, inserted[index]):
+                    continue
+                ratio = _get_similarity(paragraph_a.text, inserted[index].text, best_ratio)
+                if ratio is not None and ratio >= best_ratio:
+                    best, best_ratio = index, ratio
+            if best is None:
+                operations.append({"type": "delete", "a": _get_location(paragraph_a), "b": None})
+                continue
+            operations.extend(
+                {"type": "insert", "a": None, "b": _get_location(paragraph_b)}
+                for paragraph_b in inserted[next_inserted:best]
+            )
+            operations.append(
+                {
+                    "type": "modify",
+                    "a": _get_location(paragraph_a),
+                    "b": _get_location(inserted[best]),
+                    "similarity": round(best_ratio, 3),
+                    "changes": get_word_changes(paragraph_a.text, inserted[best].text),
+                }
+            )
+            next_inserted = best + 1
+        operations.extend(
+            {"type": "insert", "a": None, "b": _get_location(paragraph_b)}
+            for paragraph_b in inserted[next_inserted:]
+        )
+    return operations
+
+
+def _share_no_shingle(paragraph_a: Paragraph, paragraph_b: Paragraph) -> bool:
+    """
+    Whether the sketches of two long enough paragraphs tell they have no words in common
+    in the same order, so they are not worth diffing
+    """
+    return (
+        len(paragraph_a.sketch) == SKETCH_SIZE
+        and len(paragraph_b.sketch) == SKETCH_SIZE
+        and estimate_similarity(paragraph_a.sketch, paragraph_b.sketch) == 0
+    )
+
+
+def _get_similarity(text_a: str, text_b: str, threshold: float) -> Optional[float]:
+    """
+    Similarity ratio of two texts by words, None when it is certainly below `threshold`
+    """
+    matcher = SequenceMatcher(None, text_a.split(), text_b.split(), autojunk=False)
+    if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+        return None
+    return matcher.ratio()
+
+
+def get_word_changes(text_a: str, text_b: str) -> List[Dict[str, str]]:
+    """
+    Word-level changes between two versions of a paragraph
+    """
+    words_a, words_b = text_a.split(), text_b.split()
+    if max(len(words_a), len(words_b)) > MAX_WORD_DIFF_WORDS:
+        return []
+    return [
+        {
+            "type": tag,
+            "a_text": " ".join(words_a[a_start:a_end]),
+            "b_text": " ".join(words_b[b_start:b_end]),
+        }
+        for tag, a_start, a_end, b_start, b_end in diff_sequences(words_a, words_b)
+        if tag != "equal"
+    ]
+
+
+def detect_moves(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Turns each deleted paragraph inserted again, anywhere in the document, into a move
+    """
+    deleted_by_hash = defaultdict(list)
+    for index, operation in enumerate(operations):
+        if operation["type"] == "delete":
+            deleted_by_hash[operation["a"]["hash"]].append(index)
+
+    moved = set()
+    for operation in operations:
+        if operation["type"] != "insert":
+            continue
+        candidates = deleted_by_hash.get(operation["b"]["hash"])
+        if candidates:
+            deleted_index = candidates.pop(0)
+            moved.add(deleted_index)
+            operation["type"] = "move"
+            operation["a"] = operations[deleted_index]["a"]
+
+    return [operation for index, operation in enumerate(operations) if index not in moved]
+
+
+def _get_location(paragraph: Paragraph) -> Dict[str, Any]:
+    return {
+        "page_number": paragraph.page_number,
+        "paragraph_index": paragraph.index,
+        "start": paragraph.start,
+        "end": paragraph.end,
+        "text": paragraph.text,
+        "hash": paragraph.hash,
+    }
+
+
+async def get_user_file(file_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    Reads the metadata of a file of the user, raises if it is not found.
+    """
+    file = await get_mongo_service().get_file_metadata(file_id)
+    if not file or file.get("user_id") != user_id:
+        raise HTTPException(status_code=404, detail=f"File with ID: {file_id} not found.")
+    return file
+
+
+def check_comparable(file: Dict[str, Any]) -> None:
+    """
+    Raises if a file is not extracted yet.
+    """
+    if file.get("status") != FileStatus.EXTRACTED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"File {file['file_name']} is not extracted yet, its status is {file.get('status')}.",
+        )
+
+
+async def get_page_texts(file: Dict[str, Any], page_numbers: List[int]) -> Dict[int, str]:
+    """
+    Reads the text of some pages of an extracted file, one read per run of consecutive pages.
+    """
+    runs = [
+        [page_number for _, page_number in run]
+        for _, run in groupby(enumerate(page_numbers), key=lambda item: item[1] - item[0])
+    ]
+    pages = await asyncio.gather(
+        *(get_file_text_pages(file, run[0], len(run)) for run in runs)
+    )
+    return {page["page_number"]: page["text"] for run in pages for page in run}
+
+
+async def compare_files(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], options: Optional[CompareOptions] = None
+) -> Dict[str, Any]:
+    """
+    Compares two extracted files in the shared process pool.
+
+    The page fingerprints stored at extraction align the pages, so only the text of the
+    changed pages is read, and comparing a version to several others computes nothing
+    again about it. Image hashes are also computed once per content, on its first compare.
+
+    Visual compares diff rasters of the pages instead, see `compare_rasters`.
+
+    Raises:
+        HTTPException: If a file is not extracted yet
+    """
+    options = options or CompareOptions()
+    if options.mode == CompareMode.VISUAL:
+        # Imported here, the visual compare builds on this module
+        from backend.services.visual_diff import compare_rasters
+
+        return {"engine_version": COMPARE_ENGINE_VERSION, **await compare_rasters(file_a, file_b)}
+
+    check_comparable(file_a)
+    check_comparable(file_b)
+    images_a, images_b = await get_compared_images(file_a, file_b, options)
+    fingerprints_a, fingerprints_b = await asyncio.gather(
+        get_page_fingerprints(file_a), get_page_fingerprints(file_b)
+    )
+    changed_a, changed_b = get_changed_pages(fingerprints_a, fingerprints_b)
+    texts_a, texts_b = await asyncio.gather(
+        get_page_texts(file_a, changed_a), get_page_texts(file_b, changed_b)
+    )
+
+    return await asyncio.get_running_loop().run_in_executor(
+        get_process_pool(),
+        compare_documents,
+        fingerprints_a,
+        fingerprints_b,
+        texts_a,
+        texts_b,
+        options,
+        images_a,
+        images_b,
+    )
+
+
+async def get_compared_images(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], options: CompareOptions
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]]:
+    """
+    Reads the image hashes of two files, None when images are not compared.
+    """
+    if not options.detect_image_changes:
+        return None, None
+    try:
+        return await asyncio.gather(get_image_hashes(file_a), get_image_hashes(file_b))
+    except ImportError as e:
+        logger.warning(
+            event="[Compare] Images are not compared, Pillow is required to decode them",
+            error=str(e),
+        )
+        return None, None
@@ -0,0 +1,269 @@
+import asyncio
+import datetime
+import gzip
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from botocore.exceptions import ClientError
+from redis.asyncio import Redis as AsyncRedis
+
+from backend.config.settings import Settings
+from backend.schemas.compare import CompareMode, CompareOptions
+from backend.services.blob import get_blob_service
+from backend.services.cache import get_async_client
+from backend.services.compare import COMPARE_ENGINE_VERSION, compare_files
+from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import get_mongo_service
+from backend.services.visual_diff import RASTER_VERSION, get_raster_options
+
+logger = LoggerFactory().get_logger()
+
+HOT_KEY_PREFIX = "compare_result"
+# Sorted set of the cached keys by last access, and hash of their sizes, in Redis
+HOT_LRU_KEY = f"{HOT_KEY_PREFIX}:lru"
+HOT_SIZES_KEY = f"{HOT_KEY_PREFIX}:sizes"
+HOT_BYTES_KEY = f"{HOT_KEY_PREFIX}:bytes"
+COLD_PATH_PREFIX = "compare-results"
+
+DEFAULT_HOT_MAX_BYTES = 256 * 2**20
+DEFAULT_HOT_MAX_ENTRY_BYTES = 16 * 2**20
+DEFAULT_COLD_MAX_BYTES = 10 * 2**30
+# Entries looked at per round of eviction
+EVICTION_BATCH_SIZE = 100
+
+
+def get_compare_key(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], options: CompareOptions
+) -> str:
+    """
+    Key of a compare: the contents of both files, the engine version and the options.
+    Compares with the same key have the same result, whichever files hold the contents,
+    and bumping the engine version invalidates every result. Visual compares also depend
+    on the rasters and the tiles they are diffed by.
+    """
+    parts = [
+        file_a.get("content_hash") or file_a["_id"],
+        file_b.get("content_hash") or file_b["_id"],
+        COMPARE_ENGINE_VERSION,
+        options.model_dump(mode="json"),
+    ]
+    if options.mode == CompareMode.VISUAL:
+        dpi, tile_size, _ = get_raster_options()
+        parts.append([RASTER_VERSION, dpi, tile_size])
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def compress_result(result: Dict[str, Any]) -> bytes:
+    return gzip.compress(json.dumps(result, separators=(",", ":")).encode(), compresslevel=6)
+
+
+def decompress_result(data: bytes) -> Dict[str, Any]:
+    return json.loads(gzip.decompress(data))
+
+
+class CompareResultCache:
+    """
+    Cache of compare results by compare key, see `get_compare_key`, stored gzipped.
+
+    Every result is stored in blob storage, the cold tier, indexed in Mongo by key with its
+    size and last access. Results up to `compare.cache_hot_max_entry_bytes` are also kept
+    in Redis, the hot tier, when it is configured. Each tier holds at most a budget of
+    bytes, and evicts its least recently used results past it; the cold tier evicts the
+    results of older engine versions first, as they can no longer be read.
+
+    The hot tier is best effort: its errors are logged and the cold tier is used instead.
+    """
+    _instance = None
+
+    def __init__(self):
+        settings = Settings()
+        self.hot_enabled = bool(settings.get("redis.url"))
+        self.hot_max_bytes = settings.get("compare.cache_hot_max_bytes") or DEFAULT_HOT_MAX_BYTES
+        self.hot_max_entry_bytes = (
+            settings.get("compare.cache_hot_max_entry_bytes") or DEFAULT_HOT_MAX_ENTRY_BYTES
+        )
+        self.cold_max_bytes = (
+            settings.get("compare.cache_cold_max_bytes") or DEFAULT_COLD_MAX_BYTES
+        )
+        self.client: Optional[AsyncRedis] = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CompareResultCache()
+        return cls._instance
+
+    def get_client(self) -> AsyncRedis:
+        if self.client is None:
+            self.client = get_async_client(decode_responses=False)
+        return self.client
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Reads a cached result, from Redis or else from blob storage, then kept in Redis.
+        """
+        data = await self._get_hot(key)
+        if data is None:
+            data = await self._get_cold(key)
+            if data is None:
+                return None
+            await self._put_hot(key, data)
+        return await asyncio.to_thread(decompress_result, data)
+
+    async def put(self, key: str, result: Dict[str, Any]) -> None:
+        data = await asyncio.to_thread(compress_result, result)
+        await self._put_cold(key, data)
+        await self._put_hot(key, data)
+
+    async def get_cached_keys(self, keys: List[str]) -> Set[str]:
+        """
+        The keys with a cached result. The cold tier holds every result, so it is the
+        only one read.
+        """
+        return set(await get_mongo_service().get_compare_results(keys))
+
+    async def get_or_compare(
+        self,
+        file_a: Dict[str, Any],
+        file_b: Dict[str, Any],
+        options: CompareOptions,
+        key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Reads the result of a compare from the cache, or compares the files and caches it.
+        """
+        key = key or get_compare_key(file_a, file_b, options)
+        result = await self.get(key)
+        if result is None:
+            result = await compare_files(file_a, file_b, options)
+            await self.put(key, result)
+        return result
+
+    async def _get_hot(self, key: str) -> Optional[bytes]:
+        if not self.hot_enabled:
+            return None
+        try:
+            async with self.get_client().pipeline(transaction=False) as pipeline:
+                pipeline.get(f"{HOT_KEY_PREFIX}:{key}")
+                pipeline.zadd(HOT_LRU_KEY, {key: time.time()}, xx=True)
+                data, _ = await pipeline.execute()
+            return data
+        except Exception as e:
+            logger.warning(event="[CompareCache] Error while reading Redis", error=str(e))
+            return None
+
+    async def _put_hot(self, key: str, data: bytes) -> None:
+        if not self.hot_enabled or len(data) > self.hot_max_entry_bytes:
+            return
+        try:
+            client = self.get_client()
+            previous_size = int(await client.hget(HOT_SIZES_KEY, key) or 0)
+            async with client.pipeline(transaction=True) as pipeline:
+                pipeline.set(f"{HOT_KEY_PREFIX}:{key}", data)
+                pipeline.zadd(HOT_LRU_KEY, {key: time.time()})
+                pipeline.hset(HOT_SIZES_KEY, key, len(data))
+                pipeline.incrby(HOT_BYTES_KEY, len(data) - previous_size)
+                *_, total_size = await pipeline.execute()
+            if total_size > self.hot_max_bytes:
+                await self._evict_hot(total_size)
+        except Exception as e:
+            logger.warning(event="[CompareCache] Error while writing Redis", error=str(e))
+
+    async def _evict_hot(self, total_size: int) -> None:
+        client = self.get_client()
+        while total_size > self.hot_max_bytes:
+            keys = await client.zrange(HOT_LRU_KEY, 0, EVICTION_BATCH_SIZE - 1)
+            if not keys:
+                return
+            sizes = [int(size or 0) for size in await client.hmget(HOT_SIZES_KEY, keys)]
+            evicted = []
+            for key, size in zip(keys, sizes):
+                evicted.append(key.decode())
+                total_size -= size
+                if total_size <= self.hot_max_bytes:
+                    break
+            total_size = await self._delete_hot(evicted)
+
+    async def _delete_hot(self, keys: List[str]) -> int:
+        """
+        Deletes results from Redis, returns the bytes left there.
+        """
+        client = self.get_client()
+        sizes = [int(size or 0) for size in await client.hmget(HOT_SIZES_KEY, keys)]
+        async with client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.hdel(HOT_SIZES_KEY, key)
+            deleted = await pipeline.execute()
+        # Only the sizes this instance removed are subtracted, when instances evict at once
+        freed = sum(size for size, removed in zip(sizes, deleted) if removed)
+        async with client.pipeline(transaction=False) as pipeline:
+            pipeline.delete(*(f"{HOT_KEY_PREFIX}:{key}" for key in keys))
+            pipeline.zrem(HOT_LRU_KEY, *keys)
+            pipeline.decrby(HOT_BYTES_KEY, freed)
+            *_, total_size = await pipeline.execute()
+        return total_size
+
+    async def _get_cold(self, key: str) -> Optional[bytes]:
+        mongo_service = get_mongo_service()
+        entry = await mongo_service.touch_compare_result(key)
+        if entry is None:
+            return None
+        try:
+            return await get_blob_service().download_bytes(entry["blob_path"])
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                raise
+            # Evicted by another instance since it was read, the result is a miss
+            await mongo_service.delete_compare_results([key])
+            return None
+
+    async def _put_cold(self, key: str, data: bytes) -> None:
+        blob_path = f"{COLD_PATH_PREFIX}/{key}.json.gz"
+        await get_blob_service().upload_bytes(data, blob_path)
+        now = datetime.datetime.utcnow()
+        await get_mongo_service().save_compare_result(
+            key,
+            {
+                "blob_path": blob_path,
+                "size": len(data),
+                "engine_version": COMPARE_ENGINE_VERSION,
+                "created_at": now,
+                "accessed_at": now,
+            },
+        )
+        await self._evict_cold()
+
+    async def _evict_cold(self) -> None:
+        mongo_service = get_mongo_service()
+        total_size = await mongo_service.get_compare_results_size()
+        queries = [{"engine_version": {"$ne": COMPARE_ENGINE_VERSION}}, {}]
+        while total_size > self.cold_max_bytes and queries:
+            entries = await mongo_service.get_least_recent_compare_results(
+                queries[0], EVICTION_BATCH_SIZE
+            )
+            if not entries:
+                queries.pop(0)
+                continue
+            evicted = []
+            excess_size = total_size - self.cold_max_bytes
+            for entry in entries:
+                evicted.append(entry)
+                excess_size -= entry["size"]
+                if excess_size <= 0:
+                    break
+            keys = [entry["_id"] for entry in evicted]
+            total_size -= await mongo_service.delete_compare_results(keys)
+            await asyncio.to_thread(
+                get_blob_service().delete_files, [entry["blob_path"] for entry in evicted]
+            )
+            if self.hot_enabled:
+                try:
+                    await self._delete_hot(keys)
+                except Exception as e:
+                    logger.warning(event="[CompareCache] Error while writing Redis", error=str(e))
+
+
+def get_compare_cache() -> CompareResultCache:
+    return CompareResultCache.get_instance()
@@ -0,0 +1,206 @@
+import asyncio
+import datetime
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from backend.config.settings import Settings
+from backend.schemas.compare import CompareJobState, CompareOptions
+from backend.services.compare_cache import get_compare_cache, get_compare_key
+from backend.services.job_queue import Job, JobQueue, JobState, JobWorker
+from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import DEFAULT_PAGE_SIZE, get_mongo_service
+
+logger = LoggerFactory().get_logger()
+
+COMPARE_JOBS_COLLECTION = "compare_jobs"
+
+
+def get_compare_queue() -> JobQueue:
+    settings = Settings()
+    return JobQueue(
+        COMPARE_JOBS_COLLECTION,
+        max_running=max(settings.get("compare.max_concurrent_jobs") or 1, 1),
+        max_running_per_tenant=settings.get("compare.max_concurrent_jobs_per_tenant"),
+        max_attempts=max(settings.get("compare.job_max_attempts") or 1, 1),
+        lease_seconds=settings.get("compare.job_lease_seconds") or 600,
+    )
+
+
+class CompareJobService(JobWorker):
+    """
+    Runs compares as background jobs and keeps the history of the jobs of every user.
+
+    A submission is recorded in the user's job history, and the compare is queued under
+    its compare key, so identical submissions collapse into a single queued job, raised to
+    the highest priority submitted. A compare whose result is already stored is not queued
+    at all. Results are stored in the compare result cache, so reopening a past job is a
+    read, as long as its result was not evicted.
+    """
+    _instance = None
+    log_tag = "Compare"
+
+    def __init__(self, queue: Optional[JobQueue] = None):
+        settings = Settings()
+        super().__init__(
+            queue or get_compare_queue(),
+            max_running=settings.get("compare.max_concurrent_jobs") or 1,
+            poll_interval=settings.get("compare.job_poll_interval_seconds") or 1,
+        )
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = CompareJobService()
+        return cls._instance
+
+    async def submit(
+        self,
+        file_a: Dict[str, Any],
+        file_b: Dict[str, Any],
+        options: CompareOptions,
+        user_id: str,
+        priority: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Record a compare job for a user, and queue the compare unless it is already
+        queued, running or stored.
+
+        Returns:
+            Dict[str, Any]: The job, with its state
+        """
+        key = get_compare_key(file_a, file_b, options)
+        job = {
+            "_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "compare_key": key,
+            "file_id_a": file_a["_id"],
+            "file_id_b": file_b["_id"],
+            "file_name_a": file_a["file_name"],
+            "file_name_b": file_b["file_name"],
+            "options": options.model_dump(mode="json"),
+            "priority": priority,
+            "created_at": datetime.datetime.utcnow(),
+        }
+        await get_mongo_service().save_compare_job(job)
+
+        if not await get_compare_cache().get_cached_keys([key]):
+            payload = {
+                "file_id_a": file_a["_id"],
+                "file_id_b": file_b["_id"],
+                "options": job["options"],
+            }
+            if not await self.queue.enqueue(key, user_id, payload, priority):
+                await self.queue.raise_priority(key, priority)
+            await self.start()
+        return (await self._with_states([job]))[0]
+
+    async def get_job(self, job_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Reads a compare job of the user, with its state, raises if it is not found.
+        """
+        job = await get_mongo_service().get_compare_job(job_id)
+        if not job or job["user_id"] != user_id:
+            raise HTTPException(
+                status_code=404, detail=f"Compare job with ID: {job_id} not found."
+            )
+        return (await self._with_states([job]))[0]
+
+    async def list_jobs(
+        self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List the compare jobs of a user, newest first, with their states.
+
+        Raises:
+            ValueError: If the cursor is not valid
+        """
+        jobs, next_cursor = await get_mongo_service().list_compare_jobs(user_id, limit, cursor)
+        return await self._with_states(jobs), next_cursor
+
+    async def get_result(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reads the cached result of a done compare job.
+
+        Raises:
+            HTTPException: If the job is not done
+        """
+        result = await get_compare_cache().get(job["compare_key"])
+        if result is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Compare job {job['_id']} is not done, its state is {job['state']}.",
+            )
+        return result
+
+    async def _with_states(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Adds the state of their compare to jobs, two reads for any number of jobs.
+        """
+        keys = list({job["compare_key"] for job in jobs})
+        if not keys:
+            return jobs
+        cached = await get_compare_cache().get_cached_keys(keys)
+        queued = await self.queue.get_jobs(keys)
+        for job in jobs:
+            queued_job = queued.get(job["compare_key"])
+            if job["compare_key"] in cached:
+                job["state"], job["error"] = CompareJobState.DONE, None
+            elif queued_job is None or queued_job.state == JobState.DONE:
+                # The job ended but its result was evicted from the cache since
+                job["state"], job["error"] = (
+                    CompareJobState.FAILED,
+                    "The result was evicted, submit the compare again.",
+                )
+            else:
+                job["state"], job["error"] = CompareJobState(queued_job.state), queued_job.error
+        return jobs
+
+    async def _run_job(self, job: Job):
+        heartbeat = asyncio.create_task(self._renew_lease(job, asyncio.current_task()))
+        try:
+            await self.run(job.id, job.payload)
+        except asyncio.CancelledError:
+            await self.queue.release(job)
+            raise
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(
+                event="[Compare] Error while running compare job",
+                job_id=job.id,
+                attempt=job.attempts,
+                error=error,
+            )
+            await self.queue.fail(job.id, job.attempts, error, job.lease_id)
+        else:
+            await self.queue.complete(job.id, job.lease_id)
+        finally:
+            heartbeat.cancel()
+
+    async def run(self, key: str, payload: Dict[str, Any]) -> None:
+        """
+        Compare the files of a job and cache the result under its compare key.
+        """
+        mongo_service = get_mongo_service()
+        file_a = await mongo_service.get_file_metadata(payload["file_id_a"])
+        file_b = await mongo_service.get_file_metadata(payload["file_id_b"])
+        if file_a is None or file_b is None:
+            raise HTTPException(status_code=404, detail="A compared file was deleted.")
+
+        await get_compare_cache().get_or_compare(
+            file_a, file_b, CompareOptions(**payload["options"]), key=key
+        )
+
+    async def _recover_orphans(self):
+        for job, retry in await self.queue.recover_orphans():
+            logger.error(
+                event="[Compare] Recovered orphaned compare job",
+                job_id=job.id,
+                attempt=job.attempts,
+                retry=retry,
+            )
+
+
+def get_compare_job_service() -> CompareJobService:
+    return CompareJobService.get_instance()
@@ -0,0 +1,373 @@
+import asyncio
+import json
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Coroutine, Deque, Dict, Iterator, List, Tuple
+
+from fastapi import HTTPException
+
+from backend.config.settings import Settings
+from backend.schemas.compare import CompareMode, CompareOptions
+from backend.services.compare import (
+    COMPARE_ENGINE_VERSION,
+    check_comparable,
+    detect_moves,
+    diff_regions,
+    get_changed_regions,
+    get_compared_images,
+    get_page_texts,
+    get_summary,
+)
+from backend.services.compare_cache import get_compare_cache, get_compare_key
+from backend.services.fingerprint import get_page_fingerprints
+from backend.services.image_diff import match_images
+from backend.services.logger.utils import LoggerFactory
+from backend.services.process_pool import get_process_pool
+from backend.services.visual_diff import (
+    align_pages,
+    check_rasterizable,
+    diff_raster_pairs,
+    get_compared_pairs,
+    get_page_changes,
+    get_page_rasters,
+    get_raster_options,
+    get_visual_summary,
+)
+
+logger = LoggerFactory().get_logger()
+
+PROGRESS_EVENT = "progress"
+PAGES_EVENT = "pages"
+SUMMARY_EVENT = "summary"
+ERROR_EVENT = "error"
+
+DEFAULT_BATCH_PAGES = 25
+# Batches in flight while one is streamed, the batches not started yet are cancelled when
+# the client disconnects
+MAX_PENDING_BATCHES = 2
+
+Region = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def check_compared_files(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], options: CompareOptions
+) -> None:
+    """
+    Raises if two files cannot be compared, before a stream is opened.
+    """
+    check = check_rasterizable if options.mode == CompareMode.VISUAL else check_comparable
+    check(file_a)
+    check(file_b)
+
+
+def batch_regions(regions: List[Region], batch_pages: int) -> List[List[Region]]:
+    """
+    Groups consecutive changed regions into batches of about `batch_pages` pages. Regions
+    are not split, so a streamed compare finds the same changes as a single one.
+    """
+    batches: List[List[Region]] = []
+    pages = 0
+    for region in regions:
+        if not batches or pages >= batch_pages:
+            batches.append([])
+            pages = 0
+        batches[-1].append(region)
+        pages += len(region[0]) + len(region[1])
+    return batches
+
+
+async def _iter_in_order(
+    coroutines: Iterator[Coroutine[Any, Any, Any]], max_pending: int
+) -> AsyncIterator[Any]:
+    """
+    Runs coroutines, at most `max_pending` at once, and yields their results in order.
+    Coroutines still running when the iteration stops are cancelled.
+    """
+    pending: Deque[asyncio.Task] = deque()
+    try:
+        for coroutine in coroutines:
+            pending.append(asyncio.ensure_future(coroutine))
+            if len(pending) >= max_pending:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _to_event(event: str, data: Dict[str, Any]) -> Dict[str, str]:
+    return {"event": event, "data": json.dumps(data)}
+
+
+def _to_progress_event(stage: str, completed_pages: int, total_pages: int) -> Dict[str, str]:
+    return _to_event(
+        PROGRESS_EVENT,
+        {"stage": stage, "completed_pages": completed_pages, "total_pages": total_pages},
+    )
+
+
+async def _diff_batch(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], batch: List[Region], options: CompareOptions
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Reads the text of the pages of a batch of changed regions and diffs them in the pool.
+    """
+    texts_a, texts_b = await asyncio.gather(
+        get_page_texts(
+            file_a, [fingerprint["page_number"] for pages_a, _ in batch for fingerprint in pages_a]
+        ),
+        get_page_texts(
+            file_b, [fingerprint["page_number"] for _, pages_b in batch for fingerprint in pages_b]
+        ),
+    )
+    regions = [
+        (
+            [(fingerprint, texts_a[fingerprint["page_number"]]) for fingerprint in pages_a],
+            [(fingerprint, texts_b[fingerprint["page_number"]]) for fingerprint in pages_b],
+        )
+        for pages_a, pages_b in batch
+    ]
+    return await asyncio.get_running_loop().run_in_executor(
+        get_process_pool(), diff_regions, regions, options
+    )
+
+
+async def _cache_result(key: str, result: Dict[str, Any]) -> None:
+    try:
+        await get_compare_cache().put(key, result)
+    except Exception as e:
+        logger.error(event="[Compare] Error while caching a streamed compare", error=str(e))
+
+
+async def _stream_cached_result(result: Dict[str, Any]) -> AsyncIterator[Dict[str, str]]:
+    """
+    Sends a cached result as a single batch, its moves are already in its operations.
+    """
+    yield _to_event(
+        PAGES_EVENT,
+        {
+            key: result[key]
+            for key in ("operations", "table_changes", "visual_changes")
+            if key in result
+        },
+    )
+    yield _to_event(
+        SUMMARY_EVENT,
+        {
+            "engine_version": result["engine_version"],
+            "summary": result["summary"],
+            "moves": [],
+            "image_changes": result.get("image_changes", []),
+        },
+    )
+
+
+async def _stream_text_compare(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], options: CompareOptions, key: str
+) -> AsyncIterator[Dict[str, str]]:
+    images = asyncio.ensure_future(get_compared_images(file_a, file_b, options))
+    try:
+        fingerprints_a, fingerprints_b = await asyncio.gather(
+            get_page_fingerprints(file_a), get_page_fingerprints(file_b)
+        )
+        regions, identical_pages = get_changed_regions(fingerprints_a, fingerprints_b)
+        batch_pages = max(
+            Settings().get("compare.stream_batch_pages") or DEFAULT_BATCH_PAGES, 1
+        )
+        batches = batch_regions(regions, batch_pages)
+        total_pages = sum(len(pages_a) + len(pages_b) for pages_a, pages_b in regions)
+        yield _to_progress_event("comparing", 0, total_pages)
+
+        operations: List[Dict[str, Any]] = []
+        table_changes: List[Dict[str, Any]] = []
+        completed_pages = 0
+        results = _iter_in_order(
+            (_diff_batch(file_a, file_b, batch, options) for batch in batches),
+            MAX_PENDING_BATCHES,
+        )
+        async with aclosing(results):
+            batch_index = 0
+            async for batch_operations, batch_table_changes in results:
+                batch = batches[batch_index]
+                batch_index += 1
+                completed_pages += sum(len(pages_a) + len(pages_b) for pages_a, pages_b in batch)
+                operations.extend(batch_operations)
+                table_changes.extend(batch_table_changes)
+                yield _to_event(
+                    PAGES_EVENT,
+                    {
+                        "a_page_numbers": [
+                            fingerprint["page_number"]
+                            for pages_a, _ in batch
+                            for fingerprint in pages_a
+                        ],
+                        "b_page_numbers": [
+                            fingerprint["page_number"]
+                            for _, pages_b in batch
+                            for fingerprint in pages_b
+                        ],
+                        "operations": batch_operations,
+                        "table_changes": batch_table_changes,
+                    },
+                )
+                yield _to_progress_event("comparing", completed_pages, total_pages)
+
+        moves = []
+        if options.detect_moves:
+            operations = detect_moves(operations)
+            moves = [operation for operation in operations if operation["type"] == "move"]
+
+        images_a, images_b = await images
+        image_changes = []
+        if images_a is not None and images_b is not None:
+            image_changes = await asyncio.get_running_loop().run_in_executor(
+                get_process_pool(), match_images, images_a, images_b, options.image_match_distance
+            )
+
+        summary = get_summary(
+            len(fingerprints_a),
+            len(fingerprints_b),
+            identical_pages,
+            operations,
+            table_changes,
+            image_changes,
+        )
+        await _cache_result(
+            key,
+            {
+                "engine_version": COMPARE_ENGINE_VERSION,
+                "summary": summary,
+                "operations": operations,
+                "table_changes": table_changes,
+                "image_changes": image_changes,
+            },
+        )
+        yield _to_event(
+            SUMMARY_EVENT,
+            {
+                "engine_version": COMPARE_ENGINE_VERSION,
+                "summary": summary,
+                "moves": moves,
+                "image_changes": image_changes,
+            },
+        )
+    finally:
+        images.cancel()
+
+
+async def _stream_visual_compare(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], key: str
+) -> AsyncIterator[Dict[str, str]]:
+    dpi, tile_size, pages_per_task = get_raster_options()
+    yield _to_progress_event("rendering", 0, 0)
+    rasters_a, rasters_b = await asyncio.gather(
+        get_page_rasters(file_a, dpi, pages_per_task),
+        get_page_rasters(file_b, dpi, pages_per_task),
+    )
+    pairs = align_pages(rasters_a, rasters_b)
+    batches = [
+        pairs[start:start + pages_per_task] for start in range(0, len(pairs), pages_per_task)
+    ]
+    yield _to_progress_event("comparing", 0, len(pairs))
+
+    loop = asyncio.get_running_loop()
+    changes: List[Dict[str, Any]] = []
+    identical_pages = 0
+    completed_pages = 0
+    results = _iter_in_order(
+        (
+            loop.run_in_executor(
+                get_process_pool(),
+                diff_raster_pairs,
+                get_compared_pairs(batch, rasters_a, rasters_b),
+                tile_size,
+            )
+            for batch in batches
+        ),
+        MAX_PENDING_BATCHES,
+    )
+    async with aclosing(results):
+        batch_index = 0
+        async for page_diffs in results:
+            batch = batches[batch_index]
+            batch_index += 1
+            batch_changes, batch_identical_pages = get_page_changes(batch, page_diffs)
+            changes.extend(batch_changes)
+            identical_pages += batch_identical_pages
+            completed_pages += len(batch)
+            yield _to_event(PAGES_EVENT, {"visual_changes": batch_changes})
+            yield _to_progress_event("comparing", completed_pages, len(pairs))
+
+    summary = get_visual_summary(len(rasters_a), len(rasters_b), identical_pages, changes)
+    await _cache_result(
+        key,
+        {
+            "engine_version": COMPARE_ENGINE_VERSION,
+            "summary": summary,
+            "operations": [],
+            "visual_changes": changes,
+        },
+    )
+    yield _to_event(
+        SUMMARY_EVENT,
+        {
+            "engine_version": COMPARE_ENGINE_VERSION,
+            "summary": summary,
+            "moves": [],
+            "image_changes": [],
+        },
+    )
+
+
+async def stream_compare(
+    file_a: Dict[str, Any], file_b: Dict[str, Any], options: CompareOptions
+) -> AsyncIterator[Dict[str, str]]:
+    """
+    Streams the comparison of two files, so the changes of long documents are shown as
+    they are found.
+
+    Changed regions are diffed in batches of about `compare.stream_batch_pages` pages, in
+    the process pool, a few batches ahead of the one sent. When the client disconnects the
+    batches not started yet are cancelled, so at most the running ones keep a worker busy.
+    Results are read from and stored in the compare result cache, a cached result is sent
+    as a single batch.
+
+    Yields:
+        Dict[str, str]: Server-sent events:
+            - `progress`: the stage, and the changed pages compared out of all of them
+            - `pages`: the operations and table changes, or the visual changes, of a batch
+              of pages, in document order
+            - `summary`: the summary, the image changes, and the moves, each replacing the
+              deletion of its `a` paragraph and the insertion of its `b` paragraph sent
+              in `pages` events
+            - `error`: the detail of an error, which ends the stream
+    """
+    key = get_compare_key(file_a, file_b, options)
+    try:
+        result = await get_compare_cache().get(key)
+    except Exception as e:
+        logger.error(event="[Compare] Error while reading the compare cache", error=str(e))
+        result = None
+
+    if result is not None:
+        events = _stream_cached_result(result)
+    elif options.mode == CompareMode.VISUAL:
+        events = _stream_visual_compare(file_a, file_b, key)
+    else:
+        events = _stream_text_compare(file_a, file_b, options, key)
+
+    async with aclosing(events):
+        try:
+            async for event in events:
+                yield event
+        except HTTPException as e:
+            yield _to_event(ERROR_EVENT, {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(
+                event="[Compare] Streamed compare failed",
+                file_id_a=file_a["_id"],
+                file_id_b=file_b["_id"],
+                error=str(e),
+            )
+            yield _to_event(ERROR_EVENT, {"status_code": 500, "detail": "The compare failed."})
@@ -56,6 +56,40 @@ def validate_conversation(
     return conversation
 
 
+def get_or_create_conversation(
+    session: DBSessionDep, conversation_id: Optional[str], user_id: str
+) -> Conversation:
+    """Gets the conversation files are uploaded to, creating it if it does not exist
+
+    Args:
+        session (DBSessionDep): Database session
+        conversation_id (Optional[str]): Conversation ID, a new conversation is created if not set
+        user_id (str): User ID
+
+    Returns:
+        ConversationModel: Conversation object
+
+    Raises:
+        HTTPException: If the conversation is not found and no user ID is provided
+    """
+    if conversation_id:
+        conversation = conversation_crud.get_conversation(session, conversation_id, user_id)
+        if conversation:
+            return conversation
+
+        # Fail if user_id is not provided when conversation DNE
+        if not user_id:
+            raise HTTPException(
+                status_code=400,
+                detail="user_id is required if no valid conversation is provided.",
+            )
+
+    return conversation_crud.create_conversation(
+        session,
+        ConversationModel(user_id=user_id),
+    )
+
+
 def extract_details_from_conversation(
     convo: Conversation,
     num_turns: int = 5,
@@ -0,0 +1,117 @@
+import re
+from collections import Counter
+from typing import Any, Dict, Optional
+
+# Words of the preview shown to the model for each attached file
+PREVIEW_WORDS = 25
+# Characters looked at to detect the language of a document
+LANGUAGE_SAMPLE_SIZE = 20_000
+
+# Roughly how BPE tokenizers split text: a token per 4 word characters, and per punctuation mark
+TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Scripts used by a single language, or by a language most documents written in it use
+SCRIPT_LANGUAGES = [
+    ("ja", re.compile("[\u3040-\u30ff]")),
+    ("ko", re.compile("[\uac00-\ud7af]")),
+    ("zh", re.compile("[\u4e00-\u9fff]")),
+    ("ru", re.compile("[\u0400-\u04ff]")),
+    ("ar", re.compile("[\u0600-\u06ff]")),
+    ("he", re.compile("[\u0590-\u05ff]")),
+    ("el", re.compile("[\u0370-\u03ff]")),
+    ("hi", re.compile("[\u0900-\u097f]")),
+    ("th", re.compile("[\u0e00-\u0e7f]")),
+]
+
+# Frequent words of languages written in the Latin script
+STOPWORDS = {
+    "en": {"the", "and", "of", "to", "is", "in", "that", "it", "for", "with", "as", "was", "on", "are", "this"},
+    "es": {"el", "la", "de", "que", "y", "en", "los", "las", "del", "se", "por", "con", "una", "para", "es"},
+    "fr": {"le", "la", "les", "de", "des", "et", "est", "en", "un", "une", "du", "que", "pour", "dans", "pas"},
+    "de": {"der", "die", "das", "und", "ist", "nicht", "ein", "eine", "zu", "den", "mit", "von", "sich", "auf", "dem"},
+    "it": {"il", "di", "che", "e", "la", "per", "un", "una", "non", "sono", "del", "della", "con", "gli", "le"},
+    "pt": {"o", "a", "de", "que", "e", "do", "da", "em", "um", "uma", "para", "com", "não", "os", "no"},
+    "nl": {"de", "het", "een", "en", "van", "is", "dat", "niet", "op", "te", "zijn", "met", "voor", "ook", "die"},
+}
+# Share of the words of a sample that must be stopwords of a language to detect it
+MIN_STOPWORD_RATIO = 0.1
+
+
+def get_document_stats(text: str, page_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Computes the statistics of a document stored with its metadata at ingest, so they are
+    never computed again from the text.
+
+    Args:
+        text (str): The text of the document
+        page_count (Optional[int]): Number of pages, for paginated documents
+
+    Returns:
+        Dict[str, Any]: The word count, estimated token count, page count, language and preview
+    """
+    return {
+        "word_count": count_words(text),
+        "token_count": estimate_token_count(text),
+        "page_count": page_count,
+        "language": detect_language(text),
+        "preview": get_preview(text),
+    }
+
+
+def count_words(text: str) -> int:
+    """
+    Counts the whitespace-separated words of a text
+    """
+    return len(text.split())
+
+
+def estimate_token_count(text: str) -> int:
+    """
+    Estimates the number of tokens of a text, without the tokenizer of a model
+    """
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text))
+
+
+def get_preview(text: str, num_words: int = PREVIEW_WORDS) -> str:
+    """
+    Returns the first words of a text, reading only as much of it as needed
+    """
+    words = []
+    for match in re.finditer(r"\S+", text):
+        words.append(match.group())
+        if len(words) == num_words:
+            break
+    return " ".join(words)
+
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    Detects the language of a text from the start of it, by script then by stopwords.
+
+    Returns:
+        Optional[str]: The ISO 639-1 code of the language, or None if it is not recognized
+    """
+    sample = text[:LANGUAGE_SAMPLE_SIZE]
+    letters = sum(1 for character in sample if character.isalpha())
+    if not letters:
+        return None
+
+    for language, pattern in SCRIPT_LANGUAGES:
+        # Japanese mixes kana with Chinese characters, a few kana are enough to tell it apart
+        threshold = 0.05 if language == "ja" else 0.3
+        if len(pattern.findall(sample)) / letters >= threshold:
+            return language
+
+    words = [word.lower() for word in WORD_PATTERN.findall(sample)]
+    if not words:
+        return None
+    counts = Counter(words)
+    scores = {
+        language: sum(counts[word] for word in stopwords)
+        for language, stopwords in STOPWORDS.items()
+    }
+    language, score = max(scores.items(), key=lambda item: item[1])
+    if score / len(words) < MIN_STOPWORD_RATIO:
+        return None
+    return language
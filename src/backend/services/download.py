@@ -0,0 +1,110 @@
+import mimetypes
+import re
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from starlette.responses import RedirectResponse, Response, StreamingResponse
+
+from backend.config.settings import Settings
+from backend.services.blob import get_blob_service, get_content_disposition
+
+# Storage serves a single range, other Range headers are ignored and the whole file is sent
+SINGLE_RANGE = re.compile(r"^bytes=(\d+-\d*|-\d+)$")
+
+
+def get_etag(file: Dict[str, Any]) -> Optional[str]:
+    """
+    Strong ETag of a stored file. Blobs are content-addressed, so the content hash
+    identifies the bytes without asking storage.
+    """
+    content_hash = file.get("content_hash")
+    return f'"{content_hash}"' if content_hash else None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+async def download_stored_file(
+    file: Dict[str, Any],
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+) -> Response:
+    """
+    Serves the original bytes of a stored file.
+
+    The object is streamed from storage chunk by chunk. A single `Range` is forwarded to
+    storage, so viewers reading a PDF in small ranges only read those bytes, and a
+    matching `If-None-Match` is answered with 304 without reading storage. When
+    `blob.download_redirect` is set, the client is redirected to a presigned URL instead.
+
+    Args:
+        file (Dict[str, Any]): The file metadata
+        range_header (Optional[str]): The Range header of the request
+        if_none_match (Optional[str]): The If-None-Match header of the request
+
+    Returns:
+        Response: The file, a part of it, or a 304, 307 or 416 response
+
+    Raises:
+        HTTPException: If the file is not in storage
+    """
+    blob_service = get_blob_service()
+    file_name = file["file_name"]
+    blob_path = file["blob_path"]
+
+    if Settings().get("blob.download_redirect"):
+        return RedirectResponse(blob_service.get_file_url(blob_path, file_name), status_code=307)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": get_content_disposition(file_name),
+    }
+    etag = get_etag(file)
+    if etag and if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    byte_range = None
+    if range_header and SINGLE_RANGE.match(range_header.strip()):
+        byte_range = range_header.strip()
+
+    try:
+        stored = await blob_service.open_file_stream(
+            blob_path,
+            byte_range,
+            # Files stored before content hashing are checked against the storage ETag
+            if_none_match=None if etag else if_none_match,
+        )
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code in ("304", "NotModified"):
+            stored_etag = e.response.get("ResponseMetadata", {}).get("HTTPHeaders", {}).get("etag")
+            return Response(status_code=304, headers={**headers, "ETag": stored_etag or if_none_match})
+        if code == "InvalidRange":
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{file.get('file_size', '*')}"},
+            )
+        if code in ("404", "NoSuchKey"):
+            raise HTTPException(status_code=404, detail=f"File {file['_id']} not found in storage.")
+        raise
+
+    headers["ETag"] = etag or stored["ETag"]
+    headers["Content-Length"] = str(stored["ContentLength"])
+    status_code = 200
+    if stored.get("ContentRange"):
+        status_code = 206
+        headers["Content-Range"] = stored["ContentRange"]
+
+    media_type = (
+        mimetypes.guess_type(file_name)[0] or stored.get("ContentType") or "application/octet-stream"
+    )
+    return StreamingResponse(
+        blob_service.iter_file_stream(stored["Body"]),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
@@ -0,0 +1,81 @@
+import json
+from typing import Any, Optional
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.client import PubSub
+
+from backend.config.settings import Settings
+from backend.services.cache import get_async_client
+from backend.services.logger.utils import LoggerFactory
+
+logger = LoggerFactory().get_logger()
+
+FILE_EVENTS_CHANNEL_PREFIX = "file_events"
+
+
+def get_conversation_channel(conversation_id: str) -> str:
+    """
+    Channel of the files registered in a conversation
+    """
+    return f"{FILE_EVENTS_CHANNEL_PREFIX}:conversation:{conversation_id}"
+
+
+def get_content_channel(content_hash: str) -> str:
+    """
+    Channel of the status changes of every file with a content
+    """
+    return f"{FILE_EVENTS_CHANNEL_PREFIX}:content:{content_hash}"
+
+
+def get_file_channel(file_id: str) -> str:
+    """
+    Channel of the status changes of a single file
+    """
+    return f"{FILE_EVENTS_CHANNEL_PREFIX}:file:{file_id}"
+
+
+class FileEventBus:
+    """
+    Redis pub/sub channels announcing file registrations and status changes.
+
+    Events only say which files changed, subscribers read the current state from Mongo,
+    so a missed or duplicated event never leaves them with a wrong state. Publishing is
+    best effort and a no-op when Redis is not configured.
+    """
+    _instance = None
+
+    def __init__(self):
+        self.enabled = bool(Settings().get("redis.url"))
+        self.client: Optional[AsyncRedis] = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = FileEventBus()
+        return cls._instance
+
+    def get_client(self) -> AsyncRedis:
+        if self.client is None:
+            self.client = get_async_client()
+        return self.client
+
+    async def publish(self, events: list[tuple[str, dict[str, Any]]]) -> None:
+        """
+        Publish (channel, event) pairs in a single round trip.
+        """
+        if not self.enabled or not events:
+            return
+        try:
+            async with self.get_client().pipeline(transaction=False) as pipeline:
+                for channel, event in events:
+                    pipeline.publish(channel, json.dumps(event, default=str))
+                await pipeline.execute()
+        except Exception as e:
+            logger.error(event="[FileEvents] Error while publishing file events", error=str(e))
+
+    def pubsub(self) -> PubSub:
+        return self.get_client().pubsub()
+
+
+def get_file_event_bus() -> FileEventBus:
+    return FileEventBus.get_instance()
@@ -1,17 +1,243 @@
 import aiohttp
+import asyncio
 import os
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pyarrow as pa
+
+from backend.schemas.file import FileStatus
+from backend.services import document_stats, fingerprint, tabular, utils, visual_diff
+from backend.services.blob import get_blob_service
+from backend.services.file import PDF_EXTENSION, get_file_extension, parse_file_contents
+from backend.services.job_queue import Job, JobQueue, JobState, JobWorker
+from backend.services.logger.utils import LoggerFactory
 from backend.services.mongo import get_mongo_service
+from backend.services.process_pool import get_process_pool
 from backend.config.settings import Settings
 
-class ExternalExtractionService:
-    _instance = None
+logger = LoggerFactory().get_logger()
+
+EXTRACTION_JOBS_COLLECTION = "extraction_jobs"
+# Tenant of extraction jobs queued without a user
+DEFAULT_TENANT_ID = "default"
+
+
+@dataclass
+class ExtractionJob:
+    file_id: str
+    blob_path: str
+    content_hash: Optional[str] = None
+
+    @property
+    def content_key(self) -> str:
+        """
+        Key the extracted pages are stored under, shared by files with the same content
+        """
+        return self.content_hash or self.file_id
+
+
+def get_extraction_queue() -> JobQueue:
+    settings = Settings()
+    return JobQueue(
+        EXTRACTION_JOBS_COLLECTION,
+        max_running=max(settings.get("extraction.max_concurrent_documents") or 1, 1),
+        max_running_per_tenant=settings.get("extraction.max_concurrent_documents_per_tenant"),
+        max_attempts=max(settings.get("extraction.max_attempts") or 1, 1),
+        retry_backoff_seconds=settings.get("extraction.retry_backoff_seconds") or 0,
+        retry_backoff_max_seconds=settings.get("extraction.retry_backoff_max_seconds") or 0,
+        lease_seconds=settings.get("extraction.job_lease_seconds") or 600,
+    )
+
 
-    def __init__(self):
+class BaseExtractionService(JobWorker, ABC):
+    """
+    Extracts the text of files stored in Blob Storage and tracks the extraction status in Mongo.
+
+    Extractions are persisted as jobs in a queue, so a burst of uploads is spread over time
+    and nothing is lost on restart. Jobs are dispatched within the global and per-tenant
+    concurrency caps, failed attempts are retried with exponential backoff, and jobs left
+    running by a crashed instance are retried once their lease expires.
+    """
+    # Whether a job keeps running once `run` returns, until the extraction reports back
+    completes_on_callback = False
+    # File status once every attempt failed
+    failed_status = FileStatus.FAILED
+    log_tag = "Extraction"
+
+    def __init__(self, queue: Optional[JobQueue] = None):
         settings = Settings()
-        # Retrieve OpenShift service URL from env or settings
-        # We need this URL from the user, defaulting to placeholder for now
-        self.extraction_service_url = os.environ.get("EXTRACTION_SERVICE_URL") or "http://openshift-service-placeholder/api/extract"
-        self.callback_url = os.environ.get("EXTRACTION_CALLBACK_URL") or "http://backend:8000/api/extraction/callback"
+        super().__init__(
+            queue or get_extraction_queue(),
+            max_running=settings.get("extraction.max_concurrent_documents") or 1,
+            poll_interval=settings.get("extraction.poll_interval_seconds") or 1,
+        )
+
+    async def trigger_extraction(
+        self,
+        file_id: str,
+        blob_path: str,
+        content_hash: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Queue a file for extraction.
+
+        When the file has a content hash, the status is tracked on the content so every
+        file sharing the same bytes follows the same extraction, which is queued only once.
+        The status is left as is when the extraction is already queued or running.
+
+        Returns:
+            bool: Whether the extraction was queued
+        """
+        job = ExtractionJob(file_id, blob_path, content_hash)
+        if not await self.queue.enqueue(
+            job.content_key, tenant_id or DEFAULT_TENANT_ID, asdict(job)
+        ):
+            return False
+        await self._set_status(job, {"status": FileStatus.QUEUED, "error": None})
+        await self.start()
+        return True
+
+    async def get_queue_depth(self) -> dict:
+        return await self.queue.get_depth()
+
+    async def ingest_results(
+        self,
+        job_id: str,
+        pages: list[dict],
+        status: str = FileStatus.PROCESSING,
+        page_count: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        Store results reported by the extraction service for a job.
+
+        Results can come in any number of calls, each with the pages extracted since the
+        previous one. Pages are readable as soon as they are stored, and every call renews
+        the job lease. The final call, EXTRACTED or FAILED, ends the job. Pages of a stale
+        call, for an attempt that was already ended, are still stored but the status is
+        left to the current attempt.
+
+        Returns:
+            Optional[dict]: The job state and the number of new pages, or None if the job
+            does not exist
+        """
+        job = await self.queue.get_job(job_id)
+        if job is None:
+            return None
+        extraction_job = ExtractionJob(**job.payload)
+        mongo_service = get_mongo_service()
+
+        pages_stored = await mongo_service.save_pages(extraction_job.content_key, pages)
+
+        fields = {}
+        job_state = job.state
+        if page_count is not None:
+            fields["page_count"] = page_count
+        if job.state == JobState.RUNNING:
+            if status == FileStatus.EXTRACTED:
+                await self.queue.complete(job.id)
+                job_state = JobState.DONE
+                fields.update(status=FileStatus.EXTRACTED, error=None)
+            elif status == FileStatus.FAILED:
+                error = error or "Extraction failed"
+                retry = await self.queue.fail(job.id, job.attempts, error)
+                job_state = JobState.QUEUED if retry else JobState.FAILED
+                fields.update(status=FileStatus.QUEUED if retry else FileStatus.FAILED, error=error)
+            else:
+                await self.queue.renew(job.id)
+                fields["status"] = FileStatus.PROCESSING
+
+        await mongo_service.update_extraction_state(
+            extraction_job.file_id,
+            extraction_job.content_hash,
+            fields,
+            increments={"pages_extracted": pages_stored} if pages_stored else None,
+        )
+        return {"job_state": job_state, "pages_stored": pages_stored}
+
+    @abstractmethod
+    async def run(self, job: ExtractionJob) -> None:
+        """
+        Run an extraction attempt, raises if it failed
+        """
+        ...
+
+    async def _run_job(self, job: Job):
+        extraction_job = ExtractionJob(**job.payload)
+        heartbeat = None
+        if not self.completes_on_callback:
+            heartbeat = asyncio.create_task(
+                self._renew_lease(job, asyncio.current_task())
+            )
+
+        try:
+            await self.run(extraction_job)
+        except asyncio.CancelledError:
+            await self.queue.release(job)
+            raise
+        except Exception as e:
+            logger.error(
+                event="[Extraction] Error while extracting file",
+                file_id=extraction_job.file_id,
+                content_hash=extraction_job.content_hash,
+                attempt=job.attempts,
+                error=str(e),
+            )
+            retry = await self.queue.fail(job.id, job.attempts, str(e), job.lease_id)
+            await self._set_status(
+                extraction_job,
+                {"status": FileStatus.QUEUED if retry else self.failed_status, "error": str(e)},
+            )
+        else:
+            if not self.completes_on_callback:
+                await self.queue.complete(job.id, job.lease_id)
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+
+    async def _recover_orphans(self):
+        for job, retry in await self.queue.recover_orphans():
+            logger.error(
+                event="[Extraction] Recovered orphaned extraction job",
+                job_id=job.id,
+                attempt=job.attempts,
+                retry=retry,
+            )
+            await self._set_status(
+                ExtractionJob(**job.payload),
+                {
+                    "status": FileStatus.QUEUED if retry else self.failed_status,
+                    "error": "Job lease expired",
+                },
+            )
+
+    async def _set_status(self, job: ExtractionJob, fields: dict):
+        await get_mongo_service().update_extraction_state(job.file_id, job.content_hash, fields)
+
+
+class ExternalExtractionService(BaseExtractionService):
+    """
+    Extraction delegated to the external extraction service.
+
+    A job is submitted with one request on a shared HTTP session. Once accepted it keeps
+    running until the service reports back on the callback URL, so the concurrency caps
+    bound the documents in flight on the service. A rejected submission is retried.
+    """
+    _instance = None
+    completes_on_callback = True
+    failed_status = FileStatus.FAILED_TRIGGER
+
+    def __init__(self, queue: Optional[JobQueue] = None):
+        super().__init__(queue)
+        # Only used when EXTRACTION_SERVICE_URL is set, see `get_extraction_service`
+        self.extraction_service_url = os.environ.get("EXTRACTION_SERVICE_URL")
+        self.callback_url = os.environ.get("EXTRACTION_CALLBACK_URL") or "http://backend:8000/v1/extraction/callback"
+        self.session: Optional[aiohttp.ClientSession] = None
 
     @classmethod
     def get_instance(cls):
@@ -19,39 +245,282 @@ class ExternalExtractionService:
             cls._instance = ExternalExtractionService()
         return cls._instance
 
-    async def trigger_extraction(self, file_id: str, blob_path: str):
+    async def start(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        await super().start()
+
+    async def stop(self):
+        await super().stop()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def run(self, job: ExtractionJob) -> None:
         """
         Call the external service to start extraction.
         """
-        mongo_service = get_mongo_service()
-        
         payload = {
-            "file_id": file_id,
-            "blob_path": blob_path,
+            "job_id": job.content_key,
+            "file_id": job.file_id,
+            "blob_path": job.blob_path,
+            "content_hash": job.content_hash,
             "callback_url": self.callback_url
         }
-        if "placeholder" in self.extraction_service_url:
-            print(f"Mocking extraction trigger for {file_id}")
-            # Mock success
-            await mongo_service.update_file_status(file_id, "PROCESSING")
-            return True
+        async with self.session.post(self.extraction_service_url, json=payload) as response:
+            if response.status not in (200, 202):
+                error_text = await response.text()
+                raise Exception(f"Extraction trigger failed: {response.status} - {error_text}")
+        await self._set_status(job, {"status": FileStatus.PROCESSING})
+
+
+class LocalExtractionService(BaseExtractionService):
+    """
+    In-process extraction engine.
+
+    Queued jobs are run by this instance, at most `extraction.max_concurrent_documents` at a
+    time. A job downloads the blob to a temporary file, then extracts PDFs page-parallel in
+    the shared process pool, `extraction.pages_per_task` pages per task. Pages are stored in
+    order, each with its character offset in the document text and its fingerprint for the
+    compare engine, and the status goes through PROCESSING, then EXTRACTED, or FAILED once
+    every attempt failed.
+    """
+    _instance = None
+
+    def __init__(self, executor: Optional[Executor] = None, queue: Optional[JobQueue] = None):
+        super().__init__(queue)
+        settings = Settings()
+        self.pages_per_task = max(settings.get("extraction.pages_per_task") or 1, 1)
+        self.rows_per_page = max(
+            settings.get("tabular.rows_per_page") or tabular.DEFAULT_ROWS_PER_PAGE, 1
+        )
+        self.row_group_size = max(
+            settings.get("tabular.row_group_size") or tabular.DEFAULT_ROW_GROUP_SIZE, 1
+        )
+        # Defaults to the shared process pool, resolved lazily so it is only spawned when used
+        self.executor = executor
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = LocalExtractionService()
+        return cls._instance
+
+    async def run(self, job: ExtractionJob) -> None:
+        """
+        Extract the text of a file and store it page by page.
+        """
+        await self._set_status(job, {"status": FileStatus.PROCESSING, "pages_extracted": 0})
+        await get_mongo_service().delete_fingerprints(job.content_key)
+        await visual_diff.delete_page_rasters(job.content_key)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, os.path.basename(job.blob_path))
+            await get_blob_service().download_to_file(job.blob_path, file_path)
+
+            if get_file_extension(job.blob_path) == PDF_EXTENSION:
+                page_count = await self._extract_pdf(job, file_path)
+            elif tabular.is_table_file(job.blob_path):
+                page_count = await self._extract_table(job, file_path)
+            else:
+                page_count = await self._extract_document(job, file_path)
+
+        await self._set_status(
+            job, {"status": FileStatus.EXTRACTED, "page_count": page_count, "error": None}
+        )
+
+    async def _extract_pdf(self, job: ExtractionJob, file_path: str) -> int:
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_process_pool()
+        mongo_service = get_mongo_service()
+
+        page_count = await loop.run_in_executor(executor, utils.get_pdf_page_count, file_path)
+        # Word and token counts are summed over the page ranges, as they are stored
+        await mongo_service.update_extraction_state(
+            job.file_id,
+            job.content_hash,
+            {"page_count": page_count, "word_count": 0, "token_count": 0},
+        )
 
+        # Ranges complete out of order, but a page's offset depends on every page before it,
+        # so completed ranges are buffered and stored in page order
+        completed: dict[int, PageRange] = {}
+        next_start = 0
+        char_offset = 0
+        store_lock = asyncio.Lock()
+
+        async def store_completed_ranges() -> None:
+            nonlocal next_start, char_offset
+            async with store_lock:
+                while next_start in completed:
+                    texts, word_count, token_count, fingerprints = completed.pop(next_start)
+                    fields = {}
+                    if next_start == 0:
+                        # The first pages are enough for the preview and the language
+                        text = "".join(texts)
+                        fields = {
+                            "preview": document_stats.get_preview(text),
+                            "language": document_stats.detect_language(text),
+                        }
+                    pages = []
+                    for index, text in enumerate(texts):
+                        pages.append(
+                            {
+                                "page_number": next_start + index + 1,
+                                "text": text,
+                                "char_offset": char_offset,
+                            }
+                        )
+                        char_offset += len(text)
+                    await mongo_service.save_pages(job.content_key, pages)
+                    await mongo_service.save_page_fingerprints(
+                        job.content_key, fingerprint.FINGERPRINT_VERSION, fingerprints
+                    )
+                    await mongo_service.update_extraction_state(
+                        job.file_id,
+                        job.content_hash,
+                        fields,
+                        increments={
+                            "pages_extracted": len(texts),
+                            "word_count": word_count,
+                            "token_count": token_count,
+                        },
+                    )
+                    next_start += self.pages_per_task
+
+        async def extract_page_range(start: int) -> None:
+            completed[start] = await loop.run_in_executor(
+                executor, extract_pdf_page_range, file_path, start, start + self.pages_per_task
+            )
+            await store_completed_ranges()
+
+        tasks = [
+            asyncio.create_task(extract_page_range(start))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
         try:
-            timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.extraction_service_url, json=payload) as response:
-                    if response.status == 200 or response.status == 202:
-                        await mongo_service.update_file_status(file_id, "PROCESSING")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        print(f"Extraction trigger failed: {response.status} - {error_text}")
-                        await mongo_service.update_file_status(file_id, "FAILED_TRIGGER")
-                        return False
-        except Exception as e:
-            print(f"Exception triggering extraction: {e}")
-            await mongo_service.update_file_status(file_id, "FAILED_TRIGGER")
-            return False
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Don't keep the pool busy with a document that already failed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return page_count
+
+    async def _extract_table(self, job: ExtractionJob, file_path: str) -> int:
+        """
+        Stores each sheet as a Parquet artifact with row group statistics. No text page
+        is stored: the text view is rendered from the artifacts, page by page.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_process_pool()
+        blob_service = get_blob_service()
+        mongo_service = get_mongo_service()
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            try:
+                sheets = await loop.run_in_executor(
+                    executor,
+                    tabular.write_table_artifacts,
+                    file_path,
+                    output_dir,
+                    self.row_group_size,
+                )
+            except pa.ArrowInvalid as e:
+                # Text files that are not well-formed tables, e.g. ragged CSV rows
+                logger.error(
+                    event="[Extraction] File is not a valid table, extracting its text",
+                    file_id=job.file_id,
+                    error=str(e),
+                )
+                return await self._extract_document(job, file_path)
+            manifest = {"rows_per_page": self.rows_per_page, "sheets": sheets}
+            # Tables have no stored pages, their fingerprints are computed from the artifacts
+            fingerprints = await loop.run_in_executor(
+                executor, fingerprint.fingerprint_table_artifacts, output_dir, manifest
+            )
+            for sheet in sheets:
+                sheet["blob_path"] = f"tables/{job.content_key}/{sheet['index']}.parquet"
+                await blob_service.upload_local_file(
+                    os.path.join(output_dir, f"{sheet['index']}.parquet"), sheet["blob_path"]
+                )
+
+        await mongo_service.save_table_manifest(job.content_key, manifest)
+        await mongo_service.save_page_fingerprints(
+            job.content_key, fingerprint.FINGERPRINT_VERSION, fingerprints
+        )
+        page_count = tabular.get_table_page_count(manifest)
+        await mongo_service.update_extraction_state(
+            job.file_id,
+            job.content_hash,
+            {"format": tabular.TABLE_FORMAT},
+            increments={"pages_extracted": page_count},
+        )
+        return page_count
+
+    async def _extract_document(self, job: ExtractionJob, file_path: str) -> int:
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_process_pool()
+        mongo_service = get_mongo_service()
+
+        text, stats, page_fingerprint = await loop.run_in_executor(
+            executor, extract_document, file_path
+        )
+        await mongo_service.save_pages(
+            job.content_key, [{"page_number": 1, "text": text, "char_offset": 0}]
+        )
+        await mongo_service.save_page_fingerprints(
+            job.content_key, fingerprint.FINGERPRINT_VERSION, [page_fingerprint]
+        )
+        del stats["page_count"]
+        await mongo_service.update_extraction_state(
+            job.file_id, job.content_hash, stats, increments={"pages_extracted": 1}
+        )
+        return 1
+
+
+class PageRange(NamedTuple):
+    """Text of a range of PDF pages, its word and token counts and its page fingerprints"""
+    texts: List[str]
+    word_count: int
+    token_count: int
+    fingerprints: List[Dict[str, Any]]
+
+
+def extract_pdf_page_range(file_path: str, start: int, stop: int) -> PageRange:
+    """
+    Extract the text of a range of pages of a PDF, count and fingerprint it, runs in the
+    process pool.
+    """
+    texts = utils.read_pdf_page_range(file_path, start, stop)
+    text = "".join(texts)
+    return PageRange(
+        texts,
+        document_stats.count_words(text),
+        document_stats.estimate_token_count(text),
+        [fingerprint.fingerprint_page(start + index + 1, page) for index, page in enumerate(texts)],
+    )
+
+
+def extract_document(file_path: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """
+    Extract the text of a non paginated document, its statistics and fingerprint, runs in
+    the process pool.
+    """
+    with open(file_path, "rb") as file:
+        text = parse_file_contents(os.path.basename(file_path), file.read())
+    return text, document_stats.get_document_stats(text), fingerprint.fingerprint_page(1, text)
+
 
-def get_extraction_service():
-    return ExternalExtractionService.get_instance()
+def get_extraction_service() -> BaseExtractionService:
+    if Settings().get("extraction.mode") == "external":
+        if os.environ.get("EXTRACTION_SERVICE_URL"):
+            return ExternalExtractionService.get_instance()
+        # Without a service to submit to, files would never leave PROCESSING
+        if LocalExtractionService._instance is None:
+            logger.warning(
+                event="[Extraction] EXTRACTION_SERVICE_URL is not set, extracting files locally"
+            )
+    return LocalExtractionService.get_instance()
@@ -1,23 +1,28 @@
+import asyncio
 import io
+import os
+from typing import Any, Dict, NamedTuple, Optional
+from uuid import uuid4
 
-import pandas as pd
 from docx import Document
 from fastapi import Depends, HTTPException
 from fastapi import UploadFile as FastAPIUploadFile
-from python_calamine.pandas import pandas_monkeypatch
 
 import backend.crud.conversation as conversation_crud
 import backend.crud.file as file_crud
+from backend.config.settings import Settings
 from backend.crud import message as message_crud
 from backend.database_models.conversation import ConversationFileAssociation
 from backend.database_models.database import DBSessionDep
 from backend.database_models.file import File as FileModel
 from backend.schemas.context import Context
 from backend.schemas.file import ConversationFilePublic, File
-from backend.services import utils
+from backend.services import document_stats, tabular, utils
 from backend.services.agent import validate_agent_exists
+from backend.services.blob import get_blob_service
 from backend.services.context import get_context
 from backend.services.logger.utils import LoggerFactory
+from backend.services.process_pool import get_process_pool
 
 MAX_FILE_SIZE = 20_000_000  # 20MB
 MAX_TOTAL_FILE_SIZE = 1_000_000_000  # 1GB
@@ -34,11 +39,17 @@ DOCX_EXTENSION = "docx"
 PARQUET_EXTENSION = "parquet"
 CALENDAR_EXTENSION = "ics"
 
-# Monkey patch Pandas to use Calamine for Excel reading because Calamine is faster than Pandas
-pandas_monkeypatch()
+# The extracted text of files is stored in Blob Storage under this prefix, keyed by file ID
+FILE_CONTENT_PREFIX = "file_contents"
+# Columns of a file holding the statistics computed at ingest
+DOCUMENT_STATS_FIELDS = ("word_count", "token_count", "page_count", "language", "preview")
 
 file_service = None
 
+# Caps the files parsed in the process pool at once, bound to the event loop that created it
+parse_slots: Optional[asyncio.Semaphore] = None
+parse_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
 logger = LoggerFactory().get_logger()
 
 
@@ -210,7 +221,7 @@ class FileService:
 
         return files
 
-    def delete_conversation_file_by_id(
+    async def delete_conversation_file_by_id(
         self,
         session: DBSessionDep,
         conversation_id: str,
@@ -231,11 +242,13 @@ class FileService:
             session, conversation_id, file_id, user_id
         )
 
+        content_paths = file_crud.get_file_content_paths(session, [file_id], user_id)
         file_crud.delete_file(session, file_id, user_id)
+        await delete_file_contents(content_paths)
 
         return
 
-    def delete_agent_file_by_id(
+    async def delete_agent_file_by_id(
         self,
         session: DBSessionDep,
         agent_id: str,
@@ -252,11 +265,13 @@ class FileService:
             file_id (str): The file ID
             user_id (str): The user ID
         """
+        content_paths = file_crud.get_file_content_paths(session, [file_id], user_id)
         file_crud.delete_file(session, file_id, user_id)
+        await delete_file_contents(content_paths)
 
         return
 
-    def delete_all_conversation_files(
+    async def delete_all_conversation_files(
         self,
         session: DBSessionDep,
         conversation_id: str,
@@ -279,7 +294,9 @@ class FileService:
         logger.info(
                 event=f"Deleting conversation {conversation_id} files from DB."
             )
+        content_paths = file_crud.get_file_content_paths(session, file_ids, user_id)
         file_crud.bulk_delete_files(session, file_ids, user_id)
+        await delete_file_contents(content_paths)
 
     def get_files_by_message_id(
         self, session: DBSessionDep, message_id: str, user_id: str, ctx: Context
@@ -348,25 +365,124 @@ async def insert_files_in_db(
     Returns:
         list[File]: The files that were created
     """
+    # Files are parsed in parallel in the process pool, keeping the event loop free
+    documents = await asyncio.gather(*(get_file_content(file) for file in files))
+
     files_to_upload = []
-    for file in files:
-        content = await get_file_content(file)
-        cleaned_content = content.replace("\x00", "")
+    encoded_contents = []
+    for file, document in zip(files, documents):
+        encoded_content = document.text.encode("utf-8")
         filename = file.filename.encode("ascii", "ignore").decode("utf-8")
+        file_id = str(uuid4())
 
+        encoded_contents.append(encoded_content)
         files_to_upload.append(
             FileModel(
+                id=file_id,
                 file_name=filename,
                 file_size=file.size,
-                file_content=cleaned_content,
+                content_path=get_file_content_path(file_id),
+                content_length=len(encoded_content),
                 user_id=user_id,
+                **document.stats,
             )
         )
 
+    # Contents are stored before the rows that point to them
+    blob_service = get_blob_service()
+    await asyncio.gather(
+        *(
+            blob_service.upload_bytes(encoded_content, file.content_path)
+            for file, encoded_content in zip(files_to_upload, encoded_contents)
+        )
+    )
+
     uploaded_files = file_crud.batch_create_files(session, files_to_upload)
     return uploaded_files
 
 
+def get_file_content_path(file_id: str) -> str:
+    return f"{FILE_CONTENT_PREFIX}/{file_id}.txt"
+
+
+def read_file_text(
+    file: FileModel, start: int = 0, length: Optional[int] = None
+) -> str:
+    """
+    Read the extracted text of a file, blocking
+
+    Args:
+        file (FileModel): The file
+        start (int): Offset of the first byte of the UTF-8 text to read
+        length (Optional[int]): Number of bytes to read, up to the end of the text if not set
+
+    Returns:
+        str: The text, without the characters a range boundary cuts through
+    """
+    end = None if length is None else start + length
+
+    # Files created before contents moved to Blob Storage keep them in the deferred column
+    if file.content_path is None:
+        return file.file_content.encode("utf-8")[start:end].decode("utf-8", errors="ignore")
+
+    end = file.content_length if end is None else min(end, file.content_length)
+    if start >= end:
+        return ""
+    data = get_blob_service().read_file_range(file.content_path, start, end - start)
+    return data.decode("utf-8", errors="ignore")
+
+
+async def get_file_text(
+    file: FileModel, start: int = 0, length: Optional[int] = None
+) -> str:
+    """
+    Read the extracted text of a file, see `read_file_text`
+    """
+    if file.content_path is None:
+        # Loading the deferred column uses the session, keep it in the calling thread
+        return read_file_text(file, start, length)
+    return await asyncio.to_thread(read_file_text, file, start, length)
+
+
+async def get_file_stats(file: FileModel) -> Dict[str, Any]:
+    """
+    Get the statistics of a file computed at ingest
+
+    Files created before statistics were stored have them computed from their text.
+
+    Args:
+        file (FileModel): The file
+
+    Returns:
+        Dict[str, Any]: The word count, token count, page count, language and preview
+    """
+    if file.word_count is None:
+        return document_stats.get_document_stats(await get_file_text(file), file.page_count)
+    return {field: getattr(file, field) for field in DOCUMENT_STATS_FIELDS}
+
+
+async def delete_file_contents(content_paths: list[str]) -> None:
+    """
+    Delete the stored contents of files, once their rows are deleted
+
+    A failed delete only leaves unreferenced objects in Blob Storage, so it is logged
+    instead of raised.
+
+    Args:
+        content_paths (list[str]): The content paths of the deleted files
+    """
+    if not content_paths:
+        return
+    try:
+        await asyncio.to_thread(get_blob_service().delete_files, content_paths)
+    except Exception as e:
+        logger.error(
+            event="[File] Error while deleting file contents",
+            content_paths=content_paths,
+            error=str(e),
+        )
+
+
 def attach_conversation_id_to_files(
     conversation_id: str, files: list[FileModel]
 ) -> list[ConversationFilePublic]:
@@ -381,6 +497,7 @@ def attach_conversation_id_to_files(
                 user_id=file.user_id,
                 created_at=file.created_at,
                 updated_at=file.updated_at,
+                **{field: getattr(file, field) for field in DOCUMENT_STATS_FIELDS},
             )
         )
     return results
@@ -388,16 +505,15 @@ def attach_conversation_id_to_files(
 
 
 def read_excel(file_contents: bytes) -> str:
-    """Reads the text from an Excel file using Pandas
+    """Reads the text of every sheet of an Excel file
 
     Args:
         file_contents (bytes): The file contents
 
     Returns:
-        str: The text extracted from the Excel
+        str: The text extracted from the Excel, one tab-separated row per line
     """
-    excel = pd.read_excel(io.BytesIO(file_contents), engine="calamine")
-    return excel.to_string()
+    return tabular.render_tables_text(tabular.read_tables("file.xlsx", file_contents))
 
 
 def read_docx(file_contents: bytes) -> str:
@@ -419,17 +535,15 @@ def read_docx(file_contents: bytes) -> str:
 
 
 def read_parquet(file_contents: bytes) -> str:
-    """Reads the text from a Parquet file using Pandas
+    """Reads the text from a Parquet file
 
     Args:
         file_contents (bytes): The file contents
 
     Returns:
-        str: The text extracted from the Parquet
+        str: The text extracted from the Parquet, one tab-separated row per line
     """
-    parquet = pd.read_parquet(io.BytesIO(file_contents), engine="pyarrow")
-    return parquet.to_string()
-
+    return tabular.render_tables_text(tabular.read_tables("file.parquet", file_contents))
 
 
 def get_file_extension(file_name: str) -> str:
@@ -444,20 +558,135 @@ def get_file_extension(file_name: str) -> str:
     return file_name.split(".")[-1].lower()
 
 
-async def get_file_content(file: FastAPIUploadFile) -> str:
+class ParsedDocument(NamedTuple):
+    """Text extracted from a file, and its statistics"""
+    text: str
+    stats: Dict[str, Any]
+
+
+async def get_file_content(file: FastAPIUploadFile) -> ParsedDocument:
     """Reads the file contents based on the file extension
 
+    The file is parsed in the shared process pool, since parsers are CPU-bound.
+
     Args:
         file (UploadFile): The file to read
 
+    Returns:
+        ParsedDocument: The file contents and statistics
+
+    Raises:
+        ValueError: If the file extension is not supported, or parsing timed out
+    """
+    file_contents = await file.read()
+    return await parse_file_in_process_pool(file.filename, file_contents)
+
+
+def get_parse_slots() -> asyncio.Semaphore:
+    """
+    Returns the semaphore capping the files parsed at once, `upload.max_concurrent_parses`,
+    or the number of process pool workers if not set
+    """
+    global parse_slots, parse_slots_loop
+    loop = asyncio.get_running_loop()
+    if parse_slots is None or parse_slots_loop is not loop:
+        settings = Settings()
+        max_concurrent_parses = (
+            settings.get("upload.max_concurrent_parses")
+            or settings.get("process_pool.max_workers")
+            or os.cpu_count()
+            or 1
+        )
+        parse_slots = asyncio.Semaphore(max(max_concurrent_parses, 1))
+        parse_slots_loop = loop
+    return parse_slots
+
+
+async def parse_file_in_process_pool(
+    file_name: str, file_contents: bytes, timeout: Optional[float] = None
+) -> ParsedDocument:
+    """Extracts the text of a file and computes its statistics in the shared process pool
+
+    A file that takes longer than `timeout` seconds (`upload.parse_timeout_seconds` by
+    default) fails. Its worker cannot be interrupted, so it keeps its parse slot until it
+    is done: timed out files never pile up on the pool.
+
+    Args:
+        file_name (str): The file name
+        file_contents (bytes): The file contents
+        timeout (Optional[float]): Seconds allowed to parse the file
+
+    Returns:
+        ParsedDocument: The file contents and statistics
+
+    Raises:
+        ValueError: If the file extension is not supported, or parsing timed out
+    """
+    if timeout is None:
+        timeout = Settings().get("upload.parse_timeout_seconds")
+
+    slots = get_parse_slots()
+    await slots.acquire()
+    try:
+        future = asyncio.get_running_loop().run_in_executor(
+            get_process_pool(), parse_document, file_name, file_contents
+        )
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+
+    try:
+        # Shielded so a timed out or cancelled caller does not release the slot early
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        logger.error(
+            event="[File] Parsing timed out",
+            file_name=file_name,
+            timeout=timeout,
+        )
+        raise ValueError(f"Parsing {file_name} timed out after {timeout} seconds")
+
+
+def parse_document(file_name: str, file_contents: bytes) -> ParsedDocument:
+    """Extracts the text of a file and computes its statistics, runs in the process pool
+
+    Args:
+        file_name (str): The file name
+        file_contents (bytes): The file contents
+
+    Returns:
+        ParsedDocument: The text, without NUL characters, and its statistics
+
+    Raises:
+        ValueError: If the file extension is not supported
+    """
+    page_count = None
+    if get_file_extension(file_name) == PDF_EXTENSION:
+        pages = list(utils.iter_pdf_pages(file_contents))
+        text = utils.join_pdf_pages(pages)
+        page_count = len(pages)
+    else:
+        text = parse_file_contents(file_name, file_contents)
+
+    text = text.replace("\x00", "")
+    return ParsedDocument(text, document_stats.get_document_stats(text, page_count))
+
+
+def parse_file_contents(file_name: str, file_contents: bytes) -> str:
+    """Extracts the text of a file based on its extension
+
+    Args:
+        file_name (str): The file name
+        file_contents (bytes): The file contents
+
     Returns:
         str: The file contents
 
     Raises:
         ValueError: If the file extension is not supported
     """
-    file_contents = await file.read()
-    file_extension = get_file_extension(file.filename)
+    file_extension = get_file_extension(file_name)
 
     if file_extension == PDF_EXTENSION:
         return utils.read_pdf(file_contents)
@@ -0,0 +1,166 @@
+import asyncio
+import datetime
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+from pymongo.errors import OperationFailure
+
+from backend.services.event_bus import (
+    get_content_channel,
+    get_conversation_channel,
+    get_file_channel,
+    get_file_event_bus,
+)
+from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import FILE_PROGRESS_PROJECTION, get_mongo_service
+
+logger = LoggerFactory().get_logger()
+
+FILE_STATUS_EVENT = "file_status"
+# Seconds between two reads of the conversation files when no change feed is available
+POLL_INTERVAL = 2
+
+
+def to_file_status(file: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": file["_id"],
+        "file_name": file.get("file_name"),
+        "status": file.get("status", "UPLOADED"),
+        "page_count": file.get("page_count"),
+        "pages_extracted": file.get("pages_extracted", 0),
+        "error": file.get("error"),
+    }
+
+
+async def stream_conversation_file_events(conversation_id: str) -> AsyncIterator[Dict[str, str]]:
+    """
+    Streams the status and extraction progress of the files of a conversation.
+
+    The current state of every file is sent first, then a new event every time a file
+    changes or is added to the conversation. Changes come from the Redis file event
+    channels, or from a Mongo change stream when Redis is not configured.
+
+    Args:
+        conversation_id (str): The conversation ID
+
+    Yields:
+        Dict[str, str]: Server-sent events, one `file_status` event per file change
+    """
+    if get_file_event_bus().enabled:
+        updates = _watch_file_events(conversation_id)
+    else:
+        updates = _watch_files_collection(conversation_id)
+
+    sent: Dict[str, Dict[str, Any]] = {}
+    async for files in updates:
+        for file in files:
+            file_status = to_file_status(file)
+            if sent.get(file_status["id"]) != file_status:
+                sent[file_status["id"]] = file_status
+                yield {"event": FILE_STATUS_EVENT, "data": json.dumps(file_status)}
+
+
+async def _get_all_conversation_files(conversation_id: str) -> List[Dict[str, Any]]:
+    mongo_service = get_mongo_service()
+    files, cursor = await mongo_service.get_files_by_conversation_id(
+        conversation_id, projection=FILE_PROGRESS_PROJECTION
+    )
+    while cursor:
+        page, cursor = await mongo_service.get_files_by_conversation_id(
+            conversation_id, cursor=cursor, projection=FILE_PROGRESS_PROJECTION
+        )
+        files.extend(page)
+    return files
+
+
+async def _watch_file_events(conversation_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields the conversation files, then the files announced on the file event channels.
+    """
+    pubsub = get_file_event_bus().pubsub()
+    try:
+        # Subscribe before reading the files so no change falls in between
+        await pubsub.subscribe(get_conversation_channel(conversation_id))
+        files = await _get_all_conversation_files(conversation_id)
+        subscribed = set()
+
+        while True:
+            channels = {get_file_channel(file["_id"]) for file in files}
+            channels |= {
+                get_content_channel(file["content_hash"])
+                for file in files
+                if file.get("content_hash")
+            }
+            if channels - subscribed:
+                await pubsub.subscribe(*(channels - subscribed))
+                subscribed |= channels
+            yield files
+
+            # Wait for an event, then take every event already received as one batch
+            events = [await _get_event(pubsub, timeout=None)]
+            while event := await _get_event(pubsub, timeout=0):
+                events.append(event)
+
+            files = await get_mongo_service().get_conversation_files(
+                conversation_id,
+                file_ids=list({event["file_id"] for event in events if "file_id" in event}),
+                content_hashes=list(
+                    {event["content_hash"] for event in events if "content_hash" in event}
+                ),
+                projection=FILE_PROGRESS_PROJECTION,
+            )
+    finally:
+        await pubsub.aclose()
+
+
+async def _get_event(pubsub, timeout) -> Dict[str, Any] | None:
+    while True:
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            if timeout is None:
+                continue
+            return None
+        try:
+            return json.loads(message["data"])
+        except (TypeError, ValueError):
+            logger.error(event="[FileEvents] Invalid file event", data=message["data"])
+
+
+async def _watch_files_collection(conversation_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yields the conversation files, then the files changed according to a Mongo change
+    stream, or to periodic reads of recently updated files if change streams are not
+    supported (standalone server).
+    """
+    files_collection = get_mongo_service().files_collection
+    pipeline = [{"$match": {"fullDocument.conversation_id": conversation_id}}]
+    try:
+        async with files_collection.watch(pipeline, full_document="updateLookup") as stream:
+            yield await _get_all_conversation_files(conversation_id)
+            async for change in stream:
+                if change.get("fullDocument"):
+                    yield [change["fullDocument"]]
+        return
+    except OperationFailure as e:
+        logger.error(
+            event="[FileEvents] Mongo change streams unavailable, polling files",
+            conversation_id=conversation_id,
+            error=str(e),
+        )
+
+    files = await _get_all_conversation_files(conversation_id)
+    yield files
+    last_update = max(
+        (file["updated_at"] for file in files if file.get("updated_at")),
+        default=datetime.datetime.min,
+    )
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+        cursor = files_collection.find(
+            {"conversation_id": conversation_id, "updated_at": {"$gte": last_update}},
+            FILE_PROGRESS_PROJECTION,
+        )
+        files = await cursor.to_list(length=None)
+        if files:
+            last_update = max(file["updated_at"] for file in files)
+            yield files
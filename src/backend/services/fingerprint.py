@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Any, Dict, List
+
+import pyarrow.parquet as pq
+
+from backend.services import tabular
+from backend.services.mongo import get_mongo_service
+from backend.services.process_pool import get_process_pool
+
+# Bumped whenever a change to the fingerprints changes their values, stored fingerprints
+# of other versions are ignored and computed again
+FINGERPRINT_VERSION = 1
+
+# Words of each shingle of a paragraph sketch
+SHINGLE_WORDS = 4
+# Smallest shingle hashes kept per paragraph, to estimate the similarity of two paragraphs
+SKETCH_SIZE = 8
+ROLLING_BASE = 1_000_003
+# Mersenne prime, rolling hashes fit in a signed 64-bit integer as stored by Mongo
+ROLLING_MODULUS = (1 << 61) - 1
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+LINE = re.compile(r"[^\n]+")
+# A line ending a sentence ends its paragraph in text extracted without blank lines
+SENTENCE_END = re.compile(r"[.!?:;][\"')\]]*\s*$")
+
+
+@dataclass
+class Paragraph:
+    """
+    A paragraph of a page, located by its character offsets in the text of the page
+    """
+    page_number: int
+    index: int
+    start: int
+    end: int
+    text: str
+    hash: str
+    sketch: List[int] = field(default_factory=list)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses whitespace, so reflowed or re-extracted text compares equal
+    """
+    return " ".join(text.split())
+
+
+def hash_text(text: str) -> str:
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def get_rolling_hashes(words: List[str]) -> List[int]:
+    """
+    Polynomial rolling hash of every window of `SHINGLE_WORDS` words, a single hash of all
+    the words when there are fewer.
+    """
+    word_hashes = [zlib.crc32(word.encode("utf-8")) for word in words]
+    window = min(SHINGLE_WORDS, len(word_hashes))
+    if not window:
+        return []
+
+    # Weight of the word leaving the window
+    leading_weight = pow(ROLLING_BASE, window - 1, ROLLING_MODULUS)
+    value = 0
+    for word_hash in word_hashes[:window]:
+        value = (value * ROLLING_BASE + word_hash) % ROLLING_MODULUS
+    hashes = [value]
+    for index in range(window, len(word_hashes)):
+        value = (value - word_hashes[index - window] * leading_weight) % ROLLING_MODULUS
+        value = (value * ROLLING_BASE + word_hashes[index]) % ROLLING_MODULUS
+        hashes.append(value)
+    return hashes
+
+
+def get_sketch(text: str) -> List[int]:
+    """
+    Bottom-k sketch of the word shingles of a text: its `SKETCH_SIZE` smallest distinct
+    shingle hashes.
+    """
+    return sorted(set(get_rolling_hashes(text.split())))[:SKETCH_SIZE]
+
+
+def estimate_similarity(sketch_a: List[int], sketch_b: List[int]) -> float:
+    """
+    Estimates the Jaccard similarity of the shingles of two texts from their sketches
+    """
+    union = sorted(set(sketch_a) | set(sketch_b))[:SKETCH_SIZE]
+    if not union:
+        return 1.0
+    common = set(sketch_a) & set(sketch_b)
+    return sum(1 for value in union if value in common) / len(union)
+
+
+def split_paragraphs(page_number: int, text: str) -> List[Paragraph]:
+    """
+    Splits the text of a page into paragraphs, at blank lines and at lines ending a sentence.
+    """
+    paragraphs = []
+
+    def add(start: int, end: int) -> None:
+        paragraph_text = text[start:end]
+        if paragraph_text.strip():
+            paragraphs.append(
+                Paragraph(
+                    page_number,
+                    len(paragraphs),
+                    start,
+                    end,
+                    paragraph_text,
+                    hash_text(paragraph_text),
+                    get_sketch(paragraph_text),
+                )
+            )
+
+    block_start = 0
+    for block_end in [match.start() for match in PARAGRAPH_BREAK.finditer(text)] + [len(text)]:
+        start = None
+        end = None
+        for line in LINE.finditer(text, block_start, block_end):
+            if not line.group().strip():
+                continue
+            if start is None:
+                start = line.start()
+            end = line.end()
+            if SENTENCE_END.search(line.group()):
+                add(start, end)
+                start = None
+        if start is not None:
+            add(start, end)
+        block_start = block_end
+
+    return paragraphs
+
+
+def fingerprint_page(page_number: int, text: str) -> Dict[str, Any]:
+    """
+    Fingerprint of a page: the hash of its text, and the offsets, hash and sketch of each
+    of its paragraphs, enough to compare it without its text.
+    """
+    return {
+        "page_number": page_number,
+        "hash": hash_text(text),
+        "paragraphs": [
+            {
+                "start": paragraph.start,
+                "end": paragraph.end,
+                "hash": paragraph.hash,
+                "sketch": paragraph.sketch,
+            }
+            for paragraph in split_paragraphs(page_number, text)
+        ],
+    }
+
+
+def fingerprint_pages(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fingerprints pages with a `page_number` and a `text`, runs in the process pool.
+    """
+    return [fingerprint_page(page["page_number"], page["text"]) for page in pages]
+
+
+def get_paragraphs(fingerprint: Dict[str, Any], text: str) -> List[Paragraph]:
+    """
+    Paragraphs of a fingerprinted page, located in its text without splitting it again.
+    """
+    return [
+        Paragraph(
+            fingerprint["page_number"],
+            index,
+            paragraph["start"],
+            paragraph["end"],
+            text[paragraph["start"]:paragraph["end"]],
+            paragraph["hash"],
+            paragraph["sketch"],
+        )
+        for index, paragraph in enumerate(fingerprint["paragraphs"])
+    ]
+
+
+def fingerprint_table_artifacts(
+    output_dir: str, manifest: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Fingerprints the pages of the text view of a table from its local Parquet artifacts,
+    runs in the process pool.
+    """
+    fingerprints = []
+    windows_by_sheet = {
+        sheet_index: list(windows)
+        for sheet_index, windows in groupby(
+            tabular.iter_page_windows(manifest), key=lambda window: window.sheet["index"]
+        )
+    }
+    for sheet in manifest["sheets"]:
+        table = pq.read_table(os.path.join(output_dir, f"{sheet['index']}.parquet"))
+        for window in windows_by_sheet.get(sheet["index"], []):
+            rows = table.slice(window.row_start, window.row_stop - window.row_start)
+            page = tabular.render_page_window(window, rows)
+            fingerprints.append(fingerprint_page(page["page_number"], page["text"]))
+    return fingerprints
+
+
+def get_content_key(file: Dict[str, Any]) -> str:
+    return file.get("content_hash") or file["_id"]
+
+
+async def get_page_fingerprints(file: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Reads the page fingerprints of an extracted file, in page order.
+
+    Fingerprints are stored per content at extraction, so they are shared by every file
+    with the same bytes and every comparison reads them back. Pages extracted before their
+    fingerprints were, or by an older version, are fingerprinted once here and stored.
+    """
+    mongo_service = get_mongo_service()
+    content_key = get_content_key(file)
+    fingerprints = await mongo_service.get_page_fingerprints(content_key, FINGERPRINT_VERSION)
+    page_count = file.get("page_count")
+    if fingerprints and (page_count is None or len(fingerprints) >= page_count):
+        return fingerprints
+
+    fingerprinted = {fingerprint["page_number"] for fingerprint in fingerprints}
+    pages = [
+        {"page_number": page["page_number"], "text": page["text"]}
+        for page in await tabular.get_file_text_pages(file)
+        if page["page_number"] not in fingerprinted
+    ]
+    if not pages:
+        return fingerprints
+
+    missing = await asyncio.get_running_loop().run_in_executor(
+        get_process_pool(), fingerprint_pages, pages
+    )
+    await mongo_service.save_page_fingerprints(content_key, FINGERPRINT_VERSION, missing)
+    return sorted(fingerprints + missing, key=lambda fingerprint: fingerprint["page_number"])
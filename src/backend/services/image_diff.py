@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pypdf import PdfReader
+
+from backend.services.blob import get_blob_service
+from backend.services.file import PDF_EXTENSION, get_file_extension
+from backend.services.mongo import get_mongo_service
+from backend.services.process_pool import get_process_pool
+from backend.services.utils import PDF_PAGE_WINDOW
+
+# Bumped whenever a change to the hashes changes their values, stored hashes of other
+# versions are ignored and computed again
+IMAGE_HASH_VERSION = 1
+
+# Side of the grayscale thumbnail of the perceptual hash, and of its low frequencies kept
+PHASH_SIZE = 32
+HASH_SIZE = 8
+# Images smaller than this on a side, e.g. bullets and rules, are not compared
+MIN_IMAGE_SIZE = 32
+# Images hashed at once, bounds the thumbnails held in memory
+HASH_BATCH_SIZE = 256
+# Sum of the Hamming distances of both hashes up to which two images are the same image,
+# e.g. encoded again
+UNCHANGED_DISTANCE = 4
+
+
+@lru_cache(maxsize=1)
+def _get_dct_matrix(size: int) -> np.ndarray:
+    """
+    Orthonormal DCT-II matrix, the DCT of a square block `x` is `C @ x @ C.T`
+    """
+    frequencies = np.arange(size)[:, None]
+    positions = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * positions + 1) * frequencies / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """
+    Packs rows of 64 booleans into 64-bit integers, first bit highest
+    """
+    return np.packbits(bits.reshape(len(bits), -1), axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def get_phashes(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Perceptual hashes of a batch of `PHASH_SIZE` x `PHASH_SIZE` grayscale thumbnails: the
+    signs of the lowest frequencies of their DCT against their median.
+
+    Returns:
+        np.ndarray: One 64-bit hash per thumbnail
+    """
+    matrix = _get_dct_matrix(thumbnails.shape[-1])
+    frequencies = (matrix @ thumbnails.astype(np.float64) @ matrix.T)[:, :HASH_SIZE, :HASH_SIZE]
+    frequencies = frequencies.reshape(len(thumbnails), -1)
+    # The DC term is the mean brightness, not part of the shape of the image
+    medians = np.median(frequencies[:, 1:], axis=1)
+    return _pack_bits(frequencies > medians[:, None])
+
+
+def get_dhashes(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Difference hashes of a batch of `HASH_SIZE` x `HASH_SIZE + 1` grayscale thumbnails:
+    whether each pixel is brighter than its right neighbour.
+
+    Returns:
+        np.ndarray: One 64-bit hash per thumbnail
+    """
+    return _pack_bits(thumbnails[:, :, 1:] > thumbnails[:, :, :-1])
+
+
+def get_hamming_distance(hash_a: int, hash_b: int) -> int:
+    return (hash_a ^ hash_b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of hashes by Hamming distance. A search only visits the subtrees
+    whose distance to their parent is within the searched distance of the parent's, so
+    close hashes are found without comparing every pair.
+    """
+
+    def __init__(self):
+        # Node: (hash, item, children by their distance to the node)
+        self.root: Optional[Tuple[int, Any, Dict[int, tuple]]] = None
+
+    def add(self, value: int, item: Any) -> None:
+        if self.root is None:
+            self.root = (value, item, {})
+            return
+        node = self.root
+        while True:
+            distance = get_hamming_distance(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, item, {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """
+        Items whose hash is within `max_distance` of `value`, with their distance
+        """
+        results = []
+        nodes = [self.root] if self.root is not None else []
+        while nodes:
+            node_value, item, children = nodes.pop()
+            distance = get_hamming_distance(value, node_value)
+            if distance <= max_distance:
+                results.append((distance, item))
+            nodes.extend(
+                child
+                for child_distance, child in children.items()
+                if distance - max_distance <= child_distance <= distance + max_distance
+            )
+        return results
+
+
+def extract_pdf_images(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Hashes the images of every page of a PDF, runs in the process pool.
+
+    Images are read through pypdf's image API, which decodes them with Pillow. Their
+    thumbnails are hashed `HASH_BATCH_SIZE` at a time.
+
+    Returns:
+        List[Dict[str, Any]]: Per image, its page, position in the page, name, size, the
+            digest of its data and its perceptual and difference hashes, as hexadecimal
+
+    Raises:
+        ImportError: If Pillow is not installed
+    """
+    from PIL import Image
+
+    images: List[Dict[str, Any]] = []
+    phash_thumbnails: List[np.ndarray] = []
+    dhash_thumbnails: List[np.ndarray] = []
+
+    def hash_batch() -> None:
+        batch = images[len(images) - len(phash_thumbnails):]
+        phashes = get_phashes(np.stack(phash_thumbnails))
+        dhashes = get_dhashes(np.stack(dhash_thumbnails))
+        for image, phash, dhash in zip(batch, phashes, dhashes):
+            image["phash"] = f"{int(phash):016x}"
+            image["dhash"] = f"{int(dhash):016x}"
+        phash_thumbnails.clear()
+        dhash_thumbnails.clear()
+
+    pdf_reader = PdfReader(file_path)
+    for page_index, page in enumerate(pdf_reader.pages):
+        for image_index, image_file in enumerate(page.images):
+            try:
+                image = image_file.image.convert("L")
+            except Exception:
+                # Encodings Pillow cannot decode, e.g. JBIG2
+                continue
+            if min(image.size) < MIN_IMAGE_SIZE:
+                continue
+            images.append(
+                {
+                    "page_number": page_index + 1,
+                    "image_index": image_index,
+                    "name": image_file.name,
+                    "width": image.width,
+                    "height": image.height,
+                    "digest": hashlib.blake2b(image_file.data, digest_size=8).hexdigest(),
+                }
+            )
+            phash_thumbnails.append(
+                np.asarray(image.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS))
+            )
+            dhash_thumbnails.append(
+                np.asarray(image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS))
+            )
+            if len(phash_thumbnails) == HASH_BATCH_SIZE:
+                hash_batch()
+
+        if (page_index + 1) % PDF_PAGE_WINDOW == 0:
+            pdf_reader.resolved_objects.clear()
+
+    if phash_thumbnails:
+        hash_batch()
+    return images
+
+
+def match_images(
+    images_a: List[Dict[str, Any]], images_b: List[Dict[str, Any]], max_distance: int
+) -> List[Dict[str, Any]]:
+    """
+    Images inserted, deleted and modified between two versions of a document.
+
+    Images with the same data are paired first. The perceptual hashes of the remaining
+    images of the second version are indexed in a BK-tree, and each remaining image of the
+    first version is paired with the closest one whose perceptual and difference hashes
+    are both within `max_distance`, the closest pairs first.
+    """
+    unmatched_b = defaultdict(list)
+    for index, image in enumerate(images_b):
+        unmatched_b[image["digest"]].append(index)
+    remaining_a = []
+    for index, image in enumerate(images_a):
+        if unmatched_b.get(image["digest"]):
+            unmatched_b[image["digest"]].pop(0)
+        else:
+            remaining_a.append(index)
+    remaining_b = sorted(index for indexes in unmatched_b.values() for index in indexes)
+
+    tree = BKTree()
+    for index in remaining_b:
+        tree.add(int(images_b[index]["phash"], 16), index)
+    candidates = []
+    for index_a in remaining_a:
+        image_a = images_a[index_a]
+        for phash_distance, index_b in tree.search(int(image_a["phash"], 16), max_distance):
+            dhash_distance = get_hamming_distance(
+                int(image_a["dhash"], 16), int(images_b[index_b]["dhash"], 16)
+            )
+            if dhash_distance <= max_distance:
+                candidates.append((phash_distance + dhash_distance, index_a, index_b))
+
+    changes = []
+    matched_a, matched_b = set(), set()
+    for distance, index_a, index_b in sorted(candidates):
+        if index_a in matched_a or index_b in matched_b:
+            continue
+        matched_a.add(index_a)
+        matched_b.add(index_b)
+        if distance > UNCHANGED_DISTANCE:
+            changes.append(
+                {
+                    "type": "modify",
+                    "a": _get_location(images_a[index_a]),
+                    "b": _get_location(images_b[index_b]),
+                    "distance": distance,
+                }
+            )
+    changes.extend(
+        {"type": "delete", "a": _get_location(images_a[index]), "b": None, "distance": None}
+        for index in remaining_a
+        if index not in matched_a
+    )
+    changes.extend(
+        {"type": "insert", "a": None, "b": _get_location(images_b[index]), "distance": None}
+        for index in remaining_b
+        if index not in matched_b
+    )
+    return sorted(changes, key=_get_change_position)
+
+
+def _get_location(image: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: image[key] for key in ("page_number", "image_index", "name", "width", "height")
+    }
+
+
+def _get_change_position(change: Dict[str, Any]) -> Tuple[int, int]:
+    location = change["b"] or change["a"]
+    return location["page_number"], location["image_index"]
+
+
+async def get_image_hashes(file: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Reads the hashes of the images of a file, computed once per content and version.
+
+    Only the images of stored PDFs are hashed, other files have none.
+
+    Raises:
+        ImportError: If the images are not hashed yet and Pillow is not installed
+    """
+    if get_file_extension(file["file_name"]) != PDF_EXTENSION or not file.get("blob_path"):
+        return []
+
+    mongo_service = get_mongo_service()
+    content_key = file.get("content_hash") or file["_id"]
+    images = await mongo_service.get_image_hashes(content_key, IMAGE_HASH_VERSION)
+    if images is not None:
+        return images
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, os.path.basename(file["blob_path"]))
+        await get_blob_service().download_to_file(file["blob_path"], file_path)
+        images = await asyncio.get_running_loop().run_in_executor(
+            get_process_pool(), extract_pdf_images, file_path
+        )
+    await mongo_service.save_image_hashes(content_key, IMAGE_HASH_VERSION, images)
+    return images
@@ -0,0 +1,463 @@
+import asyncio
+import datetime
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import get_mongo_service
+
+logger = LoggerFactory().get_logger()
+
+# Seconds between two scans for jobs orphaned by a crashed instance
+ORPHAN_RECOVERY_INTERVAL = 30
+
+
+class JobState(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+ACTIVE_STATES = [JobState.QUEUED, JobState.RUNNING]
+
+
+@dataclass
+class Job:
+    id: str
+    tenant_id: str
+    payload: Dict[str, Any]
+    attempts: int
+    lease_id: Optional[str] = None
+    state: Optional[str] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "Job":
+        return cls(
+            id=document["_id"],
+            tenant_id=document["tenant_id"],
+            payload=document["payload"],
+            attempts=document.get("attempts", 0),
+            lease_id=document.get("lease_id"),
+            state=document.get("state"),
+            error=document.get("error"),
+        )
+
+
+def get_retry_delay(attempts: int, backoff_seconds: float, backoff_max_seconds: float) -> float:
+    """
+    Delay before retrying a job that failed its `attempts`-th attempt: doubled after every
+    attempt, starting at `backoff_seconds` and capped at `backoff_max_seconds`.
+    """
+    return min(backoff_seconds * 2 ** max(attempts - 1, 0), backoff_max_seconds)
+
+
+class JobQueue:
+    """
+    Durable job queue stored in a Mongo collection.
+
+    A job is claimed by atomically moving it to RUNNING with a lease, which its worker
+    renews while it works. A job whose lease expires, because its worker crashed or the
+    result never came back, is recovered by `recover_orphans`. Failed attempts are retried
+    with exponential backoff up to `max_attempts`. Claims honour a cap on running jobs and
+    an optional cap per tenant, counted over every backend instance sharing the collection.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        max_running: int,
+        max_running_per_tenant: Optional[int] = None,
+        max_attempts: int = 5,
+        retry_backoff_seconds: float = 2,
+        retry_backoff_max_seconds: float = 300,
+        lease_seconds: float = 600,
+    ):
+        self.collection_name = collection_name
+        self.max_running = max_running
+        self.max_running_per_tenant = max_running_per_tenant
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retry_backoff_max_seconds = retry_backoff_max_seconds
+        self.lease_seconds = lease_seconds
+
+    @property
+    def collection(self):
+        return get_mongo_service().db[self.collection_name]
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index(
+            [("state", 1), ("priority", -1), ("available_at", 1)]
+        )
+        await self.collection.create_index([("state", 1), ("lease_expires_at", 1)])
+        await self.collection.create_index([("state", 1), ("tenant_id", 1)])
+
+    async def enqueue(
+        self, job_id: str, tenant_id: str, payload: Dict[str, Any], priority: int = 0
+    ) -> bool:
+        """
+        Queue a job.
+
+        A job with the same ID that is already queued or running is left as is, so the
+        same work is never queued twice. A finished job is queued again.
+
+        Returns:
+            bool: Whether the job was queued
+        """
+        now = datetime.datetime.utcnow()
+        try:
+            await self.collection.update_one(
+                {"_id": job_id, "state": {"$nin": ACTIVE_STATES}},
+                {
+                    "$set": {
+                        "tenant_id": tenant_id,
+                        "payload": payload,
+                        "priority": priority,
+                        "state": JobState.QUEUED,
+                        "attempts": 0,
+                        "available_at": now,
+                        "lease_id": None,
+                        "lease_expires_at": None,
+                        "error": None,
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The filter missed because the job is active, and the upsert hit its ID
+            return False
+        return True
+
+    async def raise_priority(self, job_id: str, priority: int) -> None:
+        """
+        Raise the priority of a queued job, e.g. when the same work is queued again with a
+        higher priority.
+        """
+        await self.collection.update_one(
+            {"_id": job_id, "state": JobState.QUEUED}, {"$max": {"priority": priority}}
+        )
+
+    async def claim(self) -> Optional[Job]:
+        """
+        Claim the next job that is due, highest priority first, if the caps allow it.
+
+        Returns:
+            Optional[Job]: The claimed job, or None if no job can run now
+        """
+        if await self.collection.count_documents({"state": JobState.RUNNING}) >= self.max_running:
+            return None
+
+        now = datetime.datetime.utcnow()
+        query: Dict[str, Any] = {"state": JobState.QUEUED, "available_at": {"$lte": now}}
+        if self.max_running_per_tenant:
+            saturated_tenants = [
+                tenant_id
+                for tenant_id, running in (await self.get_running_per_tenant()).items()
+                if running >= self.max_running_per_tenant
+            ]
+            if saturated_tenants:
+                query["tenant_id"] = {"$nin": saturated_tenants}
+
+        document = await self.collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "state": JobState.RUNNING,
+                    "lease_id": str(uuid.uuid4()),
+                    "lease_expires_at": now + datetime.timedelta(seconds=self.lease_seconds),
+                    "started_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", -1), ("available_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is None:
+            return None
+
+        job = Job.from_document(document)
+        if not await self._within_caps(job):
+            # Another instance claimed at the same time and took the last slot
+            await self.release(job)
+            return None
+        return job
+
+    async def _within_caps(self, job: Job) -> bool:
+        if await self.collection.count_documents({"state": JobState.RUNNING}) > self.max_running:
+            return False
+        if self.max_running_per_tenant:
+            running = await self.collection.count_documents(
+                {"state": JobState.RUNNING, "tenant_id": job.tenant_id}
+            )
+            return running <= self.max_running_per_tenant
+        return True
+
+    async def renew(self, job_id: str, lease_id: Optional[str] = None) -> bool:
+        """
+        Extend the lease of a running job.
+
+        Returns:
+            bool: False if the job is no longer running under this lease
+        """
+        now = datetime.datetime.utcnow()
+        result = await self.collection.update_one(
+            self._lease_query(job_id, lease_id),
+            {
+                "$set": {
+                    "lease_expires_at": now + datetime.timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                }
+            },
+        )
+        return result.matched_count > 0
+
+    async def release(self, job: Job) -> None:
+        """
+        Put a running job back in the queue without counting the attempt.
+        """
+        await self.collection.update_one(
+            self._lease_query(job.id, job.lease_id),
+            {
+                "$set": {
+                    "state": JobState.QUEUED,
+                    "lease_id": None,
+                    "lease_expires_at": None,
+                    "updated_at": datetime.datetime.utcnow(),
+                },
+                "$inc": {"attempts": -1},
+            },
+        )
+
+    async def complete(self, job_id: str, lease_id: Optional[str] = None) -> bool:
+        """
+        Mark a running job as done.
+
+        Returns:
+            bool: False if the job is no longer running under this lease
+        """
+        now = datetime.datetime.utcnow()
+        result = await self.collection.update_one(
+            self._lease_query(job_id, lease_id),
+            {
+                "$set": {
+                    "state": JobState.DONE,
+                    "lease_id": None,
+                    "lease_expires_at": None,
+                    "finished_at": now,
+                    "updated_at": now,
+                }
+            },
+        )
+        return result.matched_count > 0
+
+    async def fail(
+        self, job_id: str, attempts: int, error: str, lease_id: Optional[str] = None
+    ) -> bool:
+        """
+        Record a failed attempt of a running job: the job is queued again after a backoff
+        delay, or marked as failed when it has no attempts left.
+
+        Returns:
+            bool: Whether the job will be retried
+        """
+        now = datetime.datetime.utcnow()
+        retry = attempts < self.max_attempts
+        fields: Dict[str, Any] = {
+            "state": JobState.QUEUED if retry else JobState.FAILED,
+            "lease_id": None,
+            "lease_expires_at": None,
+            "error": error,
+            "updated_at": now,
+        }
+        if retry:
+            delay = get_retry_delay(
+                attempts, self.retry_backoff_seconds, self.retry_backoff_max_seconds
+            )
+            fields["available_at"] = now + datetime.timedelta(seconds=delay)
+        else:
+            fields["finished_at"] = now
+
+        await self.collection.update_one(self._lease_query(job_id, lease_id), {"$set": fields})
+        return retry
+
+    async def recover_orphans(self) -> List[Tuple[Job, bool]]:
+        """
+        Fail the current attempt of running jobs whose lease expired, so they are retried.
+
+        Returns:
+            List[Tuple[Job, bool]]: The recovered jobs and whether each will be retried
+        """
+        cursor = self.collection.find(
+            {
+                "state": JobState.RUNNING,
+                "lease_expires_at": {"$lt": datetime.datetime.utcnow()},
+            }
+        )
+        recovered = []
+        for document in await cursor.to_list(length=None):
+            job = Job.from_document(document)
+            retry = await self.fail(job.id, job.attempts, "Job lease expired", job.lease_id)
+            recovered.append((job, retry))
+        return recovered
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        document = await self.collection.find_one({"_id": job_id})
+        return Job.from_document(document) if document else None
+
+    async def get_jobs(self, job_ids: List[str]) -> Dict[str, Job]:
+        cursor = self.collection.find({"_id": {"$in": job_ids}})
+        return {document["_id"]: Job.from_document(document) async for document in cursor}
+
+    async def get_running_per_tenant(self) -> Dict[str, int]:
+        cursor = self.collection.aggregate(
+            [
+                {"$match": {"state": JobState.RUNNING}},
+                {"$group": {"_id": "$tenant_id", "count": {"$sum": 1}}},
+            ]
+        )
+        return {group["_id"]: group["count"] async for group in cursor}
+
+    async def get_depth(self) -> Dict[str, Any]:
+        """
+        Count the queued and running jobs, overall and per tenant.
+        """
+        cursor = self.collection.aggregate(
+            [
+                {"$match": {"state": {"$in": ACTIVE_STATES}}},
+                {
+                    "$group": {
+                        "_id": {"state": "$state", "tenant_id": "$tenant_id"},
+                        "count": {"$sum": 1},
+                    }
+                },
+            ]
+        )
+        depth: Dict[str, Any] = {JobState.QUEUED: 0, JobState.RUNNING: 0, "tenants": {}}
+        async for group in cursor:
+            state, tenant_id = group["_id"]["state"], group["_id"]["tenant_id"]
+            tenant_depth = depth["tenants"].setdefault(
+                tenant_id, {JobState.QUEUED: 0, JobState.RUNNING: 0}
+            )
+            tenant_depth[state] += group["count"]
+            depth[state] += group["count"]
+        return depth
+
+    def _lease_query(self, job_id: str, lease_id: Optional[str]) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"_id": job_id, "state": JobState.RUNNING}
+        if lease_id:
+            query["lease_id"] = lease_id
+        return query
+
+
+class JobWorker(ABC):
+    """
+    Runs the jobs of a queue in this instance, at most `max_running` at a time.
+
+    A dispatcher claims due jobs while a slot is free and runs each in its own task. Jobs
+    left running by a crashed instance are recovered every `ORPHAN_RECOVERY_INTERVAL`
+    seconds. Stopping cancels the running jobs, which go back to the queue.
+    """
+    # Prefix of the logged events
+    log_tag = "Jobs"
+
+    def __init__(self, queue: JobQueue, max_running: int, poll_interval: float):
+        self.queue = queue
+        self.max_running = max(max_running, 1)
+        self.poll_interval = poll_interval
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.running: set[asyncio.Task] = set()
+
+    async def start(self):
+        """
+        Start dispatching queued jobs
+        """
+        if self.dispatcher is None:
+            self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        """
+        Stop dispatching, jobs interrupted in this instance go back to the queue
+        """
+        tasks = [task for task in (self.dispatcher, *self.running) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.dispatcher = None
+        self.running = set()
+
+    @abstractmethod
+    async def _run_job(self, job: Job):
+        """
+        Run a claimed job and report its outcome to the queue
+        """
+        ...
+
+    @abstractmethod
+    async def _recover_orphans(self):
+        ...
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_running)
+        indexes_created = False
+        next_recovery = 0.0
+
+        while True:
+            await slots.acquire()
+            job = None
+            try:
+                if not indexes_created:
+                    await self.queue.ensure_indexes()
+                    indexes_created = True
+                if loop.time() >= next_recovery:
+                    await self._recover_orphans()
+                    next_recovery = loop.time() + ORPHAN_RECOVERY_INTERVAL
+                job = await self.queue.claim()
+            except Exception as e:
+                logger.error(event=f"[{self.log_tag}] Error while dispatching jobs", error=str(e))
+
+            if job is None:
+                slots.release()
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            task = asyncio.create_task(self._run_job(job))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _renew_lease(self, job: Job, attempt: asyncio.Task):
+        """
+        Renew the lease of a running job until cancelled. Errors are retried on the next
+        beat, the attempt is cancelled if the lease was lost so it stops running alongside
+        the attempt of the worker that claimed the job since.
+        """
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                renewed = await self.queue.renew(job.id, job.lease_id)
+            except Exception as e:
+                logger.warning(
+                    event=f"[{self.log_tag}] Error while renewing job lease",
+                    job_id=job.id,
+                    error=str(e),
+                )
+                continue
+            if not renewed:
+                logger.error(
+                    event=f"[{self.log_tag}] Job lease lost, cancelling the attempt",
+                    job_id=job.id,
+                    attempt=job.attempts,
+                )
+                attempt.cancel()
+                return
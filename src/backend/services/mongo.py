@@ -1,7 +1,95 @@
-from typing import Any, Dict, Optional, List
+import asyncio
+import base64
+import datetime
+import json
+from typing import Any, Dict, Optional, List, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from backend.config.settings import Settings
+from backend.services.bulk_writer import CoalescingWriter
+from backend.services.event_bus import (
+    get_content_channel,
+    get_conversation_channel,
+    get_file_channel,
+    get_file_event_bus,
+)
+
+DEFAULT_PAGE_SIZE = 100
+# Counter document holding the bytes of the stored compare results
+COMPARE_RESULTS_SIZE_COUNTER = "compare_results_size"
+
+# Fields returned by file listings, leaving out anything only needed by a single file view
+LIST_FILE_PROJECTION = {
+    "user_id": 1,
+    "conversation_id": 1,
+    "file_name": 1,
+    "file_size": 1,
+    "status": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "word_count": 1,
+    "token_count": 1,
+    "page_count": 1,
+    "language": 1,
+    "preview": 1,
+}
+
+# Fields needed to follow the extraction of a file
+FILE_PROGRESS_PROJECTION = {
+    "file_name": 1,
+    "content_hash": 1,
+    "status": 1,
+    "page_count": 1,
+    "pages_extracted": 1,
+    "error": 1,
+    "updated_at": 1,
+}
+
+FILE_INDEXES = [
+    # Listings are sorted by (created_at, _id), which is also the pagination key
+    IndexModel([("conversation_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("created_at", DESCENDING)]),
+    # Extraction state is propagated to every file sharing a content
+    IndexModel([("content_hash", ASCENDING)]),
+]
+
+
+def get_status_update(
+    fields: Dict[str, Any], increments: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """
+    Build the update of status and progress fields. A status change is appended to the
+    `status_history` with its timestamp, to measure the time spent in each stage.
+    """
+    now = datetime.datetime.utcnow()
+    update: Dict[str, Any] = {"$set": {**fields, "updated_at": now}}
+    if increments:
+        update["$inc"] = increments
+    if fields.get("status"):
+        update["$push"] = {"status_history": {"status": fields["status"], "at": now}}
+    return update
+
+
+def encode_cursor(created_at: datetime.datetime, file_id: str) -> str:
+    """
+    Encode the position of a file in a listing as an opaque pagination cursor.
+    """
+    position = json.dumps([created_at.isoformat(), file_id])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    """
+    Decode a pagination cursor, raises ValueError if it is not valid.
+    """
+    try:
+        created_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(created_at), file_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 class MongoService:
     _instance = None
@@ -18,6 +106,31 @@ class MongoService:
         self.client = AsyncIOMotorClient(mongo_url)
         self.db = self.client.docu_compare
         self.files_collection = self.db.files
+        # Content index: one entry per distinct file content, keyed by its SHA-256
+        self.contents_collection = self.db.contents
+        # Extracted text, one document per page, keyed by content hash (or file ID for legacy files)
+        self.pages_collection = self.db.pages
+        # Direct uploads started but not completed yet, expired by a TTL index
+        self.uploads_collection = self.db.uploads
+        # Parquet artifacts of tabular contents and their statistics, keyed by content hash
+        self.tables_collection = self.db.tables
+        # Page fingerprints of each content and fingerprint version, one document per page
+        self.fingerprints_collection = self.db.fingerprints
+        # Perceptual hashes of the images of each content, one document per content and version
+        self.image_hashes_collection = self.db.image_hashes
+        # Page rasters of each content cached in blob storage, by version and resolution
+        self.rasters_collection = self.db.rasters
+        # Compare jobs submitted by users, and the stored results by compare key
+        self.compare_history_collection = self.db.compare_history
+        self.compare_results_collection = self.db.compare_results
+        # Running totals, one document per total, kept up to date with $inc
+        self.counters_collection = self.db.counters
+
+        # Status and progress updates are coalesced into bulk writes
+        flush_interval = (settings.get("mongo.status_flush_interval_ms") or 0) / 1000
+        batch_size = settings.get("mongo.status_batch_size") or 500
+        self.files_writer = CoalescingWriter(self.files_collection, flush_interval, batch_size)
+        self.contents_writer = CoalescingWriter(self.contents_collection, flush_interval, batch_size)
 
     @classmethod
     def get_instance(cls):
@@ -32,6 +145,50 @@ class MongoService:
         result = await self.files_collection.insert_one(file_data)
         return str(result.inserted_id)
 
+    async def create_files_metadata(self, files_data: List[Dict[str, Any]]) -> List[str]:
+        """
+        Create the metadata entries of a batch of files in one round trip.
+
+        Entries are inserted independently: when some fail, the others are still inserted
+        and the raised BulkWriteError lists the failed ones.
+        """
+        if not files_data:
+            return []
+        try:
+            result = await self.files_collection.insert_many(files_data, ordered=False)
+        finally:
+            # Announce every file, subscribers check which ones were actually inserted
+            await get_file_event_bus().publish(
+                [
+                    (
+                        get_conversation_channel(file_data["conversation_id"]),
+                        {"file_id": file_data["_id"]},
+                    )
+                    for file_data in files_data
+                    if file_data.get("conversation_id")
+                ]
+            )
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    async def create_upload_sessions(self, sessions: List[Dict[str, Any]]) -> None:
+        """
+        Save the direct uploads of a batch, each with its `expires_at`.
+        """
+        if sessions:
+            await self.uploads_collection.insert_many(sessions)
+
+    async def get_upload_session(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a pending direct upload by the ID of its file.
+        """
+        return await self.uploads_collection.find_one({"_id": file_id})
+
+    async def delete_upload_session(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove a pending direct upload, returns it if it was still pending.
+        """
+        return await self.uploads_collection.find_one_and_delete({"_id": file_id})
+
     async def get_file_metadata(self, file_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve file metadata by ID.
@@ -41,36 +198,441 @@ class MongoService:
         # If using Mongo ObjectId: from bson import ObjectId; ObjectId(file_id)
         return await self.files_collection.find_one({"_id": file_id})
 
-    async def update_file_status(self, file_id: str, status: str) -> bool:
+    async def update_file_status(self, file_id: str, status: str) -> None:
         """
-        Update the status of a file.
+        Update the status of a file and record the transition in its status history.
+        """
+        await self.files_writer.update({"_id": file_id}, get_status_update({"status": status}))
+        await get_file_event_bus().publish([(get_file_channel(file_id), {"file_id": file_id})])
+
+    async def ensure_indexes(self) -> None:
         """
-        result = await self.files_collection.update_one(
-            {"_id": file_id},
-            {"$set": {"status": status}}
+        Create the indexes used by the file queries, a no-op for indexes that already exist.
+        """
+        await self.files_collection.create_indexes(FILE_INDEXES)
+        await self.pages_collection.create_index(
+            [("content_key", ASCENDING), ("page_number", ASCENDING)]
+        )
+        await self.uploads_collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.fingerprints_collection.create_index(
+            [("content_key", ASCENDING), ("version", ASCENDING), ("page_number", ASCENDING)]
+        )
+        await self.rasters_collection.create_index("content_key")
+        # Cached results are evicted least recently used first, older engine versions first
+        await self.compare_results_collection.create_index(
+            [("engine_version", ASCENDING), ("accessed_at", ASCENDING)]
+        )
+        await self.compare_results_collection.create_index("accessed_at")
+        # Job history is listed newest first, by (created_at, _id), the pagination key
+        await self.compare_history_collection.create_index(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
         )
-        return result.modified_count > 0
 
-    async def list_files(self, user_id: str) -> List[Dict[str, Any]]:
+    async def list_files(
+        self,
+        user_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = LIST_FILE_PROJECTION,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List the files of a user, oldest first, one page at a time.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The files and the cursor of the next page
+        """
+        return await self._find_page({"user_id": user_id}, limit, cursor, projection)
+
+    async def get_files_by_conversation_id(
+        self,
+        conversation_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = LIST_FILE_PROJECTION,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
-        List all files for a user.
+        List the files of a conversation, oldest first, one page at a time.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The files and the cursor of the next page
         """
-        cursor = self.files_collection.find({"user_id": user_id})
-        return await cursor.to_list(length=100)
+        return await self._find_page(
+            {"conversation_id": conversation_id}, limit, cursor, projection
+        )
 
-    async def get_files_by_conversation_id(self, conversation_id: str) -> List[Dict[str, Any]]:
+    async def get_conversation_files(
+        self,
+        conversation_id: str,
+        file_ids: Optional[List[str]] = None,
+        content_hashes: Optional[List[str]] = None,
+        projection: Optional[Dict[str, int]] = LIST_FILE_PROJECTION,
+    ) -> List[Dict[str, Any]]:
         """
-        List all files for a conversation.
+        List the files of a conversation with the given IDs or content hashes.
         """
-        cursor = self.files_collection.find({"conversation_id": conversation_id})
-        return await cursor.to_list(length=100)
-        
+        conditions = []
+        if file_ids:
+            conditions.append({"_id": {"$in": file_ids}})
+        if content_hashes:
+            conditions.append({"content_hash": {"$in": content_hashes}})
+        if not conditions:
+            return []
+        cursor = self.files_collection.find(
+            {"conversation_id": conversation_id, "$or": conditions}, projection
+        )
+        return await cursor.to_list(length=None)
+
+    async def _find_page(
+        self,
+        query: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str],
+        projection: Optional[Dict[str, int]],
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset pagination on (created_at, _id): each page starts right after the last
+        # file of the previous one, so deep pages cost the same as the first
+        if cursor:
+            created_at, file_id = decode_cursor(cursor)
+            query = {
+                **query,
+                "$or": [
+                    {"created_at": {"$gt": created_at}},
+                    {"created_at": created_at, "_id": {"$gt": file_id}},
+                ],
+            }
+        files = await (
+            self.files_collection.find(query, projection)
+            .sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        if len(files) <= limit:
+            return files, None
+        files = files[:limit]
+        return files, encode_cursor(files[-1]["created_at"], files[-1]["_id"])
+
     async def delete_file(self, file_id: str) -> bool:
         """
         Delete a file by ID.
         """
-        result = await self.files_collection.delete_one({"_id": file_id})
-        return result.deleted_count > 0
+        file_data = await self.files_collection.find_one_and_delete({"_id": file_id})
+        return file_data is not None
+
+    async def claim_content(
+        self, content_hash: str, blob_path: str, file_size: int, status: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Register a file content in the content index.
+
+        The first claim of a content creates its entry with the given blob path and status,
+        later claims get the existing entry back.
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: The content entry and whether this claim created it
+        """
+        now = datetime.datetime.utcnow()
+        update = {
+            "$setOnInsert": {
+                "blob_path": blob_path,
+                "file_size": file_size,
+                "status": status,
+                "created_at": now,
+            },
+        }
+        try:
+            previous = await self.contents_collection.find_one_and_update(
+                {"_id": content_hash}, update, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Two uploads of the same content raced on the upsert, the entry exists now
+            previous = await self.contents_collection.find_one_and_update(
+                {"_id": content_hash}, update, return_document=ReturnDocument.BEFORE
+            )
+
+        if previous is None:
+            return await self.contents_collection.find_one({"_id": content_hash}), True
+        return previous, False
+
+    async def get_content(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a content index entry by its hash.
+        """
+        return await self.contents_collection.find_one({"_id": content_hash})
+
+    async def update_content_status(self, content_hash: str, status: str) -> None:
+        """
+        Update the extraction status of a content and of every file pointing at it.
+        """
+        await self.update_extraction_state(None, content_hash, {"status": status})
+
+    async def update_extraction_state(
+        self,
+        file_id: Optional[str],
+        content_hash: Optional[str],
+        fields: Dict[str, Any],
+        increments: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Update extraction fields (status, progress counters) of a content and every file
+        pointing at it, or of a single file when it has no content hash.
+
+        Status changes are recorded in the status history. Updates are coalesced with
+        concurrent ones and return once written.
+        """
+        update = get_status_update(fields, increments)
+        if content_hash:
+            await asyncio.gather(
+                self.contents_writer.update({"_id": content_hash}, update),
+                self.files_writer.update({"content_hash": content_hash}, update, many=True),
+            )
+            event = (get_content_channel(content_hash), {"content_hash": content_hash})
+        else:
+            await self.files_writer.update({"_id": file_id}, update)
+            event = (get_file_channel(file_id), {"file_id": file_id})
+        await get_file_event_bus().publish([event])
+
+    async def save_pages(self, content_key: str, pages: List[Dict[str, Any]]) -> int:
+        """
+        Store extracted pages, replacing pages previously extracted for the same content.
+
+        Each page must have a `page_number` and a `text`.
+
+        Returns:
+            int: The number of pages that were not stored before
+        """
+        if not pages:
+            return 0
+        result = await self.pages_collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": f"{content_key}:{page['page_number']}"},
+                    {"content_key": content_key, **page},
+                    upsert=True,
+                )
+                for page in pages
+            ],
+            ordered=False,
+        )
+        return result.upserted_count
+
+    async def save_table_manifest(self, content_key: str, manifest: Dict[str, Any]) -> None:
+        """
+        Save the sheets of a tabular content, their Parquet artifacts and statistics.
+        """
+        await self.tables_collection.replace_one(
+            {"_id": content_key}, {"_id": content_key, **manifest}, upsert=True
+        )
+
+    async def get_table_manifest(self, content_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the sheets of a tabular content.
+        """
+        return await self.tables_collection.find_one({"_id": content_key})
+
+    async def get_pages(
+        self, content_key: str, start_page: int = 1, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        List the extracted pages of a content, in page order, from `start_page`.
+        """
+        cursor = self.pages_collection.find(
+            {"content_key": content_key, "page_number": {"$gte": start_page}}
+        ).sort("page_number", 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def save_page_fingerprints(
+        self, content_key: str, version: int, fingerprints: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Store page fingerprints of a content, replacing those of the same pages and version.
+        """
+        if not fingerprints:
+            return
+        await self.fingerprints_collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": f"{content_key}:{version}:{fingerprint['page_number']}"},
+                    {"content_key": content_key, "version": version, **fingerprint},
+                    upsert=True,
+                )
+                for fingerprint in fingerprints
+            ],
+            ordered=False,
+        )
+
+    async def get_page_fingerprints(self, content_key: str, version: int) -> List[Dict[str, Any]]:
+        """
+        List the page fingerprints of a content for a fingerprint version, in page order.
+        """
+        cursor = self.fingerprints_collection.find(
+            {"content_key": content_key, "version": version},
+            {"_id": 0, "content_key": 0, "version": 0},
+        ).sort("page_number", 1)
+        return await cursor.to_list(length=None)
+
+    async def save_image_hashes(
+        self, content_key: str, version: int, images: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Store the hashes of the images of a content for an image hash version.
+        """
+        await self.image_hashes_collection.replace_one(
+            {"_id": f"{content_key}:{version}"},
+            {"content_key": content_key, "version": version, "images": images},
+            upsert=True,
+        )
+
+    async def get_image_hashes(self, content_key: str, version: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        List the hashes of the images of a content, None if they were not computed yet.
+        """
+        document = await self.image_hashes_collection.find_one({"_id": f"{content_key}:{version}"})
+        return document["images"] if document else None
+
+    async def save_raster_page_count(
+        self, content_key: str, version: int, dpi: int, page_count: int
+    ) -> None:
+        """
+        Record that the page rasters of a content are cached, at a version and resolution.
+        """
+        await self.rasters_collection.replace_one(
+            {"_id": f"{content_key}:{version}:{dpi}"},
+            {"content_key": content_key, "version": version, "dpi": dpi, "page_count": page_count},
+            upsert=True,
+        )
+
+    async def get_raster_page_count(self, content_key: str, version: int, dpi: int) -> Optional[int]:
+        """
+        Number of pages of the cached rasters of a content, None if they are not cached.
+        """
+        document = await self.rasters_collection.find_one({"_id": f"{content_key}:{version}:{dpi}"})
+        return document["page_count"] if document else None
+
+    async def delete_rasters(self, content_key: str) -> List[Dict[str, Any]]:
+        """
+        Delete the records of the cached page rasters of a content, of every version and
+        resolution, returns the deleted records.
+        """
+        rasters = await self.rasters_collection.find({"content_key": content_key}).to_list(
+            length=None
+        )
+        await self.rasters_collection.delete_many(
+            {"_id": {"$in": [raster["_id"] for raster in rasters]}}
+        )
+        return rasters
+
+    async def save_compare_job(self, job: Dict[str, Any]) -> None:
+        """
+        Record a compare job submitted by a user in their job history.
+        """
+        await self.compare_history_collection.insert_one(job)
+
+    async def get_compare_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a compare job from the job history by ID.
+        """
+        return await self.compare_history_collection.find_one({"_id": job_id})
+
+    async def list_compare_jobs(
+        self, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List the compare jobs of a user, newest first, one page at a time.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The jobs and the cursor of the next page
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        # Keyset pagination on (created_at, _id), as for files but descending
+        if cursor:
+            created_at, job_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": job_id}},
+            ]
+        jobs = await (
+            self.compare_history_collection.find(query)
+            .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        if len(jobs) <= limit:
+            return jobs, None
+        jobs = jobs[:limit]
+        return jobs, encode_cursor(jobs[-1]["created_at"], jobs[-1]["_id"])
+
+    async def save_compare_result(self, key: str, fields: Dict[str, Any]) -> None:
+        """
+        Record where the result of a compare is stored, by compare key, and add its size to
+        the total size of the stored results.
+        """
+        previous = await self.compare_results_collection.find_one_and_replace(
+            {"_id": key}, fields, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+        size = fields.get("size", 0) - (previous or {}).get("size", 0)
+        if size:
+            await self.counters_collection.update_one(
+                {"_id": COMPARE_RESULTS_SIZE_COUNTER}, {"$inc": {"value": size}}, upsert=True
+            )
+
+    async def get_compare_results(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Read where the results of compares are stored, by compare key, for the stored ones.
+        """
+        cursor = self.compare_results_collection.find({"_id": {"$in": keys}})
+        return {document["_id"]: document async for document in cursor}
+
+    async def touch_compare_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read where the result of a compare is stored, and record that it was accessed.
+        """
+        return await self.compare_results_collection.find_one_and_update(
+            {"_id": key}, {"$set": {"accessed_at": datetime.datetime.utcnow()}}
+        )
+
+    async def get_compare_results_size(self) -> int:
+        """
+        Total size of the stored compare results, from its running counter.
+        """
+        counter = await self.counters_collection.find_one({"_id": COMPARE_RESULTS_SIZE_COUNTER})
+        return counter["value"] if counter else 0
+
+    async def get_least_recent_compare_results(
+        self, query: Dict[str, Any], limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Stored compare results matching a query, least recently accessed first.
+        """
+        cursor = self.compare_results_collection.find(query).sort("accessed_at", ASCENDING)
+        return await cursor.limit(limit).to_list(length=limit)
+
+    async def delete_compare_results(self, keys: List[str]) -> int:
+        """
+        Delete stored compare results by compare key, returns the bytes they held.
+
+        Only the results this call deleted are subtracted from the total size, so instances
+        evicting the same results at once count them once.
+        """
+        deleted = await asyncio.gather(
+            *(self.compare_results_collection.find_one_and_delete({"_id": key}) for key in keys)
+        )
+        size = sum(document.get("size", 0) for document in deleted if document)
+        if size:
+            await self.counters_collection.update_one(
+                {"_id": COMPARE_RESULTS_SIZE_COUNTER}, {"$inc": {"value": -size}}, upsert=True
+            )
+        return size
+
+    async def delete_fingerprints(self, content_key: str) -> None:
+        """
+        Delete the fingerprints and image hashes of a content, of every version, before it
+        is extracted again.
+        """
+        await self.fingerprints_collection.delete_many({"content_key": content_key})
+        await self.image_hashes_collection.delete_many({"content_key": content_key})
+
 
 def get_mongo_service():
     return MongoService.get_instance()
@@ -0,0 +1,36 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from backend.config.settings import Settings
+
+process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Initialize a singular ProcessPoolExecutor shared by CPU-bound services if not initialized yet
+
+    Workers are spawned rather than forked, forking a process running an event loop
+    and background threads can leave locks held in the children.
+
+    Returns:
+        ProcessPoolExecutor: The shared process pool
+    """
+    global process_pool
+    if process_pool is None:
+        process_pool = ProcessPoolExecutor(
+            max_workers=Settings().get("process_pool.max_workers"),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return process_pool
+
+
+def shutdown_process_pool() -> None:
+    """
+    Shut down the shared process pool, cancelling pending tasks
+    """
+    global process_pool
+    if process_pool is not None:
+        process_pool.shutdown(wait=False, cancel_futures=True)
+        process_pool = None
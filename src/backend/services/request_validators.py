@@ -1,3 +1,4 @@
+import hmac
 from typing import Annotated
 from urllib.parse import unquote_plus
 
@@ -5,6 +6,7 @@ from fastapi import Header, HTTPException, Request
 
 import backend.crud.user as user_crud
 from backend.config.deployments import AVAILABLE_MODEL_DEPLOYMENTS
+from backend.config.settings import Settings
 from backend.config.tools import get_available_tools
 from backend.crud import agent as agent_crud
 from backend.crud import conversation as conversation_crud
@@ -138,6 +140,31 @@ def validate_organization_header(
             raise HTTPException(status_code=404, detail=f"Organization ID {Organization_Id} not found.")
 
 
+def validate_extraction_callback_token(
+    Extraction_Token: Annotated[str|None, Header( # Not following snake_case so FastAPI parses dependencies properly
+        title="Extraction Token",
+        description="Shared secret of the extraction service",
+    )] = None,
+) -> None:
+    """
+    Validate that an extraction callback comes from the extraction service. Callbacks are
+    rejected when `extraction.callback_token` is not configured.
+
+    Raises:
+        HTTPException: If no token is configured, or the `Extraction-Token` header does not
+            match.
+    """
+    callback_token = Settings().get("extraction.callback_token")
+    if not callback_token:
+        logger.error(event="Extraction callback received but no callback token is configured.")
+        raise HTTPException(
+            status_code=503, detail="Extraction callbacks are not configured."
+        )
+    if not hmac.compare_digest((Extraction_Token or "").encode(), callback_token.encode()):
+        logger.error(event="Invalid extraction callback token.")
+        raise HTTPException(status_code=401, detail="Invalid extraction callback token.")
+
+
 def validate_deployment_header(
     session: DBSessionDep,
     deployment_name: Annotated[str|None, Header(
@@ -0,0 +1,288 @@
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher, get_close_matches
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.schemas.compare import CompareOptions
+from backend.services.fingerprint import normalize_text
+
+# Consecutive rows of numbers from which lines of text are read as a table
+MIN_TABLE_ROWS = 3
+# Similarity from which two row labels or column headers are matched
+LABEL_MATCH_CUTOFF = 0.8
+# Unmatched rows of a table pair above which rows are only matched by exact label
+MAX_FUZZY_ROWS = 50
+# Share of the row labels two tables must have in common to be paired
+MIN_TABLE_OVERLAP = 0.5
+
+NUMBER = re.compile(r"^\(?[-+−]?[$€£¥]?\d[\d,]*(?:\.\d+)?%?\)?$")
+# Column headers of financial statements, read as the header rather than a row of values
+YEAR = re.compile(r"^(?:19|20)\d\d$")
+COLUMN_SEPARATOR = re.compile(r"\t| {2,}")
+
+
+@dataclass
+class ExtractedTable:
+    """
+    A table found in the text of a page: a label and numeric values per row, and a
+    header per value column
+    """
+    page_number: int
+    index: int
+    columns: List[str]
+    labels: List[str]
+    values: np.ndarray
+
+
+def parse_number(text: str) -> Optional[float]:
+    """
+    Parses a number as printed in a financial statement: thousands separators, currency
+    signs, percentages, and negatives in parentheses. None if the text is not a number.
+    """
+    text = text.strip()
+    if not NUMBER.match(text):
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    value = text.strip("()").replace("−", "-").replace(",", "").rstrip("%")
+    sign = ""
+    if value[:1] in ("+", "-"):
+        sign, value = value[0], value[1:]
+    number = float(sign + value.lstrip("$€£¥"))
+    return -number if negative else number
+
+
+def _split_row(line: str) -> Tuple[str, List[float]]:
+    """
+    Splits a line into its label and its trailing numbers, empty if it has none
+    """
+    cells = line.split("\t") if "\t" in line else line.split()
+    values: List[float] = []
+    while cells:
+        number = parse_number(cells[-1])
+        if number is None:
+            break
+        values.append(number)
+        cells.pop()
+    return " ".join(cells).strip(), values[::-1]
+
+
+def _split_header(line: str, width: int) -> Optional[List[str]]:
+    """
+    Headers of the last `width` columns from the line above a table, None if it does not
+    have as many
+    """
+    cells = [cell.strip() for cell in COLUMN_SEPARATOR.split(line.strip()) if cell.strip()]
+    if len(cells) < width:
+        cells = line.split()
+    if len(cells) < width:
+        return None
+    return [normalize_text(cell) for cell in cells[len(cells) - width:]]
+
+
+def detect_tables(page_number: int, text: str) -> List[ExtractedTable]:
+    """
+    Finds the tables of the text of a page: runs of at least `MIN_TABLE_ROWS` lines ending
+    with numbers. Values are right-aligned to the widest row of the table, and the line
+    above the run, or a first row of years, gives the column headers.
+    """
+    tables: List[ExtractedTable] = []
+    lines = text.splitlines()
+    rows: List[Tuple[str, List[float]]] = []
+    run_start = 0
+
+    def add_table(header_line: Optional[str]) -> None:
+        table_rows = list(rows)
+        width = max(len(values) for _, values in table_rows)
+        columns = None
+        _, first_values = table_rows[0]
+        if all(value.is_integer() and YEAR.match(str(int(value))) for value in first_values):
+            columns = [str(int(value)) for value in first_values]
+            columns = [""] * (width - len(columns)) + columns
+            table_rows = table_rows[1:]
+        elif header_line is not None:
+            columns = _split_header(header_line, width)
+        if not table_rows:
+            return
+        values = np.full((len(table_rows), width), np.nan)
+        for row_index, (_, row_values) in enumerate(table_rows):
+            values[row_index, width - len(row_values):] = row_values
+        tables.append(
+            ExtractedTable(
+                page_number,
+                len(tables),
+                columns or [f"Column {index + 1}" for index in range(width)],
+                [normalize_text(label) for label, _ in table_rows],
+                values,
+            )
+        )
+
+    for line_index, line in enumerate(lines + [""]):
+        label, values = _split_row(line) if line.strip() else ("", [])
+        if values and (label or len(values) > 1):
+            if not rows:
+                run_start = line_index
+            rows.append((label, values))
+            continue
+        if len(rows) >= MIN_TABLE_ROWS:
+            add_table(lines[run_start - 1] if run_start > 0 else None)
+        rows = []
+
+    return tables
+
+
+def _match_labels(labels_a: List[str], labels_b: List[str]) -> List[Tuple[int, int]]:
+    """
+    Pairs equal labels in order of occurrence, then the remaining labels with their
+    closest match
+    """
+    positions_b = defaultdict(list)
+    for index, label in enumerate(labels_b):
+        positions_b[label.lower()].append(index)
+
+    pairs = []
+    unmatched_a = []
+    for index, label in enumerate(labels_a):
+        candidates = positions_b.get(label.lower())
+        if candidates:
+            pairs.append((index, candidates.pop(0)))
+        else:
+            unmatched_a.append(index)
+
+    unmatched_b = {
+        labels_b[index].lower(): index for indexes in positions_b.values() for index in indexes
+    }
+    if unmatched_a and unmatched_b and max(len(unmatched_a), len(unmatched_b)) <= MAX_FUZZY_ROWS:
+        for index in unmatched_a:
+            matches = get_close_matches(
+                labels_a[index].lower(), list(unmatched_b), n=1, cutoff=LABEL_MATCH_CUTOFF
+            )
+            if matches:
+                pairs.append((index, unmatched_b.pop(matches[0])))
+    return sorted(pairs)
+
+
+def diff_tables(
+    table_a: ExtractedTable, table_b: ExtractedTable, options: CompareOptions
+) -> List[Dict[str, Any]]:
+    """
+    Changed cells of two versions of a table, rows aligned by label and columns by header.
+
+    Values of every aligned cell are compared at once: a cell changed when its absolute
+    change exceeds `numeric_tolerance` and its change relative to the original value
+    reaches `numeric_change_threshold`, or when it is only filled in one version.
+    """
+    columns = _match_labels(table_a.columns, table_b.columns)
+    rows = _match_labels(table_a.labels, table_b.labels)
+    if not columns or not rows:
+        return []
+
+    row_index_a, row_index_b = (np.array(indexes) for indexes in zip(*rows))
+    column_index_a, column_index_b = (np.array(indexes) for indexes in zip(*columns))
+    values_a = table_a.values[np.ix_(row_index_a, column_index_a)]
+    values_b = table_b.values[np.ix_(row_index_b, column_index_b)]
+
+    delta = values_b - values_a
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(values_a != 0, np.abs(delta) / np.abs(values_a), np.inf)
+    missing_a, missing_b = np.isnan(values_a), np.isnan(values_b)
+    changed = (
+        (np.abs(delta) > options.numeric_tolerance)
+        & (relative >= options.numeric_change_threshold)
+        & (delta != 0)
+    ) | (missing_a != missing_b)
+
+    cells = []
+    for row, column in zip(*np.nonzero(changed)):
+        a_value = None if missing_a[row, column] else float(values_a[row, column])
+        b_value = None if missing_b[row, column] else float(values_b[row, column])
+        both = a_value is not None and b_value is not None
+        cells.append(
+            {
+                "row": table_b.labels[row_index_b[row]],
+                "column": table_b.columns[column_index_b[column]],
+                "a_value": a_value,
+                "b_value": b_value,
+                "delta": float(delta[row, column]) if both else None,
+                "relative_change": (
+                    float(delta[row, column] / abs(values_a[row, column]))
+                    if both and a_value != 0
+                    else None
+                ),
+            }
+        )
+    return cells
+
+
+def _pair_tables(
+    tables_a: List[ExtractedTable], tables_b: List[ExtractedTable]
+) -> List[Tuple[ExtractedTable, ExtractedTable]]:
+    """
+    Pairs each table with the table of the other version sharing the most row labels,
+    only looking at tables sharing at least one
+    """
+    tables_by_label = defaultdict(set)
+    for index, table in enumerate(tables_b):
+        for label in table.labels:
+            tables_by_label[label.lower()].add(index)
+
+    pairs = []
+    paired_b = set()
+    for table_a in tables_a:
+        labels_a = Counter(label.lower() for label in table_a.labels)
+        candidates = Counter(
+            index
+            for label in labels_a
+            for index in tables_by_label.get(label, ())
+            if index not in paired_b
+        )
+        scores = []
+        for index, common in candidates.items():
+            table_b = tables_b[index]
+            overlap = common / max(len(labels_a), len({label.lower() for label in table_b.labels}))
+            if overlap >= MIN_TABLE_OVERLAP:
+                scores.append((overlap, _header_similarity(table_a, table_b), -index))
+        best = -max(scores)[2] if scores else None
+        if best is not None:
+            paired_b.add(best)
+            pairs.append((table_a, tables_b[best]))
+    return pairs
+
+
+def _header_similarity(table_a: ExtractedTable, table_b: ExtractedTable) -> float:
+    return SequenceMatcher(None, table_a.columns, table_b.columns, autojunk=False).ratio()
+
+
+def diff_page_tables(
+    pages_a: List[Tuple[int, str]], pages_b: List[Tuple[int, str]], options: CompareOptions
+) -> List[Dict[str, Any]]:
+    """
+    Numeric changes of the tables of two ranges of pages, the changed pages of a comparison.
+
+    Args:
+        pages_a (List[Tuple[int, str]]): Page number and text of each page of the first version
+        pages_b (List[Tuple[int, str]]): Page number and text of each page of the second version
+        options (CompareOptions): Thresholds of the comparison
+
+    Returns:
+        List[Dict[str, Any]]: Per pair of tables with changed cells, their locations and cells
+    """
+    tables_a = [table for page in pages_a for table in detect_tables(*page)]
+    tables_b = [table for page in pages_b for table in detect_tables(*page)]
+    if not tables_a or not tables_b:
+        return []
+
+    table_changes = []
+    for table_a, table_b in _pair_tables(tables_a, tables_b):
+        cells = diff_tables(table_a, table_b, options)
+        if cells:
+            table_changes.append(
+                {
+                    "a": {"page_number": table_a.page_number, "table_index": table_a.index},
+                    "b": {"page_number": table_b.page_number, "table_index": table_b.index},
+                    "cells": cells,
+                }
+            )
+    return table_changes
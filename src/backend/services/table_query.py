@@ -0,0 +1,268 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from backend.services import tabular
+
+# Rows returned by a query at most, results are meant to be read by a model
+MAX_RESULT_ROWS = 50
+DEFAULT_RESULT_ROWS = 20
+
+FILTER_OPERATORS = {"==", "!=", "<", "<=", ">", ">=", "in", "contains"}
+AGGREGATE_FUNCTIONS = {"sum", "mean", "min", "max", "count", "count_distinct"}
+# Aggregating this column counts rows
+ALL_ROWS = "*"
+
+
+@dataclass
+class TableFilter:
+    column: str
+    operator: str
+    value: Any
+
+
+@dataclass
+class TableAggregate:
+    column: str
+    function: str
+
+    @property
+    def output_name(self) -> str:
+        if self.column == ALL_ROWS:
+            return "count"
+        return f"{self.column}_{self.function}"
+
+
+@dataclass
+class TableQuery:
+    """
+    Filter, then group and aggregate, then sort a sheet. Without aggregates, the filtered
+    rows are returned, only `columns` if set.
+    """
+    filters: List[TableFilter] = field(default_factory=list)
+    group_by: List[str] = field(default_factory=list)
+    aggregates: List[TableAggregate] = field(default_factory=list)
+    columns: List[str] = field(default_factory=list)
+    sort_by: Optional[str] = None
+    descending: bool = False
+    limit: int = DEFAULT_RESULT_ROWS
+
+    @classmethod
+    def from_parameters(cls, parameters: Dict[str, Any]) -> "TableQuery":
+        """
+        Builds a query from tool parameters.
+
+        Raises:
+            ValueError: If an operator or aggregate function is not supported
+        """
+        filters = []
+        for item in parameters.get("filters") or []:
+            operator = item.get("operator", "==")
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(
+                    f"Unsupported filter operator {operator}, use one of: "
+                    f"{', '.join(sorted(FILTER_OPERATORS))}"
+                )
+            value = item.get("value")
+            if operator == "in" and not isinstance(value, list):
+                # A single value is matched as a list of one, by pruning and filtering alike
+                value = [value]
+            filters.append(TableFilter(item.get("column"), operator, value))
+
+        aggregates = []
+        for item in parameters.get("aggregates") or []:
+            function = item.get("function", "count")
+            if function not in AGGREGATE_FUNCTIONS:
+                raise ValueError(
+                    f"Unsupported aggregate function {function}, use one of: "
+                    f"{', '.join(sorted(AGGREGATE_FUNCTIONS))}"
+                )
+            aggregates.append(TableAggregate(item.get("column") or ALL_ROWS, function))
+
+        group_by = list(parameters.get("group_by") or [])
+        if group_by and not aggregates:
+            aggregates.append(TableAggregate(ALL_ROWS, "count"))
+
+        return cls(
+            filters=filters,
+            group_by=group_by,
+            aggregates=aggregates,
+            columns=list(parameters.get("columns") or []),
+            sort_by=parameters.get("sort_by") or None,
+            descending=bool(parameters.get("descending")),
+            limit=min(max(int(parameters.get("limit") or DEFAULT_RESULT_ROWS), 1), MAX_RESULT_ROWS),
+        )
+
+    def get_input_columns(self, sheet_columns: List[str]) -> List[str]:
+        """
+        Columns to read from storage, in sheet order
+        """
+        if not self.aggregates and not self.columns:
+            return sheet_columns
+        needed = {item.column for item in self.filters}
+        needed |= set(self.group_by) | set(self.columns)
+        needed |= {item.column for item in self.aggregates if item.column != ALL_ROWS}
+        return [column for column in sheet_columns if column in needed]
+
+
+@dataclass
+class TableQueryResult:
+    table: pa.Table
+    total_rows: int
+    row_groups_read: int
+    row_groups_total: int
+
+
+def run_table_query(sheet: Dict[str, Any], query: TableQuery) -> TableQueryResult:
+    """
+    Runs a query over a sheet stored as Parquet.
+
+    Row groups whose statistics show that no row can match the filters are skipped, and
+    only the columns the query uses are read.
+
+    Raises:
+        ValueError: If the query uses unknown columns, or values that don't fit the columns
+    """
+    sheet_columns = [column["name"] for column in sheet["columns"]]
+    _check_columns(query, sheet_columns)
+
+    row_groups = [
+        index
+        for index, row_group in enumerate(sheet["row_groups"])
+        if all(_may_match(row_group, item) for item in query.filters)
+    ]
+    table = tabular.read_row_groups(sheet, row_groups, query.get_input_columns(sheet_columns))
+
+    if query.filters:
+        mask = None
+        for item in query.filters:
+            condition = _get_condition(table, item)
+            mask = condition if mask is None else pc.and_kleene(mask, condition)
+        table = table.filter(mask)
+
+    if query.group_by:
+        table = table.group_by(query.group_by).aggregate(
+            [_get_aggregation(item) for item in query.aggregates]
+        )
+        table = table.rename_columns(
+            [_get_group_output_name(name) for name in table.column_names]
+        )
+        table = table.select(query.group_by + [item.output_name for item in query.aggregates])
+    elif query.aggregates:
+        table = pa.table(
+            {item.output_name: [_aggregate(table, item)] for item in query.aggregates}
+        )
+    elif query.columns:
+        table = table.select(query.columns)
+
+    if query.sort_by:
+        if query.sort_by not in table.column_names:
+            raise ValueError(
+                f"Cannot sort by {query.sort_by}, result columns are: {', '.join(table.column_names)}"
+            )
+        table = table.sort_by([(query.sort_by, "descending" if query.descending else "ascending")])
+
+    return TableQueryResult(
+        table=table.slice(0, query.limit),
+        total_rows=table.num_rows,
+        row_groups_read=len(row_groups),
+        row_groups_total=len(sheet["row_groups"]),
+    )
+
+
+async def query_table(sheet: Dict[str, Any], query: TableQuery) -> TableQueryResult:
+    return await asyncio.to_thread(run_table_query, sheet, query)
+
+
+def _check_columns(query: TableQuery, sheet_columns: List[str]) -> None:
+    used = {item.column for item in query.filters}
+    used |= set(query.group_by) | set(query.columns)
+    used |= {item.column for item in query.aggregates if item.column != ALL_ROWS}
+    unknown = used - set(sheet_columns)
+    if unknown:
+        raise ValueError(
+            f"Unknown columns: {', '.join(sorted(map(str, unknown)))}. "
+            f"Columns are: {', '.join(sheet_columns)}"
+        )
+
+
+def _may_match(row_group: Dict[str, Any], item: TableFilter) -> bool:
+    """
+    Whether rows of a row group may match a filter, according to its statistics
+    """
+    statistics = next(
+        (stats for stats in row_group["statistics"] if stats["column"] == item.column), None
+    )
+    if statistics is None or statistics["min"] is None or statistics["max"] is None:
+        return True
+    minimum, maximum = statistics["min"], statistics["max"]
+    # A truncated string maximum is below the real one, it can't bound the values
+    if isinstance(maximum, str) and len(maximum) >= tabular.MAX_STATISTIC_LENGTH:
+        return True
+
+    try:
+        if item.operator == "==":
+            return minimum <= item.value <= maximum
+        if item.operator == "<":
+            return minimum < item.value
+        if item.operator == "<=":
+            return minimum <= item.value
+        if item.operator == ">":
+            return maximum > item.value
+        if item.operator == ">=":
+            return maximum >= item.value
+        if item.operator == "in":
+            return any(minimum <= value <= maximum for value in item.value)
+    except TypeError:
+        # Statistics and value are not comparable, e.g. a date given as a string
+        pass
+    return True
+
+
+def _get_condition(table: pa.Table, item: TableFilter) -> pa.ChunkedArray:
+    column = table.column(item.column)
+    try:
+        if item.operator == "contains":
+            return pc.match_substring(
+                pc.cast(column, pa.string()), str(item.value), ignore_case=True
+            )
+        if item.operator == "in":
+            return pc.is_in(column, value_set=pa.array(item.value).cast(column.type))
+
+        value = pa.scalar(item.value).cast(column.type)
+        operations = {
+            "==": pc.equal,
+            "!=": pc.not_equal,
+            "<": pc.less,
+            "<=": pc.less_equal,
+            ">": pc.greater,
+            ">=": pc.greater_equal,
+        }
+        return operations[item.operator](column, value)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        raise ValueError(
+            f"Cannot compare column {item.column} of type {column.type} with {item.value!r}: {e}"
+        )
+
+
+def _get_aggregation(item: TableAggregate) -> tuple:
+    if item.column == ALL_ROWS:
+        return ([], "count_all")
+    return (item.column, item.function)
+
+
+def _get_group_output_name(name: str) -> str:
+    # Arrow names aggregated columns `{column}_{function}` and counted rows `count_all`
+    return "count" if name == "count_all" else name
+
+
+def _aggregate(table: pa.Table, item: TableAggregate) -> Any:
+    if item.column == ALL_ROWS:
+        return table.num_rows
+    column = table.column(item.column)
+    if item.function == "count_distinct":
+        return pc.count_distinct(column).as_py()
+    return getattr(pc, item.function)(column).as_py()
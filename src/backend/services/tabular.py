@@ -0,0 +1,400 @@
+import asyncio
+import datetime
+import io
+import math
+import os
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from python_calamine import CalamineWorkbook
+
+from backend.services.blob import get_blob_service
+from backend.services.mongo import get_mongo_service
+
+# Extraction `format` of contents stored as Parquet artifacts instead of text pages
+TABLE_FORMAT = "table"
+TABLE_EXTENSIONS = {"csv", "tsv", "xlsx", "xls", "parquet"}
+DEFAULT_ROWS_PER_PAGE = 200
+DEFAULT_ROW_GROUP_SIZE = 10000
+# Longest string kept as a row group minimum or maximum
+MAX_STATISTIC_LENGTH = 256
+
+
+class PageWindow(NamedTuple):
+    page_number: int
+    sheet: Dict[str, Any]
+    row_start: int
+    row_stop: int
+
+
+def is_table_file(file_name: str) -> bool:
+    return _get_extension(file_name) in TABLE_EXTENSIONS
+
+
+def read_tables(file_name: str, source: bytes | str) -> List[Tuple[str, pa.Table]]:
+    """
+    Reads the sheets of a spreadsheet, or the single table of a CSV, TSV or Parquet file.
+
+    Args:
+        file_name (str): The file name, its extension selects the reader
+        source (bytes | str): The file contents, or the path of the file
+
+    Returns:
+        List[Tuple[str, pa.Table]]: The name and content of each sheet, in workbook order
+
+    Raises:
+        ValueError: If the file extension is not tabular
+    """
+    extension = _get_extension(file_name)
+    name = os.path.splitext(os.path.basename(file_name))[0]
+    arrow_source = pa.BufferReader(source) if isinstance(source, bytes) else source
+
+    if extension == "parquet":
+        return [(name, pq.read_table(arrow_source))]
+    if extension in ("csv", "tsv"):
+        parse_options = pa_csv.ParseOptions(delimiter="\t" if extension == "tsv" else ",")
+        return [(name, pa_csv.read_csv(arrow_source, parse_options=parse_options))]
+    if extension in ("xlsx", "xls"):
+        if isinstance(source, bytes):
+            workbook = CalamineWorkbook.from_filelike(io.BytesIO(source))
+        else:
+            workbook = CalamineWorkbook.from_path(source)
+        return [
+            (sheet_name, rows_to_table(workbook.get_sheet_by_name(sheet_name).to_python()))
+            for sheet_name in workbook.sheet_names
+        ]
+
+    raise ValueError(f"File extension {extension} is not tabular")
+
+
+def rows_to_table(rows: List[List[Any]]) -> pa.Table:
+    """
+    Builds a table from spreadsheet rows, the first one holding the column names. Columns
+    whose cells have incompatible types are stored as text.
+    """
+    if not rows:
+        return pa.table({})
+
+    header, body = rows[0], rows[1:]
+    width = max(len(row) for row in rows)
+    names = _get_unique_names(list(header) + [""] * (width - len(header)))
+
+    columns = {}
+    for index, name in enumerate(names):
+        values = [_normalize_cell(row[index]) if index < len(row) else None for row in body]
+        try:
+            columns[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            columns[name] = pa.array(
+                [None if value is None else str(value) for value in values], pa.string()
+            )
+    return pa.table(columns)
+
+
+def write_table_artifacts(
+    file_path: str, output_dir: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> List[Dict[str, Any]]:
+    """
+    Converts each sheet of a tabular file to a Parquet file `{index}.parquet` in
+    `output_dir`, runs in the process pool.
+
+    Returns:
+        List[Dict[str, Any]]: Per sheet, its index, name, row count, columns, Parquet file
+            size and the statistics of each row group
+    """
+    sheets = []
+    for index, (name, table) in enumerate(read_tables(file_path, file_path)):
+        artifact_path = os.path.join(output_dir, f"{index}.parquet")
+        pq.write_table(table, artifact_path, row_group_size=row_group_size, compression="zstd")
+        metadata = pq.read_metadata(artifact_path)
+        sheets.append(
+            {
+                "index": index,
+                "name": name,
+                "num_rows": table.num_rows,
+                "columns": [
+                    {"name": field.name, "type": str(field.type)} for field in table.schema
+                ],
+                "file_size": os.path.getsize(artifact_path),
+                "row_groups": get_row_group_statistics(metadata),
+            }
+        )
+    return sheets
+
+
+def get_row_group_statistics(metadata: pq.FileMetaData) -> List[Dict[str, Any]]:
+    """
+    Position and per column minimum, maximum and null count of each row group, so readers
+    can skip row groups without reading them.
+    """
+    row_groups = []
+    first_row = 0
+    for row_group_index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(row_group_index)
+        statistics = []
+        for column_index in range(row_group.num_columns):
+            column = row_group.column(column_index)
+            column_statistics = column.statistics
+            has_min_max = column_statistics is not None and column_statistics.has_min_max
+            statistics.append(
+                {
+                    "column": column.path_in_schema,
+                    "min": _to_document_value(column_statistics.min) if has_min_max else None,
+                    "max": _to_document_value(column_statistics.max) if has_min_max else None,
+                    "null_count": (
+                        column_statistics.null_count
+                        if column_statistics is not None and column_statistics.has_null_count
+                        else None
+                    ),
+                }
+            )
+        row_groups.append(
+            {"first_row": first_row, "num_rows": row_group.num_rows, "statistics": statistics}
+        )
+        first_row += row_group.num_rows
+    return row_groups
+
+
+class BlobRangeFile(io.RawIOBase):
+    """
+    Read-only file over a stored object where every read is a ranged GET, so Parquet
+    readers only fetch the footer and the row groups they read.
+    """
+
+    def __init__(self, object_name: str, size: int):
+        self.object_name = object_name
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(offset, 0)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = get_blob_service().read_file_range(self.object_name, self.position, length)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def read_sheet_rows(
+    sheet: Dict[str, Any], offset: int, limit: int, columns: Optional[List[str]] = None
+) -> pa.Table:
+    """
+    Reads `limit` rows of a sheet from `offset`, fetching only the row groups holding them.
+    """
+    row_groups = [
+        index
+        for index, row_group in enumerate(sheet["row_groups"])
+        if row_group["first_row"] < offset + limit
+        and row_group["first_row"] + row_group["num_rows"] > offset
+    ]
+    table = read_row_groups(sheet, row_groups, columns)
+    if not row_groups:
+        return table
+
+    first_row = sheet["row_groups"][row_groups[0]]["first_row"]
+    return table.slice(offset - first_row, limit)
+
+
+def read_row_groups(
+    sheet: Dict[str, Any], row_groups: List[int], columns: Optional[List[str]] = None
+) -> pa.Table:
+    """
+    Reads row groups of a sheet, and only the requested columns if set. Only the footer
+    and the column chunks read are fetched from storage.
+    """
+    with BlobRangeFile(sheet["blob_path"], sheet["file_size"]) as file:
+        # Pre-buffering coalesces the column chunk reads into few ranged requests
+        parquet_file = pq.ParquetFile(file, pre_buffer=True)
+        if not row_groups:
+            table = parquet_file.schema_arrow.empty_table()
+            return table.select(columns) if columns else table
+        return parquet_file.read_row_groups(row_groups, columns=columns)
+
+
+def get_sheet_page_count(sheet: Dict[str, Any], rows_per_page: int) -> int:
+    return max(math.ceil(sheet["num_rows"] / rows_per_page), 1)
+
+
+def get_table_page_count(manifest: Dict[str, Any]) -> int:
+    return sum(
+        get_sheet_page_count(sheet, manifest["rows_per_page"]) for sheet in manifest["sheets"]
+    )
+
+
+def iter_page_windows(
+    manifest: Dict[str, Any], start_page: int = 1, limit: Optional[int] = None
+) -> Iterator[PageWindow]:
+    """
+    Yields the rows of each page of the text view of a table, from `start_page`. Pages go
+    through the sheets in order, `rows_per_page` rows at a time.
+    """
+    rows_per_page = manifest["rows_per_page"]
+    stop_page = start_page + limit if limit else None
+    page_number = 1
+    for sheet in manifest["sheets"]:
+        for page_index in range(get_sheet_page_count(sheet, rows_per_page)):
+            if stop_page is not None and page_number >= stop_page:
+                return
+            if page_number >= start_page:
+                row_start = page_index * rows_per_page
+                row_stop = min(row_start + rows_per_page, sheet["num_rows"])
+                yield PageWindow(page_number, sheet, row_start, row_stop)
+            page_number += 1
+
+
+def read_table_pages(
+    manifest: Dict[str, Any], start_page: int = 1, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Renders pages of the text view of a table, reading each sheet once for all its pages.
+    """
+    pages = []
+    for _, sheet_windows in groupby(
+        iter_page_windows(manifest, start_page, limit), key=lambda window: window.sheet["index"]
+    ):
+        windows = list(sheet_windows)
+        sheet = windows[0].sheet
+        row_start = windows[0].row_start
+        table = read_sheet_rows(sheet, row_start, windows[-1].row_stop - row_start)
+        for window in windows:
+            rows = table.slice(window.row_start - row_start, window.row_stop - window.row_start)
+            pages.append(render_page_window(window, rows))
+    return pages
+
+
+def render_page_window(window: PageWindow, rows: pa.Table) -> Dict[str, Any]:
+    """
+    Renders the page of the text view of a table holding the rows of `window`.
+    """
+    sheet = window.sheet
+    header = (
+        f"Sheet: {sheet['name']}, rows {window.row_start + 1}-{window.row_stop}"
+        f" of {sheet['num_rows']}\n"
+    )
+    return {
+        "page_number": window.page_number,
+        "text": header + render_rows(rows),
+        "char_offset": None,
+    }
+
+
+def render_rows(table: pa.Table) -> str:
+    """
+    Renders rows as tab-separated lines under a line of column names, without the padding
+    of `DataFrame.to_string`.
+    """
+    lines = ["\t".join(_format_value(name) for name in table.column_names)]
+    for batch in table.to_batches():
+        columns = [column.to_pylist() for column in batch.columns]
+        lines.extend("\t".join(_format_value(value) for value in row) for row in zip(*columns))
+    return "\n".join(lines) + "\n"
+
+
+def render_tables_text(tables: List[Tuple[str, pa.Table]]) -> str:
+    """
+    Renders every sheet of a tabular file as text.
+    """
+    if len(tables) == 1:
+        return render_rows(tables[0][1])
+    return "\n".join(f"Sheet: {name}\n{render_rows(table)}" for name, table in tables)
+
+
+async def get_table_manifest(file: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Returns the sheets of a file extracted as a table, None for other files.
+    """
+    if file.get("format") != TABLE_FORMAT:
+        return None
+    return await get_mongo_service().get_table_manifest(file.get("content_hash") or file["_id"])
+
+
+async def get_table_rows(
+    sheet: Dict[str, Any], offset: int, limit: int, columns: Optional[List[str]] = None
+) -> pa.Table:
+    """
+    Reads a window of rows of a sheet, and only the requested columns if set.
+    """
+    return await asyncio.to_thread(read_sheet_rows, sheet, offset, limit, columns)
+
+
+async def get_file_text_pages(
+    file: Dict[str, Any], start_page: int = 1, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Lists the text pages of a file from `start_page`: the stored pages, or for tables the
+    row windows rendered from their Parquet artifacts.
+    """
+    manifest = await get_table_manifest(file)
+    if manifest is not None:
+        return await asyncio.to_thread(read_table_pages, manifest, start_page, limit)
+    return await get_mongo_service().get_pages(
+        file.get("content_hash") or file["_id"], start_page, limit
+    )
+
+
+def _get_extension(file_name: str) -> str:
+    return file_name.split(".")[-1].lower()
+
+
+def _get_unique_names(header: List[Any]) -> List[str]:
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for index, value in enumerate(header):
+        base = str(value).strip() if value not in (None, "") else f"column_{index + 1}"
+        name = base
+        while name in seen:
+            seen[base] += 1
+            name = f"{base}_{seen[base]}"
+        seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _normalize_cell(value: Any) -> Any:
+    if value == "":
+        return None
+    # Spreadsheets store every number as a float
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2**53:
+        return int(value)
+    return value
+
+
+def _to_document_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, float, datetime.datetime)):
+        return value
+    if isinstance(value, int):
+        return value if -(2**63) <= value < 2**63 else str(value)
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time())
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    return str(value)[:MAX_STATISTIC_LENGTH]
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).replace("\t", " ").replace("\n", " ")
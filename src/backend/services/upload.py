@@ -0,0 +1,468 @@
+import asyncio
+import datetime
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi import UploadFile as FastAPIUploadFile
+from pymongo.errors import BulkWriteError
+
+from backend.config.settings import Settings
+from backend.schemas.context import Context
+from backend.schemas.file import (
+    CompletedUploadPart,
+    CreateDirectUploadFile,
+    DirectUpload,
+    DirectUploadPart,
+    FileStatus,
+    UploadConversationFileResponse,
+)
+from backend.services.blob import PresignedUpload, UploadedBlob, get_blob_service
+from backend.services.extraction import get_extraction_service
+from backend.services.logger.utils import LoggerFactory
+from backend.services.mongo import get_mongo_service
+
+logger = LoggerFactory().get_logger()
+
+DEFAULT_MAX_CONCURRENT_FILES = 8
+
+# Content in these statuses is extracted again on re-upload: its previous extraction failed,
+# or was never queued because the upload that claimed it did not get to trigger it. An
+# extraction already queued or running is not queued twice.
+REEXTRACT_STATUSES = {FileStatus.UPLOADED, FileStatus.FAILED, FileStatus.FAILED_TRIGGER}
+# Extraction progress and document statistics copied from the content to files reusing it
+EXTRACTION_STATE_FIELDS = (
+    "page_count",
+    "pages_extracted",
+    "format",
+    "word_count",
+    "token_count",
+    "language",
+    "preview",
+)
+
+
+@dataclass
+class StagedFile:
+    """
+    A file of an upload batch stored in Blob Storage, waiting to be registered in Mongo
+    """
+    file_name: str
+    file_size: int
+    file_id: str
+    created_at: datetime.datetime
+    file_meta: Optional[dict] = None
+    content_hash: Optional[str] = None
+    blob_path: Optional[str] = None
+    needs_extraction: bool = False
+    error: Optional[str] = None
+
+
+async def upload_conversation_files(
+    files: list[FastAPIUploadFile],
+    user_id: str,
+    conversation_id: str,
+    ctx: Context,
+) -> list[UploadConversationFileResponse]:
+    """
+    Stores, registers and queues for extraction a batch of conversation files.
+
+    Files are stored concurrently, with at most `upload.max_concurrent_files` in flight,
+    then registered in Mongo with a single insert for the whole batch. A failing file does
+    not fail the batch: its response has the FAILED_UPLOAD status and the error message.
+    Responses are returned in the order of the input files.
+
+    Args:
+        files (list[FastAPIUploadFile]): The files to upload
+        user_id (str): The user ID
+        conversation_id (str): The conversation ID
+        ctx (Context): Context object
+
+    Returns:
+        list[UploadConversationFileResponse]: One response per input file
+    """
+    max_concurrent_files = (
+        Settings().get("upload.max_concurrent_files") or DEFAULT_MAX_CONCURRENT_FILES
+    )
+    in_flight = asyncio.Semaphore(max(max_concurrent_files, 1))
+
+    async def stage(file: FastAPIUploadFile) -> StagedFile:
+        async with in_flight:
+            return await stage_conversation_file(file, user_id, conversation_id, ctx)
+
+    staged_files = await asyncio.gather(*(stage(file) for file in files))
+    await register_files(staged_files, ctx)
+    return await asyncio.gather(
+        *(
+            finish_conversation_file(staged_file, user_id, conversation_id, ctx)
+            for staged_file in staged_files
+        )
+    )
+
+
+async def stage_conversation_file(
+    file: FastAPIUploadFile,
+    user_id: str,
+    conversation_id: str,
+    ctx: Context,
+) -> StagedFile:
+    """
+    Uploads a single file to Blob Storage and prepares its metadata.
+
+    Files are deduplicated by the SHA-256 of their content: when the same bytes were already
+    uploaded, the new file record points at the stored blob and shares its extraction,
+    which is only triggered again if it previously failed or was never queued.
+
+    Args:
+        file (FastAPIUploadFile): The file to upload
+        user_id (str): The user ID
+        conversation_id (str): The conversation ID
+        ctx (Context): Context object
+
+    Returns:
+        StagedFile: The stored file and its metadata, or the error if it failed
+    """
+    logger = ctx.get_logger()
+    staged_file = StagedFile(
+        file.filename, file.size or 0, str(uuid.uuid4()), datetime.datetime.utcnow()
+    )
+
+    try:
+        uploaded = await get_blob_service().stream_upload(
+            file, f"raw/{staged_file.file_id}/{file.filename}"
+        )
+        await stage_stored_blob(staged_file, uploaded, user_id, conversation_id)
+    except Exception as e:
+        logger.error(
+            event="[Upload] Error while uploading file",
+            file_name=file.filename,
+            conversation_id=conversation_id,
+            error=str(e),
+        )
+        staged_file.error = str(e)
+
+    return staged_file
+
+
+async def stage_stored_blob(
+    staged_file: StagedFile,
+    uploaded: UploadedBlob,
+    user_id: str,
+    conversation_id: str,
+) -> None:
+    """
+    Deduplicates a file stored in Blob Storage against the known contents and prepares its
+    metadata, whether the API or the client sent the bytes to storage.
+
+    Files are deduplicated by the SHA-256 of their content: when the same bytes were already
+    uploaded, the new file record points at the stored blob and shares its extraction,
+    which is only triggered again if it previously failed or was never queued.
+    """
+    blob_service = get_blob_service()
+    mongo_service = get_mongo_service()
+
+    content, is_new_content = await mongo_service.claim_content(
+        uploaded.sha256, uploaded.key, uploaded.size, FileStatus.UPLOADED
+    )
+    staged_file.needs_extraction = (
+        is_new_content or content.get("status") in REEXTRACT_STATUSES
+    )
+    if not is_new_content:
+        # Same bytes were uploaded before: drop this copy and point at the stored one
+        await blob_service.delete_file(uploaded.key)
+    status = FileStatus.UPLOADED
+    extraction_state = {}
+    if not staged_file.needs_extraction:
+        status = content.get("status", FileStatus.UPLOADED)
+        extraction_state = {
+            field: content[field] for field in EXTRACTION_STATE_FIELDS if field in content
+        }
+
+    staged_file.file_size = uploaded.size
+    staged_file.content_hash = uploaded.sha256
+    staged_file.blob_path = content["blob_path"]
+    staged_file.file_meta = {
+        "_id": staged_file.file_id,
+        "user_id": user_id,
+        "conversation_id": conversation_id,
+        "file_name": staged_file.file_name,
+        "file_size": uploaded.size,
+        "status": status,
+        "status_history": [{"status": status, "at": staged_file.created_at}],
+        "blob_path": content["blob_path"],
+        "content_hash": uploaded.sha256,
+        "created_at": staged_file.created_at,
+        "updated_at": staged_file.created_at,
+        **extraction_state,
+    }
+
+
+async def register_files(staged_files: list[StagedFile], ctx: Context) -> None:
+    """
+    Saves the metadata of the stored files of a batch to Mongo in one round trip.
+    Files whose metadata could not be saved get the error.
+    """
+    to_register = [staged_file for staged_file in staged_files if staged_file.error is None]
+    if not to_register:
+        return
+
+    try:
+        await get_mongo_service().create_files_metadata(
+            [staged_file.file_meta for staged_file in to_register]
+        )
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            to_register[write_error["index"]].error = write_error.get("errmsg", str(e))
+    except Exception as e:
+        ctx.get_logger().error(event="[Upload] Error while saving file metadata", error=str(e))
+        for staged_file in to_register:
+            staged_file.error = str(e)
+
+
+async def finish_conversation_file(
+    staged_file: StagedFile,
+    user_id: str,
+    conversation_id: str,
+    ctx: Context,
+) -> UploadConversationFileResponse:
+    """
+    Triggers the extraction of a registered file, or syncs its status with the extraction
+    it shares.
+
+    Returns:
+        UploadConversationFileResponse: The uploaded file, or the error if it failed
+    """
+    status = FileStatus.FAILED_UPLOAD
+
+    if staged_file.error is None:
+        try:
+            status = staged_file.file_meta["status"]
+            if staged_file.needs_extraction and await get_extraction_service().trigger_extraction(
+                staged_file.file_id,
+                staged_file.blob_path,
+                staged_file.content_hash,
+                tenant_id=user_id,
+            ):
+                status = FileStatus.QUEUED
+            else:
+                # The content status may have moved while this file was being registered, or
+                # its extraction was already queued or running
+                mongo_service = get_mongo_service()
+                content = await mongo_service.get_content(staged_file.content_hash)
+                if content and content.get("status") != status:
+                    status = content["status"]
+                    await mongo_service.update_file_status(staged_file.file_id, status)
+        except Exception as e:
+            ctx.get_logger().error(
+                event="[Upload] Error while uploading file",
+                file_name=staged_file.file_name,
+                conversation_id=conversation_id,
+                error=str(e),
+            )
+            staged_file.error = str(e)
+            status = FileStatus.FAILED_UPLOAD
+
+    return UploadConversationFileResponse(
+        id=staged_file.file_id,
+        conversation_id=conversation_id,
+        user_id=user_id,
+        file_name=staged_file.file_name,
+        file_size=staged_file.file_size,
+        status=status,
+        error=staged_file.error,
+        created_at=staged_file.created_at,
+        updated_at=staged_file.created_at,
+    )
+
+
+async def create_direct_uploads(
+    files: list[CreateDirectUploadFile],
+    user_id: str,
+    conversation_id: str,
+) -> list[DirectUpload]:
+    """
+    Starts uploads that clients send directly to Blob Storage, bypassing the API workers.
+
+    Each file gets a multipart upload with one presigned URL per part, and a pending upload
+    record that expires with the URLs. The file is only registered and queued for
+    extraction once `complete_direct_upload` verified what was stored.
+
+    Args:
+        files (list[CreateDirectUploadFile]): The files to upload
+        user_id (str): The user ID
+        conversation_id (str): The conversation ID
+
+    Returns:
+        list[DirectUpload]: One upload per input file, in the same order
+    """
+    blob_service = get_blob_service()
+    max_concurrent_files = (
+        Settings().get("upload.max_concurrent_files") or DEFAULT_MAX_CONCURRENT_FILES
+    )
+    in_flight = asyncio.Semaphore(max(max_concurrent_files, 1))
+    created_at = datetime.datetime.utcnow()
+    expires_at = created_at + datetime.timedelta(seconds=blob_service.presigned_url_expiration)
+
+    async def create(file: CreateDirectUploadFile) -> tuple[str, PresignedUpload]:
+        file_id = str(uuid.uuid4())
+        async with in_flight:
+            presigned = await blob_service.create_presigned_upload(
+                f"raw/{file_id}/{file.file_name}", file.file_size, file.content_type
+            )
+        return file_id, presigned
+
+    created = await asyncio.gather(*(create(file) for file in files))
+    await get_mongo_service().create_upload_sessions(
+        [
+            {
+                "_id": file_id,
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "file_name": file.file_name,
+                "file_size": file.file_size,
+                "content_type": file.content_type,
+                "sha256": file.sha256.lower() if file.sha256 else None,
+                "blob_path": presigned.key,
+                "upload_id": presigned.upload_id,
+                "created_at": created_at,
+                "expires_at": expires_at,
+            }
+            for file, (file_id, presigned) in zip(files, created)
+        ]
+    )
+
+    return [
+        DirectUpload(
+            file_id=file_id,
+            file_name=file.file_name,
+            part_size=presigned.part_size,
+            parts=[
+                DirectUploadPart(part_number=part_number, url=url)
+                for part_number, url in enumerate(presigned.part_urls, start=1)
+            ],
+            expires_at=expires_at,
+        )
+        for file, (file_id, presigned) in zip(files, created)
+    ]
+
+
+async def complete_direct_upload(
+    file_id: str,
+    parts: list[CompletedUploadPart],
+    user_id: str,
+    conversation_id: str,
+    ctx: Context,
+) -> UploadConversationFileResponse:
+    """
+    Completes a direct upload: assembles its parts, checks the stored object has the
+    declared size and SHA-256, then registers the file and queues it for extraction like
+    a file uploaded through the API.
+
+    Args:
+        file_id (str): The file ID returned when the upload started
+        parts (list[CompletedUploadPart]): The parts sent by the client
+        user_id (str): The user ID
+        conversation_id (str): The conversation ID
+        ctx (Context): Context object
+
+    Returns:
+        UploadConversationFileResponse: The uploaded file, or the error if it failed
+
+    Raises:
+        HTTPException: If the upload is not pending, or the stored object does not match
+    """
+    logger = ctx.get_logger()
+    blob_service = get_blob_service()
+    session = await _claim_upload_session(file_id, user_id, conversation_id)
+    blob_path = session["blob_path"]
+
+    try:
+        await blob_service.complete_presigned_upload(
+            blob_path,
+            session["upload_id"],
+            [{"PartNumber": part.part_number, "ETag": part.etag} for part in parts],
+        )
+    except Exception as e:
+        logger.error(
+            event="[Upload] Error while completing direct upload",
+            file_id=file_id,
+            error=str(e),
+        )
+        await _discard_upload(session, completed=False)
+        raise HTTPException(status_code=400, detail=f"Upload could not be completed: {e}")
+
+    # Multipart ETags are not content hashes, so the stored bytes are hashed again
+    size = (await blob_service.get_file_info(blob_path))["ContentLength"]
+    if size != session["file_size"]:
+        await _discard_upload(session)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Uploaded {size} bytes, expected {session['file_size']}",
+        )
+    sha256 = await blob_service.hash_file(blob_path)
+    if session.get("sha256") and sha256 != session["sha256"]:
+        await _discard_upload(session)
+        raise HTTPException(status_code=400, detail="SHA-256 of the uploaded file does not match")
+
+    staged_file = StagedFile(session["file_name"], size, file_id, datetime.datetime.utcnow())
+    try:
+        await stage_stored_blob(
+            staged_file, UploadedBlob(blob_path, size, sha256), user_id, conversation_id
+        )
+    except Exception as e:
+        logger.error(
+            event="[Upload] Error while uploading file",
+            file_name=staged_file.file_name,
+            conversation_id=conversation_id,
+            error=str(e),
+        )
+        staged_file.error = str(e)
+
+    await register_files([staged_file], ctx)
+    return await finish_conversation_file(staged_file, user_id, conversation_id, ctx)
+
+
+async def abort_direct_upload(file_id: str, user_id: str, conversation_id: str) -> None:
+    """
+    Aborts a pending direct upload and discards the parts already sent.
+
+    Raises:
+        HTTPException: If the upload is not pending
+    """
+    session = await _claim_upload_session(file_id, user_id, conversation_id)
+    await _discard_upload(session, completed=False)
+
+
+async def _claim_upload_session(file_id: str, user_id: str, conversation_id: str) -> dict:
+    """
+    Takes a pending direct upload of the user, so it is completed or aborted only once.
+    """
+    mongo_service = get_mongo_service()
+    session = await mongo_service.get_upload_session(file_id)
+    if (
+        session is None
+        or session["user_id"] != user_id
+        or session["conversation_id"] != conversation_id
+        # The TTL monitor removes expired uploads with some delay
+        or session["expires_at"] < datetime.datetime.utcnow()
+        or await mongo_service.delete_upload_session(file_id) is None
+    ):
+        raise HTTPException(status_code=404, detail=f"Pending upload {file_id} not found.")
+    return session
+
+
+async def _discard_upload(session: dict, completed: bool = True) -> None:
+    blob_service = get_blob_service()
+    try:
+        if completed:
+            await blob_service.delete_file(session["blob_path"])
+        else:
+            await blob_service.abort_presigned_upload(session["blob_path"], session["upload_id"])
+    except Exception as e:
+        # Parts left behind are removed by the bucket lifecycle rule
+        logger.error(
+            event="[Upload] Error while discarding direct upload",
+            file_id=session["_id"],
+            error=str(e),
+        )
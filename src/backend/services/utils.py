@@ -1,8 +1,12 @@
 import io
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
 
 from fastapi import Request
 from pypdf import PdfReader
 
+# Pages parsed between two releases of the PDF reader cache
+PDF_PAGE_WINDOW = 32
+
 
 def get_deployment_config(request: Request) -> dict:
     headers = request.get("headers", {})
@@ -32,12 +36,85 @@ def read_pdf(file_contents: bytes) -> str:
     Returns:
         str: The text extracted from the PDF
     """
-    pdf_reader = PdfReader(io.BytesIO(file_contents))
-    text = ""
+    return join_pdf_pages(iter_pdf_pages(file_contents))
+
+
+class PdfPage(NamedTuple):
+    """Text of a PDF page and where it starts in the text of the whole document"""
+    page_number: int
+    text: str
+    char_offset: int
+
+
+def iter_pdf_pages(
+    source: bytes | str | BinaryIO,
+    start: int = 0,
+    stop: Optional[int] = None,
+    window: int = PDF_PAGE_WINDOW,
+) -> Iterator[PdfPage]:
+    """Yields the text of the pages of a PDF file one by one
+
+    PyPDF2 keeps every object it parses, decoded content streams included, so the
+    reader cache is released every `window` pages to bound memory on long documents.
+
+    Args:
+        source (bytes | str | BinaryIO): The file contents, path or stream
+        start (int): Index of the first page to read
+        stop (Optional[int]): Index after the last page to read, defaults to the last page
+        window (int): Number of pages parsed between two cache releases
+
+    Yields:
+        PdfPage: The page number (1-based), its text and its offset from the start page
+    """
+    pdf_reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    page_count = len(pdf_reader.pages)
+    stop = page_count if stop is None else min(stop, page_count)
+
+    char_offset = 0
+    for index in range(start, stop):
+        text = pdf_reader.pages[index].extract_text()
+        yield PdfPage(index + 1, text, char_offset)
+        char_offset += len(text)
+
+        if (index - start + 1) % window == 0:
+            pdf_reader.resolved_objects.clear()
+
+
+def join_pdf_pages(pages: Iterable[PdfPage]) -> str:
+    """Joins the text of PDF pages into the text of the whole document
+
+    Args:
+        pages (Iterable[PdfPage]): The pages, in order
+
+    Returns:
+        str: The text of the pages
+    """
+    return "".join(page.text for page in pages)
+
+
+def get_pdf_page_count(source: str | BinaryIO) -> int:
+    """Returns the number of pages of a PDF
+
+    Args:
+        source (str | BinaryIO): The PDF file path or stream
+
+    Returns:
+        int: The number of pages
+    """
+    return len(PdfReader(source).pages)
+
+
+def read_pdf_page_range(source: str | BinaryIO, start: int, stop: int) -> list[str]:
+    """Reads the text of a range of pages of a PDF file using PyPDF2
 
-    # Extract text from each page
-    for page in pdf_reader.pages:
-        page_text = page.extract_text()
-        text += page_text
+    Only the requested pages are parsed, so a document can be split across processes.
 
-    return text
+    Args:
+        source (str | BinaryIO): The PDF file path or stream
+        start (int): Index of the first page to read
+        stop (int): Index after the last page to read
+
+    Returns:
+        list[str]: The text of each page of the range
+    """
+    return [page.text for page in iter_pdf_pages(source, start, stop)]
@@ -0,0 +1,411 @@
+import asyncio
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from backend.config.settings import Settings
+from backend.services import utils
+from backend.services.blob import get_blob_service
+from backend.services.compare import diff_sequences
+from backend.services.file import PDF_EXTENSION, get_file_extension
+from backend.services.image_diff import get_dhashes
+from backend.services.mongo import get_mongo_service
+from backend.services.process_pool import get_process_pool
+
+# Bumped whenever a change to the rendering changes the rasters, cached rasters of other
+# versions are rendered again
+RASTER_VERSION = 1
+DEFAULT_RASTER_DPI = 36
+DEFAULT_TILE_SIZE = 12
+DEFAULT_PAGES_PER_TASK = 16
+
+# Gray level difference from which a pixel changed, above scanner noise
+PIXEL_THRESHOLD = 64
+# Share of the changed pixels of a tile from which it is part of a changed region
+TILE_CHANGE_RATIO = 0.02
+# Largest offset, in pixels, between two scans of a page that is compensated
+MAX_SHIFT = 8
+
+Region = Dict[str, float]
+
+
+def render_pdf_page_range(file_path: str, start: int, stop: int, dpi: int) -> List[np.ndarray]:
+    """
+    Renders a range of pages of a PDF to grayscale rasters, runs in the process pool.
+
+    Raises:
+        ImportError: If pypdfium2 is not installed
+    """
+    import pypdfium2 as pdfium
+
+    rasters = []
+    document = pdfium.PdfDocument(file_path)
+    try:
+        for index in range(start, min(stop, len(document))):
+            page = document[index]
+            raster = page.render(scale=dpi / 72, grayscale=True).to_numpy()
+            page.close()
+            rasters.append(np.ascontiguousarray(raster[:, :, 0] if raster.ndim == 3 else raster))
+    finally:
+        document.close()
+    return rasters
+
+
+def _shrink(raster: np.ndarray, height: int, width: int) -> np.ndarray:
+    """
+    Box-filtered thumbnail of a raster
+    """
+    rows = np.linspace(0, raster.shape[0], height + 1).astype(int)[:-1]
+    columns = np.linspace(0, raster.shape[1], width + 1).astype(int)[:-1]
+    sums = np.add.reduceat(
+        np.add.reduceat(raster.astype(np.float64), rows, axis=0), columns, axis=1
+    )
+    counts = np.outer(
+        np.diff(np.append(rows, raster.shape[0])), np.diff(np.append(columns, raster.shape[1]))
+    )
+    return sums / counts
+
+
+def _pad(raster: np.ndarray, height: int, width: int) -> np.ndarray:
+    """
+    Pads a raster with white to the given size
+    """
+    return np.pad(
+        raster,
+        ((0, height - raster.shape[0]), (0, width - raster.shape[1])),
+        constant_values=255,
+    )
+
+
+def _estimate_shift(raster_a: np.ndarray, raster_b: np.ndarray) -> Tuple[int, int]:
+    """
+    Offset of the second raster from the first by phase correlation, e.g. a page scanned
+    slightly off, (0, 0) when larger than `MAX_SHIFT`
+    """
+    spectrum = np.fft.rfft2(255 - raster_a.astype(np.float64)) * np.conj(
+        np.fft.rfft2(255 - raster_b.astype(np.float64))
+    )
+    correlation = np.fft.irfft2(spectrum / np.maximum(np.abs(spectrum), 1e-9), raster_a.shape)
+    row, column = np.unravel_index(np.argmax(correlation), correlation.shape)
+    # Peaks past the middle are negative offsets
+    row = row - raster_a.shape[0] if row > raster_a.shape[0] // 2 else row
+    column = column - raster_a.shape[1] if column > raster_a.shape[1] // 2 else column
+    if max(abs(row), abs(column)) > MAX_SHIFT:
+        return 0, 0
+    return int(row), int(column)
+
+
+def _get_regions(changed_tiles: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """
+    Bounding boxes, in tiles, of the groups of changed tiles touching by a side or a corner
+    """
+    regions = []
+    seen = np.zeros_like(changed_tiles)
+    for start in zip(*np.nonzero(changed_tiles)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        top, left = bottom, right = start
+        stack = [start]
+        while stack:
+            row, column = stack.pop()
+            top, bottom = min(top, row), max(bottom, row)
+            left, right = min(left, column), max(right, column)
+            for next_row in range(max(row - 1, 0), min(row + 2, changed_tiles.shape[0])):
+                for next_column in range(
+                    max(column - 1, 0), min(column + 2, changed_tiles.shape[1])
+                ):
+                    if changed_tiles[next_row, next_column] and not seen[next_row, next_column]:
+                        seen[next_row, next_column] = True
+                        stack.append((next_row, next_column))
+        regions.append((int(top), int(left), int(bottom) + 1, int(right) + 1))
+    return regions
+
+
+def diff_rasters(raster_a: np.ndarray, raster_b: np.ndarray, tile_size: int) -> Dict[str, Any]:
+    """
+    Difference map of two rasters of a page, by tiles of `tile_size` pixels.
+
+    The second raster is first shifted onto the first, then pixels whose gray level changed
+    past `PIXEL_THRESHOLD` are counted per tile, and adjacent changed tiles are grouped.
+
+    Returns:
+        Dict[str, Any]: The bounding boxes of the changed regions, as fractions of the page
+            width and height, and the share of the page changed
+    """
+    height = max(raster_a.shape[0], raster_b.shape[0])
+    width = max(raster_a.shape[1], raster_b.shape[1])
+    raster_a, raster_b = _pad(raster_a, height, width), _pad(raster_b, height, width)
+    raster_b = np.roll(raster_b, _estimate_shift(raster_a, raster_b), axis=(0, 1))
+
+    changed = np.abs(raster_a.astype(np.int16) - raster_b.astype(np.int16)) > PIXEL_THRESHOLD
+    tile_rows, tile_columns = -(-height // tile_size), -(-width // tile_size)
+    changed = np.pad(
+        changed, ((0, tile_rows * tile_size - height), (0, tile_columns * tile_size - width))
+    )
+    tiles = changed.reshape(tile_rows, tile_size, tile_columns, tile_size).mean(axis=(1, 3))
+    changed_tiles = tiles > TILE_CHANGE_RATIO
+
+    return {
+        "regions": [
+            {
+                "left": round(min(left * tile_size / width, 1), 4),
+                "top": round(min(top * tile_size / height, 1), 4),
+                "right": round(min(right * tile_size / width, 1), 4),
+                "bottom": round(min(bottom * tile_size / height, 1), 4),
+            }
+            for top, left, bottom, right in _get_regions(changed_tiles)
+        ],
+        "changed_ratio": round(float(changed_tiles.mean()), 4),
+    }
+
+
+def diff_raster_pairs(
+    pairs: List[Tuple[np.ndarray, np.ndarray]], tile_size: int
+) -> List[Dict[str, Any]]:
+    """
+    Difference maps of pairs of page rasters, runs in the process pool.
+    """
+    return [diff_rasters(raster_a, raster_b, tile_size) for raster_a, raster_b in pairs]
+
+
+def align_pages(
+    rasters_a: List[np.ndarray], rasters_b: List[np.ndarray]
+) -> List[Tuple[Optional[int], Optional[int]]]:
+    """
+    Pairs the pages of two scans, by position when they have as many pages. Otherwise
+    pages are aligned by the difference hash of their thumbnail, the remaining pages of a
+    changed region are paired by position and the others are inserted or deleted.
+
+    Returns:
+        List[Tuple[Optional[int], Optional[int]]]: Page indexes of each pair, None for the
+            missing side of an inserted or deleted page
+    """
+    if len(rasters_a) == len(rasters_b):
+        return list(zip(range(len(rasters_a)), range(len(rasters_b))))
+
+    hashes_a, hashes_b = (
+        get_dhashes(np.stack([_shrink(raster, 8, 9) for raster in rasters])).tolist()
+        if rasters
+        else []
+        for rasters in (rasters_a, rasters_b)
+    )
+    pairs: List[Tuple[Optional[int], Optional[int]]] = []
+    for _, a_start, a_end, b_start, b_end in diff_sequences(hashes_a, hashes_b):
+        common = min(a_end - a_start, b_end - b_start)
+        pairs.extend((a_start + offset, b_start + offset) for offset in range(common))
+        pairs.extend((index, None) for index in range(a_start + common, a_end))
+        pairs.extend((None, index) for index in range(b_start + common, b_end))
+    return pairs
+
+
+def get_raster_blob_path(content_key: str, version: int, dpi: int) -> str:
+    return f"rasters/{content_key}/{version}-{dpi}.npz"
+
+
+async def get_page_rasters(
+    file: Dict[str, Any], dpi: int, pages_per_task: int
+) -> List[np.ndarray]:
+    """
+    Reads the grayscale rasters of the pages of a PDF, rendered once per content and
+    resolution and cached in blob storage.
+
+    Raises:
+        HTTPException: If pypdfium2 is not installed
+    """
+    blob_service = get_blob_service()
+    mongo_service = get_mongo_service()
+    content_key = file.get("content_hash") or file["_id"]
+    blob_path = get_raster_blob_path(content_key, RASTER_VERSION, dpi)
+
+    with tempfile.TemporaryDirectory() as directory:
+        raster_path = os.path.join(directory, "rasters.npz")
+        if await mongo_service.get_raster_page_count(content_key, RASTER_VERSION, dpi) is not None:
+            await blob_service.download_to_file(blob_path, raster_path)
+            with np.load(raster_path) as archive:
+                return [archive[name] for name in sorted(archive.files, key=int)]
+
+        file_path = os.path.join(directory, os.path.basename(file["blob_path"]))
+        await blob_service.download_to_file(file["blob_path"], file_path)
+        loop = asyncio.get_running_loop()
+        executor = get_process_pool()
+        page_count = file.get("page_count") or await loop.run_in_executor(
+            executor, utils.get_pdf_page_count, file_path
+        )
+        try:
+            ranges = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        render_pdf_page_range,
+                        file_path,
+                        start,
+                        start + pages_per_task,
+                        dpi,
+                    )
+                    for start in range(0, page_count, pages_per_task)
+                )
+            )
+        except ImportError:
+            raise HTTPException(
+                status_code=501, detail="Visual compare requires pypdfium2 to render pages."
+            )
+        rasters = [raster for rendered in ranges for raster in rendered]
+
+        np.savez_compressed(
+            raster_path, **{str(index): raster for index, raster in enumerate(rasters)}
+        )
+        await blob_service.upload_local_file(raster_path, blob_path)
+    await mongo_service.save_raster_page_count(content_key, RASTER_VERSION, dpi, len(rasters))
+    return rasters
+
+
+async def delete_page_rasters(content_key: str) -> None:
+    """
+    Deletes the cached page rasters of a content, of every version and resolution, before
+    it is extracted again. Records are deleted first, so a raster is never read without
+    its blob.
+    """
+    rasters = await get_mongo_service().delete_rasters(content_key)
+    if rasters:
+        await asyncio.to_thread(
+            get_blob_service().delete_files,
+            [
+                get_raster_blob_path(content_key, raster["version"], raster["dpi"])
+                for raster in rasters
+            ],
+        )
+
+
+def check_rasterizable(file: Dict[str, Any]) -> None:
+    """
+    Raises if a file is not a stored PDF, the only files whose pages are rendered.
+    """
+    if get_file_extension(file["file_name"]) != PDF_EXTENSION or not file.get("blob_path"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File {file['file_name']} is not a PDF, it cannot be compared visually.",
+        )
+
+
+def get_raster_options() -> Tuple[int, int, int]:
+    """
+    Resolution of the rasters, size of the tiles and pages per task of visual compares.
+    """
+    settings = Settings()
+    dpi = settings.get("compare.raster_dpi") or DEFAULT_RASTER_DPI
+    tile_size = max(settings.get("compare.raster_tile_size") or DEFAULT_TILE_SIZE, 1)
+    pages_per_task = max(
+        settings.get("compare.raster_pages_per_task") or DEFAULT_PAGES_PER_TASK, 1
+    )
+    return dpi, tile_size, pages_per_task
+
+
+def get_page_changes(
+    pairs: List[Tuple[Optional[int], Optional[int]]], page_diffs: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Visual changes of aligned pages, from the difference maps of the pages in both versions
+    in order.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The changed pages, and the number of identical pages
+    """
+    diffs = iter(page_diffs)
+    changes = []
+    identical_pages = 0
+    for index_a, index_b in pairs:
+        page_diff = next(diffs) if index_a is not None and index_b is not None else None
+        if page_diff is not None and not page_diff["regions"]:
+            identical_pages += 1
+            continue
+        changes.append(
+            {
+                "type": "modify" if page_diff else "delete" if index_b is None else "insert",
+                "a_page_number": None if index_a is None else index_a + 1,
+                "b_page_number": None if index_b is None else index_b + 1,
+                "regions": page_diff["regions"] if page_diff else [],
+                "changed_ratio": page_diff["changed_ratio"] if page_diff else 1.0,
+            }
+        )
+    return changes, identical_pages
+
+
+def get_visual_summary(
+    pages_a: int, pages_b: int, identical_pages: int, changes: List[Dict[str, Any]]
+) -> Dict[str, int]:
+    return {
+        "pages_a": pages_a,
+        "pages_b": pages_b,
+        "identical_pages": identical_pages,
+        "inserted": sum(change["type"] == "insert" for change in changes),
+        "deleted": sum(change["type"] == "delete" for change in changes),
+        "modified": sum(change["type"] == "modify" for change in changes),
+        "moved": 0,
+        "changed_regions": sum(len(change["regions"]) for change in changes),
+    }
+
+
+def get_compared_pairs(
+    pairs: List[Tuple[Optional[int], Optional[int]]],
+    rasters_a: List[np.ndarray],
+    rasters_b: List[np.ndarray],
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Rasters of the aligned pages in both versions, the pages diffed
+    """
+    return [
+        (rasters_a[index_a], rasters_b[index_b])
+        for index_a, index_b in pairs
+        if index_a is not None and index_b is not None
+    ]
+
+
+async def compare_rasters(file_a: Dict[str, Any], file_b: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Visual compare of two PDFs, for scans whose text cannot be compared: their pages are
+    rendered to low-resolution rasters, and each pair of pages is diffed by tiles in the
+    process pool, `compare.raster_pages_per_task` pages per task.
+
+    Returns:
+        Dict[str, Any]: Per changed page, the bounding boxes of its changed regions, and
+            a summary. Pages without a counterpart are inserted or deleted.
+
+    Raises:
+        HTTPException: If a file is not a PDF, or pypdfium2 is not installed
+    """
+    check_rasterizable(file_a)
+    check_rasterizable(file_b)
+    dpi, tile_size, pages_per_task = get_raster_options()
+
+    rasters_a, rasters_b = await asyncio.gather(
+        get_page_rasters(file_a, dpi, pages_per_task),
+        get_page_rasters(file_b, dpi, pages_per_task),
+    )
+    pairs = align_pages(rasters_a, rasters_b)
+    compared = get_compared_pairs(pairs, rasters_a, rasters_b)
+
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                get_process_pool(),
+                diff_raster_pairs,
+                compared[start:start + pages_per_task],
+                tile_size,
+            )
+            for start in range(0, len(compared), pages_per_task)
+        )
+    )
+    changes, identical_pages = get_page_changes(
+        pairs, [page_diff for chunk in chunks for page_diff in chunk]
+    )
+
+    return {
+        "summary": get_visual_summary(len(rasters_a), len(rasters_b), identical_pages, changes),
+        "operations": [],
+        "visual_changes": changes,
+    }
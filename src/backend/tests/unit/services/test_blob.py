@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import io
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import UploadFile
+
+from backend.services.blob import (
+    MAX_MULTIPART_PARTS,
+    MIN_MULTIPART_PART_SIZE,
+    BlobService,
+)
+
+
+def make_blob_service(s3_client: MagicMock) -> BlobService:
+    with patch("backend.services.blob.boto3.client", return_value=s3_client):
+        return BlobService()
+
+
+def make_upload_file(size: int) -> UploadFile:
+    return UploadFile(file=io.BytesIO(b"x" * size), filename="test.pdf")
+
+
+def test_stream_upload_small_file_uses_single_put() -> None:
+    s3_client = MagicMock()
+    blob_service = make_blob_service(s3_client)
+
+    uploaded = asyncio.run(blob_service.stream_upload(make_upload_file(1024), "raw/test.pdf"))
+
+    assert uploaded.key == "raw/test.pdf"
+    assert uploaded.size == 1024
+    assert uploaded.sha256 == hashlib.sha256(b"x" * 1024).hexdigest()
+    s3_client.put_object.assert_called_once()
+    s3_client.create_multipart_upload.assert_not_called()
+
+
+def test_stream_upload_large_file_uses_multipart() -> None:
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-id"}
+    s3_client.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+    blob_service = make_blob_service(s3_client)
+    size = MIN_MULTIPART_PART_SIZE * 2 + 10
+    blob_service.part_size = MIN_MULTIPART_PART_SIZE
+
+    uploaded = asyncio.run(blob_service.stream_upload(make_upload_file(size), "raw/test.pdf"))
+
+    assert uploaded.size == size
+    assert uploaded.sha256 == hashlib.sha256(b"x" * size).hexdigest()
+    assert s3_client.upload_part.call_count == 3
+    s3_client.put_object.assert_not_called()
+    parts = s3_client.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+    assert parts == [
+        {"PartNumber": 1, "ETag": "etag-1"},
+        {"PartNumber": 2, "ETag": "etag-2"},
+        {"PartNumber": 3, "ETag": "etag-3"},
+    ]
+
+
+def test_stream_upload_aborts_multipart_on_failure() -> None:
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-id"}
+    s3_client.upload_part.side_effect = Exception("Storage unavailable")
+    blob_service = make_blob_service(s3_client)
+    blob_service.part_size = MIN_MULTIPART_PART_SIZE
+
+    with pytest.raises(Exception, match="Storage unavailable"):
+        asyncio.run(
+            blob_service.stream_upload(
+                make_upload_file(MIN_MULTIPART_PART_SIZE * 3), "raw/test.pdf"
+            )
+        )
+
+    s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket=blob_service.bucket_name, Key="raw/test.pdf", UploadId="upload-id"
+    )
+    s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_create_presigned_upload_presigns_each_part() -> None:
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-id"}
+    s3_client.generate_presigned_url.side_effect = (
+        lambda operation, Params, ExpiresIn: f"https://storage/{Params['PartNumber']}"
+    )
+    blob_service = make_blob_service(s3_client)
+    blob_service.part_size = MIN_MULTIPART_PART_SIZE
+
+    presigned = asyncio.run(
+        blob_service.create_presigned_upload("raw/test.pdf", MIN_MULTIPART_PART_SIZE * 2 + 1)
+    )
+
+    assert presigned.upload_id == "upload-id"
+    assert presigned.part_size == MIN_MULTIPART_PART_SIZE
+    assert presigned.part_urls == ["https://storage/1", "https://storage/2", "https://storage/3"]
+
+
+def test_create_presigned_upload_grows_parts_to_stay_under_part_limit() -> None:
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-id"}
+    blob_service = make_blob_service(s3_client)
+    blob_service.part_size = MIN_MULTIPART_PART_SIZE
+    size = MIN_MULTIPART_PART_SIZE * MAX_MULTIPART_PARTS * 2
+
+    presigned = asyncio.run(blob_service.create_presigned_upload("raw/test.pdf", size))
+
+    assert presigned.part_size == MIN_MULTIPART_PART_SIZE * 2
+    assert len(presigned.part_urls) == MAX_MULTIPART_PARTS
@@ -0,0 +1,100 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo import UpdateMany, UpdateOne
+
+from backend.services.bulk_writer import CoalescingWriter
+
+
+def run_updates(writer: CoalescingWriter, *updates: tuple) -> list:
+    async def run():
+        return await asyncio.gather(
+            *(writer.update(*update) for update in updates), return_exceptions=True
+        )
+
+    return asyncio.run(run())
+
+
+def test_updates_are_coalesced_into_one_bulk_write() -> None:
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    writer = CoalescingWriter(collection, flush_interval=0.01)
+
+    run_updates(
+        writer,
+        ({"_id": "a"}, {"$set": {"status": "PROCESSING", "pages_extracted": 0}}),
+        ({"_id": "a"}, {"$inc": {"pages_extracted": 4}, "$push": {"history": "PROCESSING"}}),
+        ({"_id": "a"}, {"$set": {"status": "EXTRACTED"}, "$push": {"history": "EXTRACTED"}}),
+        ({"content_hash": "hash"}, {"$inc": {"pages_extracted": 2}}, True),
+    )
+
+    collection.bulk_write.assert_awaited_once()
+    operations = collection.bulk_write.call_args.args[0]
+    assert operations == [
+        UpdateOne(
+            {"_id": "a"},
+            {
+                "$set": {"status": "EXTRACTED", "pages_extracted": 4},
+                "$push": {"history": {"$each": ["PROCESSING", "EXTRACTED"]}},
+            },
+        ),
+        UpdateMany({"content_hash": "hash"}, {"$inc": {"pages_extracted": 2}}),
+    ]
+
+
+def test_batch_is_flushed_when_full() -> None:
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    writer = CoalescingWriter(collection, flush_interval=60, max_batch_size=2)
+
+    run_updates(
+        writer,
+        ({"_id": "a"}, {"$set": {"status": "QUEUED"}}),
+        ({"_id": "b"}, {"$set": {"status": "QUEUED"}}),
+    )
+
+    collection.bulk_write.assert_awaited_once()
+
+
+def test_write_errors_are_raised_to_every_caller() -> None:
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock(side_effect=Exception("Mongo unavailable"))
+    writer = CoalescingWriter(collection, flush_interval=0.01)
+
+    results = run_updates(
+        writer,
+        ({"_id": "a"}, {"$set": {"status": "QUEUED"}}),
+        ({"_id": "b"}, {"$set": {"status": "QUEUED"}}),
+    )
+
+    assert [str(result) for result in results] == ["Mongo unavailable"] * 2
+
+
+def test_unsupported_operators_are_rejected() -> None:
+    writer = CoalescingWriter(MagicMock())
+
+    with pytest.raises(ValueError):
+        asyncio.run(writer.update({"_id": "a"}, {"$unset": {"error": ""}}))
+
+
+def test_overlapping_status_changes_are_written_in_order() -> None:
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    writer = CoalescingWriter(collection, flush_interval=0.01)
+
+    # The content-level change matches file "a" too, the last change must be applied last
+    run_updates(
+        writer,
+        ({"_id": "a"}, {"$set": {"status": "QUEUED"}}),
+        ({"content_hash": "hash"}, {"$set": {"status": "PROCESSING"}}, True),
+        ({"_id": "a"}, {"$set": {"status": "FAILED"}}),
+    )
+
+    collection.bulk_write.assert_awaited_once()
+    assert collection.bulk_write.call_args.kwargs == {"ordered": True}
+    assert collection.bulk_write.call_args.args[0] == [
+        UpdateOne({"_id": "a"}, {"$set": {"status": "QUEUED"}}),
+        UpdateMany({"content_hash": "hash"}, {"$set": {"status": "PROCESSING"}}),
+        UpdateOne({"_id": "a"}, {"$set": {"status": "FAILED"}}),
+    ]
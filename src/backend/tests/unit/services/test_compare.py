@@ -0,0 +1,119 @@
+import asyncio
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from backend.services import compare
+from backend.services.compare import compare_pages, diff_sequences, get_changed_pages
+from backend.services.fingerprint import fingerprint_pages
+
+
+def apply_opcodes(a: list, b: list, opcodes: list) -> list:
+    result = []
+    a_index = b_index = 0
+    for tag, a_start, a_end, b_start, b_end in opcodes:
+        assert (a_start, b_start) == (a_index, b_index)
+        if tag == "equal":
+            assert a[a_start:a_end] == b[b_start:b_end]
+        result.extend(b[b_start:b_end])
+        a_index, b_index = a_end, b_end
+    assert (a_index, b_index) == (len(a), len(b))
+    return result
+
+
+def test_diff_sequences_covers_both_sequences() -> None:
+    generator = random.Random(7)
+    for _ in range(200):
+        a = [generator.randint(0, 5) for _ in range(generator.randint(0, 25))]
+        b = [generator.randint(0, 5) for _ in range(generator.randint(0, 25))]
+
+        assert apply_opcodes(a, b, diff_sequences(a, b)) == b
+
+
+def test_diff_sequences_anchors_on_unique_elements() -> None:
+    a = ["x", "header", "x", "body", "x", "footer"]
+    b = ["header", "x", "x", "body", "new", "footer"]
+
+    opcodes = diff_sequences(a, b)
+
+    equal = [(a_start, b_start) for tag, a_start, _, b_start, _ in opcodes if tag == "equal"]
+    assert (1, 0) in equal
+    assert ("replace", 4, 5, 4, 5) in opcodes
+
+
+def make_pages(paragraphs: list[str], per_page: int = 3) -> list[dict]:
+    return [
+        {"page_number": index // per_page + 1, "text": "\n\n".join(paragraphs[index:index + per_page])}
+        for index in range(0, len(paragraphs), per_page)
+    ]
+
+
+def test_compare_documents_reports_operations_by_page() -> None:
+    paragraphs = [f"Clause {index}. The parties agree to term number {index} of the contract." for index in range(30)]
+    revised = list(paragraphs)
+    revised[4] = "Clause 4. The parties agree to amended term number 4 of the contract."
+    revised.insert(10, "Clause 9b. A new obligation applies to the supplier.")
+    del revised[21]
+    revised.append(revised.pop(1))
+
+    result = compare_pages(make_pages(paragraphs), make_pages(revised))
+
+    operations = [
+        (operation["type"], operation["a"] and operation["a"]["page_number"], operation["b"] and operation["b"]["page_number"])
+        for operation in result["operations"]
+    ]
+    assert sorted(operations) == [
+        ("delete", 7, None),
+        ("insert", None, 4),
+        ("modify", 2, 2),
+        ("move", 1, 10),
+    ]
+    modify = next(operation for operation in result["operations"] if operation["type"] == "modify")
+    assert modify["changes"] == [{"type": "insert", "a_text": "", "b_text": "amended"}]
+    assert result["summary"] == {
+        "pages_a": 10,
+        "pages_b": 10,
+        "identical_pages": 2,
+        "inserted": 1,
+        "deleted": 1,
+        "modified": 1,
+        "moved": 1,
+        "changed_cells": 0,
+        "changed_images": 0,
+    }
+
+
+def test_compare_documents_skips_identical_pages() -> None:
+    paragraphs = [f"Paragraph {index} of the annual report." for index in range(300)]
+    revised = list(paragraphs)
+    revised[150] = "Paragraph 150 of the annual report, restated."
+
+    result = compare_pages(make_pages(paragraphs), make_pages(revised))
+
+    assert result["summary"]["identical_pages"] == 99
+    assert [operation["type"] for operation in result["operations"]] == ["modify"]
+    assert result["operations"][0]["b"]["page_number"] == 51
+
+
+def test_get_changed_pages_skips_identical_regions() -> None:
+    paragraphs = [f"Paragraph {index} of the annual report." for index in range(30)]
+    revised = list(paragraphs)
+    revised[13] = "Paragraph 13 of the annual report, restated."
+    revised.insert(25, "A paragraph added to the annual report.")
+
+    changed_a, changed_b = get_changed_pages(
+        fingerprint_pages(make_pages(paragraphs)), fingerprint_pages(make_pages(revised))
+    )
+
+    assert changed_a == [5, 9, 10]
+    assert changed_b == [5, 9, 10, 11]
+
+
+def test_compare_files_requires_extracted_files() -> None:
+    file = {"_id": "file-id", "file_name": "draft.pdf", "status": "PROCESSING"}
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(compare.compare_files(file, file))
+
+    assert error.value.status_code == 409
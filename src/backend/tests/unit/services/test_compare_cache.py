@@ -0,0 +1,161 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from botocore.exceptions import ClientError
+from fakeredis import FakeAsyncRedis
+
+from backend.schemas.compare import CompareMode, CompareOptions
+from backend.services.compare import COMPARE_ENGINE_VERSION
+from backend.services.compare_cache import (
+    HOT_BYTES_KEY,
+    HOT_KEY_PREFIX,
+    CompareResultCache,
+    compress_result,
+    decompress_result,
+    get_compare_key,
+)
+
+FILE_A = {"_id": "file-a", "file_name": "v1.pdf", "content_hash": "hash-a"}
+FILE_B = {"_id": "file-b", "file_name": "v2.pdf", "content_hash": "hash-b"}
+
+
+def make_cache(**budgets: int) -> CompareResultCache:
+    cache = CompareResultCache()
+    cache.hot_enabled = True
+    cache.client = FakeAsyncRedis()
+    for name, value in budgets.items():
+        setattr(cache, name, value)
+    return cache
+
+
+def test_compare_key_depends_on_contents_and_options() -> None:
+    key = get_compare_key(FILE_A, FILE_B, CompareOptions())
+
+    assert get_compare_key({**FILE_A, "_id": "copy"}, FILE_B, CompareOptions()) == key
+    assert get_compare_key(FILE_B, FILE_A, CompareOptions()) != key
+    assert get_compare_key(FILE_A, FILE_B, CompareOptions(detect_moves=False)) != key
+    assert get_compare_key(FILE_A, FILE_B, CompareOptions(mode=CompareMode.VISUAL)) != key
+    with patch("backend.services.compare_cache.COMPARE_ENGINE_VERSION", COMPARE_ENGINE_VERSION + 1):
+        assert get_compare_key(FILE_A, FILE_B, CompareOptions()) != key
+
+
+def test_results_are_stored_compressed() -> None:
+    result = {"operations": [{"type": "insert", "text": "Clause 12. " * 20}] * 200}
+
+    data = compress_result(result)
+
+    assert decompress_result(data) == result
+    assert len(data) < len(str(result)) / 20
+
+
+def test_hot_tier_evicts_least_recently_used_results() -> None:
+    cache = make_cache(hot_max_bytes=350, hot_max_entry_bytes=200)
+
+    async def run() -> tuple:
+        for key in ("a", "b", "c"):
+            await cache._put_hot(key, b"x" * 100)
+            await asyncio.sleep(0.01)
+        # Reading "a" makes "b" the least recently used result
+        await cache._get_hot("a")
+        await cache._put_hot("d", b"x" * 100)
+        await cache._put_hot("e", b"x" * 201)
+        cached = [key for key in "abcde" if await cache._get_hot(key) is not None]
+        return cached, int(await cache.client.get(HOT_BYTES_KEY))
+
+    cached, total_size = asyncio.run(run())
+
+    assert cached == ["a", "c", "d"]
+    assert total_size == 300
+
+
+def test_cold_hits_are_promoted_to_the_hot_tier() -> None:
+    cache = make_cache()
+    result = {"engine_version": COMPARE_ENGINE_VERSION, "summary": {}, "operations": []}
+    mongo_service = AsyncMock()
+    mongo_service.touch_compare_result.return_value = {"blob_path": "compare-results/key.json.gz"}
+    blob_service = AsyncMock()
+    blob_service.download_bytes.return_value = compress_result(result)
+
+    async def run() -> tuple:
+        with (
+            patch("backend.services.compare_cache.get_mongo_service", return_value=mongo_service),
+            patch("backend.services.compare_cache.get_blob_service", return_value=blob_service),
+        ):
+            first = await cache.get("key")
+            second = await cache.get("key")
+        return first, second, await cache.client.exists(f"{HOT_KEY_PREFIX}:key")
+
+    first, second, promoted = asyncio.run(run())
+
+    assert first == second == result
+    assert promoted
+    blob_service.download_bytes.assert_awaited_once()
+
+
+def test_results_evicted_meanwhile_are_misses() -> None:
+    cache = make_cache()
+    cache.hot_enabled = False
+    mongo_service = AsyncMock()
+    mongo_service.touch_compare_result.return_value = {"blob_path": "compare-results/key.json.gz"}
+    blob_service = AsyncMock()
+    blob_service.download_bytes.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+    )
+
+    with (
+        patch("backend.services.compare_cache.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.compare_cache.get_blob_service", return_value=blob_service),
+    ):
+        assert asyncio.run(cache.get("key")) is None
+
+    mongo_service.delete_compare_results.assert_awaited_once_with(["key"])
+
+
+def test_get_or_compare_compares_once() -> None:
+    cache = make_cache()
+    result = {"engine_version": COMPARE_ENGINE_VERSION, "summary": {}, "operations": []}
+    mongo_service = AsyncMock()
+    mongo_service.touch_compare_result.return_value = None
+    mongo_service.get_compare_results_size.return_value = 0
+    compare_files = AsyncMock(return_value=result)
+
+    async def run() -> list:
+        with (
+            patch("backend.services.compare_cache.get_mongo_service", return_value=mongo_service),
+            patch("backend.services.compare_cache.get_blob_service", return_value=AsyncMock()),
+            patch("backend.services.compare_cache.compare_files", compare_files),
+        ):
+            return [
+                await cache.get_or_compare(FILE_A, FILE_B, CompareOptions()) for _ in range(2)
+            ]
+
+    assert asyncio.run(run()) == [result, result]
+    compare_files.assert_awaited_once()
+    saved = mongo_service.save_compare_result.await_args.args
+    assert saved[0] == get_compare_key(FILE_A, FILE_B, CompareOptions())
+    assert saved[1]["engine_version"] == COMPARE_ENGINE_VERSION
+
+
+def test_cold_tier_evicts_older_engine_versions_first() -> None:
+    cache = make_cache(cold_max_bytes=300)
+    cache.hot_enabled = False
+    old = [{"_id": "old", "blob_path": "compare-results/old.json.gz", "size": 100}]
+    recent = [
+        {"_id": "lru", "blob_path": "compare-results/lru.json.gz", "size": 100},
+        {"_id": "mru", "blob_path": "compare-results/mru.json.gz", "size": 100},
+    ]
+    mongo_service = AsyncMock()
+    mongo_service.get_compare_results_size.return_value = 500
+    mongo_service.get_least_recent_compare_results.side_effect = [old, [], recent]
+    mongo_service.delete_compare_results.side_effect = lambda keys: 100 * len(keys)
+    blob_service = MagicMock()
+
+    with (
+        patch("backend.services.compare_cache.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.compare_cache.get_blob_service", return_value=blob_service),
+    ):
+        asyncio.run(cache._evict_cold())
+
+    deleted = [call.args[0] for call in mongo_service.delete_compare_results.await_args_list]
+    assert deleted == [["old"], ["lru"]]
+    blob_service.delete_files.assert_called_with(["compare-results/lru.json.gz"])
@@ -0,0 +1,80 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from backend.schemas.compare import CompareOptions
+from backend.services.compare_cache import get_compare_key
+from backend.services.compare_jobs import CompareJobService
+from backend.services.job_queue import Job, JobState
+
+FILE_A = {"_id": "file-a", "file_name": "v1.pdf", "content_hash": "hash-a"}
+FILE_B = {"_id": "file-b", "file_name": "v2.pdf", "content_hash": "hash-b"}
+
+
+def submit(queue: AsyncMock, cached_keys: set, priority: int = 0) -> tuple:
+    mongo_service = AsyncMock()
+    cache = AsyncMock()
+    cache.get_cached_keys.return_value = cached_keys
+    with (
+        patch("backend.services.compare_jobs.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.compare_jobs.get_compare_cache", return_value=cache),
+    ):
+        service = CompareJobService(queue=queue)
+        service.start = AsyncMock()
+        job = asyncio.run(service.submit(FILE_A, FILE_B, CompareOptions(), "user", priority))
+    return job, mongo_service
+
+
+def test_identical_pending_submissions_collapse_into_one_job() -> None:
+    key = get_compare_key(FILE_A, FILE_B, CompareOptions())
+    queue = AsyncMock()
+    queue.enqueue.return_value = False
+    queue.get_jobs.return_value = {key: Job(key, "user", {}, 1, state=JobState.RUNNING)}
+
+    job, mongo_service = submit(queue, set(), priority=5)
+
+    assert job["state"] == "running"
+    assert job["compare_key"] == key
+    mongo_service.save_compare_job.assert_awaited_once()
+    queue.raise_priority.assert_awaited_once_with(key, 5)
+
+
+def test_stored_compares_are_not_queued_again() -> None:
+    key = get_compare_key(FILE_A, FILE_B, CompareOptions())
+    queue = AsyncMock()
+    queue.get_jobs.return_value = {}
+
+    job, _ = submit(queue, {key})
+
+    assert job["state"] == "done"
+    queue.enqueue.assert_not_awaited()
+
+
+def test_compare_job_caches_its_result() -> None:
+    queue = AsyncMock()
+    mongo_service = AsyncMock()
+    mongo_service.get_file_metadata.side_effect = [FILE_A, FILE_B]
+    cache = AsyncMock()
+    job = Job("key", "user", {"file_id_a": "file-a", "file_id_b": "file-b", "options": {}}, 1, "lease")
+
+    with (
+        patch("backend.services.compare_jobs.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.compare_jobs.get_compare_cache", return_value=cache),
+    ):
+        asyncio.run(CompareJobService(queue=queue)._run_job(job))
+
+    cache.get_or_compare.assert_awaited_once_with(FILE_A, FILE_B, CompareOptions(), key="key")
+    queue.complete.assert_awaited_once_with("key", "lease")
+    queue.fail.assert_not_awaited()
+
+
+def test_compare_job_is_retried_on_error() -> None:
+    queue = AsyncMock()
+    mongo_service = AsyncMock()
+    mongo_service.get_file_metadata.return_value = None
+    job = Job("key", "user", {"file_id_a": "file-a", "file_id_b": "file-b", "options": {}}, 2, "lease")
+
+    with patch("backend.services.compare_jobs.get_mongo_service", return_value=mongo_service):
+        asyncio.run(CompareJobService(queue=queue)._run_job(job))
+
+    queue.fail.assert_awaited_once_with("key", 2, "A compared file was deleted.", "lease")
+    queue.complete.assert_not_awaited()
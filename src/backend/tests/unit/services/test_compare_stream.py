@@ -0,0 +1,124 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.schemas.compare import CompareOptions
+from backend.services.compare import compare_pages
+from backend.services.compare_stream import (
+    _iter_in_order,
+    batch_regions,
+    stream_compare,
+)
+from backend.services.fingerprint import fingerprint_pages
+
+
+def make_pages(paragraphs: list[str], per_page: int = 2) -> list[dict]:
+    return [
+        {"page_number": index // per_page + 1, "text": "\n\n".join(paragraphs[index:index + per_page])}
+        for index in range(0, len(paragraphs), per_page)
+    ]
+
+
+def collect_events(pages_a: list[dict], pages_b: list[dict], batch_pages: int) -> list[tuple]:
+    fingerprints = {"a": fingerprint_pages(pages_a), "b": fingerprint_pages(pages_b)}
+    texts = {
+        "a": {page["page_number"]: page["text"] for page in pages_a},
+        "b": {page["page_number"]: page["text"] for page in pages_b},
+    }
+
+    async def get_page_fingerprints(file):
+        return fingerprints[file["_id"]]
+
+    async def get_page_texts(file, page_numbers):
+        return {page_number: texts[file["_id"]][page_number] for page_number in page_numbers}
+
+    async def get_compared_images(file_a, file_b, options):
+        return None, None
+
+    settings = MagicMock()
+    settings.get.return_value = batch_pages
+    cache = AsyncMock()
+    cache.get.return_value = None
+
+    async def collect():
+        stream = stream_compare({"_id": "a"}, {"_id": "b"}, CompareOptions())
+        return [(event["event"], json.loads(event["data"])) async for event in stream]
+
+    with (
+        patch("backend.services.compare_stream.get_page_fingerprints", get_page_fingerprints),
+        patch("backend.services.compare_stream.get_page_texts", get_page_texts),
+        patch("backend.services.compare_stream.get_compared_images", get_compared_images),
+        patch("backend.services.compare_stream.get_process_pool", return_value=None),
+        patch("backend.services.compare_stream.Settings", return_value=settings),
+        patch("backend.services.compare_stream.get_compare_cache", return_value=cache),
+    ):
+        events = asyncio.run(collect())
+    # The streamed result is cached with its moves, as a single compare returns it
+    assert cache.put.await_args.args[1]["summary"] == events[-1][1]["summary"]
+    return events
+
+
+def test_stream_compare_sends_the_changes_of_each_batch() -> None:
+    paragraphs = [f"Section {index}. The borrower shall comply with covenant {index}." for index in range(60)]
+    revised = list(paragraphs)
+    revised[3] = "Section 3. The borrower shall comply with amended covenant 3."
+    revised[30] = "Section 30. A new covenant applies to the borrower."
+    revised[50:52] = [revised[51], revised[50]]
+    revised.append(revised.pop(10))
+
+    events = collect_events(make_pages(paragraphs), make_pages(revised), batch_pages=2)
+
+    names = [name for name, _ in events]
+    assert names[0] == "progress" and names[-1] == "summary"
+    batches = [data for name, data in events if name == "pages"]
+    assert len(batches) > 1
+    progress = [data for name, data in events if name == "progress"]
+    assert progress[-1]["completed_pages"] == progress[-1]["total_pages"]
+
+    # Applying the moves to the streamed operations gives the operations of a single compare
+    _, summary = events[-1]
+    moves = summary["moves"]
+    moved_a = {json.dumps(move["a"]) for move in moves}
+    moved_b = {json.dumps(move["b"]) for move in moves}
+    operations = [
+        operation
+        for batch in batches
+        for operation in batch["operations"]
+        if not (operation["type"] == "delete" and json.dumps(operation["a"]) in moved_a)
+        and not (operation["type"] == "insert" and json.dumps(operation["b"]) in moved_b)
+    ]
+    expected = compare_pages(make_pages(paragraphs), make_pages(revised))
+    assert sorted(operation["type"] for operation in operations + moves) == sorted(
+        operation["type"] for operation in expected["operations"]
+    )
+    assert summary["summary"] == expected["summary"]
+
+
+def test_batch_regions_keeps_regions_whole() -> None:
+    regions = [([{}] * 3, [{}] * 3), ([{}], []), ([], [{}]), ([{}] * 10, [{}] * 9)]
+
+    batches = batch_regions(regions, batch_pages=4)
+
+    assert [len(batch) for batch in batches] == [1, 3]
+
+
+def test_iter_in_order_cancels_pending_work_when_closed() -> None:
+    started = []
+
+    async def work(index: int) -> int:
+        started.append(index)
+        await asyncio.sleep(0.01 * (3 - index % 3))
+        return index
+
+    async def consume() -> list:
+        results = []
+        iterator = _iter_in_order((work(index) for index in range(10)), max_pending=2)
+        async for result in iterator:
+            results.append(result)
+            if len(results) == 2:
+                break
+        await iterator.aclose()
+        return results
+
+    assert asyncio.run(consume()) == [0, 1]
+    assert len(started) <= 4
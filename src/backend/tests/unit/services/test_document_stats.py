@@ -0,0 +1,36 @@
+from backend.services import document_stats
+from backend.services.file import parse_document
+
+PDF_PATH = "src/backend/tests/unit/test_data/Mariana_Trench.pdf"
+
+
+def test_get_document_stats() -> None:
+    text = "The trench is the deepest part of the ocean, and it is in the Pacific. " * 10
+
+    stats = document_stats.get_document_stats(text, page_count=3)
+
+    assert stats["word_count"] == 150
+    assert stats["token_count"] == document_stats.estimate_token_count(text)
+    assert 150 < stats["token_count"] < 300
+    assert stats["page_count"] == 3
+    assert stats["language"] == "en"
+    assert stats["preview"] == " ".join(text.split()[:25])
+
+
+def test_detect_language_by_script_and_stopwords() -> None:
+    assert document_stats.detect_language("Die Katze ist nicht in dem Haus und der Hund auch nicht.") == "de"
+    assert document_stats.detect_language("El informe de la empresa y los resultados del año.") == "es"
+    assert document_stats.detect_language("これは日本語の文書です。東京で書きました。") == "ja"
+    assert document_stats.detect_language("这是一份中文文件，我们在北京写的。") == "zh"
+    assert document_stats.detect_language("Отчёт о работе компании за год.") == "ru"
+    assert document_stats.detect_language("12 345 67") is None
+    assert document_stats.detect_language("") is None
+
+
+def test_parse_document_counts_pdf_pages() -> None:
+    with open(PDF_PATH, "rb") as file:
+        document = parse_document("Mariana_Trench.pdf", file.read())
+
+    assert document.stats["page_count"] == 9
+    assert document.stats["word_count"] == len(document.text.split())
+    assert document.stats["language"] == "en"
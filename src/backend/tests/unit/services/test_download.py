@@ -0,0 +1,108 @@
+import asyncio
+import io
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from backend.services.blob import BlobService
+from backend.services.download import download_stored_file
+
+CONTENT = b"%PDF-1.7 stored content"
+FILE = {
+    "_id": "file-id",
+    "file_name": "report.pdf",
+    "file_size": len(CONTENT),
+    "blob_path": "raw/file-id/report.pdf",
+    "content_hash": "content-hash",
+}
+
+
+def make_blob_service(s3_client: MagicMock) -> BlobService:
+    with patch("backend.services.blob.boto3.client", return_value=s3_client):
+        return BlobService()
+
+
+def get_object(Bucket, Key, Range=None, IfNoneMatch=None) -> dict:
+    start, end = 0, len(CONTENT) - 1
+    response = {}
+    if Range:
+        first, last = Range.removeprefix("bytes=").split("-")
+        start, end = int(first), min(int(last or end), end)
+        if start >= len(CONTENT):
+            raise ClientError({"Error": {"Code": "InvalidRange"}}, "GetObject")
+        response["ContentRange"] = f"bytes {start}-{end}/{len(CONTENT)}"
+    part = CONTENT[start:end + 1]
+    return {
+        **response,
+        "Body": StreamingBody(io.BytesIO(part), len(part)),
+        "ContentLength": len(part),
+        "ETag": '"storage-etag"',
+    }
+
+
+def run_download(s3_client: MagicMock, settings: MagicMock | None = None, **headers):
+    blob_service = make_blob_service(s3_client)
+    settings = settings or MagicMock(get=MagicMock(return_value=None))
+
+    async def download():
+        response = await download_stored_file(FILE, **headers)
+        body = b""
+        if hasattr(response, "body_iterator"):
+            body = b"".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    with (
+        patch("backend.services.download.get_blob_service", return_value=blob_service),
+        patch("backend.services.download.Settings", return_value=settings),
+    ):
+        return asyncio.run(download())
+
+
+def test_download_streams_requested_range() -> None:
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = get_object
+
+    response, body = run_download(s3_client, range_header="bytes=0-7")
+
+    assert response.status_code == 206
+    assert body == CONTENT[:8]
+    assert response.headers["content-range"] == f"bytes 0-7/{len(CONTENT)}"
+    assert response.headers["content-length"] == "8"
+    assert response.headers["etag"] == '"content-hash"'
+    assert response.headers["content-type"] == "application/pdf"
+    assert s3_client.get_object.call_args.kwargs["Range"] == "bytes=0-7"
+
+
+def test_download_unsatisfiable_range_returns_416() -> None:
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = get_object
+
+    response, _ = run_download(s3_client, range_header="bytes=1000-")
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_download_matching_etag_is_not_modified_without_storage_read() -> None:
+    s3_client = MagicMock()
+
+    response, body = run_download(s3_client, if_none_match='W/"other", "content-hash"')
+
+    assert response.status_code == 304
+    assert body == b""
+    s3_client.get_object.assert_not_called()
+
+
+def test_download_redirects_to_presigned_url_when_configured() -> None:
+    s3_client = MagicMock()
+    s3_client.generate_presigned_url.return_value = "https://storage/raw/file-id/report.pdf"
+    settings = MagicMock(get=MagicMock(side_effect=lambda key: key == "blob.download_redirect"))
+
+    response, _ = run_download(s3_client, settings)
+
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://storage/raw/file-id/report.pdf"
+    params = s3_client.generate_presigned_url.call_args.kwargs["Params"]
+    assert params["ResponseContentDisposition"].startswith('inline; filename="report.pdf"')
+    s3_client.get_object.assert_not_called()
@@ -0,0 +1,283 @@
+import asyncio
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.services.extraction import (
+    ExternalExtractionService,
+    ExtractionJob,
+    LocalExtractionService,
+    get_extraction_service,
+)
+from backend.services.fingerprint import fingerprint_page
+from backend.services.job_queue import Job
+
+PDF_PATH = "src/backend/tests/unit/test_data/Mariana_Trench.pdf"
+
+
+def make_blob_service(source_path: str = PDF_PATH) -> MagicMock:
+    async def download_to_file(object_name, file_path):
+        shutil.copyfile(source_path, file_path)
+
+    blob_service = MagicMock()
+    blob_service.download_to_file = AsyncMock(side_effect=download_to_file)
+    return blob_service
+
+
+def run_extraction(
+    job: ExtractionJob | Job,
+    blob_service: MagicMock,
+    mongo_service: MagicMock,
+    queue: AsyncMock | None = None,
+) -> None:
+    with (
+        patch("backend.services.extraction.get_blob_service", return_value=blob_service),
+        patch("backend.services.extraction.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.extraction.visual_diff.delete_page_rasters", AsyncMock()),
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        extraction_service = LocalExtractionService(executor=executor, queue=queue or AsyncMock())
+        extraction_service.pages_per_task = 4
+        if isinstance(job, Job):
+            asyncio.run(extraction_service._run_job(job))
+        else:
+            asyncio.run(extraction_service.run(job))
+
+
+def get_statuses(mongo_service: MagicMock) -> list[str]:
+    return [
+        call.args[2]["status"]
+        for call in mongo_service.update_extraction_state.call_args_list
+        if "status" in call.args[2]
+    ]
+
+
+def test_extract_pdf_stores_every_page() -> None:
+    mongo_service = AsyncMock()
+
+    run_extraction(
+        ExtractionJob("file-id", "raw/file-id/Mariana_Trench.pdf", "content-hash"),
+        make_blob_service(),
+        mongo_service,
+    )
+
+    saved_pages = [
+        page
+        for call in mongo_service.save_pages.call_args_list
+        for page in call.args[1]
+    ]
+    assert all(call.args[0] == "content-hash" for call in mongo_service.save_pages.call_args_list)
+    assert [page["page_number"] for page in saved_pages] == list(range(1, 10))
+    assert all(page["text"] for page in saved_pages)
+    offsets = [page["char_offset"] for page in saved_pages]
+    assert offsets == [0] + list(accumulate(len(page["text"]) for page in saved_pages[:-1]))
+    assert mongo_service.save_pages.await_count == 3
+    assert get_statuses(mongo_service) == ["PROCESSING", "EXTRACTED"]
+    assert mongo_service.update_extraction_state.call_args.args[2]["page_count"] == 9
+    increments = [
+        call.kwargs["increments"]
+        for call in mongo_service.update_extraction_state.call_args_list
+        if call.kwargs.get("increments")
+    ]
+    # Words are counted per stored range of pages
+    assert [increment["word_count"] for increment in increments] == [
+        len("".join(page["text"] for page in call.args[1]).split())
+        for call in mongo_service.save_pages.call_args_list
+    ]
+    first_range_fields = next(
+        call.args[2]
+        for call in mongo_service.update_extraction_state.call_args_list
+        if "preview" in call.args[2]
+    )
+    assert first_range_fields["language"] == "en"
+    mongo_service.delete_fingerprints.assert_awaited_once_with("content-hash")
+    saved_fingerprints = [
+        fingerprint
+        for call in mongo_service.save_page_fingerprints.call_args_list
+        for fingerprint in call.args[2]
+    ]
+    assert saved_fingerprints == [
+        fingerprint_page(page["page_number"], page["text"]) for page in saved_pages
+    ]
+
+
+def test_extract_text_document_stores_single_page(tmp_path) -> None:
+    source_path = tmp_path / "notes.txt"
+    source_path.write_text("Some notes")
+    mongo_service = AsyncMock()
+
+    run_extraction(
+        ExtractionJob("file-id", "raw/file-id/notes.txt"),
+        make_blob_service(str(source_path)),
+        mongo_service,
+    )
+
+    mongo_service.save_pages.assert_awaited_once_with(
+        "file-id", [{"page_number": 1, "text": "Some notes", "char_offset": 0}]
+    )
+    assert get_statuses(mongo_service) == ["PROCESSING", "EXTRACTED"]
+
+
+def make_queued_job(attempts: int) -> Job:
+    payload = {
+        "file_id": "file-id",
+        "blob_path": "raw/file-id/Mariana_Trench.pdf",
+        "content_hash": "content-hash",
+    }
+    return Job("content-hash", "user", payload, attempts, "lease-id")
+
+
+def test_extraction_job_completes_on_success() -> None:
+    queue = AsyncMock()
+
+    run_extraction(make_queued_job(1), make_blob_service(), AsyncMock(), queue)
+
+    queue.complete.assert_awaited_once_with("content-hash", "lease-id")
+    queue.fail.assert_not_awaited()
+
+
+def test_trigger_extraction_leaves_status_of_active_job() -> None:
+    mongo_service = AsyncMock()
+    queue = AsyncMock()
+    queue.enqueue.return_value = False
+
+    with patch("backend.services.extraction.get_mongo_service", return_value=mongo_service):
+        extraction_service = LocalExtractionService(queue=queue)
+        extraction_service.start = AsyncMock()
+        queued = asyncio.run(
+            extraction_service.trigger_extraction("file", "raw/file.pdf", "content-hash")
+        )
+
+    assert not queued
+    mongo_service.update_extraction_state.assert_not_awaited()
+
+
+def test_extraction_job_is_retried_on_error() -> None:
+    blob_service = MagicMock()
+    blob_service.download_to_file = AsyncMock(side_effect=Exception("Object not found"))
+    mongo_service = AsyncMock()
+    queue = AsyncMock()
+    queue.fail.return_value = True
+
+    run_extraction(make_queued_job(1), blob_service, mongo_service, queue)
+
+    queue.fail.assert_awaited_once_with("content-hash", 1, "Object not found", "lease-id")
+    queue.complete.assert_not_awaited()
+    assert get_statuses(mongo_service) == ["PROCESSING", "QUEUED"]
+    mongo_service.save_pages.assert_not_awaited()
+
+
+def test_extraction_job_marks_file_failed_after_last_attempt() -> None:
+    blob_service = MagicMock()
+    blob_service.download_to_file = AsyncMock(side_effect=Exception("Object not found"))
+    mongo_service = AsyncMock()
+    queue = AsyncMock()
+    queue.fail.return_value = False
+
+    run_extraction(make_queued_job(5), blob_service, mongo_service, queue)
+
+    assert get_statuses(mongo_service) == ["PROCESSING", "FAILED"]
+    assert mongo_service.update_extraction_state.call_args.args[2]["error"] == "Object not found"
+
+
+def run_ingestion(job: Job, mongo_service: AsyncMock, queue: AsyncMock, **kwargs) -> dict:
+    queue.get_job.return_value = job
+    with patch("backend.services.extraction.get_mongo_service", return_value=mongo_service):
+        extraction_service = LocalExtractionService(queue=queue)
+        return asyncio.run(extraction_service.ingest_results(job.id, **kwargs))
+
+
+def test_ingest_results_stores_pages_as_they_arrive() -> None:
+    job = make_queued_job(1)
+    job.state = "running"
+    mongo_service = AsyncMock()
+    mongo_service.save_pages.return_value = 2
+    queue = AsyncMock()
+    pages = [{"page_number": 1, "text": "First"}, {"page_number": 2, "text": "Second"}]
+
+    result = run_ingestion(job, mongo_service, queue, pages=pages, page_count=9)
+
+    assert result == {"job_state": "running", "pages_stored": 2}
+    mongo_service.save_pages.assert_awaited_once_with("content-hash", pages)
+    queue.renew.assert_awaited_once_with("content-hash")
+    queue.complete.assert_not_awaited()
+    mongo_service.update_extraction_state.assert_awaited_once_with(
+        "file-id",
+        "content-hash",
+        {"page_count": 9, "status": "PROCESSING"},
+        increments={"pages_extracted": 2},
+    )
+
+
+def test_ingest_results_completes_job_on_last_call() -> None:
+    job = make_queued_job(1)
+    job.state = "running"
+    mongo_service = AsyncMock()
+    mongo_service.save_pages.return_value = 0
+    queue = AsyncMock()
+
+    result = run_ingestion(job, mongo_service, queue, pages=[], status="EXTRACTED")
+
+    assert result["job_state"] == "done"
+    queue.complete.assert_awaited_once_with("content-hash")
+    assert get_statuses(mongo_service) == ["EXTRACTED"]
+
+
+def test_ingest_results_leaves_status_of_ended_job() -> None:
+    job = make_queued_job(1)
+    job.state = "done"
+    mongo_service = AsyncMock()
+    mongo_service.save_pages.return_value = 1
+    queue = AsyncMock()
+
+    result = run_ingestion(
+        job, mongo_service, queue, pages=[{"page_number": 3, "text": "Late"}], status="FAILED"
+    )
+
+    assert result == {"job_state": "done", "pages_stored": 1}
+    queue.fail.assert_not_awaited()
+    assert get_statuses(mongo_service) == []
+
+
+def test_extract_table_stores_parquet_artifacts_instead_of_pages(tmp_path) -> None:
+    source_path = tmp_path / "ledger.csv"
+    source_path.write_text("id,amount\n" + "".join(f"{index},{index * 2}\n" for index in range(450)))
+    blob_service = make_blob_service(str(source_path))
+    blob_service.upload_local_file = AsyncMock()
+    mongo_service = AsyncMock()
+
+    run_extraction(
+        ExtractionJob("file-id", "raw/file-id/ledger.csv", "content-hash"),
+        blob_service,
+        mongo_service,
+    )
+
+    blob_service.upload_local_file.assert_awaited_once()
+    assert blob_service.upload_local_file.call_args.args[1] == "tables/content-hash/0.parquet"
+    mongo_service.save_pages.assert_not_awaited()
+    content_key, manifest = mongo_service.save_table_manifest.call_args.args
+    assert content_key == "content-hash"
+    assert manifest["rows_per_page"] == 200
+    assert manifest["sheets"][0]["num_rows"] == 450
+    assert manifest["sheets"][0]["blob_path"] == "tables/content-hash/0.parquet"
+    assert get_statuses(mongo_service) == ["PROCESSING", "EXTRACTED"]
+    assert mongo_service.update_extraction_state.call_args.args[2]["page_count"] == 3
+    content_key, version, fingerprints = mongo_service.save_page_fingerprints.call_args.args
+    assert [fingerprint["page_number"] for fingerprint in fingerprints] == [1, 2, 3]
+
+
+def test_external_mode_extracts_locally_without_service_url(monkeypatch) -> None:
+    settings = MagicMock()
+    settings.get.return_value = "external"
+    local_service, external_service = MagicMock(), MagicMock()
+    monkeypatch.delenv("EXTRACTION_SERVICE_URL", raising=False)
+
+    with (
+        patch("backend.services.extraction.Settings", return_value=settings),
+        patch.object(LocalExtractionService, "get_instance", return_value=local_service),
+        patch.object(ExternalExtractionService, "get_instance", return_value=external_service),
+    ):
+        assert get_extraction_service() is local_service
+        monkeypatch.setenv("EXTRACTION_SERVICE_URL", "http://extraction/api/extract")
+        assert get_extraction_service() is external_service
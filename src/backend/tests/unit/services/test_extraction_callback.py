@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from backend.services.request_validators import validate_extraction_callback_token
+
+
+def validate(token: str | None, configured_token: str | None) -> None:
+    settings = MagicMock()
+    settings.get.return_value = configured_token
+    with patch("backend.services.request_validators.Settings", return_value=settings):
+        validate_extraction_callback_token(token)
+
+
+def test_callbacks_are_rejected_without_configured_token() -> None:
+    with pytest.raises(HTTPException) as exc:
+        validate("any-token", None)
+    assert exc.value.status_code == 503
+
+
+def test_callbacks_with_wrong_token_are_rejected() -> None:
+    with pytest.raises(HTTPException) as exc:
+        validate("wrong-token", "secret")
+    assert exc.value.status_code == 401
+
+    with pytest.raises(HTTPException):
+        validate(None, "secret")
+
+
+def test_callbacks_with_configured_token_are_accepted() -> None:
+    validate("secret", "secret")
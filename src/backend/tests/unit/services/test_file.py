@@ -0,0 +1,154 @@
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+
+from backend.database_models.file import File as FileModel
+from backend.services import file as file_service
+
+
+def make_settings(**values) -> MagicMock:
+    return MagicMock(get=MagicMock(side_effect=lambda key: values.get(key)))
+
+
+def test_get_file_content_parses_in_pool_within_cap() -> None:
+    running, max_running = 0, 0
+    lock = threading.Lock()
+
+    def parse_file_contents(file_name, file_contents):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return f"{file_name}: {file_contents.decode()}"
+
+    files = [
+        UploadFile(file=io.BytesIO(b"content"), filename=f"{index}.txt") for index in range(6)
+    ]
+
+    async def parse_all():
+        return await asyncio.gather(*(file_service.get_file_content(file) for file in files))
+
+    with (
+        ThreadPoolExecutor(max_workers=6) as executor,
+        patch.object(file_service, "get_process_pool", return_value=executor),
+        patch.object(file_service, "parse_file_contents", parse_file_contents),
+        patch.object(
+            file_service,
+            "Settings",
+            return_value=make_settings(**{"upload.max_concurrent_parses": 2}),
+        ),
+    ):
+        contents = asyncio.run(parse_all())
+
+    assert [content.text for content in contents] == [f"{index}.txt: content" for index in range(6)]
+    assert contents[0].stats["word_count"] == 2
+    assert max_running == 2
+
+
+def test_parse_timeout_fails_file_and_keeps_slot_until_worker_ends() -> None:
+    release = threading.Event()
+
+    def parse_file_contents(file_name, file_contents):
+        release.wait(5)
+        return "late"
+
+    async def parse():
+        with pytest.raises(ValueError, match="timed out"):
+            await file_service.parse_file_in_process_pool("big.xlsx", b"", timeout=0.05)
+        slots = file_service.get_parse_slots()
+        assert slots.locked()
+        release.set()
+        await asyncio.sleep(0.1)
+        assert not slots.locked()
+
+    with (
+        ThreadPoolExecutor(max_workers=1) as executor,
+        patch.object(file_service, "get_process_pool", return_value=executor),
+        patch.object(file_service, "parse_file_contents", parse_file_contents),
+        patch.object(
+            file_service,
+            "Settings",
+            return_value=make_settings(**{"upload.max_concurrent_parses": 1}),
+        ),
+    ):
+        asyncio.run(parse())
+
+
+def test_insert_files_stores_contents_in_blob_storage() -> None:
+    blob_service = MagicMock(upload_bytes=AsyncMock())
+    files = [UploadFile(file=io.BytesIO("naïve\x00 text".encode()), filename="notes.txt", size=12)]
+    document = file_service.parse_document("notes.txt", "naïve\x00 text".encode())
+
+    with (
+        patch.object(file_service, "get_blob_service", return_value=blob_service),
+        patch.object(file_service.file_crud, "batch_create_files", side_effect=lambda session, files: files),
+        patch.object(file_service, "get_file_content", AsyncMock(return_value=document)),
+    ):
+        [file] = asyncio.run(file_service.insert_files_in_db(MagicMock(), files, "user-id"))
+
+    assert file.content_path == f"file_contents/{file.id}.txt"
+    assert file.content_length == len("naïve text".encode())
+    assert file.file_content is None
+    assert (file.word_count, file.token_count, file.page_count, file.preview) == (2, 3, None, "naïve text")
+    blob_service.upload_bytes.assert_awaited_once_with("naïve text".encode(), file.content_path)
+
+
+def test_read_file_text_reads_byte_ranges() -> None:
+    content = "naïve text".encode()
+    blob_service = MagicMock(
+        read_file_range=MagicMock(side_effect=lambda path, start, length: content[start:start + length])
+    )
+    file = FileModel(id="file-id", content_path="file_contents/file-id.txt", content_length=len(content))
+    legacy_file = FileModel(id="legacy-id", file_content="naïve text")
+
+    with patch.object(file_service, "get_blob_service", return_value=blob_service):
+        assert asyncio.run(file_service.get_file_text(file)) == "naïve text"
+        # The range cuts through "ï", which is dropped
+        assert file_service.read_file_text(file, start=0, length=3) == "na"
+        assert file_service.read_file_text(file, start=7, length=100) == "text"
+        assert file_service.read_file_text(file, start=100) == ""
+        assert file_service.read_file_text(legacy_file, start=6) == " text"
+
+    assert blob_service.read_file_range.call_args_list[-1].args == ("file_contents/file-id.txt", 7, 4)
+
+
+def test_file_contents_are_deleted_after_their_rows() -> None:
+    calls = []
+    blob_service = MagicMock(delete_files=MagicMock(side_effect=lambda paths: calls.append("blobs")))
+
+    with (
+        patch.object(file_service, "get_blob_service", return_value=blob_service),
+        patch.object(
+            file_service.file_crud, "get_file_content_paths", return_value=["file_contents/a.txt"]
+        ),
+        patch.object(
+            file_service.file_crud,
+            "bulk_delete_files",
+            side_effect=lambda *args: calls.append("rows"),
+        ),
+    ):
+        asyncio.run(
+            file_service.FileService().delete_all_conversation_files(
+                MagicMock(), "conversation-id", ["a"], "user-id", MagicMock()
+            )
+        )
+
+    assert calls == ["rows", "blobs"]
+    blob_service.delete_files.assert_called_once_with(["file_contents/a.txt"])
+
+
+def test_file_queries_do_not_load_contents() -> None:
+    statement = str(select(FileModel))
+
+    assert "content_path" in statement
+    assert "file_content" not in statement
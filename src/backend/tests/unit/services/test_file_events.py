@@ -0,0 +1,87 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fakeredis import FakeAsyncRedis
+
+from backend.services.event_bus import FileEventBus
+from backend.services.file_events import stream_conversation_file_events
+
+
+def make_file(file_id: str, status: str, pages_extracted: int = 0) -> dict:
+    return {
+        "_id": file_id,
+        "file_name": f"{file_id}.pdf",
+        "content_hash": f"{file_id}-hash",
+        "status": status,
+        "pages_extracted": pages_extracted,
+    }
+
+
+def make_event_bus() -> FileEventBus:
+    event_bus = FileEventBus()
+    event_bus.enabled = True
+    event_bus.client = FakeAsyncRedis(decode_responses=True)
+    return event_bus
+
+
+def test_stream_sends_current_state_then_changes() -> None:
+    event_bus = make_event_bus()
+    mongo_service = MagicMock()
+    mongo_service.get_files_by_conversation_id = AsyncMock(
+        return_value=([make_file("a", "PROCESSING", 2)], None)
+    )
+    mongo_service.get_conversation_files = AsyncMock(
+        return_value=[make_file("a", "PROCESSING", 4)]
+    )
+
+    async def run() -> list[dict]:
+        stream = stream_conversation_file_events("conversation")
+        events = [await stream.__anext__()]
+        # Subscriptions are made once the first files were sent
+        await event_bus.publish([("file_events:content:a-hash", {"content_hash": "a-hash"})])
+        events.append(await asyncio.wait_for(stream.__anext__(), timeout=5))
+        await stream.aclose()
+        return events
+
+    with (
+        patch("backend.services.file_events.get_file_event_bus", return_value=event_bus),
+        patch("backend.services.file_events.get_mongo_service", return_value=mongo_service),
+    ):
+        events = asyncio.run(run())
+
+    assert [event["event"] for event in events] == ["file_status", "file_status"]
+    assert [json.loads(event["data"])["pages_extracted"] for event in events] == [2, 4]
+    mongo_service.get_conversation_files.assert_awaited_once()
+    assert mongo_service.get_conversation_files.call_args.kwargs["content_hashes"] == ["a-hash"]
+
+
+def test_stream_skips_unchanged_files() -> None:
+    event_bus = make_event_bus()
+    mongo_service = MagicMock()
+    mongo_service.get_files_by_conversation_id = AsyncMock(
+        return_value=([make_file("a", "EXTRACTED")], None)
+    )
+    files = {"a": make_file("a", "EXTRACTED"), "b": make_file("b", "QUEUED")}
+    mongo_service.get_conversation_files = AsyncMock(
+        side_effect=lambda conversation_id, file_ids, **kwargs: [
+            files[file_id] for file_id in sorted(file_ids)
+        ]
+    )
+
+    async def run() -> list[dict]:
+        stream = stream_conversation_file_events("conversation")
+        events = [await stream.__anext__()]
+        await event_bus.publish([("file_events:file:a", {"file_id": "a"})])
+        await event_bus.publish([("file_events:conversation:conversation", {"file_id": "b"})])
+        events.append(await asyncio.wait_for(stream.__anext__(), timeout=5))
+        await stream.aclose()
+        return events
+
+    with (
+        patch("backend.services.file_events.get_file_event_bus", return_value=event_bus),
+        patch("backend.services.file_events.get_mongo_service", return_value=mongo_service),
+    ):
+        events = asyncio.run(run())
+
+    assert [json.loads(event["data"])["id"] for event in events] == ["a", "b"]
@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, patch
+
+from backend.services import fingerprint
+from backend.services.fingerprint import (
+    FINGERPRINT_VERSION,
+    estimate_similarity,
+    fingerprint_page,
+    get_paragraphs,
+    get_sketch,
+    split_paragraphs,
+)
+
+
+def test_split_paragraphs_at_blank_lines_and_sentence_ends() -> None:
+    text = "Title\nThe clause continues\non this line.\nNext clause.\n\nA block\nwithout a period"
+
+    paragraphs = split_paragraphs(3, text)
+
+    assert [paragraph.text for paragraph in paragraphs] == [
+        "Title\nThe clause continues\non this line.",
+        "Next clause.",
+        "A block\nwithout a period",
+    ]
+    assert all(text[paragraph.start:paragraph.end] == paragraph.text for paragraph in paragraphs)
+    assert {paragraph.page_number for paragraph in paragraphs} == {3}
+
+
+def test_sketches_estimate_shingle_similarity() -> None:
+    text = "The supplier shall deliver the goods to the buyer within thirty days of the order date."
+    reflowed = "The supplier shall deliver the goods\nto the buyer within thirty days of the order date."
+    amended = "The supplier shall deliver the goods to the buyer within sixty days of the order date."
+    unrelated = "Either party may terminate this agreement by written notice to the other party at any time."
+
+    assert get_sketch(text) == get_sketch(reflowed)
+    assert 0 < estimate_similarity(get_sketch(text), get_sketch(amended)) < 1
+    assert estimate_similarity(get_sketch(text), get_sketch(unrelated)) == 0
+
+
+def test_paragraphs_are_read_back_from_the_fingerprint() -> None:
+    text = "First clause of the page.\nSecond clause of the page.\n\nA closing note"
+
+    page_fingerprint = fingerprint_page(4, text)
+
+    assert get_paragraphs(page_fingerprint, text) == split_paragraphs(4, text)
+
+
+def test_missing_fingerprints_are_computed_once_and_stored() -> None:
+    file = {"_id": "file-id", "content_hash": "content-hash", "page_count": 3}
+    pages = [{"page_number": number, "text": f"Page {number} of the draft."} for number in (1, 2, 3)]
+    mongo_service = AsyncMock()
+    mongo_service.get_page_fingerprints.return_value = [fingerprint_page(2, pages[1]["text"])]
+
+    with (
+        patch("backend.services.fingerprint.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.fingerprint.tabular.get_file_text_pages", AsyncMock(return_value=pages)),
+        ThreadPoolExecutor(max_workers=1) as executor,
+        patch("backend.services.fingerprint.get_process_pool", return_value=executor),
+    ):
+        fingerprints = asyncio.run(fingerprint.get_page_fingerprints(file))
+
+    assert fingerprints == [fingerprint_page(page["page_number"], page["text"]) for page in pages]
+    mongo_service.get_page_fingerprints.assert_awaited_once_with("content-hash", FINGERPRINT_VERSION)
+    content_key, version, stored = mongo_service.save_page_fingerprints.call_args.args
+    assert (content_key, version) == ("content-hash", FINGERPRINT_VERSION)
+    assert [page_fingerprint["page_number"] for page_fingerprint in stored] == [1, 3]
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import random
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from backend.services.image_diff import (
+    BKTree,
+    get_dhashes,
+    get_hamming_distance,
+    get_image_hashes,
+    get_phashes,
+    match_images,
+)
+
+
+def make_chart(bars: list[int]) -> np.ndarray:
+    """
+    Grayscale bar chart on a white background, 128 pixels high
+    """
+    chart = np.full((128, 128), 255, dtype=np.uint8)
+    width = 128 // len(bars)
+    for index, height in enumerate(bars):
+        chart[128 - height:, index * width + 4:(index + 1) * width - 4] = 40
+    return chart
+
+
+def shrink(image: np.ndarray, height: int, width: int) -> np.ndarray:
+    """
+    Box-filtered thumbnail of an image, as Pillow would resize it
+    """
+    rows = np.array_split(np.arange(image.shape[0]), height)
+    columns = np.array_split(np.arange(image.shape[1]), width)
+    return np.array([[image[np.ix_(row, column)].mean() for column in columns] for row in rows])
+
+
+def hash_charts(charts: list[np.ndarray]) -> list[dict]:
+    phashes = get_phashes(np.stack([shrink(chart, 32, 32) for chart in charts]))
+    dhashes = get_dhashes(np.stack([shrink(chart, 8, 9) for chart in charts]))
+    return [
+        {
+            "page_number": index + 1,
+            "image_index": 0,
+            "name": f"Im{index}.png",
+            "width": 128,
+            "height": 128,
+            "digest": hashlib.blake2b(chart.tobytes(), digest_size=8).hexdigest(),
+            "phash": f"{int(phash):016x}",
+            "dhash": f"{int(dhash):016x}",
+        }
+        for index, (chart, phash, dhash) in enumerate(zip(charts, phashes, dhashes))
+    ]
+
+
+def test_perceptual_hashes_are_close_for_similar_images() -> None:
+    chart = make_chart([40, 60, 80, 100])
+    charts = [chart, np.clip(chart.astype(int) - 10, 0, 255), make_chart([100, 20, 90, 10])]
+
+    base, darker, other = get_phashes(np.stack([shrink(chart, 32, 32) for chart in charts]))
+    dhashes = get_dhashes(np.stack([shrink(chart, 8, 9) for chart in charts]))
+
+    assert get_hamming_distance(int(base), int(darker)) <= 2
+    assert get_hamming_distance(int(base), int(other)) > 12
+    assert dhashes.dtype == np.uint64
+    assert get_hamming_distance(int(dhashes[0]), int(dhashes[1])) == 0
+
+
+def test_bk_tree_finds_every_hash_within_distance() -> None:
+    generator = random.Random(3)
+    values = [generator.getrandbits(64) for _ in range(2000)]
+    tree = BKTree()
+    for index, value in enumerate(values):
+        tree.add(value, index)
+    query = values[17] ^ 0b1011
+
+    found = sorted(index for _, index in tree.search(query, 20))
+
+    expected = [index for index, value in enumerate(values) if get_hamming_distance(query, value) <= 20]
+    assert found == expected
+    assert 17 in found
+
+
+def test_match_images_reports_changed_charts() -> None:
+    kept = make_chart([40, 60, 80, 100])
+    images_a = hash_charts([kept, make_chart([30, 50, 70, 90]), make_chart([120, 10, 120, 10])])
+    images_b = hash_charts([kept, make_chart([35, 55, 70, 90]), make_chart([10, 120, 10, 120])])
+
+    changes = match_images(images_a, images_b, max_distance=12)
+
+    pages = [
+        (change["type"], change["a"] and change["a"]["page_number"], change["b"] and change["b"]["page_number"])
+        for change in changes
+    ]
+    assert pages == [
+        ("modify", 2, 2),
+        ("delete", 3, None),
+        ("insert", None, 3),
+    ]
+
+
+def test_image_hashes_are_read_from_the_cache() -> None:
+    file = {
+        "_id": "file-id",
+        "file_name": "deck.pdf",
+        "content_hash": "content-hash",
+        "blob_path": "raw/deck.pdf",
+    }
+    mongo_service = AsyncMock()
+    mongo_service.get_image_hashes.return_value = []
+
+    with patch("backend.services.image_diff.get_mongo_service", return_value=mongo_service):
+        assert asyncio.run(get_image_hashes(file)) == []
+        assert asyncio.run(get_image_hashes({**file, "file_name": "notes.txt"})) == []
+
+    mongo_service.get_image_hashes.assert_awaited_once_with("content-hash", 1)
+
+
+def test_extract_pdf_images_hashes_page_images(tmp_path) -> None:
+    pytest.importorskip("PIL")
+    from PIL import Image
+
+    from backend.services.image_diff import extract_pdf_images
+
+    path = tmp_path / "deck.pdf"
+    pages = [Image.fromarray(make_chart([40, 60, 80, 100])).convert("RGB") for _ in range(2)]
+    pages[0].save(path, save_all=True, append_images=pages[1:])
+
+    images = extract_pdf_images(str(path))
+
+    assert [image["page_number"] for image in images] == [1, 2]
+    assert images[0]["phash"] == images[1]["phash"]
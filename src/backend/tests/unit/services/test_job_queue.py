@@ -0,0 +1,102 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.services.job_queue import (
+    Job,
+    JobQueue,
+    JobState,
+    JobWorker,
+    get_retry_delay,
+)
+
+
+def test_get_retry_delay_doubles_up_to_the_maximum() -> None:
+    assert [get_retry_delay(attempts, 2, 20) for attempts in range(1, 6)] == [2, 4, 8, 16, 20]
+
+
+def test_enqueue_skips_active_job() -> None:
+    collection = MagicMock()
+    collection.update_one = AsyncMock(side_effect=DuplicateKeyError("duplicate"))
+
+    with patch("backend.services.job_queue.get_mongo_service") as get_mongo_service:
+        get_mongo_service.return_value.db = {"jobs": collection}
+        queued = asyncio.run(JobQueue("jobs", max_running=2).enqueue("job", "tenant", {}))
+
+    assert not queued
+
+
+def test_fail_schedules_retry_with_backoff() -> None:
+    collection = MagicMock()
+    collection.update_one = AsyncMock()
+
+    with patch("backend.services.job_queue.get_mongo_service") as get_mongo_service:
+        get_mongo_service.return_value.db = {"jobs": collection}
+        queue = JobQueue("jobs", max_running=2, max_attempts=3, retry_backoff_seconds=10)
+        retried = asyncio.run(queue.fail("job", 2, "Rejected", "lease"))
+        failed = not asyncio.run(queue.fail("job", 3, "Rejected", "lease"))
+
+    assert retried and failed
+    retry_query, retry_update = collection.update_one.call_args_list[0].args
+    assert retry_query == {"_id": "job", "state": JobState.RUNNING, "lease_id": "lease"}
+    retry_fields = retry_update["$set"]
+    assert retry_fields["state"] == JobState.QUEUED
+    assert (retry_fields["available_at"] - retry_fields["updated_at"]).total_seconds() == 20
+    assert collection.update_one.call_args_list[1].args[1]["$set"]["state"] == JobState.FAILED
+
+
+def test_claim_respects_global_cap() -> None:
+    collection = MagicMock()
+    collection.count_documents = AsyncMock(return_value=2)
+    collection.find_one_and_update = AsyncMock()
+
+    with patch("backend.services.job_queue.get_mongo_service") as get_mongo_service:
+        get_mongo_service.return_value.db = {"jobs": collection}
+        job = asyncio.run(JobQueue("jobs", max_running=2).claim())
+
+    assert job is None
+    collection.find_one_and_update.assert_not_awaited()
+
+
+class SleepingWorker(JobWorker):
+    async def _run_job(self, job: Job):
+        heartbeat = asyncio.create_task(self._renew_lease(job, asyncio.current_task()))
+        try:
+            await asyncio.sleep(0.5)
+        finally:
+            heartbeat.cancel()
+
+    async def _recover_orphans(self):
+        pass
+
+
+def test_heartbeat_keeps_renewing_after_an_error() -> None:
+    queue = MagicMock(lease_seconds=0.03)
+    queue.renew = AsyncMock(side_effect=[Exception("Mongo unavailable"), True])
+    job = Job(id="job", tenant_id="tenant", payload={}, attempts=1, lease_id="lease")
+
+    async def run() -> bool:
+        attempt = asyncio.create_task(SleepingWorker(queue, 1, 1)._run_job(job))
+        while queue.renew.await_count < 2:
+            await asyncio.sleep(0.005)
+        attempt.cancel()
+        await asyncio.gather(attempt, return_exceptions=True)
+        return attempt.cancelled()
+
+    assert asyncio.run(asyncio.wait_for(run(), 1))
+    assert queue.renew.await_args_list[1].args == ("job", "lease")
+
+
+def test_heartbeat_cancels_the_attempt_when_the_lease_is_lost() -> None:
+    queue = MagicMock(lease_seconds=0.03)
+    queue.renew = AsyncMock(return_value=False)
+    job = Job(id="job", tenant_id="tenant", payload={}, attempts=1, lease_id="lease")
+
+    async def run() -> bool:
+        attempt = asyncio.create_task(SleepingWorker(queue, 1, 1)._run_job(job))
+        await asyncio.gather(attempt, return_exceptions=True)
+        return attempt.cancelled()
+
+    assert asyncio.run(run())
+    queue.renew.assert_awaited_once()
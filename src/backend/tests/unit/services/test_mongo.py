@@ -0,0 +1,77 @@
+import asyncio
+import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backend.services.mongo import (
+    LIST_FILE_PROJECTION,
+    MongoService,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def make_mongo_service(files: list[dict]) -> tuple[MongoService, MagicMock]:
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(side_effect=lambda length: files[:length])
+
+    with patch("backend.services.mongo.AsyncIOMotorClient"):
+        mongo_service = MongoService()
+    mongo_service.files_collection = MagicMock()
+    mongo_service.files_collection.find.return_value = cursor
+    return mongo_service, cursor
+
+
+def make_files(count: int) -> list[dict]:
+    created_at = datetime.datetime(2024, 1, 1)
+    return [
+        {"_id": f"file-{i}", "created_at": created_at + datetime.timedelta(seconds=i)}
+        for i in range(count)
+    ]
+
+
+def test_cursor_round_trip() -> None:
+    created_at = datetime.datetime(2024, 1, 1, 12, 30, 15, 123000)
+
+    assert decode_cursor(encode_cursor(created_at, "file-id")) == (created_at, "file-id")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_get_files_by_conversation_id_returns_next_cursor() -> None:
+    files = make_files(3)
+    mongo_service, cursor = make_mongo_service(files)
+
+    page, next_cursor = asyncio.run(
+        mongo_service.get_files_by_conversation_id("conversation", limit=2)
+    )
+
+    assert page == files[:2]
+    assert decode_cursor(next_cursor) == (files[1]["created_at"], "file-1")
+    mongo_service.files_collection.find.assert_called_once_with(
+        {"conversation_id": "conversation"}, LIST_FILE_PROJECTION
+    )
+    cursor.limit.assert_called_once_with(3)
+
+
+def test_get_files_by_conversation_id_starts_after_cursor() -> None:
+    files = make_files(2)
+    mongo_service, _ = make_mongo_service(files)
+    created_at = datetime.datetime(2024, 1, 1)
+
+    page, next_cursor = asyncio.run(
+        mongo_service.get_files_by_conversation_id(
+            "conversation", limit=2, cursor=encode_cursor(created_at, "file-0")
+        )
+    )
+
+    assert page == files
+    assert next_cursor is None
+    query = mongo_service.files_collection.find.call_args.args[0]
+    assert query["$or"] == [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "_id": {"$gt": "file-0"}},
+    ]
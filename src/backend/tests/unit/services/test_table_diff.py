@@ -0,0 +1,78 @@
+import time
+
+from backend.schemas.compare import CompareOptions
+from backend.services.table_diff import detect_tables, diff_page_tables, parse_number
+
+STATEMENT = """Consolidated statement of income
+(in millions) 2023 2022
+Revenue 1,250.0 1,100.0
+Cost of sales (700.0) (650.0)
+Gross profit 550.0 450.0
+Operating expenses (300.0) (280.0)
+Net income 250.0 170.0
+The notes are an integral part of these statements."""
+
+
+def test_parse_number_reads_financial_notation() -> None:
+    assert parse_number("1,250.5") == 1250.5
+    assert parse_number("(700)") == -700
+    assert parse_number("-$12") == -12
+    assert parse_number("15%") == 15
+    assert parse_number("Revenue") is None
+
+
+def test_detect_tables_reads_labels_and_year_headers() -> None:
+    (table,) = detect_tables(4, STATEMENT)
+
+    assert table.columns == ["2023", "2022"]
+    assert table.labels[:2] == ["Revenue", "Cost of sales"]
+    assert table.values.shape == (5, 2)
+    assert table.values[1, 0] == -700
+
+
+def test_diff_page_tables_aligns_rows_by_label_and_columns_by_header() -> None:
+    revised = (
+        STATEMENT.replace("2023 2022", "2024 2023")
+        .replace("Revenue 1,250.0 1,100.0", "Revenue 1,400.0 1,250.0")
+        .replace("Cost of sales (700.0) (650.0)", "Costs of sales (760.0) (700.0)")
+        .replace("Gross profit 550.0 450.0", "Gross profit 640.0 550.0")
+        .replace("Operating expenses (300.0) (280.0)", "Operating expenses (320.0) (300.5)")
+        .replace("Net income 250.0 170.0", "Net income 320.0 250.0")
+    )
+
+    (change,) = diff_page_tables([(1, STATEMENT)], [(2, revised)], CompareOptions())
+
+    assert change["a"] == {"page_number": 1, "table_index": 0}
+    assert change["b"] == {"page_number": 2, "table_index": 0}
+    # Only the 2023 column is in both versions, and only one of its values was restated
+    assert change["cells"] == [
+        {
+            "row": "Operating expenses",
+            "column": "2023",
+            "a_value": -300.0,
+            "b_value": -300.5,
+            "delta": -0.5,
+            "relative_change": -0.5 / 300,
+        }
+    ]
+
+    options = CompareOptions(numeric_change_threshold=0.01)
+    assert diff_page_tables([(1, STATEMENT)], [(2, revised)], options) == []
+
+
+def test_diff_page_tables_handles_thousands_of_tables_quickly() -> None:
+    def make_page(page_number: int, offset: float) -> tuple[int, str]:
+        rows = "\n".join(
+            f"Item {page_number}-{row} {row * 10 + offset:,.1f} {row * 7:,.1f}" for row in range(12)
+        )
+        return page_number, f"Schedule {page_number}\nLine item Current Prior\n{rows}\n"
+
+    pages_a = [make_page(page_number, 0) for page_number in range(1, 2001)]
+    pages_b = [make_page(page_number, 1 if page_number % 2 else 0) for page_number in range(1, 2001)]
+
+    started = time.perf_counter()
+    table_changes = diff_page_tables(pages_a, pages_b, CompareOptions())
+
+    assert time.perf_counter() - started < 10
+    assert len(table_changes) == 1000
+    assert {cell["column"] for change in table_changes for cell in change["cells"]} == {"Current"}
@@ -0,0 +1,131 @@
+import os
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from backend.services import tabular
+from backend.services.table_query import TableQuery, _may_match, run_table_query
+
+
+class LocalBlobService:
+    """
+    Serves objects from a local directory and records the ranges read
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.bytes_read = 0
+
+    def read_file_range(self, object_name: str, start: int, length: int) -> bytes:
+        with open(os.path.join(self.directory, object_name), "rb") as file:
+            file.seek(start)
+            data = file.read(length)
+        self.bytes_read += len(data)
+        return data
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    """
+    1000 orders in row groups of 100, sorted by id
+    """
+    source_path = tmp_path / "orders.parquet"
+    pq.write_table(
+        pa.table(
+            {
+                "id": list(range(1000)),
+                "region": [["EU", "US", "APAC"][index % 3] for index in range(1000)],
+                "amount": [float(index % 10) for index in range(1000)],
+            }
+        ),
+        source_path,
+    )
+    output_dir = tmp_path / "artifacts"
+    output_dir.mkdir()
+    [sheet] = tabular.write_table_artifacts(str(source_path), str(output_dir), 100)
+    sheet["blob_path"] = "0.parquet"
+
+    with patch.object(tabular, "get_blob_service", return_value=LocalBlobService(str(output_dir))):
+        yield sheet
+
+
+def test_filters_skip_row_groups_by_statistics(sheet) -> None:
+    query = TableQuery.from_parameters(
+        {
+            "filters": [
+                {"column": "id", "operator": ">=", "value": 250},
+                {"column": "id", "operator": "<", "value": 400},
+                {"column": "region", "operator": "==", "value": "EU"},
+            ],
+            "columns": ["id"],
+            "limit": 3,
+        }
+    )
+
+    result = run_table_query(sheet, query)
+
+    assert result.row_groups_read == 2
+    assert result.row_groups_total == 10
+    assert result.total_rows == 50
+    assert result.table.column_names == ["id"]
+    assert result.table.column("id").to_pylist() == [252, 255, 258]
+
+
+def test_in_filter_accepts_a_single_value(sheet) -> None:
+    query = TableQuery.from_parameters(
+        {"filters": [{"column": "id", "operator": "in", "value": 150}]}
+    )
+
+    result = run_table_query(sheet, query)
+
+    assert result.row_groups_read == 1
+    assert result.table.column("id").to_pylist() == [150]
+
+    [item] = TableQuery.from_parameters(
+        {"filters": [{"column": "name", "operator": "in", "value": "Alice"}]}
+    ).filters
+    row_group = {"statistics": [{"column": "name", "min": "Aaron", "max": "Bob"}]}
+    assert _may_match(row_group, item)
+
+
+def test_group_by_aggregates_and_sorts(sheet) -> None:
+    query = TableQuery.from_parameters(
+        {
+            "filters": [{"column": "amount", "operator": "in", "value": [1, 2]}],
+            "group_by": ["region"],
+            "aggregates": [{"column": "amount", "function": "sum"}, {"column": "*", "function": "count"}],
+            "sort_by": "amount_sum",
+            "descending": True,
+        }
+    )
+
+    result = run_table_query(sheet, query)
+
+    assert result.table.column_names == ["region", "amount_sum", "count"]
+    assert result.table.to_pylist() == [
+        {"region": "APAC", "amount_sum": 101.0, "count": 67},
+        {"region": "US", "amount_sum": 100.0, "count": 67},
+        {"region": "EU", "amount_sum": 99.0, "count": 66},
+    ]
+
+
+def test_scalar_aggregates_and_invalid_queries(sheet) -> None:
+    result = run_table_query(
+        sheet,
+        TableQuery.from_parameters(
+            {"aggregates": [{"column": "amount", "function": "mean"}, {"column": "region", "function": "count_distinct"}]}
+        ),
+    )
+
+    assert result.table.to_pylist() == [{"amount_mean": 4.5, "region_count_distinct": 3}]
+    with pytest.raises(ValueError, match="Unknown columns: price"):
+        run_table_query(sheet, TableQuery.from_parameters({"columns": ["price"]}))
+    with pytest.raises(ValueError, match="Cannot compare column id"):
+        run_table_query(
+            sheet,
+            TableQuery.from_parameters({"filters": [{"column": "id", "operator": "==", "value": "many"}]}),
+        )
+    with pytest.raises(ValueError, match="Unsupported aggregate function median"):
+        TableQuery.from_parameters({"aggregates": [{"column": "amount", "function": "median"}]})
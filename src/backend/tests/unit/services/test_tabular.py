@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import io
+import os
+import zipfile
+from unittest.mock import AsyncMock, MagicMock, patch
+from xml.sax.saxutils import escape
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.services import tabular
+
+
+def make_xlsx(sheets: dict[str, list[list]]) -> bytes:
+    """
+    Builds a minimal workbook, one worksheet per entry of `sheets`
+    """
+    def cell(reference, value):
+        if isinstance(value, (int, float)):
+            return f'<c r="{reference}"><v>{value}</v></c>'
+        return f'<c r="{reference}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+    def rows_xml(rows):
+        return "".join(
+            f'<row r="{row_index + 1}">'
+            + "".join(
+                cell(f"{chr(65 + column_index)}{row_index + 1}", value)
+                for column_index, value in enumerate(row)
+            )
+            + "</row>"
+            for row_index, row in enumerate(rows)
+        )
+
+    main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    relationships = "http://schemas.openxmlformats.org/package/2006/relationships"
+    office = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="{content_type}.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{index}.xml" ContentType="{content_type}.worksheet+xml"/>'
+                for index in range(1, len(sheets) + 1)
+            )
+            + "</Types>",
+        )
+        archive.writestr(
+            "_rels/.rels",
+            f'<Relationships xmlns="{relationships}"><Relationship Id="rId1" '
+            f'Type="{office}/officeDocument" Target="xl/workbook.xml"/></Relationships>',
+        )
+        archive.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{main}" xmlns:r="{office}"><sheets>'
+            + "".join(
+                f'<sheet name="{escape(name)}" sheetId="{index}" r:id="rId{index}"/>'
+                for index, name in enumerate(sheets, start=1)
+            )
+            + "</sheets></workbook>",
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{relationships}">'
+            + "".join(
+                f'<Relationship Id="rId{index}" Type="{office}/worksheet" '
+                f'Target="worksheets/sheet{index}.xml"/>'
+                for index in range(1, len(sheets) + 1)
+            )
+            + "</Relationships>",
+        )
+        for index, rows in enumerate(sheets.values(), start=1):
+            archive.writestr(
+                f"xl/worksheets/sheet{index}.xml",
+                f'<worksheet xmlns="{main}"><sheetData>{rows_xml(rows)}</sheetData></worksheet>',
+            )
+    return buffer.getvalue()
+
+
+def test_read_tables_reads_every_sheet_with_types() -> None:
+    workbook = make_xlsx(
+        {
+            "Revenue": [["region", "amount", "amount"], ["EU", 10, 1], ["US", 2.5, "n/a"]],
+            "Notes": [["note"], ["first"]],
+        }
+    )
+
+    tables = tabular.read_tables("report.xlsx", workbook)
+
+    assert [name for name, _ in tables] == ["Revenue", "Notes"]
+    revenue = tables[0][1]
+    assert revenue.column_names == ["region", "amount", "amount_1"]
+    assert revenue.column("amount").to_pylist() == [10, 2.5]
+    assert revenue.column("amount_1").to_pylist() == ["1", "n/a"]
+    assert tabular.render_tables_text(tables).startswith(
+        "Sheet: Revenue\nregion\tamount\tamount_1\nEU\t10.0\t1\n"
+    )
+
+
+class LocalBlobService:
+    """
+    Serves objects from a local directory and records the ranges read
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.bytes_read = 0
+
+    def read_file_range(self, object_name: str, start: int, length: int) -> bytes:
+        with open(os.path.join(self.directory, object_name), "rb") as file:
+            file.seek(start)
+            data = file.read(length)
+        self.bytes_read += len(data)
+        return data
+
+
+def write_sheet(tmp_path, num_rows: int, row_group_size: int) -> dict:
+    source_path = tmp_path / "ledger.parquet"
+    pq.write_table(
+        pa.table(
+            {
+                "id": list(range(num_rows)),
+                # Hashes don't compress, so row groups are large next to the footer
+                "label": [
+                    f"row {index} " + hashlib.sha256(str(index).encode()).hexdigest() * 4
+                    for index in range(num_rows)
+                ],
+            }
+        ),
+        source_path,
+    )
+    output_dir = tmp_path / "artifacts"
+    output_dir.mkdir()
+
+    [sheet] = tabular.write_table_artifacts(str(source_path), str(output_dir), row_group_size)
+    sheet["blob_path"] = "0.parquet"
+    return sheet
+
+
+def test_write_table_artifacts_records_row_group_statistics(tmp_path) -> None:
+    sheet = write_sheet(tmp_path, num_rows=250, row_group_size=100)
+
+    assert sheet["name"] == "ledger"
+    assert sheet["num_rows"] == 250
+    assert sheet["columns"] == [
+        {"name": "id", "type": "int64"},
+        {"name": "label", "type": "string"},
+    ]
+    assert [(group["first_row"], group["num_rows"]) for group in sheet["row_groups"]] == [
+        (0, 100),
+        (100, 100),
+        (200, 50),
+    ]
+    id_statistics = sheet["row_groups"][1]["statistics"][0]
+    assert id_statistics == {"column": "id", "min": 100, "max": 199, "null_count": 0}
+
+
+def test_table_pages_are_rendered_from_the_row_groups_they_need(tmp_path) -> None:
+    sheet = write_sheet(tmp_path, num_rows=20000, row_group_size=500)
+    manifest = {"rows_per_page": 200, "sheets": [sheet]}
+    blob_service = LocalBlobService(str(tmp_path / "artifacts"))
+
+    with patch.object(tabular, "get_blob_service", return_value=blob_service):
+        pages = tabular.read_table_pages(manifest, start_page=3, limit=2)
+
+    assert tabular.get_table_page_count(manifest) == 100
+    assert [page["page_number"] for page in pages] == [3, 4]
+    first_lines = pages[0]["text"].split("\n")
+    assert first_lines[0] == "Sheet: ledger, rows 401-600 of 20000"
+    assert first_lines[1] == "id\tlabel"
+    assert first_lines[2].startswith("400\trow 400 ")
+    assert pages[1]["text"].split("\n")[2].startswith("600\t")
+    # Rows 400-800 are in the first two of forty row groups
+    assert blob_service.bytes_read < sheet["file_size"] / 4
+
+
+def test_read_sheet_rows_selects_columns(tmp_path) -> None:
+    sheet = write_sheet(tmp_path, num_rows=300, row_group_size=100)
+    blob_service = LocalBlobService(str(tmp_path / "artifacts"))
+
+    with patch.object(tabular, "get_blob_service", return_value=blob_service):
+        rows = tabular.read_sheet_rows(sheet, offset=295, limit=10, columns=["id"])
+        past_end = tabular.read_sheet_rows(sheet, offset=400, limit=10)
+
+    assert rows.column_names == ["id"]
+    assert rows.column("id").to_pylist() == [295, 296, 297, 298, 299]
+    assert past_end.num_rows == 0
+    assert past_end.column_names == ["id", "label"]
+
+
+def test_get_file_text_pages_reads_stored_pages_of_other_files() -> None:
+    mongo_service = MagicMock()
+    mongo_service.get_pages = AsyncMock(
+        side_effect=lambda content_key, start_page, limit: [
+            {"page_number": start_page, "text": content_key}
+        ]
+    )
+
+    with patch.object(tabular, "get_mongo_service", return_value=mongo_service):
+        pages = asyncio.run(
+            tabular.get_file_text_pages({"_id": "file-id", "content_hash": "hash"}, 2, 1)
+        )
+
+    assert pages == [{"page_number": 2, "text": "hash"}]
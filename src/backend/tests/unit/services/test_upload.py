@@ -0,0 +1,289 @@
+import asyncio
+import datetime
+import hashlib
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from pymongo.errors import BulkWriteError
+
+from backend.schemas.file import CompletedUploadPart, FileStatus
+from backend.services.blob import UploadedBlob
+from backend.services.upload import complete_direct_upload, upload_conversation_files
+
+
+def make_upload_files(file_names: list[str], content: bytes = b"content") -> list[UploadFile]:
+    return [
+        UploadFile(file=io.BytesIO(content), filename=file_name, size=len(content))
+        for file_name in file_names
+    ]
+
+
+def make_mongo_service(contents: dict | None = None) -> MagicMock:
+    contents = {} if contents is None else contents
+
+    async def claim_content(content_hash, blob_path, file_size, status):
+        if content_hash in contents:
+            return contents[content_hash], False
+        contents[content_hash] = {"_id": content_hash, "blob_path": blob_path, "status": status}
+        return contents[content_hash], True
+
+    mongo_service = MagicMock()
+    mongo_service.claim_content = AsyncMock(side_effect=claim_content)
+    mongo_service.get_content = AsyncMock(side_effect=lambda content_hash: contents.get(content_hash))
+    mongo_service.create_files_metadata = AsyncMock()
+    mongo_service.update_file_status = AsyncMock()
+    return mongo_service
+
+
+def make_blob_service(stream_upload=None) -> MagicMock:
+    async def default_stream_upload(file, object_name):
+        content = await file.read()
+        return UploadedBlob(object_name, len(content), hashlib.sha256(content).hexdigest())
+
+    blob_service = MagicMock()
+    blob_service.stream_upload = AsyncMock(side_effect=stream_upload or default_stream_upload)
+    blob_service.delete_file = AsyncMock()
+    return blob_service
+
+
+def run_upload(files, blob_service, mongo_service, extraction_service, settings=None):
+    patches = [
+        patch("backend.services.upload.get_blob_service", return_value=blob_service),
+        patch("backend.services.upload.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.upload.get_extraction_service", return_value=extraction_service),
+    ]
+    if settings is not None:
+        patches.append(patch("backend.services.upload.Settings", return_value=settings))
+    for p in patches:
+        p.start()
+    try:
+        return asyncio.run(upload_conversation_files(files, "user", "conversation", MagicMock()))
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_upload_conversation_files_keeps_order_and_isolates_failures() -> None:
+    async def stream_upload(file, object_name):
+        # Finish the first files last to check the responses keep the input order
+        await asyncio.sleep(0.01 if file.filename == "a.pdf" else 0)
+        if file.filename == "b.pdf":
+            raise Exception("Storage unavailable")
+        return UploadedBlob(object_name, 7, file.filename)
+
+    mongo_service = make_mongo_service()
+    extraction_service = AsyncMock()
+
+    results = run_upload(
+        make_upload_files(["a.pdf", "b.pdf", "c.pdf"]),
+        make_blob_service(stream_upload),
+        mongo_service,
+        extraction_service,
+    )
+
+    assert [result.file_name for result in results] == ["a.pdf", "b.pdf", "c.pdf"]
+    assert [result.status for result in results] == [
+        FileStatus.QUEUED,
+        FileStatus.FAILED_UPLOAD,
+        FileStatus.QUEUED,
+    ]
+    assert results[1].error == "Storage unavailable"
+    registered = mongo_service.create_files_metadata.call_args.args[0]
+    assert [file_meta["file_name"] for file_meta in registered] == ["a.pdf", "c.pdf"]
+    mongo_service.create_files_metadata.assert_awaited_once()
+    assert extraction_service.trigger_extraction.await_count == 2
+
+
+def test_upload_conversation_files_limits_files_in_flight() -> None:
+    in_flight = 0
+    max_in_flight = 0
+
+    async def stream_upload(file, object_name):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return UploadedBlob(object_name, 7, file.filename)
+
+    settings = MagicMock()
+    settings.get.return_value = 2
+
+    results = run_upload(
+        make_upload_files([f"{i}.pdf" for i in range(6)]),
+        make_blob_service(stream_upload),
+        make_mongo_service(),
+        AsyncMock(),
+        settings,
+    )
+
+    assert len(results) == 6
+    assert max_in_flight == 2
+
+
+def test_upload_conversation_files_reuses_existing_content() -> None:
+    content_hash = hashlib.sha256(b"content").hexdigest()
+    contents = {
+        content_hash: {
+            "_id": content_hash,
+            "blob_path": "raw/first/prospectus.pdf",
+            "status": FileStatus.EXTRACTED,
+        }
+    }
+    blob_service = make_blob_service()
+    mongo_service = make_mongo_service(contents)
+    extraction_service = AsyncMock()
+
+    results = run_upload(
+        make_upload_files(["prospectus.pdf"]), blob_service, mongo_service, extraction_service
+    )
+
+    assert results[0].status == FileStatus.EXTRACTED
+    file_meta = mongo_service.create_files_metadata.call_args.args[0][0]
+    assert file_meta["blob_path"] == "raw/first/prospectus.pdf"
+    assert file_meta["content_hash"] == content_hash
+    blob_service.delete_file.assert_awaited_once()
+    extraction_service.trigger_extraction.assert_not_awaited()
+
+
+# Content left UPLOADED was claimed by an upload that never got to queue its extraction
+@pytest.mark.parametrize("content_status", [FileStatus.FAILED, FileStatus.UPLOADED])
+def test_upload_conversation_files_extracts_again_after_failure(content_status) -> None:
+    content_hash = hashlib.sha256(b"content").hexdigest()
+    contents = {
+        content_hash: {
+            "_id": content_hash,
+            "blob_path": "raw/first/prospectus.pdf",
+            "status": content_status,
+        }
+    }
+    extraction_service = AsyncMock()
+
+    results = run_upload(
+        make_upload_files(["prospectus.pdf"]),
+        make_blob_service(),
+        make_mongo_service(contents),
+        extraction_service,
+    )
+
+    assert results[0].status == FileStatus.QUEUED
+    extraction_service.trigger_extraction.assert_awaited_once()
+    assert extraction_service.trigger_extraction.call_args.args[1] == "raw/first/prospectus.pdf"
+    assert extraction_service.trigger_extraction.call_args.kwargs["tenant_id"] == "user"
+
+
+def test_upload_conversation_files_reports_metadata_insert_failures() -> None:
+    mongo_service = make_mongo_service()
+    mongo_service.create_files_metadata.side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 1, "errmsg": "Duplicate key"}]}
+    )
+    extraction_service = AsyncMock()
+
+    results = run_upload(
+        make_upload_files(["a.pdf", "b.pdf"]),
+        make_blob_service(),
+        mongo_service,
+        extraction_service,
+    )
+
+    assert [result.status for result in results] == [FileStatus.QUEUED, FileStatus.FAILED_UPLOAD]
+    assert results[1].error == "Duplicate key"
+    extraction_service.trigger_extraction.assert_awaited_once()
+
+
+CONTENT = b"direct content"
+
+
+def make_upload_session(**fields) -> dict:
+    return {
+        "_id": "file-id",
+        "user_id": "user",
+        "conversation_id": "conversation",
+        "file_name": "large.pdf",
+        "file_size": len(CONTENT),
+        "sha256": hashlib.sha256(CONTENT).hexdigest(),
+        "blob_path": "raw/file-id/large.pdf",
+        "upload_id": "upload-id",
+        "expires_at": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        **fields,
+    }
+
+
+def run_completion(session, blob_service, mongo_service, extraction_service):
+    mongo_service.get_upload_session = AsyncMock(return_value=session)
+    mongo_service.delete_upload_session = AsyncMock(return_value=session)
+    with (
+        patch("backend.services.upload.get_blob_service", return_value=blob_service),
+        patch("backend.services.upload.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.upload.get_extraction_service", return_value=extraction_service),
+    ):
+        return asyncio.run(
+            complete_direct_upload(
+                "file-id",
+                [CompletedUploadPart(part_number=1, etag="etag-1")],
+                "user",
+                "conversation",
+                MagicMock(),
+            )
+        )
+
+
+def make_stored_blob_service(content: bytes = CONTENT) -> MagicMock:
+    blob_service = make_blob_service()
+    blob_service.complete_presigned_upload = AsyncMock()
+    blob_service.get_file_info = AsyncMock(return_value={"ContentLength": len(content)})
+    blob_service.hash_file = AsyncMock(return_value=hashlib.sha256(content).hexdigest())
+    return blob_service
+
+
+def test_complete_direct_upload_registers_and_queues_file() -> None:
+    blob_service = make_stored_blob_service()
+    mongo_service = make_mongo_service()
+    extraction_service = AsyncMock()
+
+    result = run_completion(make_upload_session(), blob_service, mongo_service, extraction_service)
+
+    assert result.status == FileStatus.QUEUED
+    assert result.file_size == len(CONTENT)
+    blob_service.complete_presigned_upload.assert_awaited_once_with(
+        "raw/file-id/large.pdf", "upload-id", [{"PartNumber": 1, "ETag": "etag-1"}]
+    )
+    file_meta = mongo_service.create_files_metadata.call_args.args[0][0]
+    assert file_meta["_id"] == "file-id"
+    assert file_meta["content_hash"] == hashlib.sha256(CONTENT).hexdigest()
+    extraction_service.trigger_extraction.assert_awaited_once_with(
+        "file-id",
+        "raw/file-id/large.pdf",
+        hashlib.sha256(CONTENT).hexdigest(),
+        tenant_id="user",
+    )
+
+
+def test_complete_direct_upload_rejects_mismatching_hash() -> None:
+    blob_service = make_stored_blob_service(b"other content!")
+    mongo_service = make_mongo_service()
+    extraction_service = AsyncMock()
+
+    with pytest.raises(HTTPException) as exc_info:
+        run_completion(make_upload_session(), blob_service, mongo_service, extraction_service)
+
+    assert exc_info.value.status_code == 400
+    blob_service.delete_file.assert_awaited_once_with("raw/file-id/large.pdf")
+    mongo_service.create_files_metadata.assert_not_awaited()
+    extraction_service.trigger_extraction.assert_not_awaited()
+
+
+def test_complete_direct_upload_of_another_user_is_not_found() -> None:
+    mongo_service = make_mongo_service()
+    blob_service = make_stored_blob_service()
+
+    with pytest.raises(HTTPException) as exc_info:
+        run_completion(
+            make_upload_session(user_id="someone-else"), blob_service, mongo_service, AsyncMock()
+        )
+
+    assert exc_info.value.status_code == 404
+    mongo_service.delete_upload_session.assert_not_awaited()
+    blob_service.complete_presigned_upload.assert_not_awaited()
@@ -0,0 +1,29 @@
+from itertools import accumulate
+
+from backend.services.utils import iter_pdf_pages, join_pdf_pages, read_pdf
+
+PDF_PATH = "src/backend/tests/unit/test_data/Mariana_Trench.pdf"
+
+
+def read_test_pdf() -> bytes:
+    with open(PDF_PATH, "rb") as file:
+        return file.read()
+
+
+def test_iter_pdf_pages_yields_pages_with_offsets() -> None:
+    pages = list(iter_pdf_pages(read_test_pdf(), window=2))
+
+    assert [page.page_number for page in pages] == list(range(1, 10))
+    assert [page.char_offset for page in pages] == [0] + list(
+        accumulate(len(page.text) for page in pages[:-1])
+    )
+    assert join_pdf_pages(pages) == read_pdf(read_test_pdf())
+
+
+def test_iter_pdf_pages_reads_a_range() -> None:
+    pages = list(iter_pdf_pages(PDF_PATH, start=3, stop=6))
+    all_pages = list(iter_pdf_pages(PDF_PATH))
+
+    assert [page.page_number for page in pages] == [4, 5, 6]
+    assert [page.text for page in pages] == [page.text for page in all_pages[3:6]]
+    assert pages[0].char_offset == 0
@@ -0,0 +1,131 @@
+import asyncio
+import shutil
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from backend.services.visual_diff import (
+    align_pages,
+    compare_rasters,
+    delete_page_rasters,
+    diff_rasters,
+    get_page_rasters,
+)
+
+
+def make_page(seed: int, height: int = 120, width: int = 90) -> np.ndarray:
+    """
+    Grayscale page of dark text blocks on a white background
+    """
+    generator = np.random.default_rng(seed)
+    page = np.full((height, width), 255, dtype=np.uint8)
+    for top in range(8, height - 12, 10):
+        right = int(generator.integers(30, width - 8))
+        page[top:top + 4, 8:right] = 30
+    return page
+
+
+def test_diff_rasters_locates_changed_regions() -> None:
+    page = make_page(1)
+    revised = page.copy()
+    revised[96:108, 50:80] = 0
+
+    page_diff = diff_rasters(page, revised, tile_size=12)
+
+    (region,) = page_diff["regions"]
+    assert region["left"] <= 50 / 90 < region["right"]
+    assert region["top"] <= 96 / 120 < region["bottom"]
+    assert 0 < page_diff["changed_ratio"] < 0.1
+    assert diff_rasters(page, page, tile_size=12) == {"regions": [], "changed_ratio": 0.0}
+
+
+def test_diff_rasters_compensates_small_shifts() -> None:
+    page = make_page(2)
+    shifted = np.full_like(page, 255)
+    shifted[3:, 2:] = page[:-3, :-2]
+
+    assert diff_rasters(page, shifted, tile_size=12)["regions"] == []
+
+
+def test_align_pages_finds_inserted_pages() -> None:
+    pages = [make_page(seed) for seed in range(5)]
+    revised = pages[:2] + [make_page(10)] + pages[2:]
+
+    assert align_pages(pages, revised) == [(0, 0), (1, 1), (None, 2), (2, 3), (3, 4), (4, 5)]
+
+
+def test_compare_rasters_reports_changed_pages() -> None:
+    pages = [make_page(seed) for seed in range(3)]
+    revised = [pages[0], pages[1].copy(), pages[2]]
+    revised[1][20:40, 10:40] = 0
+    file_a = {"_id": "a", "file_name": "scan.pdf", "blob_path": "raw/a.pdf"}
+    file_b = {"_id": "b", "file_name": "scan.pdf", "blob_path": "raw/b.pdf"}
+
+    async def get_rasters(file, dpi, pages_per_task):
+        return pages if file is file_a else revised
+
+    with (
+        patch("backend.services.visual_diff.get_page_rasters", side_effect=get_rasters),
+        patch("backend.services.visual_diff.get_process_pool", return_value=None),
+    ):
+        result = asyncio.run(compare_rasters(file_a, file_b))
+
+    assert result["summary"]["identical_pages"] == 2
+    assert result["summary"]["modified"] == 1
+    (change,) = result["visual_changes"]
+    assert (change["type"], change["a_page_number"], change["b_page_number"]) == ("modify", 2, 2)
+    assert result["summary"]["changed_regions"] == len(change["regions"]) == 1
+
+
+def test_compare_rasters_requires_pdfs() -> None:
+    file_a = {"_id": "a", "file_name": "notes.txt", "blob_path": "raw/a.txt"}
+    file_b = {"_id": "b", "file_name": "scan.pdf", "blob_path": "raw/b.pdf"}
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(compare_rasters(file_a, file_b))
+    assert e.value.status_code == 400
+
+
+def test_get_page_rasters_reads_cached_rasters(tmp_path) -> None:
+    pages = [make_page(seed) for seed in range(2)]
+    np.savez_compressed(tmp_path / "cached.npz", **{str(i): page for i, page in enumerate(pages)})
+    mongo_service = AsyncMock()
+    mongo_service.get_raster_page_count.return_value = 2
+    blob_service = AsyncMock()
+    blob_service.download_to_file.side_effect = lambda _, path: shutil.copy(
+        tmp_path / "cached.npz", path
+    )
+    file = {"_id": "a", "content_hash": "hash", "file_name": "scan.pdf", "blob_path": "raw/a.pdf"}
+
+    with (
+        patch("backend.services.visual_diff.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.visual_diff.get_blob_service", return_value=blob_service),
+    ):
+        rasters = asyncio.run(get_page_rasters(file, 36, 16))
+
+    assert all(np.array_equal(raster, page) for raster, page in zip(rasters, pages))
+    blob_service.download_to_file.assert_awaited_once()
+    assert blob_service.download_to_file.await_args.args[0] == "rasters/hash/1-36.npz"
+    mongo_service.save_raster_page_count.assert_not_awaited()
+
+
+def test_delete_page_rasters_deletes_every_version() -> None:
+    mongo_service = AsyncMock()
+    mongo_service.delete_rasters.return_value = [
+        {"_id": "hash:1:36", "version": 1, "dpi": 36},
+        {"_id": "hash:1:72", "version": 1, "dpi": 72},
+    ]
+    blob_service = MagicMock()
+
+    with (
+        patch("backend.services.visual_diff.get_mongo_service", return_value=mongo_service),
+        patch("backend.services.visual_diff.get_blob_service", return_value=blob_service),
+    ):
+        asyncio.run(delete_page_rasters("hash"))
+
+    mongo_service.delete_rasters.assert_awaited_once_with("hash")
+    blob_service.delete_files.assert_called_once_with(
+        ["rasters/hash/1-36.npz", "rasters/hash/1-72.npz"]
+    )
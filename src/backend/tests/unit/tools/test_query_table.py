@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pyarrow as pa
+import pytest
+
+from backend.schemas.context import Context
+from backend.services.table_query import TableQueryResult
+from backend.tools import QueryTableTool
+
+FILE = {"_id": "file-id", "file_name": "orders.csv", "user_id": "user-id", "format": "table"}
+MANIFEST = {"rows_per_page": 200, "sheets": [{"name": "orders", "columns": [], "row_groups": []}]}
+
+
+def patch_file(file: dict):
+    mongo_service = MagicMock(get_file_metadata=AsyncMock(return_value=file))
+    return patch("backend.tools.table_query.get_mongo_service", return_value=mongo_service)
+
+
+@pytest.mark.asyncio
+async def test_query_table_returns_rendered_result() -> None:
+    result = TableQueryResult(
+        table=pa.table({"region": ["EU"], "count": [3]}),
+        total_rows=2,
+        row_groups_read=1,
+        row_groups_total=1,
+    )
+
+    with (
+        patch_file(FILE),
+        patch("backend.tools.table_query.tabular.get_table_manifest", AsyncMock(return_value=MANIFEST)),
+        patch("backend.tools.table_query.query_table", AsyncMock(return_value=result)),
+    ):
+        output = await QueryTableTool().call(
+            {"file": ("orders.csv", "file-id"), "group_by": ["region"]}, Context(), user_id="user-id"
+        )
+
+    assert output == [
+        {
+            "text": "Sheet: orders, 2 result rows, showing the first 1\nregion\tcount\nEU\t3\n",
+            "title": "orders.csv",
+            "url": "orders.csv",
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_table_rejects_files_of_other_users() -> None:
+    with patch_file(FILE):
+        output = await QueryTableTool().call(
+            {"file": ("orders.csv", "file-id")}, Context(), user_id="other-user"
+        )
+
+    assert output[0]["success"] is False
+    assert "files were not found" in output[0]["details"]
@@ -10,6 +10,7 @@ from backend.tools.lang_chain import LangChainVectorDBRetriever, LangChainWikiRe
 from backend.tools.python_interpreter import PythonInterpreter
 from backend.tools.sharepoint import SharepointAuth, SharepointTool
 from backend.tools.slack import SlackAuth, SlackTool
+from backend.tools.table_query import QueryTableTool
 from backend.tools.tavily_search import TavilyWebSearch
 from backend.tools.web_scrape import WebScrapeTool
 
@@ -20,6 +21,7 @@ __all__ = [
     "LangChainWikiRetriever",
     "ReadFileTool",
     "SearchFileTool",
+    "QueryTableTool",
     "GoogleDrive",
     "GoogleDriveAuth",
     "WebScrapeTool",
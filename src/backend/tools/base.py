@@ -66,7 +66,8 @@ class ToolDefaultPreambleRegistry:
     _default_preambles = {
         "toolkit_python_interpreter": "If you decide to use toolkit_python_interpreter tool and are going to plot something, try returning result as a png. Ensure that the generated code does not include any internet connection.",
         "read_file": "When using the read_file tool, always ensure that the file parameter is prepared as a tuple in the format  (filename, file ID). The order of the tuple fields is critical. ",
-        "search_file":"When using the search_file tool, always ensure that the `files` parameter is prepared as a list of tuples in the format (filename, file ID). The order of the tuple fields is critical. "
+        "search_file":"When using the search_file tool, always ensure that the `files` parameter is prepared as a list of tuples in the format (filename, file ID). The order of the tuple fields is critical. ",
+        "query_table": "When using the query_table tool, always ensure that the file parameter is prepared as a tuple in the format (filename, file ID). Prefer filters and aggregates over reading whole tables, and use the column names exactly as they appear in the table. "
     }
 
     @classmethod
@@ -4,6 +4,7 @@ from typing import Any
 import backend.crud.file as file_crud
 from backend.schemas.context import Context
 from backend.schemas.tool import ToolCategory, ToolDefinition
+from backend.services.file import get_file_text
 from backend.tools.base import BaseTool
 
 
@@ -71,7 +72,7 @@ class ReadFileTool(BaseTool):
 
         return [
             {
-                "text": retrieved_file.file_content,
+                "text": await get_file_text(retrieved_file),
                 "title": retrieved_file.file_name,
                 "url": retrieved_file.file_name,
             }
@@ -143,7 +144,7 @@ class SearchFileTool(BaseTool):
         for file in retrieved_files:
             results.append(
                 {
-                    "text": file.file_content,
+                    "text": await get_file_text(file),
                     "title": file.file_name,
                     "url": file.file_name,
                 }
@@ -0,0 +1,139 @@
+from typing import Any
+
+from backend.schemas.context import Context
+from backend.schemas.tool import ToolCategory, ToolDefinition
+from backend.services import tabular
+from backend.services.mongo import get_mongo_service
+from backend.services.table_query import (
+    AGGREGATE_FUNCTIONS,
+    FILTER_OPERATORS,
+    MAX_RESULT_ROWS,
+    TableQuery,
+    query_table,
+)
+from backend.tools.base import BaseTool
+
+
+class QueryTableTool(BaseTool):
+    """
+    Tool to filter, group and aggregate the rows of an uploaded table (CSV, XLSX or Parquet),
+    returning only the small result instead of the whole file.
+    """
+
+    ID = "query_table"
+
+    def __init__(self):
+        pass
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    @classmethod
+    def get_tool_definition(cls) -> ToolDefinition:
+        return ToolDefinition(
+            name=cls.ID,
+            display_name="Query Table",
+            implementation=cls,
+            parameter_definitions={
+                "file": {
+                    "description": "A table file represented as a tuple (filename, file ID) to query",
+                    "type": "tuple[str, str]",
+                    "required": True,
+                },
+                "sheet": {
+                    "description": "Name of the sheet to query, defaults to the first sheet",
+                    "type": "str",
+                    "required": False,
+                },
+                "filters": {
+                    "description": (
+                        "Conditions rows must all match, as dicts with `column`, `operator` and `value`. "
+                        f"Operators are: {', '.join(sorted(FILTER_OPERATORS))}; `in` takes a list of values"
+                    ),
+                    "type": "list[dict]",
+                    "required": False,
+                },
+                "group_by": {
+                    "description": "Columns to group the matching rows by",
+                    "type": "list[str]",
+                    "required": False,
+                },
+                "aggregates": {
+                    "description": (
+                        "Aggregates to compute, as dicts with `column` and `function`, one of: "
+                        f"{', '.join(sorted(AGGREGATE_FUNCTIONS))}. Use column `*` to count rows. "
+                        "Results are named `{column}_{function}`, and `count` for counted rows"
+                    ),
+                    "type": "list[dict]",
+                    "required": False,
+                },
+                "columns": {
+                    "description": "Columns to return when not aggregating, defaults to all columns",
+                    "type": "list[str]",
+                    "required": False,
+                },
+                "sort_by": {
+                    "description": "Result column to sort by",
+                    "type": "str",
+                    "required": False,
+                },
+                "descending": {
+                    "description": "Whether to sort in descending order",
+                    "type": "bool",
+                    "required": False,
+                },
+                "limit": {
+                    "description": f"Maximum number of result rows to return, at most {MAX_RESULT_ROWS}",
+                    "type": "int",
+                    "required": False,
+                },
+            },
+            is_visible=True,
+            is_available=cls.is_available(),
+            error_message=cls.generate_error_message(),
+            category=ToolCategory.FileLoader,
+            description="Filters, groups and aggregates the rows of an uploaded spreadsheet, CSV or Parquet file.",
+        ) # type: ignore
+
+    async def call(
+        self, parameters: dict, ctx: Context, **kwargs: Any,
+    ) -> list[dict[str, Any]]:
+        file = parameters.get("file")
+        user_id = kwargs.get("user_id")
+        if not file:
+            return self.get_tool_error(details="Files are not passed in model generated params")
+
+        _, file_id = file
+        retrieved_file = await get_mongo_service().get_file_metadata(file_id)
+        if not retrieved_file or retrieved_file.get("user_id") != user_id:
+            return self.get_tool_error(details="The wrong files were passed in the tool parameters, or files were not found")
+
+        manifest = await tabular.get_table_manifest(retrieved_file)
+        if not manifest or not manifest["sheets"]:
+            return self.get_tool_error(details=f"{retrieved_file['file_name']} was not extracted as a table")
+
+        sheets = manifest["sheets"]
+        sheet_name = parameters.get("sheet")
+        sheet = next((sheet for sheet in sheets if sheet["name"] == sheet_name), None) if sheet_name else sheets[0]
+        if not sheet:
+            return self.get_tool_error(
+                details=f"Sheet {sheet_name} not found, sheets are: {', '.join(sheet['name'] for sheet in sheets)}"
+            )
+
+        try:
+            result = await query_table(sheet, TableQuery.from_parameters(parameters))
+        except ValueError as e:
+            return self.get_tool_error(details=str(e))
+
+        summary = (
+            f"Sheet: {sheet['name']}, {result.total_rows} result rows"
+            f"{f', showing the first {result.table.num_rows}' if result.total_rows > result.table.num_rows else ''}\n"
+        )
+        return [
+            {
+                "text": summary + tabular.render_rows(result.table),
+                "title": retrieved_file["file_name"],
+                "url": retrieved_file["file_name"],
+            }
+        ]